@@ -0,0 +1,117 @@
+# ==========================================================
+# 管理画面のボード構築のベンチマーク
+# ==========================================================
+# 従来の admin()（全タスクをORMで読み込み、ステータスごとに走査）と
+# build_board（列ごとの先頭ページを射影で取得し1回で振り分け）の
+# CPU時間とピークメモリを比較する。
+#
+#   $ python -m benchmarks.bench_admin --sizes 10000,100000
+import argparse
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, selectinload
+
+from flaskr.board import build_board
+from flaskr.models import Base, Category, Post
+from flaskr.scope import UserScope
+
+from .seed import seed
+
+STATUSES = ["todo", "progress", "archive"]
+
+
+def legacy_post_to_dict(post):
+    return {
+        "id": str(post.id),
+        "title": post.title,
+        "content": post.content,
+        "status": post.status,
+        "category_id": str(post.category_id),
+        "sort_order": post.sort_order,
+        "user_id": str(post.user_id),
+        "category_name": post.category.name if post.category else None,
+        "user_name": post.user.name if post.user else None,
+    }
+
+
+def legacy_board(session):
+    """従来の admin() のボード構築処理"""
+    categories_list = (
+        session.query(Category)
+        .options(selectinload(Category.user))
+        .order_by(Category.sort_order)
+        .all()
+    )
+    categories = {str(cat.id): cat.name for cat in categories_list}
+    all_posts = (
+        session.query(Post)
+        .options(selectinload(Post.user), selectinload(Post.category))
+        .order_by(Post.sort_order)
+        .all()
+    )
+    category_posts = {}
+    for post in all_posts:
+        if post.status == "todo":
+            category_posts.setdefault(str(post.category_id), []).append(
+                legacy_post_to_dict(post)
+            )
+    posts_by_status = {
+        status: [
+            legacy_post_to_dict(post)
+            for post in all_posts
+            if post.status == status
+        ]
+        for status in STATUSES
+    }
+    return categories, category_posts, posts_by_status
+
+
+def measure(engine, func, repeat):
+    """CPU時間（最小値）とピークメモリを計測"""
+    cpu_times = []
+    peak = 0
+    for _ in range(repeat):
+        with Session(engine) as session:
+            tracemalloc.start()
+            start = time.process_time()
+            func(session)
+            cpu_times.append(time.process_time() - start)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    return min(cpu_times), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ボード構築のベンチマーク")
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{'posts':>8} {'legacy cpu(ms)':>15} {'legacy peak(MB)':>16}"
+        f" {'board cpu(ms)':>14} {'board peak(MB)':>15}"
+    )
+    for size in [int(s) for s in args.sizes.split(",")]:
+        engine = create_engine(args.database_url)
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        [user_id], _ = seed(engine, size, category_count=10)
+        scope = UserScope(user_id)
+
+        legacy_cpu, legacy_peak = measure(engine, legacy_board, args.repeat)
+        board_cpu, board_peak = measure(
+            engine, lambda session: build_board(session, scope), args.repeat
+        )
+        print(
+            f"{size:>8} {legacy_cpu * 1000:>15.1f}"
+            f" {legacy_peak / 1024 / 1024:>16.1f}"
+            f" {board_cpu * 1000:>14.1f} {board_peak / 1024 / 1024:>15.1f}"
+        )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
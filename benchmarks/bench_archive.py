@@ -0,0 +1,95 @@
+# ==========================================================
+# アーカイブ済みのタスクの移動のベンチマーク
+# ==========================================================
+# アーカイブが溜まったボード（seed の偏りでは約半数が archive）で、
+# posts_archive に移す前と後のボードの構築（build_board）・アーカイブの列の
+# 1ページ目の取得時間と posts の行数を比較し、移動の処理時間を表示する。
+#
+#   $ python -m benchmarks.bench_archive --sizes 10000,100000
+import argparse
+import time
+from datetime import timedelta
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from flaskr.archive import archive_tasks, fetch_archive_page
+from flaskr.board import build_board
+from flaskr.migrations import run_migrations
+from flaskr.models import Post
+from flaskr.scope import UserScope
+
+from .seed import seed
+
+
+def best_of(engine, func, repeat):
+    """最小の処理時間（ミリ秒）"""
+    times = []
+    for _ in range(repeat):
+        with Session(engine) as session:
+            start = time.perf_counter()
+            func(session)
+            times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def measure(engine, scope, repeat):
+    with engine.connect() as conn:
+        rows = conn.scalar(select(func.count()).select_from(Post))
+    return (
+        rows,
+        best_of(engine, lambda session: build_board(session, scope), repeat),
+        best_of(
+            engine,
+            lambda session: fetch_archive_page(session, scope),
+            repeat,
+        ),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="アーカイブ済みのタスクの移動のベンチマーク"
+    )
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'posts':>8} {'':<7} {'hot rows':>9} {'board(ms)':>10}"
+        f" {'archive(ms)':>12}"
+    )
+    for size in [int(s) for s in args.sizes.split(",")]:
+        engine = create_engine(args.database_url)
+        run_migrations(engine)
+        [user_id], _ = seed(engine, size)
+        scope = UserScope(user_id)
+
+        before = measure(engine, scope, args.repeat)
+        start = time.perf_counter()
+        moved = archive_tasks(
+            engine, timedelta(days=args.days), args.batch_size
+        )
+        elapsed = time.perf_counter() - start
+        after = measure(engine, scope, args.repeat)
+
+        for label, (rows, board, archive) in (
+            ("before", before),
+            ("after", after),
+        ):
+            print(
+                f"{size:>8} {label:<7} {rows:>9} {board:>10.1f}"
+                f" {archive:>12.1f}"
+            )
+        print(
+            f"{'':>8} moved {moved} rows in {elapsed:.2f}s"
+            f" ({moved / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
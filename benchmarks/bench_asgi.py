@@ -0,0 +1,253 @@
+# ==========================================================
+# WSGI（スレッド）と ASGI モードの同時接続のベンチマーク
+# ==========================================================
+# gunicorn.conf.py で flaskr.wsgi:app（gthread）と flaskr.asgi:app
+# （WEB_MODE=asgi、uvicorn のワーカー）を順に起動し、同時接続数
+# --concurrency（既定 1000）のクライアントから /update_task_status に
+# POST し続けて、1秒あたりのリクエスト数とレイテンシを比較する。
+# クライアントは asyncio で動かすため、1000接続でもスレッドを作らない。
+# データベースは .env / 環境変数の設定を使う（マイグレーション済みであること。
+# ASGI モードは asyncpg が必要）。
+#
+# --output で結果をJSONに保存する（benchmarks/results/ に実行結果を置く）。
+#
+#   $ python -m benchmarks.bench_asgi --concurrency 1000 --duration 20
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+
+from flaskr.changes import TIMEZONE
+from flaskr.config import get_config
+from flaskr.operations import MAX_OPERATIONS
+
+from .bench_routes import git_revision
+from .bench_wsgi import gunicorn_workers, wait_until_ready
+
+SERVERS = {
+    "wsgi": ({}, "flaskr.wsgi:app"),
+    "asgi": ({"WEB_MODE": "asgi"}, "flaskr.asgi:app"),
+}
+
+STATUSES = ["todo", "progress", "archive"]
+
+
+async def request(reader, writer, method, path, body=b""):
+    """HTTP/1.1 のリクエストを1件送り (ステータス, 本文, 切断するか) を返す"""
+    writer.write(
+        (
+            f"{method} {path} HTTP/1.1\r\n"
+            "Host: 127.0.0.1\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        ).encode()
+        + body
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    length, close = 0, False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "connection" and value.strip().lower() == "close":
+            close = True
+    data = await reader.readexactly(length) if length else b""
+    return status, data, close
+
+
+async def seed(port, count):
+    """カテゴリー1件とタスク count 件を作成してタスクのIDを返す"""
+    category_id = str(uuid.uuid4())
+    task_ids = [str(uuid.uuid4()) for _ in range(count)]
+    operations = [
+        {"op": "create_category", "id": category_id, "name": "bench"},
+        *[
+            {
+                "op": "create",
+                "id": task_id,
+                "title": f"bench {i}",
+                "category_id": category_id,
+            }
+            for i, task_id in enumerate(task_ids)
+        ],
+    ]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        # 1回の /api/batch で送れる操作数ずつに分ける
+        for start in range(0, len(operations), MAX_OPERATIONS):
+            chunk = operations[start : start + MAX_OPERATIONS]
+            status, data, _ = await request(
+                reader,
+                writer,
+                "POST",
+                "/api/batch",
+                json.dumps({"operations": chunk}).encode(),
+            )
+            if status != 200:
+                raise RuntimeError(f"seed failed: {status} {data[:200]!r}")
+    finally:
+        writer.close()
+    return task_ids
+
+
+async def run_load(port, task_ids, concurrency, duration, timeout=30):
+    """同時接続数 concurrency で duration 秒間ステータスの更新を送り続ける"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+    latencies = []
+    errors = 0
+
+    async def client(task_id):
+        nonlocal errors
+        path = f"/update_task_status/{task_id}"
+        statuses = itertools.cycle(STATUSES)
+        connection = None
+        while loop.time() < deadline:
+            body = json.dumps({"status": next(statuses)}).encode()
+            start = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = await asyncio.open_connection(
+                        "127.0.0.1", port
+                    )
+                status, _, close = await asyncio.wait_for(
+                    request(*connection, "POST", path, body), timeout
+                )
+            except (OSError, ConnectionError, asyncio.TimeoutError, ValueError):
+                errors += 1
+                if connection is not None:
+                    connection[1].close()
+                connection = None
+                continue
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors += 1
+            if close:
+                connection[1].close()
+                connection = None
+        if connection is not None:
+            connection[1].close()
+
+    await asyncio.gather(
+        *[client(task_ids[i % len(task_ids)]) for i in range(concurrency)]
+    )
+
+    latencies.sort()
+    count = len(latencies)
+
+    def percentile(p):
+        return latencies[min(count - 1, int(count * p))] if count else 0
+
+    return {
+        "requests": count,
+        "errors": errors,
+        "rps": count / duration,
+        "p50_ms": percentile(0.50) * 1000,
+        "p99_ms": percentile(0.99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="WSGI と ASGI モードの同時接続のベンチマーク"
+    )
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument(
+        "--servers", default=",".join(SERVERS), help="wsgi,asgi"
+    )
+    parser.add_argument("--output", help="結果を保存するJSONファイル")
+    args = parser.parse_args()
+
+    env = dict(os.environ, FLASK_ENV="production", LOG_LEVEL="WARNING")
+    env.setdefault("SECRET_KEY", "bench")
+    env.setdefault("DB_USER", "postgres")
+    env.setdefault("DB_PASSWORD", "password")
+
+    print(
+        f"{'server':>6} {'clients':>8} {'requests':>9} {'errors':>7}"
+        f" {'req/s':>9} {'p50(ms)':>8} {'p99(ms)':>9}"
+    )
+    results = {}
+    for name in args.servers.split(","):
+        server_env, target = SERVERS[name]
+        command = [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "-c",
+            "gunicorn.conf.py",
+            "--bind",
+            f"127.0.0.1:{args.port}",
+            target,
+        ]
+        server = subprocess.Popen(
+            command,
+            env={**env, **server_env},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_ready(args.port)
+            # 接続ごとに別のタスクを更新する（行ロックの待ちを計測しない）
+            task_ids = asyncio.run(seed(args.port, args.concurrency))
+            # 接続プールを温めてから計測
+            asyncio.run(run_load(args.port, task_ids, args.concurrency, 2))
+            result = asyncio.run(
+                run_load(args.port, task_ids, args.concurrency, args.duration)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+        results[name] = result
+        print(
+            f"{name:>6} {args.concurrency:>8} {result['requests']:>9}"
+            f" {result['errors']:>7} {result['rps']:>9.1f}"
+            f" {result['p50_ms']:>8.1f} {result['p99_ms']:>9.1f}"
+        )
+
+    if args.output:
+        # サーバーと同じ環境変数（FLASK_ENV=production）で設定を読む
+        os.environ.update(env)
+        config = get_config()
+        meta = {
+            "created_at": datetime.now(TIMEZONE).isoformat(),
+            "git": git_revision(),
+            "database": config.database_url.partition(":")[0],
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "web_workers": gunicorn_workers(env),
+            "web_threads": config.WEB_THREADS,
+            "db_pool_size": config.DB_POOL_SIZE,
+            "db_max_overflow": config.DB_MAX_OVERFLOW,
+            "cpus": os.cpu_count(),
+            "python": platform.python_version(),
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {"meta": meta, "servers": results},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
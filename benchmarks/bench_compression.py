@@ -0,0 +1,94 @@
+# ==========================================================
+# レスポンスの圧縮のベンチマーク
+# ==========================================================
+# ボードの大きさ（カテゴリー数）ごとに /admin の HTML と /api/board の JSON を
+# 作成し、圧縮方式・レベルごとの圧縮時間（CPU）とバイト数、回線速度ごとの
+# 「圧縮時間 + 転送時間」を比較する。brotli がなければ gzip のみ。
+#
+#   $ python -m benchmarks.bench_compression --categories 5,20,100
+import argparse
+import time
+
+from flaskr import create_app
+from flaskr.compression import brotli, compress
+from flaskr.config import DevelopmentConfig
+from flaskr.migrations import run_migrations
+from flaskr.pagination import PAGE_SIZE
+
+from .seed import seed
+
+# 比較する圧縮方式とレベル
+LEVELS = [("gzip", 1), ("gzip", 6), ("gzip", 9)]
+if brotli is not None:
+    LEVELS += [("br", 1), ("br", 4), ("br", 6), ("br", 11)]
+
+# 回線速度（Mbps）
+LINKS = [1.6, 10.0, 100.0]
+
+
+def render(categories):
+    """カテゴリー数に応じたボードの /admin と /api/board のレスポンス本文"""
+    config = DevelopmentConfig()
+    config.DATABASE_URL = "sqlite://"
+    config.COMPRESS_ENABLED = False
+    app = create_app(config)
+    engine = app.extensions["flaskr_db"].engine
+    run_migrations(engine)
+    seed(
+        engine, categories * PAGE_SIZE * 3, category_count=categories, skew=False
+    )
+
+    client = app.test_client()
+    bodies = {
+        "admin": client.get("/admin").data,
+        "api": client.get("/api/board/progress").data,
+    }
+    engine.dispose()
+    return bodies
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.process_time()
+        result = func()
+        times.append(time.process_time() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="レスポンスの圧縮のベンチマーク")
+    parser.add_argument("--categories", default="5,20,100")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    links = "".join(f" {f'{link:g}Mbps(ms)':>13}" for link in LINKS)
+    for categories in [int(c) for c in args.categories.split(",")]:
+        for name, data in render(categories).items():
+            print(
+                f"== {name} ({categories} categories,"
+                f" {len(data) / 1024:.1f}KB)"
+            )
+            print(
+                f"{'encoding':<10} {'cpu(ms)':>8} {'KB':>8} {'ratio':>6}{links}"
+            )
+            rows = [("identity", 0.0, data)]
+            for encoding, level in LEVELS:
+                cpu, body = best_of(
+                    lambda: compress(data, encoding, level), args.repeat
+                )
+                rows.append((f"{encoding}-{level}", cpu, body))
+            for label, cpu, body in rows:
+                # 圧縮時間 + 転送時間
+                total = "".join(
+                    f" {(cpu + len(body) * 8 / (link * 1e6)) * 1000:>13.1f}"
+                    for link in LINKS
+                )
+                print(
+                    f"{label:<10} {cpu * 1000:>8.2f} {len(body) / 1024:>8.1f}"
+                    f" {len(body) / len(data):>6.2f}{total}"
+                )
+
+
+if __name__ == "__main__":
+    main()
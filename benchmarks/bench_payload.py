@@ -0,0 +1,227 @@
+# ==========================================================
+# 管理画面に埋め込むボードのデータのベンチマーク
+# ==========================================================
+# 従来の形式（category_posts と posts_by_status の2つ。TODOは両方に入る）と
+# 正規化した形式（タスクはIDごとに1回、各列はIDの配列）について、
+# バイト数・サーバーのエンコード時間・ブラウザ側の読み込み時間を比較する。
+# 読み込み時間は node があれば JSON.parse と data-manager.js の組み立て
+# （従来は .some() による重複チェック付きのマージ）を含めて計測する。
+#
+#   $ python -m benchmarks.bench_payload --categories 200
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from flaskr import serializer
+from flaskr.board import build_board
+from flaskr.migrations import run_migrations
+from flaskr.pagination import PAGE_SIZE
+from flaskr.scope import UserScope
+
+from .seed import seed
+
+# 従来の data-manager.js の読み込み処理と、正規化した形式の読み込み処理
+NODE_SCRIPT = r"""
+const fs = require("fs");
+const [legacyPath, boardPath, repeat] = process.argv.slice(2);
+const legacyText = fs.readFileSync(legacyPath, "utf8");
+const boardText = fs.readFileSync(boardPath, "utf8");
+
+function loadLegacy() {
+    const [categoryText, statusText] = legacyText.split("\n");
+    const allPosts = JSON.parse(categoryText);
+    const postsByStatus = JSON.parse(statusText);
+    Object.keys(postsByStatus).forEach(status => {
+        postsByStatus[status].forEach(task => {
+            if (!allPosts[task.category_id]) allPosts[task.category_id] = [];
+            const exists = allPosts[task.category_id].some(t => t.id === task.id);
+            if (!exists) allPosts[task.category_id].push(task);
+        });
+    });
+}
+
+function loadBoard() {
+    const board = JSON.parse(boardText);
+    const allPosts = {};
+    const postsByStatus = { todo: [], progress: [], archive: [] };
+    Object.entries(board.columns.category).forEach(([categoryId, ids]) => {
+        const tasks = ids.map(id => board.tasks[id]);
+        if (tasks.length) allPosts[categoryId] = tasks;
+        postsByStatus.todo.push(...tasks);
+    });
+    Object.entries(board.columns.status).forEach(([status, ids]) => {
+        postsByStatus[status] = ids.map(id => {
+            const task = board.tasks[id];
+            if (!allPosts[task.category_id]) allPosts[task.category_id] = [];
+            allPosts[task.category_id].push(task);
+            return task;
+        });
+    });
+}
+
+function measure(load) {
+    const times = [];
+    for (let i = 0; i < Number(repeat); i++) {
+        const start = process.hrtime.bigint();
+        load();
+        times.push(Number(process.hrtime.bigint() - start) / 1e6);
+    }
+    return Math.min(...times);
+}
+
+console.log(JSON.stringify({ legacy: measure(loadLegacy), board: measure(loadBoard) }));
+"""
+
+
+def legacy_task(task):
+    """従来の post_to_dict と同じく各UUIDを str() した辞書"""
+    return {
+        "id": str(task["id"]),
+        "title": task["title"],
+        "content": task["content"],
+        "status": task["status"],
+        "category_id": str(task["category_id"]),
+        "sort_order": task["sort_order"],
+        "user_id": str(task["user_id"]),
+        "category_name": task["category_name"],
+        "user_name": task["user_name"],
+    }
+
+
+def legacy_dumps(obj):
+    """従来の tojson（Flask の既定の JSONProvider と同じ設定）"""
+    return (
+        json.dumps(obj, ensure_ascii=True, sort_keys=True)
+        .replace("<", "\\u003c")
+        .replace(">", "\\u003e")
+        .replace("&", "\\u0026")
+        .replace("'", "\\u0027")
+    )
+
+
+def encode_legacy(board):
+    """従来の2つのJSONを作成（辞書への変換を含む）"""
+    tasks = board["tasks"]
+    columns = board["columns"]
+    category_posts = {}
+    posts_by_status = {"todo": []}
+    for category_id, ids in columns["category"].items():
+        category_tasks = [legacy_task(tasks[i]) for i in ids]
+        if category_tasks:
+            category_posts[category_id] = category_tasks
+        posts_by_status["todo"].extend(legacy_task(tasks[i]) for i in ids)
+    for status, ids in columns["status"].items():
+        posts_by_status[status] = [legacy_task(tasks[i]) for i in ids]
+    return legacy_dumps(category_posts) + "\n" + legacy_dumps(posts_by_status)
+
+
+def encode_board(board):
+    """正規化した形式のJSONを作成"""
+    return serializer.htmlsafe_dumps(
+        {
+            "tasks": board["tasks"],
+            "columns": board["columns"],
+            "cursors": board["cursors"],
+        }
+    )
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def parse_in_node(legacy_text, board_text, repeat):
+    """node で読み込み時間を計測（node がなければ None）"""
+    node = shutil.which("node")
+    if node is None:
+        return None
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        files = [
+            ("load.js", NODE_SCRIPT),
+            ("legacy.json", legacy_text),
+            ("board.json", board_text),
+        ]
+        for name, value in files:
+            path = os.path.join(tmp, name)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(value)
+            paths.append(path)
+        output = subprocess.run(
+            [node, *paths, str(repeat)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ボードのデータのベンチマーク")
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--categories", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    run_migrations(engine)
+    # 各列が最初のページで埋まる件数（TODOはカテゴリーごと）
+    rows = args.categories * PAGE_SIZE * 3
+    [user_id], _ = seed(
+        engine, rows, category_count=args.categories, skew=False
+    )
+    with Session(engine) as session:
+        board = build_board(session, UserScope(user_id))
+    engine.dispose()
+
+    encoder = "orjson" if serializer.orjson is not None else "json"
+    print(f"tasks: {len(board['tasks'])}  encoder: {encoder}")
+
+    legacy_time, legacy_text = best_of(
+        lambda: encode_legacy(board), args.repeat
+    )
+    board_time, board_text = best_of(lambda: encode_board(board), args.repeat)
+    legacy_parse, _ = best_of(
+        lambda: [json.loads(part) for part in legacy_text.split("\n")],
+        args.repeat,
+    )
+    board_parse, _ = best_of(lambda: serializer.loads(board_text), args.repeat)
+
+    print(f"{'':<22} {'legacy':>10} {'board':>10}")
+    print(
+        f"{'bytes(KB)':<22} {len(legacy_text.encode()) / 1024:>10.1f}"
+        f" {len(board_text.encode()) / 1024:>10.1f}"
+    )
+    print(
+        f"{'encode(ms)':<22} {legacy_time * 1000:>10.1f}"
+        f" {board_time * 1000:>10.1f}"
+    )
+    print(
+        f"{'parse python(ms)':<22} {legacy_parse * 1000:>10.1f}"
+        f" {board_parse * 1000:>10.1f}"
+    )
+
+    node = parse_in_node(legacy_text, board_text, args.repeat)
+    if node is None:
+        print("node が見つからないため、ブラウザ側の読み込みは計測しません")
+    else:
+        print(
+            f"{'load node(ms)':<22} {node['legacy']:>10.1f}"
+            f" {node['board']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# ==========================================================
+# 並び替え処理のベンチマーク
+# ==========================================================
+# 1行ずつ SELECT + UPDATE する従来の方式と、
+# bulk_update_order による一括更新の方式を、リスト長ごとに比較する。
+#
+#   $ python -m benchmarks.bench_reorder
+#   $ python -m benchmarks.bench_reorder --database-url postgresql+psycopg2://...
+import argparse
+import time
+
+from sqlalchemy import create_engine, delete, select
+from sqlalchemy.orm import Session
+
+from flaskr.models import Base, User, Category, Post
+from flaskr.ordering import bulk_update_order
+
+from .seed import seed
+
+
+def reorder_per_row(session, rows):
+    """従来の方式（1行ごとに SELECT + UPDATE）"""
+    for row in rows:
+        task = session.query(Post).filter(Post.id == row["id"]).first()
+        if task:
+            task.sort_order = row["sort_order"]
+    session.commit()
+
+
+def reorder_bulk(session, rows):
+    """一括更新の方式"""
+    bulk_update_order(session, Post, rows, ["sort_order"])
+    session.commit()
+
+
+def measure(engine, func, rows, repeat):
+    timings = []
+    for _ in range(repeat):
+        with Session(engine) as session:
+            start = time.perf_counter()
+            func(session, rows)
+            timings.append(time.perf_counter() - start)
+        # 次の計測で値が変わるように並び順を反転させる
+        rows = [
+            {"id": row["id"], "sort_order": len(rows) - row["sort_order"]}
+            for row in rows
+        ]
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="並び替え処理のベンチマーク")
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument(
+        "--sizes", default="10,100,1000,2000", help="カンマ区切りのリスト長"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(engine)
+
+    print(f"{'size':>8} {'per-row (ms)':>14} {'bulk (ms)':>12} {'ratio':>8}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        [user_id], _ = seed(
+            engine, size, category_count=1, skew=False, seed_value=size
+        )
+        with Session(engine) as session:
+            post_ids = session.scalars(
+                select(Post.id)
+                .where(Post.user_id == user_id)
+                .order_by(Post.sort_order)
+            ).all()
+        rows = [
+            {"id": post_id, "sort_order": size - index}
+            for index, post_id in enumerate(post_ids)
+        ]
+        per_row = measure(engine, reorder_per_row, rows, args.repeat)
+        bulk = measure(engine, reorder_bulk, rows, args.repeat)
+        print(
+            f"{size:>8} {per_row * 1000:>14.2f} {bulk * 1000:>12.2f}"
+            f" {per_row / bulk:>7.1f}x"
+        )
+
+        # 計測用データを削除
+        with Session(engine) as session:
+            session.execute(delete(Post).where(Post.user_id == user_id))
+            session.execute(delete(Category).where(Category.user_id == user_id))
+            session.execute(delete(User).where(User.id == user_id))
+            session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,692 @@
+# ==========================================================
+# 全ルートのレイテンシ・スループット・SQL数のベンチマーク
+# ==========================================================
+# benchmarks/seed.py でデータを作成し、アプリケーションの各ルートに
+# --requests 回ずつリクエストを送って、p50 / p95 / p99 のレイテンシ、
+# 1秒あたりのリクエスト数、1リクエストあたりのSQL文の数（/metrics の
+# flaskr_sql_statements_total の増分）を表示する。ストリーミングのレスポンス
+# （/api/export）は本文の送信中に実行したSQLを数えない。
+#   - 既定では Flask のテストクライアントで同じプロセスから直列に送る
+#   - --url を指定すると起動済みのサーバーに HTTP で --concurrency 並列で送る。
+#     データは --database-url に作成するため、サーバーと同じデータベースを
+#     指定する。SQL数はワーカーごとの /metrics から取るため WEB_WORKERS=1 で起動する
+# 計測していないルートがあれば一覧を表示する（ルートを追加したら SCENARIOS に追加）。
+# --output で結果をJSONに保存し、--baseline で保存済みの結果と比較する
+# （p95 か SQL数が悪化したルートがあれば終了コード1）。
+#
+#   $ python -m benchmarks.bench_routes --posts 10000 --output before.json
+#   $ python -m benchmarks.bench_routes --posts 10000 --baseline before.json
+#   $ python -m benchmarks.bench_routes --url http://127.0.0.1:5000 \
+#         --database-url postgresql+psycopg2://... --concurrency 8
+import argparse
+import http.client
+import json
+import platform
+import re
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+
+from sqlalchemy import select
+
+from flaskr import create_app
+from flaskr.changes import TIMEZONE
+from flaskr.config import DevelopmentConfig
+from flaskr.migrations import run_migrations
+from flaskr.models import Category, Post, User
+from flaskr.operations import MAX_OPERATIONS
+from flaskr.serializer import dumps
+
+from .bench_search import QUERIES
+from .seed import STATUSES, seed
+
+# 計測しないルートとその理由
+SKIPPED = {
+    "/static/<path:filename>": "静的ファイル",
+    "/metrics": "SQL数の取得に使用",
+    "/api/events": "ストリーミング（SSE）",
+    "/admin/jobs/<job_id>": "バックグラウンド処理のIDが必要",
+}
+
+# ブラウザと同じく圧縮を受け付ける
+DEFAULT_HEADERS = {"Accept-Encoding": "gzip"}
+
+Request = namedtuple("Request", "method path body headers")
+
+
+def get(path):
+    return Request("GET", path, None, DEFAULT_HEADERS)
+
+
+def post_json(path, data):
+    headers = {
+        **DEFAULT_HEADERS,
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+    }
+    return Request("POST", path, dumps(data).encode(), headers)
+
+
+def post_form(path, fields):
+    headers = {
+        **DEFAULT_HEADERS,
+        "Content-Type": "application/x-www-form-urlencoded",
+        "Accept": "application/json",
+    }
+    return Request("POST", path, urlencode(fields).encode(), headers)
+
+
+# ------------------------------------------------------
+# クライアント
+# ------------------------------------------------------
+class TestClient:
+    """Flask のテストクライアント（同じプロセス）"""
+
+    concurrent = False
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, request):
+        response = self.client.open(
+            request.path,
+            method=request.method,
+            data=request.body,
+            headers=request.headers,
+        )
+        data = response.get_data()
+        response.close()
+        return response.status_code, data
+
+
+class HTTPClient:
+    """起動済みのサーバーに送る（スレッドごとに keep-alive の接続を持つ）"""
+
+    concurrent = True
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(
+                self.host, self.port, timeout=60
+            )
+        return conn
+
+    def request(self, request):
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(
+                    request.method,
+                    request.path,
+                    body=request.body,
+                    headers=request.headers,
+                )
+                response = conn.getresponse()
+                return response.status, response.read()
+            except (OSError, http.client.HTTPException):
+                # サーバーが keep-alive の接続を閉じていた場合は1回だけ再接続
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+
+
+# ------------------------------------------------------
+# ルートごとのリクエスト
+# ------------------------------------------------------
+class Context:
+    """作成したデータのうち、リクエストに使うIDの一覧"""
+
+    def __init__(self, engine, email):
+        with engine.connect() as conn:
+            self.user_id = conn.scalar(select(User.id).where(User.email == email))
+            if self.user_id is None:
+                raise RuntimeError(f"ユーザーがありません: {email}")
+            self.category_ids = list(
+                conn.scalars(
+                    select(Category.id)
+                    .where(
+                        Category.user_id == self.user_id,
+                        Category.deleted_at.is_(None),
+                    )
+                    .order_by(Category.sort_order)
+                )
+            )
+            self._tasks = {
+                status: list(
+                    conn.scalars(
+                        select(Post.id)
+                        .where(
+                            Post.user_id == self.user_id, Post.status == status
+                        )
+                        .order_by(Post.sort_order)
+                        .limit(500)
+                    )
+                )
+                for status in STATUSES
+            }
+        self.since = (datetime.now(TIMEZONE) - timedelta(minutes=5)).isoformat()
+        # setup() で作成した削除用のID
+        self.created = defaultdict(list)
+
+    def tasks(self, status, count):
+        """ほかのルートと重ならないタスクのIDを count 件取り出す"""
+        tasks = self._tasks[status]
+        if len(tasks) < count:
+            raise RuntimeError(
+                f"{status} のタスクが足りません（--posts を増やしてください）"
+            )
+        taken, self._tasks[status] = tasks[:count], tasks[count:]
+        return [str(task_id) for task_id in taken]
+
+    def category(self, i):
+        return str(self.category_ids[i % len(self.category_ids)])
+
+
+def create_via_batch(client, operations):
+    """/api/batch で MAX_OPERATIONS 件ずつ作成（計測しない）"""
+    for start in range(0, len(operations), MAX_OPERATIONS):
+        status, data = client.request(
+            post_json(
+                "/api/batch",
+                {"operations": operations[start : start + MAX_OPERATIONS]},
+            )
+        )
+        if status != 200:
+            raise RuntimeError(f"setup failed: {status} {data[:200]!r}")
+
+
+class Scenario:
+    """1つのルートへのリクエストの作り方"""
+
+    def __init__(self, method, rule, build, setup=None):
+        self.method = method
+        self.rule = rule
+        self.build = build
+        self.setup = setup
+
+    @property
+    def key(self):
+        return f"{self.method} {self.rule}"
+
+
+def scenarios(ctx):
+    # 各ルートで使うタスク（状態を変えるルートは他と重ならないようにする）
+    batch_tasks = ctx.tasks("archive", 50)
+    status_tasks = ctx.tasks("archive", 50)
+    edit_tasks = ctx.tasks("archive", 50)
+    move_tasks = ctx.tasks("todo", 2)
+    order_tasks = ctx.tasks("todo", 50)
+    status_order_tasks = ctx.tasks("progress", 50)
+
+    def batch(i):
+        ids = [batch_tasks[(i + k) % len(batch_tasks)] for k in range(10)]
+        return post_json(
+            "/api/batch",
+            {
+                "operations": [
+                    {"op": "set_status", "id": task_id, "status": STATUSES[i % 3]}
+                    for task_id in ids
+                ]
+            },
+        )
+
+    def update_category_order(i):
+        ids = [str(category_id) for category_id in ctx.category_ids]
+        return post_json(
+            "/update_category_order",
+            {"category_ids": ids if i % 2 else ids[::-1]},
+        )
+
+    def move_category(i):
+        # 先頭の2つを交互に入れ替える
+        moved, target = (0, 1) if i % 2 == 0 else (1, 0)
+        return post_json(
+            f"/move_category/{ctx.category(moved)}",
+            {"before_id": ctx.category(target)},
+        )
+
+    def setup_delete_category(client, count):
+        ids = [str(uuid.uuid4()) for _ in range(count)]
+        create_via_batch(
+            client,
+            [
+                {"op": "create_category", "id": category_id, "name": "bench"}
+                for category_id in ids
+            ],
+        )
+        ctx.created["categories"] = ids
+
+    def setup_delete_task(client, count):
+        ids = [str(uuid.uuid4()) for _ in range(count)]
+        create_via_batch(
+            client,
+            [
+                {
+                    "op": "create",
+                    "id": task_id,
+                    "title": "bench",
+                    "category_id": ctx.category(0),
+                }
+                for task_id in ids
+            ],
+        )
+        ctx.created["tasks"] = ids
+
+    def update_task_order(i):
+        return post_json(
+            "/update_task_order",
+            {
+                "tasks": [
+                    {
+                        "id": task_id,
+                        "category_id": ctx.category(i),
+                        "sort_order": (k + i) % len(order_tasks) * 1024,
+                    }
+                    for k, task_id in enumerate(order_tasks)
+                ]
+            },
+        )
+
+    def update_task_order_by_status(i):
+        return post_json(
+            "/update_task_order_by_status",
+            {
+                "tasks": [
+                    {
+                        "id": task_id,
+                        "status": "progress",
+                        "sort_order": (k + i) % len(status_order_tasks) * 1024,
+                    }
+                    for k, task_id in enumerate(status_order_tasks)
+                ]
+            },
+        )
+
+    def move_task(i):
+        moved, target = move_tasks if i % 2 == 0 else move_tasks[::-1]
+        return post_json(f"/move_task/{moved}", {"before_id": target})
+
+    def import_(i):
+        category_id = str(uuid.uuid4())
+        lines = [{"table": "categories", "id": category_id, "name": "import"}]
+        lines += [
+            {"table": "posts", "title": f"import {k}", "category_id": category_id}
+            for k in range(5)
+        ]
+        return Request(
+            "POST",
+            "/api/import",
+            "".join(dumps(line) + "\n" for line in lines).encode(),
+            {**DEFAULT_HEADERS, "Content-Type": "application/x-ndjson"},
+        )
+
+    return [
+        # 読み込み
+        Scenario("GET", "/admin", lambda i: get("/admin")),
+        Scenario("GET", "/register", lambda i: get("/register")),
+        Scenario("GET", "/admin/pool_stats", lambda i: get("/admin/pool_stats")),
+        Scenario(
+            "GET",
+            "/api/board/<status>",
+            lambda i: get(f"/api/board/{STATUSES[i % 3]}"),
+        ),
+        Scenario(
+            "GET",
+            "/api/categories/<category_id>/tasks",
+            lambda i: get(f"/api/categories/{ctx.category(i)}/tasks"),
+        ),
+        Scenario(
+            "GET",
+            "/api/search",
+            lambda i: get(
+                "/api/search?" + urlencode({"q": QUERIES[i % len(QUERIES)]})
+            ),
+        ),
+        Scenario(
+            "GET",
+            "/api/changes",
+            lambda i: get("/api/changes?" + urlencode({"since": ctx.since})),
+        ),
+        Scenario(
+            "GET",
+            "/api/export",
+            lambda i: get("/api/export?table=categories"),
+        ),
+        # 書き込み
+        Scenario("POST", "/api/batch", batch),
+        Scenario("POST", "/update_category_order", update_category_order),
+        Scenario("POST", "/move_category/<category_id>", move_category),
+        Scenario(
+            "POST",
+            "/admin/add_category",
+            lambda i: post_form(
+                "/admin/add_category", {"category_name": f"bench {i}"}
+            ),
+        ),
+        Scenario(
+            "POST",
+            "/admin/delete_category/<category_id>",
+            lambda i: post_json(
+                f"/admin/delete_category/{ctx.created['categories'][i]}", {}
+            ),
+            setup_delete_category,
+        ),
+        Scenario("POST", "/update_task_order", update_task_order),
+        Scenario(
+            "POST",
+            "/add_task",
+            lambda i: post_json(
+                "/add_task",
+                {
+                    "title": f"bench {i}",
+                    "content": "ベンチマーク用のタスク",
+                    "category_id": ctx.category(i),
+                },
+            ),
+        ),
+        Scenario(
+            "POST",
+            "/admin/edit_task/<task_id>",
+            lambda i: post_json(
+                f"/admin/edit_task/{edit_tasks[i % len(edit_tasks)]}",
+                {
+                    "title": f"edited {i}",
+                    "content": "ベンチマーク用のタスク",
+                    "category_id": ctx.category(i),
+                },
+            ),
+        ),
+        Scenario(
+            "POST",
+            "/admin/delete_task/<task_id>",
+            lambda i: post_json(
+                f"/admin/delete_task/{ctx.created['tasks'][i]}", {}
+            ),
+            setup_delete_task,
+        ),
+        Scenario(
+            "POST",
+            "/update_task_status/<task_id>",
+            lambda i: post_json(
+                f"/update_task_status/{status_tasks[i % len(status_tasks)]}",
+                {"status": STATUSES[i % 3]},
+            ),
+        ),
+        Scenario(
+            "POST", "/update_task_order_by_status", update_task_order_by_status
+        ),
+        Scenario("POST", "/move_task/<task_id>", move_task),
+        Scenario("POST", "/api/import", import_),
+    ]
+
+
+# ------------------------------------------------------
+# 計測
+# ------------------------------------------------------
+SAMPLE = re.compile(r"^(\w+)\{(.*)\} (\S+)$")
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def sql_counters(client):
+    """/metrics からルートごとの (SQL文の数, リクエスト数) を取得"""
+    status, data = client.request(Request("GET", "/metrics", None, {}))
+    if status != 200:
+        return None
+    counters = defaultdict(lambda: [0.0, 0.0])
+    for line in data.decode().splitlines():
+        match = SAMPLE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        route = dict(LABEL.findall(labels)).get("route")
+        if name == "flaskr_sql_statements_total":
+            counters[route][0] += float(value)
+        elif name == "flaskr_http_requests_total":
+            counters[route][1] += float(value)
+    return counters
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def measure(client, scenario, count, warmup, concurrency):
+    """scenario のリクエストを count 回送って結果を返す"""
+    if scenario.setup:
+        scenario.setup(client, warmup + count)
+    requests = [scenario.build(i) for i in range(warmup + count)]
+    for request in requests[:warmup]:
+        client.request(request)
+
+    def send(request):
+        start = time.perf_counter()
+        status, _ = client.request(request)
+        return status, time.perf_counter() - start
+
+    before = sql_counters(client)
+    start = time.perf_counter()
+    if concurrency > 1 and client.concurrent:
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(send, requests[warmup:]))
+    else:
+        results = [send(request) for request in requests[warmup:]]
+    elapsed = time.perf_counter() - start
+    after = sql_counters(client)
+
+    latencies = sorted(latency for _, latency in results)
+    result = {
+        "requests": len(results),
+        "errors": sum(1 for status, _ in results if status >= 400),
+        "error_statuses": sorted({status for status, _ in results if status >= 400}),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "rps": len(results) / elapsed,
+        "sql_per_request": None,
+    }
+    if before is not None and after is not None:
+        sql = after[scenario.rule][0] - before[scenario.rule][0]
+        handled = after[scenario.rule][1] - before[scenario.rule][1]
+        if handled:
+            result["sql_per_request"] = sql / handled
+    return result
+
+
+# p95 の差がこれ未満のルートは、割合が閾値を超えても悪化とみなさない
+# （1ms 前後のルートは実行ごとの揺れが大きいため）
+MIN_REGRESSION_MS = 1.0
+
+
+def compare(baseline, meta, results, threshold):
+    """保存済みの結果と比較して表示し、悪化したルートの一覧を返す"""
+    print(f"\n== baseline ({baseline['meta'].get('git', '-')})")
+    for name in ("client", "database", "posts", "categories", "users", "concurrency"):
+        if baseline["meta"].get(name) != meta.get(name):
+            print(
+                f"warning: {name} が異なる"
+                f"（{baseline['meta'].get(name)} → {meta.get(name)}）",
+                file=sys.stderr,
+            )
+    print(
+        f"{'route':<48} {'p95(ms)':>17} {'change':>8} {'sql/req':>13}"
+    )
+    regressions = []
+    for key, result in results.items():
+        old = baseline["routes"].get(key)
+        if old is None:
+            continue
+        change = result["p95_ms"] / old["p95_ms"] - 1 if old["p95_ms"] else 0
+        old_sql, new_sql = old["sql_per_request"], result["sql_per_request"]
+        sql_worse = (
+            old_sql is not None and new_sql is not None and new_sql > old_sql + 0.5
+        )
+        mark = ""
+        slower = (
+            change > threshold
+            and result["p95_ms"] - old["p95_ms"] >= MIN_REGRESSION_MS
+        )
+        if slower or sql_worse:
+            regressions.append(key)
+            mark = " !"
+        sql = (
+            f"{old_sql:>5.1f} → {new_sql:<5.1f}"
+            if old_sql is not None and new_sql is not None
+            else f"{'-':>13}"
+        )
+        print(
+            f"{key:<48} {old['p95_ms']:>7.2f} → {result['p95_ms']:<7.2f}"
+            f" {change:>+7.0%} {sql}{mark}"
+        )
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="全ルートのレイテンシ・スループット・SQL数のベンチマーク"
+    )
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument(
+        "--url", help="起動済みのサーバー（省略時はテストクライアント）"
+    )
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--skip-seed", action="store_true", help="作成済みのデータを使う"
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument(
+        "--concurrency", type=int, default=1, help="並列数（--url の場合のみ）"
+    )
+    parser.add_argument("--routes", help="計測するルート（正規表現）")
+    parser.add_argument("--output", help="結果を保存するJSONファイル")
+    parser.add_argument(
+        "--log-level",
+        default="CRITICAL",
+        help="アプリケーションのログレベル（既定ではエラーのログも出さない）",
+    )
+    parser.add_argument("--baseline", help="比較する保存済みの結果")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="悪化とみなす p95 の増加率（既定 0.2 = 20%%）",
+    )
+    args = parser.parse_args()
+
+    config = DevelopmentConfig()
+    config.DATABASE_URL = args.database_url
+    config.LOG_LEVEL = args.log_level
+    app = create_app(config)
+    engine = app.extensions["flaskr_db"].engine
+
+    if not args.skip_seed:
+        run_migrations(engine)
+        start = time.perf_counter()
+        # 先頭のユーザーを既定ユーザー（管理画面のボード）にする
+        seed(
+            engine,
+            args.posts,
+            category_count=args.categories,
+            users=args.users,
+            seed_value=args.seed,
+            emails=[config.DEFAULT_USER_EMAIL],
+        )
+        print(f"seed: {args.posts}件 {time.perf_counter() - start:.1f}s")
+
+    client = HTTPClient(args.url) if args.url else TestClient(app)
+    ctx = Context(engine, config.DEFAULT_USER_EMAIL)
+    selected = [
+        scenario
+        for scenario in scenarios(ctx)
+        if not args.routes or re.search(args.routes, scenario.key)
+    ]
+
+    covered = {scenario.rule for scenario in scenarios(ctx)} | set(SKIPPED)
+    missing = sorted(
+        rule.rule for rule in app.url_map.iter_rules() if rule.rule not in covered
+    )
+
+    print(
+        f"{'route':<48} {'errors':>6} {'p50(ms)':>8} {'p95(ms)':>8}"
+        f" {'p99(ms)':>8} {'req/s':>8} {'sql/req':>8}"
+    )
+    results = {}
+    for scenario in selected:
+        result = measure(
+            client, scenario, args.requests, args.warmup, args.concurrency
+        )
+        results[scenario.key] = result
+        sql = result["sql_per_request"]
+        print(
+            f"{scenario.key:<48} {result['errors']:>6}"
+            f" {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f}"
+            f" {result['p99_ms']:>8.2f} {result['rps']:>8.1f}"
+            f" {sql if sql is None else round(sql, 1)!s:>8}"
+        )
+        if result["error_statuses"]:
+            print(f"  HTTP {result['error_statuses']}（--log-level ERROR で詳細を表示）")
+
+    for rule, reason in SKIPPED.items():
+        print(f"skip: {rule}（{reason}）")
+    for rule in missing:
+        print(f"未計測のルート: {rule}", file=sys.stderr)
+
+    meta = {
+        "created_at": datetime.now(TIMEZONE).isoformat(),
+        "git": git_revision(),
+        "client": args.url or "test-client",
+        "database": engine.dialect.name,
+        "posts": args.posts,
+        "categories": args.categories,
+        "users": args.users,
+        "seed": args.seed,
+        "requests": args.requests,
+        "concurrency": args.concurrency if args.url else 1,
+        "python": platform.python_version(),
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {"meta": meta, "routes": results}, f, ensure_ascii=False, indent=2
+            )
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, meta, results, args.threshold)
+        if regressions:
+            print(f"悪化したルート: {len(regressions)}件", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
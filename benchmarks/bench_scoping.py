@@ -0,0 +1,126 @@
+# ==========================================================
+# ユーザーごとのデータの絞り込みのベンチマーク
+# ==========================================================
+# 1人のユーザーのタスク（--posts 件）は変えずに、他のユーザーのタスクを
+# その何倍か（--factors）まで増やしながら、そのユーザーのボードの構築
+# （build_board）・列の1ページ目（fetch_page）・差分の取得（fetch_changes）・
+# 検索（search_tasks）の時間を計測する。クエリが user_id から始まる
+# インデックスを使っていれば、他のユーザーのデータが増えても時間は
+# ほぼ変わらない。
+#
+#   $ python -m benchmarks.bench_scoping --posts 2000 --factors 0,10,100
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import Session
+
+from flaskr.board import build_board, fetch_page
+from flaskr.changes import TIMEZONE, fetch_changes
+from flaskr.migrations import run_migrations
+from flaskr.models import Post
+from flaskr.scope import UserScope
+from flaskr.search import BigramSearch, NgramSearch, search_tasks
+
+from .seed import seed
+
+# 差分の取得で遡る時間（seed の更新日時は直近90日に分散している）
+CHANGES_SINCE = timedelta(hours=1)
+
+# 検索語（seed のタイトル・内容によく出る語）
+QUERY = "会議"
+
+
+def best_of(engine, func, repeat):
+    """最小の処理時間（ミリ秒）"""
+    times = []
+    for _ in range(repeat):
+        with Session(engine) as session:
+            start = time.perf_counter()
+            func(session)
+            times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def measure(engine, scope, backend, repeat):
+    since = datetime.now(TIMEZONE) - CHANGES_SINCE
+    return (
+        best_of(engine, lambda session: build_board(session, scope), repeat),
+        best_of(
+            engine,
+            lambda session: fetch_page(session, scope, Post.status == "todo"),
+            repeat,
+        ),
+        best_of(
+            engine,
+            lambda session: fetch_changes(
+                session, scope, since, timedelta(days=7)
+            ),
+            repeat,
+        ),
+        best_of(
+            engine,
+            lambda session: search_tasks(session, scope, backend, QUERY),
+            repeat,
+        ),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="ユーザーごとのデータの絞り込みのベンチマーク"
+    )
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument(
+        "--factors",
+        default="0,10,100",
+        help="他のユーザーのタスク数（--posts の何倍か、昇順）",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    run_migrations(engine)
+    [user_id], _ = seed(engine, args.posts)
+    scope = UserScope(user_id)
+    if engine.dialect.name == "postgresql":
+        backend = BigramSearch()
+    else:
+        backend = NgramSearch()
+
+    print(
+        f"{'others':>8} {'total':>9} {'board(ms)':>10} {'page(ms)':>9}"
+        f" {'changes(ms)':>12} {'search(ms)':>11}"
+    )
+    others = 0
+    for step, factor in enumerate(int(f) for f in args.factors.split(",")):
+        # 他のユーザー（1人あたり --posts 件）のタスクを追加する
+        target = args.posts * factor
+        if target > others:
+            added = target - others
+            seed(
+                engine,
+                added,
+                users=max(added // args.posts, 1),
+                seed_value=step + 1,
+            )
+            others = target
+        with engine.begin() as conn:
+            # 統計情報を更新してインデックスの選択を実運用に近づける
+            conn.execute(text("ANALYZE"))
+            total = conn.scalar(select(func.count()).select_from(Post))
+
+        board, page, changes, search = measure(
+            engine, scope, backend, args.repeat
+        )
+        print(
+            f"{others:>8} {total:>9} {board:>10.1f} {page:>9.1f}"
+            f" {changes:>12.1f} {search:>11.1f}"
+        )
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# ==========================================================
+# 起動時間のベンチマーク
+# ==========================================================
+# python -X importtime で各段階の読み込み時間を計測し、
+# 時間のかかったモジュールを表示する。
+#   - import:      import flaskr
+#   - create_app:  create_app()（エンジンは作成しない）
+#   - wsgi:        import flaskr.wsgi（gunicorn の preload と同じ）
+#
+#   $ python -m benchmarks.bench_startup --repeat 5 --top 15
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+STAGES = {
+    "import": "import flaskr",
+    "create_app": "from flaskr import create_app; create_app()",
+    "wsgi": "import flaskr.wsgi",
+}
+
+
+def parse_importtime(stderr):
+    """-X importtime の出力を (モジュール名, 累積マイクロ秒) の一覧に変換"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        modules.append((name.rstrip(), int(cumulative)))
+    return modules
+
+
+def run_stage(code, env):
+    """新しいプロセスで code を実行し、経過時間と importtime の結果を返す"""
+    script = (
+        "import time; _start = time.perf_counter(); "
+        f"{code}; "
+        "print(time.perf_counter() - _start)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1]), parse_importtime(
+        result.stderr
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="起動時間のベンチマーク")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    env = dict(os.environ, LOG_LEVEL="WARNING")
+    env.setdefault("PYTHONPATH", os.getcwd())
+
+    for stage, code in STAGES.items():
+        times = []
+        modules = []
+        for _ in range(args.repeat):
+            elapsed, modules = run_stage(code, env)
+            times.append(elapsed)
+        print(
+            f"== {stage}: median {statistics.median(times) * 1000:.1f}ms"
+            f" (min {min(times) * 1000:.1f}ms)"
+        )
+        # 最上位（インデントなし）のモジュールのうち時間のかかったもの
+        top_level = [
+            (name.strip(), us) for name, us in modules if not name.startswith("  ")
+        ]
+        for name, us in sorted(top_level, key=lambda m: -m[1])[: args.top]:
+            print(f"   {us / 1000:>8.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+# ==========================================================
+# タスクの一括エクスポート・インポートのベンチマーク
+# ==========================================================
+# 全行を ORM のオブジェクトにして add_all する従来のスクリプトの方式と、
+# flaskr.transfer の一括インポート（COPY / executemany）・ストリーミングの
+# エクスポートを比較し、処理時間と Python のメモリ使用量のピーク
+# （--memory、tracemalloc）を表示する。COPY は PostgreSQL（psycopg2）の場合のみ。
+#
+#   $ python -m benchmarks.bench_transfer --count 100000
+#   $ python -m benchmarks.bench_transfer --count 100000 --memory
+#   $ python -m benchmarks.bench_transfer --count 1000000 \
+#         --database-url postgresql+psycopg2://...
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import Session
+
+from flaskr.models import Base, Category, Post, User
+from flaskr.scope import UserScope
+from flaskr.serializer import dumps, loads
+from flaskr.transfer import export_stream, import_records, read_records
+from flaskr.users import ensure_user
+
+STATUSES = ["todo", "progress", "archive"]
+
+
+def write_ndjson(path, count, category_count=20):
+    """カテゴリー category_count 件とタスク count 件の NDJSON を作成"""
+    category_ids = [str(uuid.uuid4()) for _ in range(category_count)]
+    with open(path, "w", encoding="utf-8") as f:
+        for i, category_id in enumerate(category_ids):
+            f.write(
+                dumps(
+                    {
+                        "table": "categories",
+                        "id": category_id,
+                        "name": f"category {i}",
+                        "sort_order": i * 1024,
+                    }
+                )
+                + "\n"
+            )
+        for i in range(count):
+            f.write(
+                dumps(
+                    {
+                        "table": "posts",
+                        "id": str(uuid.uuid4()),
+                        "title": f"task {i}",
+                        "content": f"ベンチマーク用のタスク {i} の内容",
+                        "status": STATUSES[i % 3],
+                        "sort_order": i * 1024,
+                        "category_id": category_ids[i % category_count],
+                    }
+                )
+                + "\n"
+            )
+
+
+def import_orm(engine, path, user_id, limit):
+    """従来の方式（全行を ORM のオブジェクトにして add_all）"""
+    objects = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = loads(line)
+            if record.pop("table") == "categories":
+                objects.append(Category(user_id=user_id, **record))
+            elif len(objects) < limit:
+                record["category_id"] = uuid.UUID(record["category_id"])
+                objects.append(Post(user_id=user_id, **record))
+    with Session(engine) as session:
+        for obj in objects:
+            obj.id = uuid.UUID(str(obj.id))
+        session.add_all(objects)
+        session.commit()
+    return len(objects)
+
+
+def import_bulk(engine, path, user_id, batch_size, method):
+    with open(path, encoding="utf-8") as f:
+        counts = import_records(
+            engine,
+            read_records(f, "ndjson"),
+            user_id,
+            batch_size=batch_size,
+            method=method,
+        )
+    return sum(counts.values())
+
+
+def export_bulk(engine, user_id, batch_size):
+    rows = 0
+    with open(os.devnull, "w", encoding="utf-8") as f:
+        for chunk in export_stream(
+            engine,
+            UserScope(user_id),
+            ["categories", "posts"],
+            "ndjson",
+            batch_size,
+        ):
+            rows += chunk.count("\n")
+            f.write(chunk)
+    return rows
+
+
+def measure(func, *args, memory=False):
+    """(行数, 秒数, メモリのピーク(MB)) を返す
+
+    tracemalloc は処理を数倍遅くするため、memory=True の場合だけ使う。
+    """
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    rows = func(*args)
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return rows, elapsed, peak / 1024 / 1024
+
+
+def clear(engine, user_id):
+    with engine.begin() as conn:
+        conn.execute(delete(Post).where(Post.user_id == user_id))
+        conn.execute(delete(Category).where(Category.user_id == user_id))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="タスクの一括エクスポート・インポートのベンチマーク"
+    )
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument(
+        "--orm-count",
+        type=int,
+        default=20_000,
+        help="従来の方式で取り込むタスク数（全件では時間がかかるため）",
+    )
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="メモリ使用量のピークを計測（処理時間は遅くなる）",
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        user_id = ensure_user(
+            conn, "bench", f"bench-{uuid.uuid4()}@example.com", "bench"
+        )
+
+    methods = ["insert"]
+    if engine.dialect.driver == "psycopg2":
+        methods.append("copy")
+
+    fd, path = tempfile.mkstemp(suffix=".ndjson")
+    os.close(fd)
+    try:
+        write_ndjson(path, args.count)
+        print(f"{os.path.getsize(path) / 1024 / 1024:.1f}MB ({path})")
+        print(
+            f"{'method':<16} {'rows':>9} {'sec':>8} {'rows/s':>10}"
+            f" {'peak(MB)':>9}"
+        )
+
+        def report(name, rows, elapsed, peak):
+            print(
+                f"{name:<16} {rows:>9} {elapsed:>8.2f} {rows / elapsed:>10.0f}"
+                f" {peak:>9.1f}"
+            )
+
+        if args.orm_count:
+            report(
+                "orm add_all",
+                *measure(
+                    import_orm,
+                    engine,
+                    path,
+                    user_id,
+                    args.orm_count,
+                    memory=args.memory,
+                ),
+            )
+            clear(engine, user_id)
+
+        for method in methods:
+            report(
+                f"import {method}",
+                *measure(
+                    import_bulk,
+                    engine,
+                    path,
+                    user_id,
+                    args.batch_size,
+                    method,
+                    memory=args.memory,
+                ),
+            )
+            if method != methods[-1]:
+                clear(engine, user_id)
+
+        report(
+            "export ndjson",
+            *measure(
+                export_bulk,
+                engine,
+                user_id,
+                args.batch_size,
+                memory=args.memory,
+            ),
+        )
+        clear(engine, user_id)
+        with engine.begin() as conn:
+            conn.execute(delete(User).where(User.id == user_id))
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# ==========================================================
+# WSGIサーバーのスループットのベンチマーク
+# ==========================================================
+# 開発用サーバー（flask run）と gunicorn（gunicorn.conf.py）を同じマシンで
+# 順に起動し、同じ同時接続数でリクエストを送って比較する。
+# データベースは .env / 環境変数の設定を使う（タスクのあるデータベース）。
+#   - --paths はカンマ区切りで、write は /api/batch でタスクのステータスを
+#     切り替える書き込み（クライアントごとに別のタスク）
+#   - gunicorn は既定のワーカー数（CPU数 × 2 + 1、ボードのキャッシュは無効）、
+#     gunicorn-1 は1ワーカー（キャッシュあり）で起動する
+#
+# --output で結果をJSONに保存する（benchmarks/results/ に実行結果を置く）。
+#
+#   $ python -m benchmarks.bench_wsgi --paths /admin,write --concurrency 16
+import argparse
+import http.client
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+from flaskr.changes import TIMEZONE
+from flaskr.serializer import dumps, loads
+
+SERVERS = {
+    "flask-run": [
+        sys.executable,
+        "-m",
+        "flask",
+        "--app",
+        "flaskr.main",
+        "run",
+        "--port",
+        "{port}",
+    ],
+    "gunicorn": [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        "-c",
+        "gunicorn.conf.py",
+        "--bind",
+        "127.0.0.1:{port}",
+        "flaskr.wsgi:app",
+    ],
+}
+SERVERS["gunicorn-1"] = SERVERS["gunicorn"]
+
+# サーバーごとの環境変数
+SERVER_ENV = {"gunicorn-1": {"WEB_WORKERS": "1"}}
+
+# 書き込みのシナリオ（--paths に指定する名前）
+WRITE = "write"
+
+
+def gunicorn_workers(env):
+    """gunicorn.conf.py が起動するワーカー数（WEB_WORKERS の既定値と同じ）"""
+    return int(env.get("WEB_WORKERS", (os.cpu_count() or 1) * 2 + 1))
+
+
+def server_workers(name, env):
+    """サーバーのワーカー数（flask run は1プロセス）"""
+    if name == "flask-run":
+        return 1
+    return gunicorn_workers({**env, **SERVER_ENV.get(name, {})})
+
+
+def wait_until_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/metrics")
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("サーバーが起動しませんでした")
+
+
+def todo_task_ids(port, count):
+    """書き込みに使うTODOのタスクのID（クライアントごとに1件）"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request("GET", f"/api/board/todo?limit={count}")
+    tasks = loads(conn.getresponse().read())["tasks"]
+    conn.close()
+    if len(tasks) < count:
+        raise RuntimeError("TODOのタスクが --concurrency 件以上必要です")
+    return [task["id"] for task in tasks]
+
+
+def requests_for(path, task_id):
+    """クライアント1つが順に送る (メソッド, パス, 本文, ヘッダー) を返す関数"""
+    if path != WRITE:
+        return lambda: ("GET", path, None, {})
+    statuses = ["progress", "todo"]
+    count = 0
+
+    def next_request():
+        nonlocal count
+        status = statuses[count % 2]
+        count += 1
+        body = {
+            "operations": [
+                {"op": "set_status", "id": task_id, "status": status}
+            ]
+        }
+        headers = {"Content-Type": "application/json"}
+        return "POST", "/api/batch", dumps(body).encode(), headers
+
+    return next_request
+
+
+def run_load(port, path, concurrency, duration, task_ids=None):
+    """同時接続数 concurrency で duration 秒間リクエストを送り続ける"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(task_id):
+        nonlocal errors
+        next_request = requests_for(path, task_id)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        local = []
+        local_errors = 0
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                method, target, body, headers = next_request()
+                conn.request(method, target, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+                continue
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+
+    task_ids = task_ids or [None] * concurrency
+    threads = [
+        threading.Thread(target=client, args=(task_ids[i],))
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    count = len(latencies)
+
+    def percentile(p):
+        return latencies[min(count - 1, int(count * p))] if count else 0
+
+    return {
+        "requests": count,
+        "errors": errors,
+        "rps": count / duration,
+        "p50_ms": percentile(0.50) * 1000,
+        "p99_ms": percentile(0.99) * 1000,
+    }
+
+
+def main():
+    from .bench_routes import git_revision
+
+    parser = argparse.ArgumentParser(description="WSGIサーバーのベンチマーク")
+    parser.add_argument(
+        "--paths", default=f"/admin,{WRITE}", help=f"/admin,{WRITE}"
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument(
+        "--servers", default=",".join(SERVERS), help=",".join(SERVERS)
+    )
+    parser.add_argument("--output", help="結果を保存するJSONファイル")
+    args = parser.parse_args()
+    paths = args.paths.split(",")
+
+    env = dict(os.environ, FLASK_ENV="production", LOG_LEVEL="WARNING")
+    env.setdefault("SECRET_KEY", "bench")
+    env.setdefault("DB_USER", "postgres")
+    env.setdefault("DB_PASSWORD", "password")
+
+    print(
+        f"{'server':>10} {'workers':>7} {'path':>12} {'requests':>9}"
+        f" {'errors':>7} {'req/s':>9} {'p50(ms)':>8} {'p99(ms)':>8}"
+    )
+    results = {}
+    for name in args.servers.split(","):
+        command = [part.format(port=args.port) for part in SERVERS[name]]
+        server = subprocess.Popen(
+            command,
+            env={**env, **SERVER_ENV.get(name, {})},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        workers = server_workers(name, env)
+        results[name] = {"workers": workers, "paths": {}}
+        try:
+            wait_until_ready(args.port)
+            task_ids = None
+            if WRITE in paths:
+                task_ids = todo_task_ids(args.port, args.concurrency)
+            for path in paths:
+                # 接続プール・テンプレート・ボードのキャッシュを温めてから計測
+                run_load(args.port, path, args.concurrency, 1, task_ids)
+                result = run_load(
+                    args.port, path, args.concurrency, args.duration, task_ids
+                )
+                results[name]["paths"][path] = result
+                print(
+                    f"{name:>10} {workers:>7} {path:>12}"
+                    f" {result['requests']:>9} {result['errors']:>7}"
+                    f" {result['rps']:>9.1f} {result['p50_ms']:>8.1f}"
+                    f" {result['p99_ms']:>8.1f}"
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+    if args.output:
+        meta = {
+            "created_at": datetime.now(TIMEZONE).isoformat(),
+            "git": git_revision(),
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "board_cache_backend": env.get("BOARD_CACHE_BACKEND", "memory"),
+            "cpus": os.cpu_count(),
+            "python": platform.python_version(),
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {"meta": meta, "servers": results},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
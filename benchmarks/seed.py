@@ -0,0 +1,224 @@
+# ==========================================================
+# ベンチマーク用のデータの作成
+# ==========================================================
+# ユーザー・カテゴリー・タスクを INSERT でまとめて作成する。同じ seed_value
+# からは同じデータ（IDを含む）を作成するため、実行結果を比較できる。
+# skew=True（既定）では実際のボードに近い偏りを持たせる。
+#   - ステータス: 完了（archive）が多く、進行中（progress）が少ない
+#   - カテゴリー: 先頭のカテゴリーほどタスクが多い（Zipf 分布）
+#   - 作成・更新日時: 直近 days 日に分散
+# skew=False ではステータスとカテゴリーを順番に割り当てる（列ごとの件数を
+# そろえたい場合）。
+#
+#   $ python -m benchmarks.seed --database-url sqlite:///bench.db --posts 100000
+import argparse
+import itertools
+import random
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import create_engine, insert
+
+from flaskr.migrations import run_migrations
+from flaskr.models import Category, Post, User
+
+STATUSES = ["todo", "progress", "archive"]
+
+# ステータスごとの割合（skew=True）
+STATUS_WEIGHTS = {"todo": 0.35, "progress": 0.15, "archive": 0.5}
+
+# カテゴリーの偏り（Zipf 分布の指数。大きいほど先頭に集中する）
+CATEGORY_SKEW = 1.0
+
+WORDS = [
+    "買い物",
+    "会議",
+    "資料",
+    "準備",
+    "請求書",
+    "確認",
+    "打ち合わせ",
+    "報告",
+    "見積もり",
+    "契約",
+    "出張",
+    "予約",
+    "掃除",
+    "洗濯",
+    "料理",
+    "運動",
+    "読書",
+    "メール",
+    "電話",
+    "レビュー",
+    "デプロイ",
+    "バグ修正",
+    "設計",
+    "テスト",
+    "release",
+    "backup",
+    "invoice",
+    "meeting",
+]
+
+# 1回の INSERT で送る行数
+BATCH_SIZE = 10_000
+
+SeedResult = namedtuple("SeedResult", "user_ids category_ids")
+
+
+def sentence(rng, words):
+    return "の".join(rng.choice(WORDS) for _ in range(words))
+
+
+def random_uuid(rng):
+    """rng から作成する UUID（同じ seed_value なら同じIDになる）"""
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def seed(
+    engine,
+    posts,
+    category_count=20,
+    users=1,
+    skew=True,
+    seed_value=0,
+    emails=(),
+    days=90,
+):
+    """ユーザー users 人に、それぞれカテゴリー category_count 件と
+    タスク（合計 posts 件）を作成する
+
+    emails を指定した場合は先頭のユーザーから順にそのメールアドレスにする
+    （既定ユーザーのボードとして使う場合など）。
+    """
+    rng = random.Random(seed_value)
+    now = datetime.now(ZoneInfo("Asia/Tokyo"))
+    emails = list(emails)
+    user_ids = [random_uuid(rng) for _ in range(users)]
+    categories = {
+        user_id: [random_uuid(rng) for _ in range(category_count)]
+        for user_id in user_ids
+    }
+    status_weights = list(
+        itertools.accumulate(STATUS_WEIGHTS[status] for status in STATUSES)
+    )
+    category_weights = list(
+        itertools.accumulate(
+            1 / (rank + 1) ** CATEGORY_SKEW for rank in range(category_count)
+        )
+    )
+
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [
+                {
+                    "id": user_id,
+                    "name": f"bench {i}",
+                    "email": (
+                        emails[i]
+                        if i < len(emails)
+                        else f"bench-{user_id}@example.com"
+                    ),
+                    "password": "bench",
+                }
+                for i, user_id in enumerate(user_ids)
+            ],
+        )
+        conn.execute(
+            insert(Category),
+            [
+                {
+                    "id": category_id,
+                    "name": f"category {i}",
+                    "user_id": user_id,
+                    "sort_order": i * 1024,
+                }
+                for user_id in user_ids
+                for i, category_id in enumerate(categories[user_id])
+            ],
+        )
+
+        batch = []
+        for i in range(posts):
+            user_id = user_ids[i % users]
+            if skew:
+                [status] = rng.choices(STATUSES, cum_weights=status_weights)
+                [category_id] = rng.choices(
+                    categories[user_id], cum_weights=category_weights
+                )
+                created_at = now - timedelta(seconds=rng.uniform(0, days * 86400))
+                updated_at = created_at + (now - created_at) * rng.random()
+            else:
+                status = STATUSES[i % 3]
+                category_id = categories[user_id][i % category_count]
+                created_at = updated_at = now
+            batch.append(
+                {
+                    "id": random_uuid(rng),
+                    "title": sentence(rng, 2),
+                    "content": (
+                        f"{sentence(rng, 8)} チケット{rng.randrange(100_000)}"
+                    ),
+                    "status": status,
+                    "sort_order": i * 1024,
+                    "user_id": user_id,
+                    "category_id": category_id,
+                    "created_at": created_at,
+                    "updated_at": updated_at,
+                }
+            )
+            if len(batch) == BATCH_SIZE:
+                conn.execute(insert(Post), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Post), batch)
+
+    return SeedResult(
+        user_ids,
+        [category_id for ids in categories.values() for category_id in ids],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ベンチマーク用のデータの作成")
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--uniform", action="store_true", help="ステータス・カテゴリーを均等にする"
+    )
+    parser.add_argument(
+        "--email",
+        action="append",
+        default=[],
+        help="先頭のユーザーのメールアドレス（既定ユーザーにする場合など）",
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    run_migrations(engine)
+    start = time.perf_counter()
+    seed(
+        engine,
+        args.posts,
+        category_count=args.categories,
+        users=args.users,
+        skew=not args.uniform,
+        seed_value=args.seed,
+        emails=args.email,
+    )
+    print(
+        f"users: {args.users}, categories: {args.categories * args.users},"
+        f" posts: {args.posts} ({time.perf_counter() - start:.1f}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
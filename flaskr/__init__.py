@@ -0,0 +1,126 @@
+# ==========================================================
+# アプリケーションの作成
+# ==========================================================
+# create_app(config) でアプリケーションを作成する。データベースの
+# エンジンは初回使用時に作成するため、アプリの作成時点では接続しない。
+#
+#   app = create_app()                      # 環境変数に応じた設定
+#   app = create_app(config)                # 設定を指定（テストなど）
+#   app = create_app(config, asgi=True)     # ASGI モード（flaskr/async_api.py）
+import os
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "..", "templates")
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "..", "static")
+
+# すべてのレスポンスに付けるセキュリティヘッダー
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+}
+
+
+def template_version():
+    """テンプレートの更新を検知するための値（ETagに含める）"""
+    import hashlib
+
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(TEMPLATE_DIR)):
+        path = os.path.join(TEMPLATE_DIR, name)
+        digest.update(f"{name}:{os.path.getmtime(path)}".encode())
+    return digest.hexdigest()[:8]
+
+
+def create_app(config=None, blueprints=None, asgi=False):
+    """アプリケーションを作成
+
+    blueprints を指定した場合はそのBlueprintだけを登録する。
+    asgi が真の場合、セキュリティヘッダー・リクエストIDのヘッダー・圧縮は
+    ASGI のミドルウェア（flaskr/asgi_middleware.py）に任せて登録しない。
+    """
+    # models・flask などはここで読み込む（import flaskr だけでは読み込まない）
+    from flask import Flask
+
+    from .archive import init_archive
+    from .assets import init_assets
+    from .cache import init_board_cache
+    from .compression import init_compression
+    from .config import get_config
+    from .db import Database
+    from .events import init_events
+    from .jobs import init_jobs
+    from .logger import init_request_logging, setup_logging
+    from .maintenance import init_maintenance
+    from .metrics import init_metrics
+    from .search import init_search
+    from .serializer import FastJSONProvider
+    from .transfer import init_transfer
+    from .users import init_users
+    from .views import register_blueprints
+
+    if config is None:
+        config = get_config()
+    setup_logging(config)
+
+    app = Flask(__name__, template_folder=TEMPLATE_DIR, static_folder=STATIC_DIR)
+    app.config["SECRET_KEY"] = config.SECRET_KEY
+    app.config["APP_CONFIG"] = config
+    # jsonify・tojson のエンコード（orjson があれば UUID をそのまま扱う）
+    app.json = FastJSONProvider(app)
+
+    db = Database(config).init_app(app)
+
+    # リクエストIDの採番（ログと X-Request-ID ヘッダーに使う）
+    init_request_logging(app, add_header=not asgi)
+
+    # ルートごとのレイテンシ・SQL実行回数の計測（/metrics）
+    init_metrics(
+        app,
+        db,
+        enabled=config.METRICS_ENABLED,
+        directory=config.METRICS_DIR,
+        interval=config.METRICS_FLUSH_INTERVAL,
+    )
+
+    # 静的ファイル（ビルド済みならハッシュ付きのファイルを immutable で配信）
+    assets = init_assets(app, config)
+
+    # ボードのキャッシュ（書き込みのたびにバージョンを上げて無効化）
+    # 静的ファイルをビルドし直した場合も ETag が変わるようにする
+    init_board_cache(
+        app, config, namespace=f"-{template_version()}{assets.version}"
+    )
+
+    # 既定ユーザーのIDのキャッシュ
+    init_users(app, config)
+
+    # バックグラウンド処理（大きなカテゴリーの削除など）
+    init_jobs(app, config)
+
+    # アーカイブ済みのタスクの移動（posts → posts_archive）
+    init_archive(app, config)
+
+    # 削除の記録の整理・中断したカテゴリーの削除の再開
+    init_maintenance(app, config)
+
+    # ボードの変更通知（/api/events）
+    init_events(app, config, db)
+
+    # タスクの検索（/api/search）
+    init_search(app, config)
+
+    # エクスポート・インポートのコマンド（flask transfer）
+    init_transfer(app, config)
+
+    register_blueprints(app, blueprints)
+    if not asgi:
+        app.after_request(security_headers)
+        # レスポンスの圧縮（HTML・JSON。ストリーミングと圧縮済みのものは除く）
+        init_compression(app, config)
+    return app
+
+
+def security_headers(response):
+    """セキュリティヘッダーを追加"""
+    response.headers.update(SECURITY_HEADERS)
+    return response
@@ -0,0 +1,192 @@
+# ==========================================================
+# アーカイブ済みのタスクの移動用
+# ==========================================================
+# status="archive" のまま一定期間（ARCHIVE_AFTER_DAYS）更新されていない
+# タスクを posts から posts_archive に一定件数ずつ移し、ボードの各列の
+# クエリが読む posts の行数を進行中のタスクの数に抑える。
+#   - アーカイブの列（/api/board/archive）は両方のテーブルから1ページ分ずつ
+#     読み込み、並び順どおりにまとめる
+#   - 移したタスクを操作（ステータスの変更・編集・移動・削除）する場合は、
+#     操作の前に posts に戻す（restore_tasks、flaskr/operations.py）
+# 移動は何度実行しても同じ結果になり、複数のワーカーが同時に実行しても
+# 同じ行を移さない（PostgreSQL では FOR UPDATE SKIP LOCKED）。
+#
+#   $ flask --app flaskr.main archive run
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, insert, literal, select
+
+from .board import load_rows, row_to_dict
+from .jobs import PeriodicTask
+from .logger import get_logger
+from .models import ArchivedPost, Post
+from .pagination import PAGE_SIZE, page_query, split_page
+from .purge import hidden_category_ids
+
+logger = get_logger(__name__)
+
+ARCHIVE_STATUS = "archive"
+
+# posts と posts_archive に共通の列
+COLUMNS = [column.name for column in Post.__table__.columns]
+
+
+def _move(conn, source, target, ids, **values):
+    """ids の行を source から target に移し、移した行数を返す
+
+    values は target にだけある列（archived_at）の値。
+    """
+    names = COLUMNS + list(values)
+    columns = [source.__table__.c[name] for name in COLUMNS]
+    columns += [
+        literal(value, target.__table__.c[name].type)
+        for name, value in values.items()
+    ]
+    conn.execute(
+        insert(target).from_select(
+            names, select(*columns).where(source.id.in_(ids))
+        )
+    )
+    return conn.execute(delete(source).where(source.id.in_(ids))).rowcount
+
+
+def archive_tasks(engine, older_than, batch_size=1000):
+    """最後の更新から older_than 以上経ったアーカイブ済みのタスクを
+    batch_size 件ずつ posts_archive に移し、移した件数を返す"""
+    moved = 0
+    while True:
+        now = datetime.now(ZoneInfo("Asia/Tokyo"))
+        with engine.begin() as conn:
+            ids = list(
+                conn.scalars(
+                    select(Post.id)
+                    .where(
+                        Post.status == ARCHIVE_STATUS,
+                        Post.updated_at < now - older_than,
+                    )
+                    .limit(batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+            )
+            if ids:
+                _move(conn, Post, ArchivedPost, ids, archived_at=now)
+        moved += len(ids)
+        if len(ids) < batch_size:
+            break
+
+    if moved:
+        logger.info("tasks archived", extra={"moved": moved})
+    return moved
+
+
+def restore_tasks(session, scope, ids):
+    """posts_archive に移したスコープのユーザーのタスクを posts に戻し、
+    戻したIDを返す
+
+    ids のうち posts_archive にないものは無視する。コミットは呼び出し側で行う。
+    """
+    ids = [i for i in ids if i is not None]
+    if not ids:
+        return []
+    restored = [
+        row.id
+        for row in session.execute(
+            select(ArchivedPost.id, ArchivedPost.user_id)
+            .where(ArchivedPost.id.in_(ids))
+            .with_for_update()
+        )
+        if scope.owns(row)
+    ]
+    if restored:
+        _move(session, ArchivedPost, Post, restored)
+    return restored
+
+
+def fetch_archive_page(
+    session, scope, category_id=None, after=None, limit=PAGE_SIZE
+):
+    """スコープのユーザーのアーカイブの列の1ページ分のタスク（辞書）と
+    次ページのカーソルを取得
+
+    posts（まだ移していないもの）と posts_archive から1ページ分ずつ読み込み、
+    (sort_order, id) の順にまとめる。
+    """
+    hidden = hidden_category_ids(session, scope)
+    rows = []
+    for model in (Post, ArchivedPost):
+        criteria = [scope.where(model), model.status == ARCHIVE_STATUS]
+        if category_id is not None:
+            criteria.append(model.category_id == category_id)
+        if hidden:
+            criteria.append(model.category_id.not_in(hidden))
+        rows += load_rows(
+            session,
+            page_query(*criteria, after=after, limit=limit, model=model),
+            model,
+        )
+    rows.sort(key=lambda row: (row.sort_order, row.id))
+    rows, cursor = split_page(rows, limit)
+    return [row_to_dict(row) for row in rows], cursor
+
+
+class ArchiveMover(PeriodicTask):
+    """ワーカー内で interval 秒ごとに archive_tasks を実行するスレッド"""
+
+    thread_name = "flaskr-archive"
+
+    def __init__(self, db, older_than, interval, batch_size=1000):
+        super().__init__(interval)
+        self.db = db
+        self.older_than = older_than
+        self.batch_size = batch_size
+
+    def run_once(self):
+        try:
+            return archive_tasks(
+                self.db.engine, self.older_than, self.batch_size
+            )
+        except Exception:
+            logger.exception("archive failed")
+            return 0
+
+
+# ------------------------------------------------------
+# flask コマンド（flask --app flaskr.main archive ...）
+# ------------------------------------------------------
+archive_cli = AppGroup("archive", help="アーカイブ済みのタスクの移動")
+
+
+@archive_cli.command("run")
+@click.option(
+    "--days", type=float, help="最後の更新からの日数（既定は ARCHIVE_AFTER_DAYS）"
+)
+@click.option("--batch-size", type=int, help="1回に移す行数")
+def run_command(days, batch_size):
+    """アーカイブ済みのタスクを posts_archive に移す（cron などから実行）"""
+    config = current_app.config["APP_CONFIG"]
+    engine = current_app.extensions["flaskr_db"].engine
+    older_than = (
+        config.archive_after if days is None else timedelta(days=days)
+    )
+    moved = archive_tasks(
+        engine, older_than, batch_size or config.ARCHIVE_BATCH_SIZE
+    )
+    click.echo(f"移したタスク: {moved}件", err=True)
+
+
+def init_archive(app, config):
+    """アプリケーションにアーカイブの移動（スレッドとコマンド）を登録"""
+    mover = ArchiveMover(
+        app.extensions["flaskr_db"],
+        config.archive_after,
+        config.ARCHIVE_INTERVAL,
+        config.ARCHIVE_BATCH_SIZE,
+    )
+    app.extensions["flaskr_archive"] = mover
+    app.before_request(mover.ensure_started)
+    app.cli.add_command(archive_cli)
+    return mover
@@ -0,0 +1,23 @@
+# ==========================================================
+# ASGI モードのエントリーポイント
+# ==========================================================
+# タスクの書き込み用のJSON APIを非同期で処理する（flaskr/async_api.py）。
+#
+#   $ WEB_MODE=asgi gunicorn -c gunicorn.conf.py flaskr.asgi:app
+#   $ uvicorn flaskr.asgi:app --port 5000
+#
+# 非同期のエンジンは最初のリクエストでワーカーのイベントループ上に作成する
+# ため、fork 後に作り直すのは同期のエンジンとログ出力スレッドだけでよい。
+from .async_api import create_asgi_app
+from .logger import start_listener
+
+app = create_asgi_app()
+
+flask_app = app.state.flask_app
+
+
+def post_fork():
+    """fork 直後のワーカーで呼び出す"""
+    # マスターから引き継いだ接続は閉じずに破棄する（flaskr/wsgi.py と同じ）
+    flask_app.extensions["flaskr_db"].dispose(close=False)
+    start_listener()
@@ -0,0 +1,181 @@
+# ==========================================================
+# ASGI モードのミドルウェア
+# ==========================================================
+# WSGI では Flask の before_request / after_request で行う処理を ASGI の層で
+# 行い、非同期のルート（flaskr/async_api.py）と Flask のルートの両方に適用する。
+#   - RequestIdMiddleware:       X-Request-ID（なければ生成）をリクエストに
+#                                付けて Flask に渡し、レスポンスとログにも付ける
+#   - SecurityHeadersMiddleware: セキュリティヘッダー
+#   - CompressionMiddleware:     brotli / gzip の圧縮（flaskr/compression.py と
+#                                同じ条件。Content-Length のないストリーミング
+#                                （SSE など）は圧縮しない）
+#   - MetricsMiddleware:         非同期のルートのレイテンシ・リクエスト数を
+#                                /metrics に記録（Flask のルートは Flask の
+#                                フックで SQL の計測と合わせて記録する）
+import time
+
+from starlette.datastructures import Headers, MutableHeaders
+from werkzeug.http import parse_accept_header
+
+from . import SECURITY_HEADERS
+from .compression import compress
+from .logger import new_request_id, request_id_var
+
+
+class RequestIdMiddleware:
+    """リクエストIDを採番してリクエスト・レスポンスのヘッダーに付ける"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = MutableHeaders(scope=scope)
+        request_id = headers.get("x-request-id") or new_request_id()
+        # Flask のルートでも同じIDを使う（before_request がヘッダーから読む）
+        headers["x-request-id"] = request_id
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
+
+
+class SecurityHeadersMiddleware:
+    """レスポンスにセキュリティヘッダーを付ける"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in SECURITY_HEADERS.items():
+                    headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class CompressionMiddleware:
+    """Content-Length のあるレスポンスを Accept-Encoding に応じて圧縮する
+
+    ヘッダーで圧縮の対象か判定し、対象なら本文をすべて受け取ってから
+    圧縮して送る。Content-Length のないもの（SSE などのストリーミング）は
+    そのまま送る。
+    """
+
+    def __init__(self, app, compressor):
+        self.app = app
+        self.compressor = compressor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        accept = parse_accept_header(
+            Headers(scope=scope).get("accept-encoding")
+        )
+        encoding = self.compressor.negotiate(accept)
+        start = None
+        chunks = []
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                if self.should_compress(message):
+                    start = message
+                    return
+                await send(message)
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body"):
+                return
+            body = self.compress(start, b"".join(chunks), encoding)
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def should_compress(self, start):
+        headers = Headers(scope=start)
+        mimetype = headers.get("content-type", "").split(";")[0].strip()
+        no_transform = "no-transform" in headers.get("cache-control", "")
+        length = headers.get("content-length")
+        return self.compressor.compressible(
+            start["status"],
+            mimetype,
+            "content-encoding" in headers,
+            no_transform,
+            int(length) if length and length.isdigit() else None,
+        )
+
+    def compress(self, start, body, encoding):
+        """圧縮した本文（小さくならなければ元の本文）を返し、ヘッダーを更新"""
+        headers = MutableHeaders(scope=start)
+        # 圧縮の有無で内容が変わるので、キャッシュは Accept-Encoding ごとに分ける
+        headers.add_vary_header("Accept-Encoding")
+        if encoding is None:
+            return body
+        compressed = compress(
+            body, encoding, self.compressor.levels[encoding]
+        )
+        if len(compressed) >= len(body):
+            return body
+        headers["Content-Encoding"] = encoding
+        headers["Content-Length"] = str(len(compressed))
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        return compressed
+
+
+class MetricsMiddleware:
+    """非同期のルートのレイテンシ（レスポンスの開始まで）とリクエスト数を記録
+
+    routes はルートの関数からパスへの対応。Starlette のルーティングが
+    scope に設定する endpoint で判定し、それ以外（Flask）は記録しない。
+    """
+
+    def __init__(self, app, metrics, routes):
+        self.app = app
+        self.metrics = metrics
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                route = self.routes.get(scope.get("endpoint"))
+                if route is not None:
+                    method = scope["method"]
+                    self.metrics.request_latency.observe(
+                        (route, method), time.perf_counter() - start
+                    )
+                    self.metrics.requests.inc(
+                        (route, method, str(message["status"]))
+                    )
+                    self.metrics.flush()
+            await send(message)
+
+        await self.app(scope, receive, send_with_metrics)
@@ -0,0 +1,431 @@
+# ==========================================================
+# 静的ファイル（JS・CSS）のビルドと配信用
+# ==========================================================
+# BUNDLES のファイルを圧縮して連結し、内容のハッシュを含むファイル名で
+# static/dist/ に出力する（元の名前との対応は static/dist/manifest.json）。
+# 外部のライブラリは VENDOR のバージョンで static/vendor/ に取得して同梱する。
+# 取得したファイルは static/vendor.sha256 の sha256 と照合し、一致しなければ
+# ビルドを中止する（バージョンを変えたときは --pin で記録し直してコミットする）。
+#
+#   $ python -m flaskr.assets build
+#   $ python -m flaskr.assets vendor --pin
+#
+# ビルド済みの場合は以下のように配信する。
+#   - url_for("static", filename="js/admin.js") がハッシュ付きのファイルを指す
+#   - .br / .gz があれば Accept-Encoding に応じて圧縮済みのファイルを返す
+#   - ハッシュ付きのファイルは Cache-Control: immutable（再訪時はリクエストしない）
+# ビルドしていない場合（開発環境）は元のファイルを個別に読み込む。
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import urllib.request
+
+from flask import current_app, request, send_from_directory, url_for
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# 出力先（static/ からの相対パス）
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+
+# ハッシュ付きのファイルのキャッシュ期間（1年）
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# 同梱する外部のライブラリ（static/ からの相対パス: 取得元）
+VENDOR = {
+    "vendor/sortablejs/Sortable.min.js": (
+        "https://cdn.jsdelivr.net/npm/sortablejs@1.15.0/Sortable.min.js"
+    ),
+    "vendor/modern-css-reset/reset.min.css": (
+        "https://cdn.jsdelivr.net/npm/modern-css-reset@1.4.0/dist/reset.min.css"
+    ),
+}
+
+# 外部のライブラリの sha256 の一覧（static/ からの相対パス。sha256sum の形式）
+VENDOR_SUMS = "vendor.sha256"
+
+# 1つにまとめるファイル（読み込み順どおりに並べる）
+BUNDLES = {
+    "css/app.css": [
+        "vendor/modern-css-reset/reset.min.css",
+        "css/style.css",
+    ],
+    "js/admin.js": [
+        "vendor/sortablejs/Sortable.min.js",
+        # 基盤機能（順序重要）
+        "js/core/modal.js",
+        "js/core/delete-mode.js",
+        "js/core/data-manager.js",
+        "js/utils/task-renderer.js",
+        "js/core/sortable.js",
+        "js/core/live-updates.js",
+        # 機能別スクリプト
+        "js/features/category-switcher.js",
+        "js/features/category-creator.js",
+        "js/features/category-deleter.js",
+        "js/features/task-creator.js",
+        "js/features/task-editor.js",
+        "js/features/task-deleter.js",
+        "js/features/task-mover.js",
+        # ユーティリティ
+        "js/utils/textarea-counter.js",
+    ],
+}
+
+# 圧縮済みのファイルの拡張子（優先順）
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+try:
+    import brotli
+except ImportError:  # brotli は任意の依存（なければ .gz のみ作成）
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:  # rjsmin は任意の依存（なければJSは圧縮しない）
+    rjsmin = None
+
+# テンプレートリテラル（圧縮の前後で内容が変わっていないことを確認する）
+TEMPLATE_LITERAL = re.compile(r"`(?:\\.|[^`\\])*`")
+
+
+class VendorError(ValueError):
+    """外部のライブラリの sha256 が記録されていない・一致しない"""
+
+
+# ----------------------------------------------------------
+# ビルド
+# ----------------------------------------------------------
+
+
+def load_sums(static_dir):
+    """記録済みの外部のライブラリの sha256（static/ からの相対パス: 16進数）"""
+    sums = {}
+    try:
+        with open(os.path.join(static_dir, VENDOR_SUMS)) as f:
+            for line in f:
+                if line.strip():
+                    digest, name = line.split(maxsplit=1)
+                    sums[name.strip()] = digest
+    except FileNotFoundError:
+        pass
+    return sums
+
+
+def write_sums(static_dir, sums):
+    """外部のライブラリの sha256 を記録（sha256sum -c で確認できる形式）"""
+    with open(os.path.join(static_dir, VENDOR_SUMS), "w") as f:
+        for name in sorted(sums):
+            f.write(f"{sums[name]}  {name}\n")
+
+
+def require_sum(name, sums):
+    """sha256 が記録されていなければ VendorError"""
+    if name not in sums:
+        raise VendorError(
+            f"{name} の sha256 が {VENDOR_SUMS} に記録されていません"
+            "（python -m flaskr.assets vendor --pin で記録してコミットする）"
+        )
+
+
+def verify_vendor(name, data, sums):
+    """内容が記録済みの sha256 と一致しなければ VendorError"""
+    require_sum(name, sums)
+    digest = hashlib.sha256(data).hexdigest()
+    if digest != sums[name]:
+        raise VendorError(
+            f"{name} の sha256 が一致しません"
+            f"（記録: {sums[name]}、取得: {digest}）"
+        )
+
+
+def fetch_vendor(static_dir, force=False, pin=False):
+    """外部のライブラリを static/vendor/ に取得（取得済みのものはそのまま）
+
+    取得した内容は記録済みの sha256 と照合する。pin が真なら照合せずに
+    取得した内容の sha256 を記録する。
+    """
+    sums = load_sums(static_dir)
+    fetched = []
+    for name, source in VENDOR.items():
+        path = os.path.join(static_dir, name)
+        if os.path.exists(path) and not force:
+            continue
+        if not pin:
+            # 取得する前に記録の有無を確認する
+            require_sum(name, sums)
+        with urllib.request.urlopen(source, timeout=30) as response:
+            data = response.read()
+        if pin:
+            sums[name] = hashlib.sha256(data).hexdigest()
+        else:
+            verify_vendor(name, data, sums)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        fetched.append(name)
+    if pin:
+        write_sums(static_dir, sums)
+    return fetched
+
+
+def check_vendor(static_dir):
+    """取得済みの外部のライブラリがすべて記録済みの sha256 と一致するか確認"""
+    sums = load_sums(static_dir)
+    for name in VENDOR:
+        with open(os.path.join(static_dir, name), "rb") as f:
+            verify_vendor(name, f.read(), sums)
+
+
+def minify_css(source):
+    """CSSを圧縮（rcssmin がなければコメントと行頭の空白だけを除く）"""
+    try:
+        import rcssmin
+    except ImportError:
+        source = re.sub(r"/\*.*?\*/", "", source, flags=re.S)
+        lines = (line.strip() for line in source.splitlines())
+        return "\n".join(line for line in lines if line)
+    return rcssmin.cssmin(source)
+
+
+def minify_js(source, filename=None):
+    """JSを圧縮（rjsmin がなければそのまま）
+
+    テンプレートリテラル（HTMLの組み立て）の内容が変わった場合は
+    圧縮せずに元のまま使う。
+    """
+    if rjsmin is None:
+        return source
+    minified = rjsmin.jsmin(source)
+    if TEMPLATE_LITERAL.findall(minified) != TEMPLATE_LITERAL.findall(source):
+        logger.warning("js not minified", extra={"file": filename})
+        return source
+    return minified
+
+
+def bundle(static_dir, name, files):
+    """ファイルを圧縮して読み込み順に連結した内容"""
+    is_js = name.endswith(".js")
+    minify = minify_js if is_js else lambda source, filename: minify_css(source)
+    parts = []
+    for filename in files:
+        with open(os.path.join(static_dir, filename), encoding="utf-8") as f:
+            source = f.read()
+        # 圧縮済みのライブラリはそのまま使う
+        if ".min." not in filename:
+            source = minify(source, filename)
+        parts.append(source.strip())
+    # 前のファイルの末尾にセミコロンがなくても文がつながらないようにする
+    separator = "\n;\n" if is_js else "\n"
+    return (separator.join(parts) + "\n").encode("utf-8")
+
+
+def fingerprint(name, data):
+    """内容のハッシュを含むファイル名（dist/js/admin.<hash>.js）"""
+    stem, ext = os.path.splitext(name)
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    return f"{DIST_DIR}/{stem}.{digest}{ext}"
+
+
+def write_compressed(path, data):
+    """圧縮済みのファイル（.gz と、brotli があれば .br）を作成"""
+    # mtime を固定して同じ内容からは同じファイルを作る
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(data, quality=11))
+
+
+def build(static_dir, fetch=True):
+    """BUNDLES をビルドして manifest（元の名前: 出力先）を返す"""
+    if fetch:
+        for name in fetch_vendor(static_dir):
+            logger.info("vendor fetched", extra={"file": name})
+    # 取得済みのファイルが書き換えられていないことも確認する
+    check_vendor(static_dir)
+
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    shutil.rmtree(dist_dir, ignore_errors=True)
+
+    manifest = {}
+    for name, files in BUNDLES.items():
+        data = bundle(static_dir, name, files)
+        output = fingerprint(name, data)
+        path = os.path.join(static_dir, output)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        write_compressed(path, data)
+        manifest[name] = output
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+# ----------------------------------------------------------
+# Flask への組み込み
+# ----------------------------------------------------------
+
+
+def load_manifest(static_dir):
+    """ビルド済みの manifest（なければ None）"""
+    path = os.path.join(static_dir, DIST_DIR, MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class Assets:
+    """テンプレートから参照する静的ファイルの一覧"""
+
+    def __init__(self, static_dir, manifest=None):
+        self.static_dir = static_dir
+        self.manifest = manifest or {}
+        # 出力先ごとに存在する圧縮済みのファイル
+        self.encodings = {
+            output: [
+                (encoding, suffix)
+                for encoding, suffix in ENCODINGS
+                if os.path.exists(os.path.join(static_dir, output + suffix))
+            ]
+            for output in self.manifest.values()
+        }
+        # ETag に含める値（ビルドのたびに変わる）
+        digest = hashlib.sha256(
+            json.dumps(self.manifest, sort_keys=True).encode()
+        )
+        self.version = digest.hexdigest()[:8] if self.manifest else ""
+
+    @property
+    def bundled(self):
+        return bool(self.manifest)
+
+    def urls(self, name):
+        """name を読み込むURLの一覧
+
+        ビルド済みならハッシュ付きのファイル1つ、そうでなければ
+        元のファイルを読み込み順に返す（未取得のライブラリは取得元のURL）。
+        """
+        if name in self.manifest:
+            return [url_for("static", filename=name)]
+        urls = []
+        for filename in BUNDLES.get(name, [name]):
+            local = os.path.join(self.static_dir, filename)
+            if filename in VENDOR and not os.path.exists(local):
+                urls.append(VENDOR[filename])
+            else:
+                urls.append(url_for("static", filename=filename))
+        return urls
+
+    def url_defaults(self, endpoint, values):
+        """url_for("static", ...) の filename をハッシュ付きの名前に置き換える"""
+        if endpoint == "static":
+            filename = values.get("filename")
+            if filename in self.manifest:
+                values["filename"] = self.manifest[filename]
+
+    def send(self, filename):
+        """static のビュー（ハッシュ付きのファイルは圧縮済み・immutable で返す）"""
+        encodings = self.encodings.get(filename)
+        if encodings is None:
+            return current_app.send_static_file(filename)
+
+        mimetype = mimetypes.guess_type(filename)[0]
+        for encoding, suffix in encodings:
+            if request.accept_encodings[encoding]:
+                response = send_from_directory(
+                    self.static_dir,
+                    filename + suffix,
+                    mimetype=mimetype,
+                    max_age=IMMUTABLE_MAX_AGE,
+                )
+                response.headers["Content-Encoding"] = encoding
+                break
+        else:
+            response = send_from_directory(
+                self.static_dir,
+                filename,
+                mimetype=mimetype,
+                max_age=IMMUTABLE_MAX_AGE,
+            )
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+def init_assets(app, config):
+    """アプリケーションに静的ファイルの配信を登録
+
+    ASSETS_MODE が auto の場合、ビルド済みで DEBUG でなければ
+    まとめたファイルを使う。
+    """
+    mode = getattr(config, "ASSETS_MODE", "auto")
+    manifest = None
+    if mode != "source":
+        manifest = load_manifest(app.static_folder)
+        if manifest is None and mode == "bundle":
+            logger.warning(
+                "assets not built, run: python -m flaskr.assets build"
+            )
+        if mode == "auto" and config.DEBUG:
+            manifest = None
+
+    assets = Assets(app.static_folder, manifest)
+    app.extensions["flaskr_assets"] = assets
+    app.jinja_env.globals["asset_urls"] = assets.urls
+    if assets.bundled:
+        app.url_defaults(assets.url_defaults)
+        app.view_functions["static"] = assets.send
+    return assets
+
+
+def get_assets():
+    """現在のアプリケーションの静的ファイルの一覧"""
+    return current_app.extensions["flaskr_assets"]
+
+
+def main():
+    from . import STATIC_DIR
+
+    parser = argparse.ArgumentParser(description="静的ファイルのビルド")
+    parser.add_argument("command", choices=["build", "vendor"])
+    parser.add_argument(
+        "--no-fetch",
+        action="store_true",
+        help="外部のライブラリを取得しない（取得済みのものを使う）",
+    )
+    parser.add_argument(
+        "--pin",
+        action="store_true",
+        help=f"取得したライブラリの sha256 を {VENDOR_SUMS} に記録する（vendor のみ）",
+    )
+    args = parser.parse_args()
+
+    static_dir = os.path.abspath(STATIC_DIR)
+    try:
+        if args.command == "vendor":
+            fetched = fetch_vendor(static_dir, force=True, pin=args.pin)
+            print(f"取得したライブラリ: {fetched or 'なし'}")
+            return
+        manifest = build(static_dir, fetch=not args.no_fetch)
+    except VendorError as e:
+        raise SystemExit(f"エラー: {e}") from None
+    for name, output in manifest.items():
+        size = os.path.getsize(os.path.join(static_dir, output))
+        print(f"{name} -> {output} ({size / 1024:.1f}KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+# ==========================================================
+# ASGI モードのアプリケーションの作成
+# ==========================================================
+# タスクの書き込み用のJSON API（/add_task・/update_task_status・並び替えなど）
+# を非同期のエンジン（asyncpg / aiosqlite）で処理し、それ以外のルートは
+# Flask のアプリケーションにそのまま渡す。データベースの応答を待つ間も
+# ワーカーのスレッドを占有しないため、同時接続が多くてもスレッドが枯渇しない。
+#
+# 操作の検証・適用は flaskr/operations.py を AsyncSession.run_sync で
+# 呼び出すため、同期のルートと同じモデル・同じ処理を使う。
+# /api/events（SSE）もイベントループ上で待ち、接続ごとにスレッドを占有しない。
+# starlette・uvicorn・a2wsgi と非同期のドライバーが必要。
+#
+#   app = create_asgi_app()            # 環境変数に応じた設定
+#   app = create_asgi_app(config)      # 設定を指定
+import asyncio
+import contextlib
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+from .asgi_middleware import (
+    CompressionMiddleware,
+    MetricsMiddleware,
+    RequestIdMiddleware,
+    SecurityHeadersMiddleware,
+)
+from .compression import create_compressor
+from .db import AsyncDatabase
+from .events import astream
+from .logger import get_logger
+from .operations import OperationError, run_operations_async
+from .serializer import dumps, loads
+
+logger = get_logger(__name__)
+
+
+class FastJSONResponse(JSONResponse):
+    """flaskr.serializer でエンコードするJSONのレスポンス"""
+
+    def render(self, content):
+        return dumps(content).encode("utf-8")
+
+
+def error_response(message, status=400):
+    return FastJSONResponse({"error": message}, status_code=status)
+
+
+async def read_json(request):
+    """リクエストの本文をJSONとして読み込む（JSONでなければ None）"""
+    if request.headers.get("content-type", "").split(";")[0] != (
+        "application/json"
+    ):
+        return None
+    body = await request.body()
+    try:
+        return loads(body)
+    except ValueError:
+        return None
+
+
+class AsyncAPI:
+    """非同期で処理するルートと、Flask のアプリケーションとの共有部分"""
+
+    def __init__(self, flask_app, config):
+        self.flask_app = flask_app
+        self.config = config
+        self.db = AsyncDatabase(config)
+        # 同時に実行する操作をプールの接続数までに抑える。超えた分は
+        # プールの待ち（DB_POOL_TIMEOUT でエラー）ではなくここで順番を待つ
+        self._slots = None
+        if config.DB_POOL_CLASS != "null":
+            self._slots = asyncio.Semaphore(
+                config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW
+            )
+        # 完了を待たずに送っている変更の通知（終了時に待つ）
+        self._notifications = set()
+
+    def _default_user_id(self):
+        extensions = self.flask_app.extensions
+        engine = extensions["flaskr_db"].engine
+        return extensions["flaskr_users"].default_user_id(engine)
+
+    async def user_id(self):
+        # 初回（キャッシュされていない場合）だけ同期のエンジンで作成する
+        return await run_in_threadpool(self._default_user_id)
+
+    async def _bump_board(self):
+        """コミットした後にボードのバージョンを上げる（/admin のETag）
+
+        次の /admin より前に上がっている必要があるため完了を待つ。
+        プロセス内のカウンターはそのまま、外部ストアはスレッドで上げる。
+        """
+        cache = self.flask_app.extensions["flaskr_board_cache"]
+        # 操作の中で解決済みのため、既定ユーザーのIDはキャッシュから返る
+        user_id = self._default_user_id()
+        if cache.remote:
+            await run_in_threadpool(cache.bump, user_id)
+        else:
+            cache.bump(user_id)
+        return user_id
+
+    def _publish_board(self, user_id):
+        try:
+            self.flask_app.extensions["flaskr_events"].publish(
+                {"type": "board", "user": str(user_id)}
+            )
+        except Exception:
+            # 通知に失敗しても書き込み自体は成功している
+            logger.exception("publish board event failed")
+
+    def _publish_board_later(self, user_id):
+        """変更の通知をスレッドで送り、完了を待たずに戻る
+
+        NOTIFY は同期のエンジンで送るため、待つとレスポンスが1往復分
+        遅れる。クライアントは通知を受け取ってから /api/changes で
+        差分を取得するため、レスポンスより後に届いてもよい。
+        """
+        task = asyncio.ensure_future(
+            run_in_threadpool(self._publish_board, user_id)
+        )
+        self._notifications.add(task)
+        task.add_done_callback(self._notifications.discard)
+
+    async def drain(self):
+        """送信中の変更の通知を待つ（終了時・テスト用）"""
+        if self._notifications:
+            await asyncio.gather(*self._notifications)
+
+    async def run(self, items):
+        """操作を実行し、成功したら変更を通知する"""
+        if self._slots is None:
+            results = await run_operations_async(
+                self.db, items, self.user_id
+            )
+        else:
+            async with self._slots:
+                results = await run_operations_async(
+                    self.db, items, self.user_id
+                )
+        self._publish_board_later(await self._bump_board())
+        return results
+
+    async def operation_response(self, op, params):
+        """1件の操作を実行してJSONのレスポンスを返す（単機能のルート用）"""
+        try:
+            [(status, result)] = await self.run([{**params, "op": op}])
+        except OperationError as e:
+            return error_response(e.message, e.status)
+        except Exception as e:
+            logger.exception("operation failed", extra={"op": op})
+            return error_response(f"サーバーエラー: {str(e)}", 500)
+        return FastJSONResponse(
+            {"success": True, **result}, status_code=status
+        )
+
+    # ------------------------------------------------------
+    # ルート（flaskr/views/tasks.py・api.py と同じ入出力）
+    # ------------------------------------------------------
+    async def add_task(self, request):
+        data = await read_json(request)
+        if data is None:
+            return error_response("JSON形式のリクエストが必要です")
+        return await self.operation_response(
+            "create",
+            {
+                "title": data.get("title"),
+                "content": data.get("content"),
+                "category_id": data.get("category_id"),
+            },
+        )
+
+    async def update_task_status(self, request):
+        data = await read_json(request)
+        if data is None:
+            return error_response("JSON形式のリクエストが必要です")
+        return await self.operation_response(
+            "set_status",
+            {
+                "id": request.path_params["task_id"],
+                "status": data.get("status"),
+            },
+        )
+
+    async def move_task(self, request):
+        data = await read_json(request) or {}
+        return await self.operation_response(
+            "move",
+            {
+                "id": request.path_params["task_id"],
+                "before_id": data.get("before_id"),
+                "after_id": data.get("after_id"),
+            },
+        )
+
+    async def delete_task(self, request):
+        response = await self.operation_response(
+            "delete", {"id": request.path_params["task_id"]}
+        )
+        if response.status_code != 200:
+            return response
+        return Response(status_code=204)
+
+    async def update_task_order(self, request):
+        data = await read_json(request)
+        if not data or "tasks" not in data:
+            return error_response("Invalid data format")
+        tasks = data["tasks"]
+        if not isinstance(tasks, list):
+            return error_response("Tasks must be a list")
+        if not all(
+            isinstance(task, dict) and "category_id" in task for task in tasks
+        ):
+            return error_response("Missing required fields in task data")
+        return await self.operation_response("reorder", {"tasks": tasks})
+
+    async def update_task_order_by_status(self, request):
+        data = await read_json(request)
+        if not data or "tasks" not in data:
+            return error_response("Invalid data format")
+        tasks = data["tasks"]
+        if not isinstance(tasks, list):
+            return error_response("Tasks must be a list")
+        if not all(
+            isinstance(task, dict) and "status" in task for task in tasks
+        ):
+            return error_response("Missing required fields in task data")
+        rows = [
+            {key: task[key] for key in ("id", "sort_order") if key in task}
+            for task in tasks
+        ]
+        return await self.operation_response("reorder", {"tasks": rows})
+
+    async def batch(self, request):
+        data = await read_json(request)
+        if not isinstance(data, dict) or "operations" not in data:
+            return error_response("operations が指定されていません")
+        operations = data["operations"]
+        try:
+            results = await self.run(operations)
+        except OperationError as e:
+            return FastJSONResponse(
+                {"error": e.message, "index": e.index}, status_code=e.status
+            )
+        except Exception as e:
+            logger.exception("batch failed")
+            return error_response(f"サーバーエラー: {str(e)}", 500)
+        return FastJSONResponse(
+            {
+                "success": True,
+                "results": [
+                    {"op": item["op"], "code": code, "result": result}
+                    for item, (code, result) in zip(operations, results)
+                ],
+            }
+        )
+
+    async def events(self, request):
+        """ボードの変更を Server-Sent Events で通知（flaskr/views/api.py と同じ）"""
+        broadcaster = self.flask_app.extensions["flaskr_events"]
+        subscription = broadcaster.subscribe(await self.user_id())
+        if subscription is None:
+            # 接続数の上限（クライアントは手動更新にフォールバックする）
+            return error_response("接続数の上限に達しています", 503)
+        return StreamingResponse(
+            astream(
+                subscription,
+                broadcaster,
+                heartbeat=self.config.EVENTS_HEARTBEAT,
+                max_age=self.config.EVENTS_MAX_AGE,
+            ),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                # nginx などのプロキシでバッファリングさせない
+                "X-Accel-Buffering": "no",
+            },
+        )
+
+    def routes(self):
+        post = ["POST"]
+        return [
+            Route("/api/events", self.events),
+            Route("/add_task", self.add_task, methods=post),
+            Route(
+                "/update_task_status/{task_id}",
+                self.update_task_status,
+                methods=post,
+            ),
+            Route("/move_task/{task_id}", self.move_task, methods=post),
+            Route(
+                "/admin/delete_task/{task_id}", self.delete_task, methods=post
+            ),
+            Route("/update_task_order", self.update_task_order, methods=post),
+            Route(
+                "/update_task_order_by_status",
+                self.update_task_order_by_status,
+                methods=post,
+            ),
+            Route("/api/batch", self.batch, methods=post),
+        ]
+
+
+def create_asgi_app(config=None, flask_app=None):
+    """ASGI のアプリケーションを作成
+
+    上記のルート以外（管理画面・読み込み用のAPIなど）は
+    Flask のアプリケーションをスレッドで実行する。
+    リクエストID・セキュリティヘッダー・圧縮・（非同期のルートの）計測は
+    ASGI のミドルウェアで両方のルートに適用する。
+    """
+    from . import create_app
+    from .config import get_config
+
+    if config is None:
+        config = get_config()
+    if flask_app is None:
+        flask_app = create_app(config, asgi=True)
+
+    api = AsyncAPI(flask_app, config)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        yield
+        await api.drain()
+        await api.db.dispose()
+
+    routes = api.routes()
+    middleware = [Middleware(RequestIdMiddleware)]
+    metrics = flask_app.extensions.get("flaskr_metrics")
+    if metrics is not None:
+        middleware.append(
+            Middleware(
+                MetricsMiddleware,
+                metrics=metrics,
+                routes={route.endpoint: route.path for route in routes},
+            )
+        )
+    middleware.append(Middleware(SecurityHeadersMiddleware))
+    compressor = create_compressor(config)
+    if compressor is not None:
+        middleware.append(
+            Middleware(CompressionMiddleware, compressor=compressor)
+        )
+
+    wsgi = WSGIMiddleware(flask_app, workers=config.WEB_THREADS)
+    app = Starlette(
+        routes=[*routes, Mount("/", app=wsgi)],
+        middleware=middleware,
+        lifespan=lifespan,
+    )
+    app.state.api = api
+    app.state.flask_app = flask_app
+    return app
@@ -0,0 +1,196 @@
+# ==========================================================
+# 管理画面のボード構築用
+# ==========================================================
+# ORMオブジェクトを経由せず、表示に必要な列だけを JOIN で取得し、
+# 1回の走査でステータス別・カテゴリー別に振り分ける。
+import hashlib
+from collections import namedtuple
+
+from sqlalchemy import func, select, union_all
+
+from .models import Category, Post, User
+from .pagination import PAGE_SIZE, STATUSES, page_query, split_page
+from .purge import visible_criteria
+
+# 最初のページを埋め込まず、列が表示されたときに読み込むステータス
+# （アーカイブは完了したタスクが溜まり続けるため、ボードの表示を待たせない）
+LAZY_STATUSES = ["archive"]
+
+# ボードの1タスク分の行（ORMのインスタンスより軽量なタプル）
+BoardRow = namedtuple(
+    "BoardRow",
+    [
+        "id",
+        "title",
+        "content",
+        "status",
+        "category_id",
+        "sort_order",
+        "user_id",
+        "category_name",
+        "user_name",
+    ],
+)
+
+
+def board_select(model=Post):
+    """ボードの表示に必要な列だけを取得するSELECT文
+
+    model はアーカイブのテーブル（ArchivedPost）を読む場合に指定する。
+    """
+    return (
+        select(
+            model.id,
+            model.title,
+            model.content,
+            model.status,
+            model.category_id,
+            model.sort_order,
+            model.user_id,
+            Category.name,
+            User.name,
+        )
+        .join(Category, Category.id == model.category_id)
+        .join(User, User.id == model.user_id)
+    )
+
+
+def load_rows(session, id_query, model=Post):
+    """IDのSELECT文に一致するタスクを並び順どおりに BoardRow で読み込む"""
+    result = session.execute(
+        board_select(model)
+        .where(model.id.in_(id_query))
+        .order_by(model.sort_order, model.id)
+    )
+    return [BoardRow._make(row) for row in result.tuples()]
+
+
+def row_to_dict(row):
+    """BoardRow を data-manager.js が扱う形式の辞書に変換
+
+    UUID は str() せずそのまま返す（JSONへの変換は serializer で行う）。
+    """
+    return row._asdict()
+
+
+def fetch_page(session, scope, *criteria, after=None, limit=PAGE_SIZE):
+    """スコープのユーザーのタスクの1ページ分（辞書）と次ページのカーソルを取得"""
+    criteria = [
+        scope.where(Post),
+        *criteria,
+        *visible_criteria(session, scope),
+    ]
+    rows = load_rows(session, page_query(*criteria, after=after, limit=limit))
+    rows, cursor = split_page(rows, limit)
+    return [row_to_dict(row) for row in rows], cursor
+
+
+def board_version(session, scope):
+    """スコープのユーザーのボードのバージョン（ETag・キャッシュのキー）
+
+    ボードのキャッシュのカウンターをワーカー間で共有できない構成
+    （flaskr/cache.py）で使う。
+    タスク・カテゴリーの最終更新日時と件数から1回のクエリで求める。
+    書き込んだワーカーやバックグラウンドの処理によらず、更新・追加で
+    最終更新日時が、削除・アーカイブへの移動で件数が変わる。
+    """
+    stats = []
+    for model in (Post, Category):
+        stats += [
+            select(func.max(model.updated_at))
+            .where(scope.where(model))
+            .scalar_subquery(),
+            select(func.count())
+            .select_from(model)
+            .where(scope.where(model))
+            .scalar_subquery(),
+        ]
+    row = session.execute(select(*stats)).one()
+    return hashlib.sha1(repr(tuple(row)).encode()).hexdigest()[:16]
+
+
+def build_board(session, scope, limit=PAGE_SIZE):
+    """スコープのユーザーの管理画面のテンプレートに渡すボードのデータを構築
+
+    各列（TODOはカテゴリー別、それ以外はステータス別）の最初のページを
+    1回のクエリで取得し、1回の走査で振り分ける。LAZY_STATUSES の列は
+    空にしておき、クライアントが表示したときに読み込む。
+    """
+    categories_list = session.execute(
+        select(Category.id, Category.name, Category.deleted_at)
+        .where(scope.where(Category))
+        .order_by(Category.sort_order, Category.id)
+    ).all()
+    # 削除処理中のカテゴリーとそのタスクは表示しない
+    hidden = [cat.id for cat in categories_list if cat.deleted_at is not None]
+    categories_list = [cat for cat in categories_list if cat.deleted_at is None]
+    categories = {str(cat.id): cat.name for cat in categories_list}
+
+    columns = [("category", cat.id) for cat in categories_list]
+    columns += [
+        ("status", status)
+        for status in STATUSES
+        if status != "todo" and status not in LAZY_STATUSES
+    ]
+
+    def column_criteria(kind, key):
+        # カテゴリーはスコープのユーザーのものだけなので、カテゴリー別の列は
+        # (category_id, status, ...) のインデックスだけで絞り込める
+        if kind == "category":
+            return [Post.status == "todo", Post.category_id == key]
+        criteria = [scope.where(Post), Post.status == key]
+        if hidden:
+            criteria.append(Post.category_id.not_in(hidden))
+        return criteria
+
+    # 列ごとの LIMIT 付きサブクエリを UNION ALL で1つにまとめる
+    id_query = union_all(
+        *[
+            select(
+                page_query(*column_criteria(kind, key), limit=limit)
+                .subquery()
+                .c.id
+            )
+            for kind, key in columns
+        ]
+    )
+
+    # 1回の走査で列ごとに振り分ける
+    grouped = {column: [] for column in columns}
+    for row in load_rows(session, id_query):
+        if row.status == "todo":
+            column = ("category", row.category_id)
+        else:
+            column = ("status", row.status)
+        if column in grouped:
+            grouped[column].append(row)
+
+    # タスクはIDをキーに1回だけ持ち、各列はIDの配列で参照する
+    tasks = {}
+    columns_ids = {"category": {}, "status": {}}
+    cursors = {"category": {}, "status": {}}
+    for (kind, key), rows in grouped.items():
+        rows, cursor = split_page(rows, limit)
+        cursors[kind][str(key)] = cursor
+        ids = []
+        for row in rows:
+            task_id = str(row.id)
+            tasks[task_id] = row_to_dict(row)
+            ids.append(task_id)
+        columns_ids[kind][str(key)] = ids
+    for status in LAZY_STATUSES:
+        columns_ids["status"][status] = []
+        cursors["status"][status] = None
+
+    return {
+        "categories": categories,
+        "tasks": tasks,
+        # TODOはカテゴリー別、それ以外はステータス別の並び順
+        # （TODOのステータス別の並びはカテゴリー順に連結したもの）
+        "columns": columns_ids,
+        "cursors": cursors,  # 各列の次ページ取得用カーソル
+        # 最初のページから /api/board/<status> で読み込む列
+        "lazy": LAZY_STATUSES,
+        # 最初のカテゴリーIDを取得（初期選択用）
+        "first_category_id": next(iter(categories), None),
+    }
@@ -0,0 +1,246 @@
+# ==========================================================
+# 管理画面のボードのキャッシュ用
+# ==========================================================
+# キャッシュは (ユーザー, ボードのバージョン) をキーにする。バージョンは
+# ユーザーごとのカウンターで、書き込みのルートがコミットした後に上げる
+# （views/helpers.py の invalidates_board・async_api.py）。/admin は
+# カウンターを読むだけでETagを決められるため、304 の場合はデータベースに
+# 問い合わせない。
+# カウンターはバックエンドが保持するため、ワーカー間で共有できる構成
+# （redis、または1プロセス）でだけ使う。それ以外はデータベースの内容
+# （board.board_version: タスク・カテゴリーの最終更新日時と件数）から求める。
+# リクエストを経由しない書き込みのうち、アーカイブの移動・カテゴリーの
+# 削除の続きはボードに表示する内容を変えないため上げない。flask transfer
+# import は上げるが、別プロセスのため redis の場合だけ反映される
+# （memory・none では次の書き込みか再起動まで古いボードのまま）。
+# バックエンドは以下から選択できる。
+#   - memory: プロセス内のLRU（1プロセス構成向け）
+#   - redis:  外部ストア（複数ワーカー構成向け、redis-py が必要）
+#   - none:   キャッシュしない（ETagによる304は使う）
+# memory・local はワーカーごとにボードを保持し、ワーカー数だけ同じボードを
+# 構築・保持することになるため、WEB_WORKERS が2以上の場合は none に切り替える
+# （WEB_WORKERS は gunicorn で起動した場合だけ既定で2以上になる）。
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from .logger import get_logger
+from .serializer import dumps, loads
+
+logger = get_logger(__name__)
+
+# ワーカー間で共有されないバックエンド
+PROCESS_LOCAL_BACKENDS = ("memory", "local")
+
+
+def _initial_version():
+    # 再起動前に発行したETagと重ならないように現在時刻から始める
+    return int(time.time() * 1000)
+
+
+class LRUBackend:
+    """プロセス内のLRUキャッシュ（件数上限付き）"""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def version(self, name):
+        with self._lock:
+            return self._versions.setdefault(name, _initial_version())
+
+    def incr(self, name):
+        with self._lock:
+            current = self._versions.get(name, _initial_version())
+            self._versions[name] = current + 1
+            return current + 1
+
+
+class ExternalStoreBackend:
+    """外部ストアのアダプター
+
+    client は redis-py 互換の get / set(ex=, nx=) / incr を持つオブジェクト。
+    値はJSONで保存する。
+    """
+
+    def __init__(self, client, prefix="flaskr:board:", ttl=3600):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return loads(raw) if raw is not None else None
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, dumps(value), ex=self.ttl)
+
+    def version(self, name):
+        key = self.prefix + "version:" + name
+        raw = self.client.get(key)
+        if raw is None:
+            # 複数ワーカーが同時に初期化しても最初の値だけが残る
+            self.client.set(key, _initial_version(), nx=True)
+            raw = self.client.get(key)
+        return int(raw)
+
+    def incr(self, name):
+        key = self.prefix + "version:" + name
+        self.version(name)
+        return int(self.client.incr(key))
+
+
+class LocalStore:
+    """ExternalStoreBackend 用のプロセス内の代替ストア（テスト・開発用）"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None, nx=False):
+        with self._lock:
+            if nx and key in self._data:
+                return False
+            expires_at = time.monotonic() + ex if ex else None
+            self._data[key] = (str(value).encode(), expires_at)
+            return True
+
+    def incr(self, key):
+        with self._lock:
+            value, expires_at = self._data.get(key, (b"0", None))
+            value = int(value) + 1
+            self._data[key] = (str(value).encode(), expires_at)
+            return value
+
+
+class NullBackend:
+    """キャッシュしないバックエンド（バージョン番号のみ管理）"""
+
+    def __init__(self):
+        self._versions = LRUBackend(maxsize=0)
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def version(self, name):
+        return self._versions.version(name)
+
+    def incr(self, name):
+        return self._versions.incr(name)
+
+
+class BoardCache:
+    """ユーザーごとのボードのキャッシュ
+
+    versioned が偽の場合はバージョン番号をワーカー間で共有できないため、
+    version() は None を返す（呼び出し側はデータベースの内容から求める）。
+    """
+
+    def __init__(self, backend, namespace="", versioned=True):
+        self.backend = backend
+        self.namespace = namespace
+        self.versioned = versioned
+
+    @staticmethod
+    def _user(user_key):
+        return hashlib.sha1(str(user_key).encode()).hexdigest()[:16]
+
+    @property
+    def remote(self):
+        """バージョン番号を外部ストア（ネットワーク越し）で管理するか"""
+        return isinstance(self.backend, ExternalStoreBackend)
+
+    def version(self, user_key):
+        """現在のバージョン番号（共有できない構成では None）"""
+        if not self.versioned:
+            return None
+        return self.backend.version(self._user(user_key))
+
+    def bump(self, user_key):
+        """バージョン番号を上げて、既存のキャッシュ・ETagを無効にする"""
+        if not self.versioned:
+            return None
+        return self.backend.incr(self._user(user_key))
+
+    def etag(self, user_key, version):
+        """(ユーザー, バージョン) に対応するETag"""
+        return f"board-{self._user(user_key)}-{version}{self.namespace}"
+
+    def get(self, user_key, version):
+        return self.backend.get(f"{self._user(user_key)}:{version}")
+
+    def set(self, user_key, version, payload):
+        self.backend.set(f"{self._user(user_key)}:{version}", payload)
+
+
+def create_board_cache(config, namespace=""):
+    """設定に応じたボードのキャッシュを作成"""
+    backend_name = getattr(config, "BOARD_CACHE_BACKEND", "memory")
+    workers = getattr(config, "WEB_WORKERS", 1)
+
+    if backend_name in PROCESS_LOCAL_BACKENDS and workers > 1:
+        # ワーカーごとに同じボードを構築・保持しないようにする
+        logger.warning(
+            "board cache disabled",
+            extra={
+                "backend": backend_name,
+                "workers": config.WEB_WORKERS,
+                "hint": "BOARD_CACHE_BACKEND=redis を指定してください",
+            },
+        )
+        return BoardCache(NullBackend(), namespace=namespace, versioned=False)
+
+    if backend_name == "redis":
+        import redis  # 外部ストアを使う場合のみ必要
+
+        client = redis.Redis.from_url(config.BOARD_CACHE_URL)
+        backend = ExternalStoreBackend(client, ttl=config.BOARD_CACHE_TTL)
+    elif backend_name == "local":
+        backend = ExternalStoreBackend(LocalStore(), ttl=config.BOARD_CACHE_TTL)
+    elif backend_name == "none":
+        # カウンターはプロセス内のため、1プロセスの場合だけ使う
+        return BoardCache(
+            NullBackend(), namespace=namespace, versioned=workers <= 1
+        )
+    else:
+        backend = LRUBackend(maxsize=config.BOARD_CACHE_SIZE)
+
+    return BoardCache(backend, namespace=namespace)
+
+
+def init_board_cache(app, config, namespace=""):
+    """アプリケーションにボードのキャッシュを登録"""
+    cache = create_board_cache(config, namespace=namespace)
+    app.extensions["flaskr_board_cache"] = cache
+    return cache
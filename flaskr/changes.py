@@ -0,0 +1,105 @@
+# ==========================================================
+# 差分の取得用（/api/changes）
+# ==========================================================
+# タスク・カテゴリーの updated_at と、削除の記録（flaskr/tombstones.py）から
+# カーソル以降に作成・更新・削除されたものだけを取得する。
+# カーソルは取得を始めた時刻で、次回はそれ以降の変更を返す。
+# コミットが遅れたトランザクションの変更を取りこぼさないように
+# CURSOR_OVERLAP だけ遡って取得する（重複はクライアントで上書きされる）。
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import select
+
+from .board import BoardRow, board_select, row_to_dict
+from .models import Category, Post, Tombstone
+from .purge import visible_criteria
+
+# 1回で返す変更の上限（超える場合はクライアントに再読み込みさせる）
+MAX_CHANGES = 500
+
+# カーソルより前に遡って取得する時間
+CURSOR_OVERLAP = timedelta(seconds=5)
+
+TIMEZONE = ZoneInfo("Asia/Tokyo")
+
+
+def current_cursor():
+    """現在時刻のカーソル文字列"""
+    return datetime.now(TIMEZONE).isoformat()
+
+
+def parse_cursor(cursor):
+    """カーソル文字列を日時に変換（不正な場合は ValueError）"""
+    since = datetime.fromisoformat(cursor)
+    if since.tzinfo is None:
+        raise ValueError("cursor must have a timezone")
+    return since.astimezone(TIMEZONE)
+
+
+def fetch_changes(session, scope, since, retention, limit=MAX_CHANGES):
+    """スコープのユーザーの since 以降の変更を取得
+
+    削除の記録が残っていないほど古いカーソルや、変更が limit 件を
+    超える場合は None（クライアントはボード全体を読み込み直す）。
+    """
+    if since < datetime.now(TIMEZONE) - retention:
+        return None
+    after = since - CURSOR_OVERLAP
+
+    categories = session.execute(
+        select(
+            Category.id, Category.name, Category.sort_order, Category.deleted_at
+        )
+        .where(scope.where(Category), Category.updated_at > after)
+        .order_by(Category.updated_at, Category.id)
+        .limit(limit + 1)
+    ).all()
+    tasks = session.execute(
+        board_select()
+        .where(
+            scope.where(Post),
+            Post.updated_at > after,
+            *visible_criteria(session, scope),
+        )
+        .order_by(Post.updated_at, Post.id)
+        .limit(limit + 1)
+    ).all()
+    tombstones = session.execute(
+        select(Tombstone.kind, Tombstone.object_id)
+        .where(scope.where(Tombstone), Tombstone.deleted_at > after)
+        .order_by(Tombstone.deleted_at, Tombstone.id)
+        .limit(limit + 1)
+    ).all()
+
+    if max(len(categories), len(tasks), len(tombstones)) > limit:
+        return None
+
+    deleted = {"categories": set(), "tasks": set()}
+    for kind, object_id in tombstones:
+        deleted["categories" if kind == "category" else "tasks"].add(
+            str(object_id)
+        )
+    # 削除処理中のカテゴリーは削除済みとして返す
+    for category in categories:
+        if category.deleted_at is not None:
+            deleted["categories"].add(str(category.id))
+
+    return {
+        "categories": [
+            {
+                "id": str(category.id),
+                "name": category.name,
+                "sort_order": category.sort_order,
+            }
+            for category in categories
+            if str(category.id) not in deleted["categories"]
+        ],
+        "tasks": [
+            row_to_dict(BoardRow._make(row))
+            for row in tasks
+            if str(row.id) not in deleted["tasks"]
+        ],
+        "deleted": {key: sorted(ids) for key, ids in deleted.items()},
+    }
+
@@ -0,0 +1,122 @@
+# ==========================================================
+# レスポンスの圧縮用（after_request）
+# ==========================================================
+# HTML・JSON などのレスポンスを Accept-Encoding に応じて brotli / gzip で
+# 圧縮する。以下のレスポンスは圧縮しない。
+#   - COMPRESS_MIN_SIZE バイト未満のもの（圧縮しても転送時間がほぼ変わらない）
+#   - Content-Encoding が付いているもの（圧縮済みの静的ファイルなど）
+#   - ストリーミング（/api/events の SSE など）・ファイルの送信
+#   - 圧縮の効かない形式（画像など）や Cache-Control: no-transform
+# 圧縮すると内容が変わるため、強いETagは弱いETag（W/"..."）に変える。
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli は任意の依存（なければ gzip のみ）
+    brotli = None
+
+# 圧縮するContent-Type
+COMPRESSIBLE_TYPES = {
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+}
+
+
+def compress(data, encoding, level):
+    """data を encoding（"br" / "gzip"）で圧縮"""
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    # mtime を固定して同じ内容からは同じ圧縮結果にする
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class Compressor:
+    """レスポンスを圧縮する after_request のフック"""
+
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=4):
+        self.min_size = min_size
+        # サーバーの優先順（q値が同じ場合に先のものを使う）
+        self.levels = {"gzip": gzip_level}
+        if brotli is not None:
+            self.levels = {"br": brotli_quality, **self.levels}
+
+    def negotiate(self, accept_encodings):
+        """Accept-Encoding から使う圧縮方式を選ぶ（なければ None）"""
+        best, best_quality = None, 0
+        for encoding in self.levels:
+            quality = accept_encodings[encoding]
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def compressible(self, status, mimetype, encoded, no_transform, length):
+        """ステータス・ヘッダーの値から圧縮するかを判定
+        （ASGI のミドルウェアと共通）"""
+        if status < 200 or status in (204, 206, 304):
+            return False
+        if encoded:
+            return False
+        if mimetype not in COMPRESSIBLE_TYPES:
+            return False
+        if no_transform:
+            return False
+        return length is not None and length >= self.min_size
+
+    def should_compress(self, response):
+        if response.direct_passthrough or response.is_streamed:
+            return False
+        return self.compressible(
+            response.status_code,
+            response.mimetype,
+            "Content-Encoding" in response.headers,
+            response.cache_control.no_transform,
+            response.content_length,
+        )
+
+    def after_request(self, response):
+        if not self.should_compress(response):
+            return response
+        # 圧縮の有無で内容が変わるので、キャッシュは Accept-Encoding ごとに分ける
+        response.vary.add("Accept-Encoding")
+        encoding = self.negotiate(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        compressed = compress(data, encoding, self.levels[encoding])
+        if len(compressed) >= len(data):
+            return response
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def create_compressor(config):
+    """設定に応じた圧縮（COMPRESS_ENABLED が偽なら None）"""
+    if not getattr(config, "COMPRESS_ENABLED", True):
+        return None
+    return Compressor(
+        min_size=config.COMPRESS_MIN_SIZE,
+        gzip_level=config.COMPRESS_GZIP_LEVEL,
+        brotli_quality=config.COMPRESS_BROTLI_QUALITY,
+    )
+
+
+def init_compression(app, config):
+    """アプリケーションにレスポンスの圧縮を登録"""
+    compressor = create_compressor(config)
+    if compressor is None:
+        return None
+    app.extensions["flaskr_compression"] = compressor
+    app.after_request(compressor.after_request)
+    return compressor
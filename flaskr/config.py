@@ -1,8 +1,18 @@
 # flaskr/config.py
 import os
+from datetime import timedelta
+
 from dotenv import load_dotenv
 
 
+def env_bool(name, default):
+    """環境変数を真偽値として取得"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 class Config:
     """基本設定クラス"""
 
@@ -16,6 +26,20 @@ class Config:
     DB_PASSWORD = os.getenv("DB_PASSWORD", "password")
     DB_HOST = os.getenv("DB_HOST", "localhost")
     DB_NAME = os.getenv("DB_NAME", "todo_db")
+    # 指定した場合は DB_* より優先する（例: テスト用の sqlite://）
+    DATABASE_URL = os.getenv("DATABASE_URL")
+    # ASGI モードの非同期のドライバーのURL（省略時は DATABASE_URL から
+    # postgresql+asyncpg:// / sqlite+aiosqlite:// に変換する）
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+    # コネクションプール設定
+    # queue: SQLAlchemyのプールを使う, null: 外部のプーラー（PgBouncerなど）に任せる
+    DB_POOL_CLASS = os.getenv("DB_POOL_CLASS", "queue")
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+    DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", False)
 
     # アプリケーション設定
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
@@ -29,8 +53,130 @@ class Config:
         "DEFAULT_USER_PASSWORD", "secure_password_123"
     )
 
+    # WSGIサーバー（gunicorn）設定
+    # DB_POOL_SIZE はワーカーごとの値（最大接続数 = ワーカー数 × (プール + オーバーフロー)）
+    # WEB_WORKERS はこのプロセスを含むワーカーの数（ボードのキャッシュの切り替えに
+    # 使う）。未指定なら1プロセス（flask run など）とみなし、gunicorn.conf.py が
+    # 既定のワーカー数（CPU数 × 2 + 1）を設定してから読み込む
+    WEB_BIND = os.getenv("WEB_BIND", "0.0.0.0:5000")
+    WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+    WEB_THREADS = int(os.getenv("WEB_THREADS", "4"))
+    WEB_TIMEOUT = int(os.getenv("WEB_TIMEOUT", "30"))
+    # 指定した件数を処理したワーカーを再起動（0は無効）
+    WEB_MAX_REQUESTS = int(os.getenv("WEB_MAX_REQUESTS", "0"))
+    # wsgi: スレッドで処理（flaskr.wsgi:app）
+    # asgi: JSONの書き込みAPIを非同期で処理（flaskr.asgi:app、uvicorn のワーカー）
+    WEB_MODE = os.getenv("WEB_MODE", "wsgi")
+
+    # ログ設定
+    # LOG_LEVELS はモジュールごとのレベル（例: "flaskr.main=DEBUG,sqlalchemy.engine=INFO"）
+    # SQLを出力する場合は sqlalchemy.engine=INFO を指定する
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+    # DEBUGログの出力割合（0〜1）と、同じメッセージの1秒あたりの上限（0は無制限）
+    LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+    LOG_DEBUG_RATE_LIMIT = int(os.getenv("LOG_DEBUG_RATE_LIMIT", "10"))
+
+    # リクエスト・SQLの計測（/metrics）
+    METRICS_ENABLED = env_bool("METRICS_ENABLED", True)
+    # 全ワーカーの値を合計するためのディレクトリ（空ならワーカーごとの値）と、
+    # 各ワーカーが値を書き出す間隔（秒）
+    METRICS_DIR = os.getenv("METRICS_DIR", "")
+    METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))
+
+    # カテゴリーの削除
+    # タスク数がこの件数を超える場合はバックグラウンドで分割して削除する
+    CATEGORY_PURGE_THRESHOLD = int(
+        os.getenv("CATEGORY_PURGE_THRESHOLD", "5000")
+    )
+    CATEGORY_PURGE_BATCH = int(os.getenv("CATEGORY_PURGE_BATCH", "1000"))
+    # バックグラウンド処理のスレッド数（ワーカーごと）
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+
+    # アーカイブ済みのタスクの移動（flaskr/archive.py）
+    # 最後の更新から ARCHIVE_AFTER_DAYS 日経ったタスクを posts_archive に移す。
+    # ワーカーごとに ARCHIVE_INTERVAL 秒おきに実行する（0 は無効。cron から
+    # flask archive run を実行する場合など）
+    ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "7"))
+    ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+    ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+
+    # 差分の取得（/api/changes）
+    # 削除の記録の保持日数（これより古いカーソルにはボード全体を読み込み直させる）
+    TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "7"))
+
+    # 定期的な後片付け（flaskr/maintenance.py）
+    # 保持期間を過ぎた削除の記録の削除と、中断したカテゴリーの削除の再開を
+    # ワーカーごとに MAINTENANCE_INTERVAL 秒おきに実行する（0 は無効。cron から
+    # flask maintenance run を実行する場合など）
+    MAINTENANCE_INTERVAL = float(os.getenv("MAINTENANCE_INTERVAL", "3600"))
+
+    # ボードの変更通知（/api/events、Server-Sent Events）
+    # auto: PostgreSQLなら LISTEN/NOTIFY、それ以外はプロセス内, memory, postgres, none
+    EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "auto")
+    EVENTS_CHANNEL = os.getenv("EVENTS_CHANNEL", "flaskr_board")
+    # 接続ごとのキューの上限（あふれたら resync 1件に置き換える）
+    EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "16"))
+    # ワーカーごとの接続数の上限。WSGI では接続がスレッドを1つ占有するため
+    # WEB_THREADS の半分、ASGI ではイベントループ上で待つため 1000
+    EVENTS_MAX_SUBSCRIBERS = int(
+        os.getenv(
+            "EVENTS_MAX_SUBSCRIBERS",
+            "1000" if WEB_MODE == "asgi" else str(max(WEB_THREADS // 2, 1)),
+        )
+    )
+    # 接続維持のコメントを送る間隔と、再接続させるまでの秒数
+    EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+    EVENTS_MAX_AGE = float(os.getenv("EVENTS_MAX_AGE", "300"))
+
+    # タスクの検索（/api/search）
+    # auto: PostgreSQLなら bigram（GIN インデックス）、それ以外はプロセス内の n-gram, bigram, ngram
+    SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+
+    # 静的ファイル（python -m flaskr.assets build でビルド）
+    # auto: ビルド済みで DEBUG でなければまとめたファイル, bundle, source: 元のファイル
+    ASSETS_MODE = os.getenv("ASSETS_MODE", "auto")
+
+    # レスポンスの圧縮（Accept-Encoding に応じて br / gzip）
+    # COMPRESS_MIN_SIZE バイト未満のレスポンスは圧縮しない
+    COMPRESS_ENABLED = env_bool("COMPRESS_ENABLED", True)
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+    COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+
+    # タスク・カテゴリーのエクスポート・インポート（flask transfer、/api/export）
+    # 1回に取得・書き込む行数と、書き込み方法
+    # auto: psycopg2 なら COPY、それ以外は executemany, copy, insert
+    TRANSFER_BATCH_SIZE = int(os.getenv("TRANSFER_BATCH_SIZE", "5000"))
+    TRANSFER_METHOD = os.getenv("TRANSFER_METHOD", "auto")
+
+    # ボードのキャッシュ設定
+    # memory: プロセス内LRU（1プロセス構成向け）, redis: 外部ストア, none: 無効
+    # memory（と開発用の local）は WEB_WORKERS が2以上（gunicorn の複数ワーカー）なら無効になる
+    BOARD_CACHE_BACKEND = os.getenv("BOARD_CACHE_BACKEND", "memory")
+    BOARD_CACHE_SIZE = int(os.getenv("BOARD_CACHE_SIZE", "128"))
+    BOARD_CACHE_URL = os.getenv("BOARD_CACHE_URL", "redis://localhost:6379/0")
+    BOARD_CACHE_TTL = int(os.getenv("BOARD_CACHE_TTL", "3600"))
+
+    @property
+    def tombstone_retention(self):
+        return timedelta(days=self.TOMBSTONE_RETENTION_DAYS)
+
+    @property
+    def archive_after(self):
+        return timedelta(days=self.ARCHIVE_AFTER_DAYS)
+
+    @property
+    def async_database_url(self):
+        from .db import async_url
+
+        return self.ASYNC_DATABASE_URL or async_url(self.database_url)
+
     @property
     def database_url(self):
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         return f"postgresql+psycopg2://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}/{self.DB_NAME}"
 
 
@@ -40,6 +186,9 @@ class DevelopmentConfig(Config):
     DEBUG = True
     FLASK_ENV = "development"
 
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+
 
 class ProductionConfig(Config):
     """本番環境設定"""
@@ -47,6 +196,16 @@ class ProductionConfig(Config):
     DEBUG = False
     FLASK_ENV = "production"
 
+    # 本番環境ではDEBUGログを1割に間引く
+    LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))
+
+    # 本番環境ではワーカー数に合わせてプールを調整する
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", True)
+
     def __init__(self):
         super().__init__()
         # 本番環境では必須環境変数をチェック
@@ -12,11 +12,15 @@ from sqlalchemy import (
 )
 from sqlalchemy.orm import Session, selectinload, sessionmaker
 from .models import Base, User, Post, Category
+from .logger import get_logger
+from .ranking import respace
 from datetime import date
 from dotenv import load_dotenv  # type: ignore
 import os
 import uuid
 
+logger = get_logger(__name__)
+
 
 def main():
     load_dotenv()
@@ -29,15 +33,14 @@ def main():
     # 接続文字列を作成
     db_url = f"postgresql+psycopg2://{user}:{password}@{host}/{dbname}"
 
-    engine = create_engine(
-        db_url,
-        echo=True,
-    )
+    # SQLの出力は sqlalchemy.engine のログレベルで切り替える
+    engine = create_engine(db_url)
 
+    # カテゴリーの並び順をユーザーごとに RANK_GAP 間隔で振り直す
+    # （連番にすると間に移動できず、移動のたびにリバランスが起きる）
     with Session(engine) as session:
-        categories = session.query(Category).all()
-        for index, cat in enumerate(categories):
-            cat.sort_order = index
+        for user_id in session.scalars(select(User.id)).all():
+            respace(session, [(Category, (Category.user_id == user_id,))])
         session.commit()
 
     """ データベースの情報を取得
@@ -155,53 +158,46 @@ def main():
 def init_database():
     """Docker環境用のデータベース初期化"""
     from .config import get_config
-    from sqlalchemy import create_engine, text
-    from sqlalchemy.orm import Session
-    from .models import Base, User
-    import uuid
+    from sqlalchemy import create_engine
+    from .models import Base
+    from .migrations import run_migrations
+    from .maintenance import run_maintenance
+    from .users import ensure_user
+
+    from .logger import setup_logging
 
     config = get_config()
+    setup_logging(config)
 
-    # DEBUG属性の安全な取得
-    debug_mode = getattr(config, "DEBUG", False)
-    engine = create_engine(config.database_url, echo=debug_mode)
+    # SQLの出力は sqlalchemy.engine のログレベルで切り替える
+    engine = create_engine(config.database_url)
 
     try:
-        # 残りのコードは変更なし
-        with engine.connect() as conn:
-            result = conn.execute(
-                text(
-                    """
-                    SELECT table_name FROM information_schema.tables 
-                    WHERE table_schema = 'public' AND table_name = 'users'
-                """
-                )
+        # 未適用のマイグレーション（テーブル・インデックスの作成など）を実行
+        applied = run_migrations(engine)
+        if applied:
+            logger.info("マイグレーションを適用しました: %s", applied)
+        else:
+            logger.info("既存のテーブルを使用します")
+
+        # デフォルトユーザーを作成（既にあれば何もしない）
+        with engine.begin() as conn:
+            user_id = ensure_user(
+                conn,
+                config.DEFAULT_USER_NAME,
+                config.DEFAULT_USER_EMAIL,
+                config.DEFAULT_USER_PASSWORD,  # 本番では要ハッシュ化
             )
+        logger.info(
+            "デフォルトユーザー: %s (%s)", config.DEFAULT_USER_EMAIL, user_id
+        )
 
-            if not result.fetchone():
-                print("テーブルが存在しないため、作成します...")
-                Base.metadata.create_all(engine)
-
-                # デフォルトユーザーを作成
-                with Session(engine) as session:
-                    existing_user = session.query(User).first()
-                    if not existing_user:
-                        default_user = User(
-                            id=uuid.uuid4(),
-                            name=config.DEFAULT_USER_NAME,
-                            email=config.DEFAULT_USER_EMAIL,
-                            password=config.DEFAULT_USER_PASSWORD,  # 本番では要ハッシュ化
-                        )
-                        session.add(default_user)
-                        session.commit()
-                        print(
-                            f"デフォルトユーザーを作成しました: {default_user.name}"
-                        )
-            else:
-                print("既存のテーブルを使用します")
+        # 中断したカテゴリーの削除を再開し、保持期間を過ぎた削除の記録を削除
+        # （起動後はワーカーのスレッドか flask maintenance run で実行する）
+        run_maintenance(engine, config)
 
     except Exception as e:
-        print(f"データベース初期化エラー: {e}")
+        logger.exception("データベース初期化エラー: %s", e)
         # 初期化に失敗した場合でもテーブルを作成
         Base.metadata.create_all(engine)
 
@@ -1,18 +1,275 @@
 # ==========================================================
 # データベースの接続用
 # ==========================================================
-from sqlalchemy import create_engine
+# エンジンは初回使用時に作成する（インポートやアプリ作成の時点では接続しない）。
+# AsyncDatabase は ASGI モード（flaskr/asgi.py）用の非同期のエンジン。
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import create_engine, event, exc
 from sqlalchemy.orm import sessionmaker
-from .config import get_config
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
+
+
+class PoolStats:
+    """コネクションの取得（チェックアウト）に関する統計"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_checkout(self, wait):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def record_timeout(self, wait):
+        with self._lock:
+            self.checkout_timeouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def as_dict(self):
+        with self._lock:
+            attempts = self.checkouts + self.checkout_timeouts
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "wait_total_ms": round(self.wait_total * 1000, 3),
+                "wait_avg_ms": round(
+                    self.wait_total * 1000 / attempts if attempts else 0, 3
+                ),
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+class _InstrumentedPoolMixin:
+    """チェックアウトの待ち時間とタイムアウトを記録するプール"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.record_timeout(time.perf_counter() - start)
+            raise
+        self.stats.record_checkout(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() などで作り直されても統計を引き継ぐ
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedNullPool(_InstrumentedPoolMixin, NullPool):
+    pass
+
+
+def engine_options(config, url=None):
+    """設定からエンジン（コネクションプール）のオプションを作成"""
+    url = url or config.database_url
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # インメモリのSQLite（テスト用）は1つの接続を全スレッドで共有する
+        return {
+            "poolclass": StaticPool,
+            "connect_args": {"check_same_thread": False},
+        }
+
+    # SQLの出力は echo ではなく sqlalchemy.engine のログレベルで切り替える
+    # （LOG_LEVELS="sqlalchemy.engine=INFO"）
+    options = {
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
+    if config.DB_POOL_CLASS == "null":
+        # 外部のプーラーを使う場合は接続を保持しない
+        options["poolclass"] = InstrumentedNullPool
+    else:
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+            pool_recycle=config.DB_POOL_RECYCLE,
+        )
+    return options
+
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLiteは接続ごとに有効にしないと ON DELETE CASCADE が動かない
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def get_pool_stats(engine):
+    """コネクションプールの状態と統計を取得"""
+    pool = engine.pool
+    stats = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout(),
+            }
+        )
+    if hasattr(pool, "stats"):
+        stats.update(pool.stats.as_dict())
+    return stats
+
+
+class Database:
+    """エンジンとセッションを初回使用時に作成する"""
+
+    def __init__(self, config, url=None):
+        self.config = config
+        self.url = url or config.database_url
+        self._engine = None
+        self._sessionmaker = None
+        self._on_create = []
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.extensions["flaskr_db"] = self
+        return self
+
+    @property
+    def created(self):
+        """エンジンを作成済みか"""
+        return self._engine is not None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    engine = create_engine(
+                        self.url, **engine_options(self.config, self.url)
+                    )
+                    if engine.dialect.name == "sqlite":
+                        event.listen(
+                            engine, "connect", _enable_sqlite_foreign_keys
+                        )
+                    for callback in self._on_create:
+                        callback(engine)
+                    self._sessionmaker = sessionmaker(
+                        autocommit=False,
+                        autoflush=False,
+                        bind=engine,
+                    )
+                    self._engine = engine
+        return self._engine
+
+    def on_create(self, callback):
+        """エンジンの作成時に呼び出す関数を登録（作成済みならすぐに呼び出す）"""
+        with self._lock:
+            if self._engine is None:
+                self._on_create.append(callback)
+                return
+        callback(self._engine)
+
+    def session(self):
+        """新しいセッションを作成"""
+        if self._sessionmaker is None:
+            self.engine
+        return self._sessionmaker()
+
+    def dispose(self, close=True):
+        """コネクションプールを破棄（fork後のワーカーでは close=False）"""
+        if self._engine is not None:
+            self._engine.dispose(close=close)
+
+
+def async_url(url):
+    """同期のドライバーのURLを非同期のドライバーのURLに変換"""
+    scheme, _, rest = url.partition("://")
+    if scheme.startswith("postgresql"):
+        return f"postgresql+asyncpg://{rest}"
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+
+def async_engine_options(config, url):
+    """設定から非同期のエンジンのオプションを作成"""
+    if url in ("sqlite+aiosqlite://", "sqlite+aiosqlite:///:memory:"):
+        # インメモリのSQLiteは同期のエンジンとは別のデータベースになる
+        return {"poolclass": StaticPool}
+
+    options = {"pool_pre_ping": config.DB_POOL_PRE_PING}
+    if config.DB_POOL_CLASS == "null":
+        options["poolclass"] = NullPool
+    else:
+        # プールのクラスは既定（AsyncAdaptedQueuePool）を使う
+        options.update(
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+            pool_recycle=config.DB_POOL_RECYCLE,
+        )
+    return options
+
+
+class AsyncDatabase:
+    """非同期のエンジンとセッションを初回使用時に作成する"""
+
+    def __init__(self, config, url=None):
+        self.config = config
+        self.url = url or config.async_database_url
+        self._engine = None
+        self._sessionmaker = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            # sqlalchemy.ext.asyncio は ASGI モードでのみ読み込む
+            from sqlalchemy.ext.asyncio import (
+                async_sessionmaker,
+                create_async_engine,
+            )
+
+            engine = create_async_engine(
+                self.url, **async_engine_options(self.config, self.url)
+            )
+            if engine.dialect.name == "sqlite":
+                event.listen(
+                    engine.sync_engine, "connect", _enable_sqlite_foreign_keys
+                )
+            self._sessionmaker = async_sessionmaker(
+                engine, autoflush=False, expire_on_commit=False
+            )
+            self._engine = engine
+        return self._engine
+
+    def session(self):
+        """新しい AsyncSession を作成"""
+        if self._sessionmaker is None:
+            self.engine
+        return self._sessionmaker()
 
-# 設定を取得
-config = get_config()
+    async def dispose(self):
+        if self._engine is not None:
+            await self._engine.dispose()
 
-# データベース接続エンジンを作成
-engine = create_engine(config.database_url, echo=config.DEBUG)
 
-SessionLocal = sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=engine,
-)
+def get_db():
+    """現在のアプリケーションのデータベース"""
+    return current_app.extensions["flaskr_db"]
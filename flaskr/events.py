@@ -0,0 +1,329 @@
+# ==========================================================
+# ボードの変更通知用（Server-Sent Events）
+# ==========================================================
+# 書き込みのたびに「ボードが変わった」イベントを発行し、/api/events で
+# 接続中のクライアントに送る。イベントには変更内容を含めず、受け取った
+# クライアントは /api/changes で差分だけを取得する。
+# バックエンドは以下から選択できる。
+#   - memory:   プロセス内で配信（1プロセス構成・テスト向け）
+#   - postgres: LISTEN/NOTIFY でワーカー間に配信（複数ワーカー構成向け）
+#   - none:     配信しない
+#   - auto:     データベースが PostgreSQL なら postgres、それ以外は memory
+#
+# 購読者ごとのキューは上限付きで、あふれた場合は溜まったイベントを捨てて
+# resync イベント1件に置き換える（遅いクライアントでメモリが増えない）。
+# ユーザー（"user"）を含むイベントは、そのユーザーの購読者にだけ配信する。
+#
+# WSGI では接続ごとにスレッドを1つ占有する（stream）。ASGI モードでは
+# イベントループ上で待つ（astream）ため、接続数はスレッド数に縛られない。
+import asyncio
+import json
+import queue
+import select
+import threading
+import time
+
+from flask import current_app
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# キューがあふれた・通知を取りこぼした可能性がある場合のイベント
+RESYNC = {"type": "resync"}
+
+
+class Subscription:
+    """1つの接続の購読（上限付きキュー）
+
+    user を指定した場合は、そのユーザーのイベントとユーザーを含まない
+    イベント（resync）だけを受け取る。
+    """
+
+    def __init__(self, maxsize, user=None):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.user = None if user is None else str(user)
+        self.dropped = 0
+        # イベントが届いたときに呼び出す関数（astream が登録する）
+        self.on_put = None
+
+    def accepts(self, event):
+        """このイベントを受け取るか"""
+        user = event.get("user")
+        return user is None or self.user is None or user == self.user
+
+    def put(self, event):
+        with self._lock:
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                # 溜まったイベントを捨てて、差分の取得だけを促す
+                while True:
+                    try:
+                        self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        break
+                self._queue.put_nowait(RESYNC)
+        if self.on_put is not None:
+            self.on_put()
+
+    def get(self, timeout):
+        """イベントを取り出す（timeout 秒以内になければ None）"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_nowait(self):
+        """イベントを取り出す（なければ None）"""
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+
+class Broadcaster:
+    """プロセス内の購読者にイベントを配信する"""
+
+    def __init__(self, queue_size=16, max_subscribers=2):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, user=None):
+        """購読を開始（上限に達している場合は None）"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscription = Subscription(self.queue_size, user)
+            self._subscribers.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event):
+        """イベントを発行"""
+        self.deliver(event)
+
+    def deliver(self, event):
+        """このプロセスの購読者にイベントを配信"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if subscription.accepts(event):
+                subscription.put(event)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "max_subscribers": self.max_subscribers,
+            }
+
+
+class PostgresBroadcaster(Broadcaster):
+    """LISTEN/NOTIFY でワーカー間にイベントを配信する
+
+    発行したイベントは NOTIFY で全ワーカーに送られ、各ワーカーの
+    LISTEN スレッドがプロセス内の購読者に配信する。LISTEN 用の接続は
+    最初の購読時、NOTIFY 用の接続は最初の発行時に作成する（fork 前の
+    マスタープロセスでは作成しない）。
+    """
+
+    def __init__(self, db, channel, poll_interval=5.0, **kwargs):
+        super().__init__(**kwargs)
+        self.db = db
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self._listener = None
+        self._listener_lock = threading.Lock()
+        # NOTIFY 用の接続（発行のたびにプールから借りずに使い回す）
+        self._publisher = None
+        self._publisher_lock = threading.Lock()
+
+    def subscribe(self, user=None):
+        subscription = super().subscribe(user)
+        if subscription is not None:
+            self._ensure_listener()
+        return subscription
+
+    def publish(self, event):
+        """NOTIFY でイベントを発行（接続が切れていれば1回だけ作り直す）"""
+        payload = json.dumps(event)
+        with self._publisher_lock:
+            for attempt in range(2):
+                try:
+                    if self._publisher is None:
+                        self._publisher = self._connect()
+                    with self._publisher.cursor() as cursor:
+                        cursor.execute(
+                            "SELECT pg_notify(%s, %s)", (self.channel, payload)
+                        )
+                    return
+                except Exception:
+                    self._close_publisher()
+                    if attempt:
+                        raise
+
+    def _close_publisher(self):
+        if self._publisher is not None:
+            try:
+                self._publisher.close()
+            except Exception:
+                pass
+            self._publisher = None
+
+    def _ensure_listener(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen, name="flaskr-events", daemon=True
+                )
+                self._listener.start()
+
+    def _connect(self):
+        # プールから切り離した専用の接続（autocommit）
+        connection = self.db.engine.raw_connection()
+        dbapi_connection = connection.driver_connection
+        connection.detach()
+        dbapi_connection.autocommit = True
+        return dbapi_connection
+
+    def _connect_listener(self):
+        dbapi_connection = self._connect()
+        with dbapi_connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return dbapi_connection
+
+    def _listen(self):
+        backoff = 1.0
+        while True:
+            try:
+                dbapi_connection = self._connect_listener()
+            except Exception:
+                logger.exception("events listen failed")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+
+            backoff = 1.0
+            # 接続が切れていた間の通知は届かないので差分の取得を促す
+            self.deliver(RESYNC)
+            try:
+                while True:
+                    select.select(
+                        [dbapi_connection], [], [], self.poll_interval
+                    )
+                    dbapi_connection.poll()
+                    while dbapi_connection.notifies:
+                        notify = dbapi_connection.notifies.pop(0)
+                        self.deliver(json.loads(notify.payload))
+            except Exception:
+                logger.exception("events connection lost")
+                try:
+                    dbapi_connection.close()
+                except Exception:
+                    pass
+
+
+class NullBroadcaster(Broadcaster):
+    """配信しないバックエンド"""
+
+    def subscribe(self, user=None):
+        return None
+
+    def publish(self, event):
+        pass
+
+
+def create_broadcaster(config, db):
+    """設定に応じたイベントの配信を作成"""
+    backend_name = getattr(config, "EVENTS_BACKEND", "auto")
+    if backend_name == "auto":
+        is_postgres = config.database_url.startswith("postgresql")
+        backend_name = "postgres" if is_postgres else "memory"
+
+    options = {
+        "queue_size": config.EVENTS_QUEUE_SIZE,
+        "max_subscribers": config.EVENTS_MAX_SUBSCRIBERS,
+    }
+    if backend_name == "postgres":
+        return PostgresBroadcaster(db, config.EVENTS_CHANNEL, **options)
+    if backend_name == "none":
+        return NullBroadcaster(**options)
+    return Broadcaster(**options)
+
+
+def init_events(app, config, db):
+    """アプリケーションにイベントの配信を登録"""
+    broadcaster = create_broadcaster(config, db)
+    app.extensions["flaskr_events"] = broadcaster
+    return broadcaster
+
+
+def get_events():
+    """現在のアプリケーションのイベントの配信"""
+    return current_app.extensions["flaskr_events"]
+
+
+def format_event(event):
+    """イベントをSSEの形式に変換"""
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def stream(subscription, broadcaster, heartbeat, max_age):
+    """購読したイベントをSSEで送るジェネレーター
+
+    heartbeat 秒ごとにコメント行を送って接続を維持し、max_age 秒経ったら
+    接続を閉じる（EventSource が再接続するため、スレッドを占有し続けない）。
+    """
+    try:
+        yield "retry: 3000\n\n"
+        deadline = time.monotonic() + max_age
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            event = subscription.get(timeout=min(heartbeat, remaining))
+            yield format_event(event) if event else ": ping\n\n"
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+async def astream(subscription, broadcaster, heartbeat, max_age):
+    """stream() と同じSSEをイベントループ上で送る非同期ジェネレーター
+
+    配信側（LISTEN のスレッドなど）からは call_soon_threadsafe で起こす。
+    """
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+    subscription.on_put = lambda: loop.call_soon_threadsafe(ready.set)
+    try:
+        yield "retry: 3000\n\n"
+        deadline = loop.time() + max_age
+        while True:
+            event = subscription.get_nowait()
+            if event is None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                ready.clear()
+                # clear の前に届いたイベントを取りこぼさないよう確認し直す
+                event = subscription.get_nowait()
+                if event is None:
+                    try:
+                        await asyncio.wait_for(
+                            ready.wait(), min(heartbeat, remaining)
+                        )
+                        continue
+                    except asyncio.TimeoutError:
+                        pass
+            yield format_event(event) if event else ": ping\n\n"
+    finally:
+        subscription.on_put = None
+        broadcaster.unsubscribe(subscription)
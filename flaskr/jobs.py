@@ -0,0 +1,124 @@
+# ==========================================================
+# バックグラウンド処理用
+# ==========================================================
+# リクエストの外で時間のかかる処理（大きなカテゴリーの削除など）を
+# プロセス内のスレッドで実行する。処理は何度実行しても同じ結果に
+# なるように書き、プロセスの再起動で中断した場合は起動時に再開する。
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class JobRunner:
+    """スレッドプールでジョブを実行し、状態を保持する"""
+
+    def __init__(self, max_workers=1, history=100):
+        self.max_workers = max_workers
+        self.history = history
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # fork 後のワーカーで作成されるように初回使用時に作成する
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="flaskr-job",
+                )
+            return self._executor
+
+    def submit(self, name, func, *args, **kwargs):
+        """ジョブを登録してIDを返す"""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {"id": job_id, "name": name, "state": "queued"}
+            # 古いジョブの状態から捨てる
+            while len(self._jobs) > self.history:
+                self._jobs.pop(next(iter(self._jobs)))
+
+        def run():
+            self._update(job_id, state="running")
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                logger.exception("job failed", extra={"job": name})
+                self._update(job_id, state="failed", error=str(e))
+            else:
+                self._update(job_id, state="done", result=result)
+
+        self._get_executor().submit(run)
+        return job_id
+
+    def _update(self, job_id, **values):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(values)
+
+    def status(self, job_id):
+        """ジョブの状態（不明な場合は None）"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+class PeriodicTask:
+    """ワーカー内で interval 秒ごとに run_once を実行するスレッド
+
+    サブクラスで run_once を実装する（例外はログに出して次の回に続ける）。
+    """
+
+    thread_name = "flaskr-periodic"
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        """スレッドを開始する（fork 後のワーカーで開始されるように
+        最初のリクエストで呼び出す）"""
+        if self._thread is not None or self.interval <= 0:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=self.thread_name, daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def run_once(self):
+        raise NotImplementedError
+
+    def stop(self):
+        self._stop.set()
+
+
+def init_jobs(app, config):
+    """アプリケーションにジョブの実行を登録"""
+    runner = JobRunner(max_workers=config.JOB_WORKERS)
+    app.extensions["flaskr_jobs"] = runner
+    return runner
+
+
+def get_jobs():
+    """現在のアプリケーションの JobRunner"""
+    return current_app.extensions["flaskr_jobs"]
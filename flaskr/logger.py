@@ -0,0 +1,210 @@
+# ==========================================================
+# ログ出力用
+# ==========================================================
+# - JSON形式（LOG_FORMAT=text で従来どおりの1行テキスト）
+# - モジュールごとのログレベル（LOG_LEVELS="flaskr.main=DEBUG,..."）
+# - リクエストID（X-Request-ID ヘッダー、なければ生成）
+# - DEBUGログのサンプリングと1秒あたりの件数制限
+# - QueueHandler 経由の出力（リクエスト処理は標準出力を待たない）
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+# LogRecord が標準で持つ属性（extra で渡された項目と区別する）
+_RECORD_ATTRS = set(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__
+) | {"message", "asctime", "request_id"}
+
+_listener = None
+_listener_lock = threading.Lock()
+
+# ASGI のミドルウェアで処理中のリクエストのID（Flask の外のルート用）
+request_id_var = contextvars.ContextVar("flaskr_request_id", default="-")
+
+
+def get_logger(name):
+    """モジュール用のロガーを取得"""
+    return logging.getLogger(name)
+
+
+def current_request_id():
+    """処理中のリクエストのID（リクエスト外では "-"）"""
+    if has_request_context():
+        return getattr(g, "request_id", "-")
+    return request_id_var.get()
+
+
+class RequestIdFilter(logging.Filter):
+    """ログにリクエストIDを付与する"""
+
+    def filter(self, record):
+        record.request_id = current_request_id()
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """DEBUG以下のログを間引く
+
+    rate の割合だけ通し、さらに同じメッセージは1秒あたり
+    per_second 件までに制限する。INFO以上は常に通す。
+    """
+
+    def __init__(self, rate=1.0, per_second=0):
+        super().__init__()
+        self.rate = rate
+        self.per_second = per_second
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        if self.rate < 1.0 and random.random() >= self.rate:
+            return False
+        if self.per_second <= 0:
+            return True
+
+        key = (record.name, record.msg)
+        now = int(time.monotonic())
+        with self._lock:
+            second, count = self._counts.get(key, (now, 0))
+            if second != now:
+                second, count = now, 0
+            if count >= self.per_second:
+                return False
+            self._counts[key] = (second, count + 1)
+            if len(self._counts) > 10_000:
+                self._counts.clear()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """1行1レコードのJSON形式で出力する"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(
+                record.created, tz=timezone.utc
+            ).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        # extra で渡された項目を追加
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(name)s] [%(request_id)s] %(message)s"
+
+
+def parse_levels(spec):
+    """"flaskr.main=DEBUG,sqlalchemy.engine=INFO" を辞書に変換"""
+    levels = {}
+    for item in (spec or "").split(","):
+        name, _, level = item.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def start_listener():
+    """出力スレッドを再開（fork後の子プロセスにはスレッドが引き継がれない）"""
+    with _listener_lock:
+        if _listener is None:
+            return
+        thread = _listener._thread
+        if thread is not None and thread.is_alive():
+            return
+        _listener._thread = None
+        _listener.start()
+
+
+def stop_listener():
+    """キューに残ったログを出力してから停止"""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def setup_logging(config):
+    """設定に応じてルートロガーを構成（何度呼んでも1回分だけ構成する）"""
+    global _listener
+
+    if config.LOG_FORMAT == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(
+        DebugSampler(config.LOG_DEBUG_SAMPLE_RATE, config.LOG_DEBUG_RATE_LIMIT)
+    )
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if getattr(handler, "_flaskr_handler", False):
+            root.removeHandler(handler)
+    queue_handler._flaskr_handler = True
+    root.addHandler(queue_handler)
+    root.setLevel(config.LOG_LEVEL.upper())
+
+    for name, level in parse_levels(config.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    stop_listener()
+    with _listener_lock:
+        _listener = logging.handlers.QueueListener(log_queue, output)
+        _listener.start()
+    return root
+
+
+def new_request_id():
+    return uuid.uuid4().hex
+
+
+def init_request_logging(app, add_header=True):
+    """リクエストIDの採番とレスポンスヘッダーへの付与を登録
+
+    ASGI モードではミドルウェアが採番してヘッダーを付けるため、
+    add_header=False でリクエストのヘッダーの値を使うだけにする。
+    """
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get("X-Request-ID") or new_request_id()
+
+    if not add_header:
+        return
+
+    @app.after_request
+    def add_request_id_header(response):
+        if hasattr(g, "request_id"):
+            response.headers["X-Request-ID"] = g.request_id
+        return response
+
+
+atexit.register(stop_listener)
@@ -0,0 +1,93 @@
+# ==========================================================
+# 定期的な後片付け用
+# ==========================================================
+# 以下をワーカー内のスレッド（MAINTENANCE_INTERVAL 秒ごと）または
+# flask maintenance run で実行する。起動時（init_database）だけでは、
+# 長く動いているワーカーで削除の記録が溜まり続け、中断したカテゴリーの
+# 削除も再開されない。
+#   - 保持期間（TOMBSTONE_RETENTION_DAYS）を過ぎた削除の記録の削除
+#   - 中断したカテゴリーの削除の再開（スレッドからは MAINTENANCE_INTERVAL
+#     秒より前に始めたものだけ。実行中の削除処理と重ならないように）
+# どちらも何度実行しても、複数のワーカーが同時に実行しても同じ結果になる。
+#
+#   $ flask --app flaskr.main maintenance run
+from datetime import timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from .jobs import PeriodicTask
+from .logger import get_logger
+from .purge import resume_purges
+from .tombstones import prune_tombstones
+
+logger = get_logger(__name__)
+
+
+def run_maintenance(engine, config, started_before=None):
+    """後片付けを1回実行し、(再開したカテゴリーのID, 削除した記録の件数) を返す"""
+    purged = resume_purges(
+        engine, config.CATEGORY_PURGE_BATCH, started_before=started_before
+    )
+    pruned = prune_tombstones(engine, config.tombstone_retention)
+    if purged or pruned:
+        logger.info(
+            "maintenance done",
+            extra={
+                "purged_categories": [str(i) for i in purged],
+                "pruned_tombstones": pruned,
+            },
+        )
+    return purged, pruned
+
+
+class MaintenanceRunner(PeriodicTask):
+    """ワーカー内で interval 秒ごとに run_maintenance を実行するスレッド"""
+
+    thread_name = "flaskr-maintenance"
+
+    def __init__(self, db, config, interval):
+        super().__init__(interval)
+        self.db = db
+        self.config = config
+
+    def run_once(self):
+        try:
+            return run_maintenance(
+                self.db.engine,
+                self.config,
+                started_before=timedelta(seconds=self.interval),
+            )
+        except Exception:
+            logger.exception("maintenance failed")
+            return [], 0
+
+
+# ------------------------------------------------------
+# flask コマンド（flask --app flaskr.main maintenance ...）
+# ------------------------------------------------------
+maintenance_cli = AppGroup("maintenance", help="削除の記録の整理など")
+
+
+@maintenance_cli.command("run")
+def run_command():
+    """削除の記録を整理し、中断したカテゴリーの削除を再開（cron などから実行）"""
+    config = current_app.config["APP_CONFIG"]
+    engine = current_app.extensions["flaskr_db"].engine
+    purged, pruned = run_maintenance(engine, config)
+    click.echo(
+        f"再開した削除: {len(purged)}件, 整理した削除の記録: {pruned}件",
+        err=True,
+    )
+
+
+def init_maintenance(app, config):
+    """アプリケーションに後片付け（スレッドとコマンド）を登録"""
+    runner = MaintenanceRunner(
+        app.extensions["flaskr_db"], config, config.MAINTENANCE_INTERVAL
+    )
+    app.extensions["flaskr_maintenance"] = runner
+    app.before_request(runner.ensure_started)
+    app.cli.add_command(maintenance_cli)
+    return runner
@@ -0,0 +1,542 @@
+# ==========================================================
+# リクエスト・SQLの計測用（Prometheusテキスト形式）
+# ==========================================================
+# ルートごとに以下を記録し、/metrics で公開する。
+#   - レイテンシのヒストグラム
+#   - リクエスト数（ステータスコード別）
+#   - SQLの実行回数・実行時間・取得行数
+# 記録はロック1回の加算だけなので本番環境でも有効にしておける。
+# METRICS_ENABLED=false の場合はフックもルートも登録しない。
+#
+# 値はワーカー（プロセス）ごとに持つ。METRICS_DIR を指定すると、各ワーカーが
+# METRICS_FLUSH_INTERVAL 秒ごとに自分の値をそのディレクトリに書き出し、
+# /metrics はどのワーカーが応答しても全ワーカーの合計を返す（他のワーカーの
+# 値は最大 METRICS_FLUSH_INTERVAL 秒遅れる）。終了したワーカーのカウンター・
+# ヒストグラムは合計に残し、ゲージ（コネクションプール）は除く。
+# METRICS_DIR を指定しない場合は応答したワーカーの値だけを返す。
+import atexit
+import json
+import os
+import threading
+import time
+
+from flask import Response, request
+from sqlalchemy import event
+
+from .db import get_pool_stats
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# レイテンシのヒストグラムのバケット（秒）
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _escape(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .replace('"', '\\"')
+    )
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """ラベル別に値を加算するカウンター"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values=(), amount=1):
+        with self._lock:
+            self._values[label_values] = (
+                self._values.get(label_values, 0) + amount
+            )
+
+    def values(self):
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(values, exported):
+        """export() の値を values に加算"""
+        for label_values, value in exported:
+            key = tuple(label_values)
+            values[key] = values.get(key, 0) + value
+
+    def export(self):
+        """ファイルに書き出す形式（[[ラベル, 値], ...]）"""
+        return [[list(key), value] for key, value in self.values().items()]
+
+    def samples(self, values=None):
+        if values is None:
+            values = self.values()
+        for label_values, value in values.items():
+            yield self.name, _labels(self.label_names, label_values), value
+
+
+class Histogram:
+    """ラベル別のヒストグラム"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        # ラベル -> [各バケットの件数..., 合計値, 件数]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self._lock:
+            data = self._values.get(label_values)
+            if data is None:
+                data = self._values[label_values] = [0] * (
+                    len(self.buckets) + 2
+                )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[index] += 1
+                    break
+            data[-2] += value
+            data[-1] += 1
+
+    def values(self):
+        with self._lock:
+            return {key: list(data) for key, data in self._values.items()}
+
+    @staticmethod
+    def merge(values, exported):
+        """export() の値を values にバケットごとに加算"""
+        for label_values, data in exported:
+            key = tuple(label_values)
+            current = values.get(key)
+            if current is None:
+                values[key] = list(data)
+            else:
+                values[key] = [a + b for a, b in zip(current, data)]
+
+    def export(self):
+        """ファイルに書き出す形式（[[ラベル, [バケット..., 合計, 件数]], ...]）"""
+        return [[list(key), data] for key, data in self.values().items()]
+
+    def samples(self, values=None):
+        if values is None:
+            values = self.values()
+        names = self.label_names + ("le",)
+        for label_values, data in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, data):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    _labels(names, label_values + (bound,)),
+                    cumulative,
+                )
+            yield (
+                f"{self.name}_bucket",
+                _labels(names, label_values + ("+Inf",)),
+                data[-1],
+            )
+            labels = _labels(self.label_names, label_values)
+            yield f"{self.name}_sum", labels, data[-2]
+            yield f"{self.name}_count", labels, data[-1]
+
+
+class Registry:
+    """メトリクスの一覧"""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+        # 全ワーカーの値を合計する場合の SharedStore
+        self.store = None
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """(名前, 種類, 説明, 値) を返す関数を登録（出力時に呼び出す）"""
+        self.collectors.append(collector)
+
+    def collect(self):
+        """登録した関数の値 [(名前, 種類, 説明, 値), ...]"""
+        return [
+            sample for collector in self.collectors for sample in collector()
+        ]
+
+    def export(self):
+        """このワーカーの値（SharedStore が書き出す内容）"""
+        return {
+            "metrics": {
+                metric.name: metric.export() for metric in self.metrics
+            },
+            "collected": self.collect(),
+        }
+
+    def render(self):
+        """Prometheusテキスト形式で出力（store があれば全ワーカーの合計）"""
+        values = {metric.name: metric.values() for metric in self.metrics}
+        collected = {}
+
+        def add_collected(samples, gauges=True):
+            for name, kind, help_text, value in samples:
+                if kind == "gauge" and not gauges:
+                    continue
+                if name in collected:
+                    value += collected[name][2]
+                collected[name] = (kind, help_text, value)
+
+        add_collected(self.collect())
+        if self.store is not None:
+            for snapshot, alive in self.store.read_others():
+                for metric in self.metrics:
+                    metric.merge(
+                        values[metric.name],
+                        snapshot["metrics"].get(metric.name, []),
+                    )
+                add_collected(snapshot["collected"], gauges=alive)
+
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples(values[metric.name]):
+                lines.append(f"{name}{labels} {value}")
+        for name, (kind, help_text, value) in collected.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # 権限がない（別のユーザーのプロセス）
+    return True
+
+
+class SharedStore:
+    """ワーカーごとの値をディレクトリに書き出し、他のワーカーの値を読む
+
+    ファイル名は「プロセスID-開始時刻.json」で、プロセスIDが再利用されても
+    終了したワーカーのファイルを上書きしない。fork の前（preload_app の
+    マスター）に作成しても、書き出すときのプロセスIDを使う。
+    """
+
+    def __init__(self, registry, directory, interval=1.0):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self._pid = None
+        self._path = None
+        self._dirty = False
+        self._flusher_pid = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _own_path(self):
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._path = os.path.join(
+                self.directory, f"{pid}-{time.time_ns()}.json"
+            )
+        return self._path
+
+    def write(self):
+        """このワーカーの値を書き出す（一時ファイルから置き換える）"""
+        with self._lock:
+            path = self._own_path()
+            data = self.registry.export()
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temp_path, path)
+
+    def maybe_write(self, force=False):
+        """値が変わったことを記録し、interval 秒以内に書き出す
+
+        書き出しはワーカーごとのスレッドで行う（リクエストが途絶えても
+        最後の値が書き出される）。force または interval が 0 ならすぐに
+        書き出す。
+        """
+        if force or self.interval <= 0:
+            try:
+                self.write()
+            except OSError:
+                pass  # 計測の失敗でリクエストを失敗させない
+            return
+        self._dirty = True
+        if self._flusher_pid != os.getpid():
+            with self._lock:
+                if self._flusher_pid != os.getpid():
+                    # fork の後は親のスレッドが存在しないので作り直す
+                    self._flusher_pid = os.getpid()
+                    threading.Thread(
+                        target=self._flush_loop,
+                        name="flaskr-metrics",
+                        daemon=True,
+                    ).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.interval)
+            if self._dirty:
+                self._dirty = False
+                try:
+                    self.write()
+                except OSError:
+                    logger.warning("metrics write failed", exc_info=True)
+
+    def read_others(self):
+        """他のワーカーの値 [(値, 生きているか), ...]"""
+        own_path = self._own_path()
+        results = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return results
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if not name.endswith(".json") or path == own_path:
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue  # 書き出し中・削除済み
+            pid = int(name.partition("-")[0])
+            results.append((snapshot, _pid_alive(pid)))
+        return results
+
+
+def reset_shared_metrics(directory):
+    """METRICS_DIR の前回の起動時のファイルを削除（gunicorn の起動時に呼ぶ）"""
+    if not directory or not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.endswith((".json", ".tmp")):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+class RequestMetrics:
+    """Flaskのリクエストフックと SQLAlchemy のイベントで計測する"""
+
+    def __init__(self):
+        self.registry = Registry()
+        self.request_latency = self.registry.register(
+            Histogram(
+                "flaskr_http_request_duration_seconds",
+                "HTTPリクエストの処理時間",
+                labels=("route", "method"),
+            )
+        )
+        self.requests = self.registry.register(
+            Counter(
+                "flaskr_http_requests_total",
+                "HTTPリクエスト数",
+                labels=("route", "method", "status"),
+            )
+        )
+        self.sql_statements = self.registry.register(
+            Counter(
+                "flaskr_sql_statements_total",
+                "実行したSQL文の数",
+                labels=("route",),
+            )
+        )
+        self.sql_duration = self.registry.register(
+            Counter(
+                "flaskr_sql_duration_seconds_total",
+                "SQLの実行時間の合計",
+                labels=("route",),
+            )
+        )
+        self.sql_rows = self.registry.register(
+            Counter(
+                "flaskr_sql_rows_total",
+                "SQLが返した（または更新した）行数",
+                labels=("route",),
+            )
+        )
+        # リクエストごとの集計（スレッドごとに保持）
+        self._local = threading.local()
+
+    # ------------------------------------------------------
+    # Flaskのフック
+    # ------------------------------------------------------
+    def before_request(self):
+        local = self._local
+        local.start = time.perf_counter()
+        local.sql_count = 0
+        local.sql_time = 0.0
+        local.sql_rows = 0
+
+    def after_request(self, response):
+        # 記録は例外でも必ず呼ばれる teardown_request で行う
+        self._local.status = response.status_code
+        return response
+
+    def teardown_request(self, exc=None):
+        local = self._local
+        start = getattr(local, "start", None)
+        status = getattr(local, "status", None)
+        # 次のリクエストやリクエスト外のSQLに持ち越さない
+        local.start = None
+        local.status = None
+        if start is None:
+            return
+        if exc is not None or status is None:
+            status = 500  # 処理されなかった例外
+
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        method = request.method
+        self.request_latency.observe(
+            (route, method), time.perf_counter() - start
+        )
+        self.requests.inc((route, method, str(status)))
+        if local.sql_count:
+            self.sql_statements.inc((route,), local.sql_count)
+            self.sql_duration.inc((route,), local.sql_time)
+            self.sql_rows.inc((route,), local.sql_rows)
+        self.flush()
+
+    def flush(self):
+        """METRICS_DIR を指定していれば値を書き出す（interval 秒以内）"""
+        if self.registry.store is not None:
+            self.registry.store.maybe_write()
+
+    # ------------------------------------------------------
+    # SQLAlchemyのイベント
+    # ------------------------------------------------------
+    def before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info.setdefault("flaskr_query_start", []).append(
+            time.perf_counter()
+        )
+
+    def after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        started = conn.info.get("flaskr_query_start")
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+
+        local = self._local
+        if getattr(local, "start", None) is None:
+            return  # リクエスト外のSQLは記録しない
+        local.sql_count += 1
+        local.sql_time += elapsed
+        if cursor.rowcount and cursor.rowcount > 0:
+            local.sql_rows += cursor.rowcount
+
+    def listen(self, engine):
+        """エンジンにSQLの計測用のイベントを登録"""
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+
+    def pool_samples(self, db):
+        """コネクションプールの状態をゲージとして出力する関数を作成"""
+
+        def collect():
+            if not db.created:
+                return  # まだ接続していない
+            stats = get_pool_stats(db.engine)
+            for key in [
+                "size",
+                "checked_out",
+                "overflow",
+                "checkouts",
+                "checkout_timeouts",
+            ]:
+                if key in stats:
+                    if key.startswith("checkout"):
+                        kind, name = "counter", f"flaskr_db_pool_{key}_total"
+                    else:
+                        kind, name = "gauge", f"flaskr_db_pool_{key}"
+                    yield (
+                        name,
+                        kind,
+                        f"コネクションプールの{key}",
+                        stats[key],
+                    )
+            yield (
+                "flaskr_db_pool_wait_seconds_total",
+                "counter",
+                "コネクション取得の待ち時間の合計",
+                stats.get("wait_total_ms", 0) / 1000,
+            )
+
+        return collect
+
+
+def init_metrics(app, db, enabled=True, directory="", interval=1.0):
+    """アプリケーションとデータベースに計測用のフックと /metrics を登録
+
+    directory（METRICS_DIR）を指定すると /metrics は全ワーカーの合計になる。
+    """
+    if not enabled:
+        return None
+
+    metrics = RequestMetrics()
+    if directory:
+        store = SharedStore(metrics.registry, directory, interval)
+        metrics.registry.store = store
+        # 終了するワーカーの最後の値も合計に残す
+        atexit.register(store.maybe_write, force=True)
+    app.before_request(metrics.before_request)
+    app.after_request(metrics.after_request)
+    app.teardown_request(metrics.teardown_request)
+    # エンジンは初回使用時に作成されるので、そのときにイベントを登録する
+    db.on_create(metrics.listen)
+    metrics.registry.add_collector(metrics.pool_samples(db))
+
+    def metrics_view():
+        return Response(
+            metrics.registry.render(),
+            mimetype="text/plain; version=0.0.4",
+        )
+
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+    app.extensions["flaskr_metrics"] = metrics
+    return metrics
@@ -0,0 +1,793 @@
+# ==========================================================
+# スキーマのマイグレーション用
+# ==========================================================
+# schema_version テーブルに適用済みのバージョンを記録し、
+# 未適用のステップだけをバージョン順に実行する。
+# 各ステップは何度実行しても同じ結果になるように書く。
+# テーブル・インデックスはモデル（flaskr/models.py）ではなくステップを
+# 追加した時点の定義で作成する（モデルを変更しても、新規に作成した
+# データベースと順に適用したデータベースが同じスキーマになるように）。
+#
+#   $ python -m flaskr.migrations            # 未適用のステップを実行
+#   $ python -m flaskr.migrations --explain  # ボードのクエリの実行計画を表示
+import argparse
+from collections import namedtuple
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    Uuid,
+    create_engine,
+    insert,
+    inspect,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.orm import Session
+
+from .logger import get_logger
+from .models import Category, Post, Tombstone
+from .ordering import bulk_update_order
+from .ranking import RANK_GAP
+from .search import BIGRAM_FUNCTION, SEARCH_EXPRESSION
+
+logger = get_logger(__name__)
+
+# マイグレーションの同時実行を防ぐアドバイザリーロックのキー
+MIGRATION_LOCK_KEY = 715_301
+
+metadata = MetaData()
+
+schema_version = Table(
+    "schema_version",
+    metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column(
+        "applied_at",
+        DateTime(timezone=True),
+        default=lambda: datetime.now(ZoneInfo("Asia/Tokyo")),
+    ),
+)
+
+# ----------------------------------------------------------
+# ステップを追加した時点のテーブルの定義（変更しない）
+# ----------------------------------------------------------
+history = MetaData()
+
+# マイグレーション1（初期テーブル）
+Table(
+    "users",
+    history,
+    Column("id", Uuid, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("email", String(255), unique=True, nullable=False),
+    Column("password", String(255), nullable=False),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+)
+
+Table(
+    "categories",
+    history,
+    Column("id", Uuid, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("sort_order", Integer, nullable=False),
+    Column(
+        "user_id",
+        Uuid,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    ),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+)
+
+Table(
+    "posts",
+    history,
+    Column("id", Uuid, primary_key=True),
+    Column("title", String(200), nullable=False),
+    Column("content", Text, nullable=True),
+    Column("status", String(20), nullable=False),
+    Column("sort_order", Integer, nullable=False),
+    Column(
+        "user_id",
+        Uuid,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    ),
+    Column(
+        "category_id",
+        Uuid,
+        ForeignKey("categories.id", ondelete="CASCADE"),
+        nullable=False,
+    ),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+    Column("updated_at", DateTime(timezone=True), nullable=False),
+)
+
+# マイグレーション8（user_id は 15 で追加する）
+Table(
+    "tombstones",
+    history,
+    Column("id", Integer, primary_key=True),
+    Column("kind", String(20), nullable=False),
+    Column("object_id", Uuid, nullable=False),
+    Column("deleted_at", DateTime(timezone=True), nullable=False),
+    Index("ix_tombstones_deleted", "deleted_at", "id"),
+)
+
+# マイグレーション14（ix_posts_archive_sort は 19 で削除する）
+Table(
+    "posts_archive",
+    history,
+    Column("id", Uuid, primary_key=True),
+    Column("title", String(200), nullable=False),
+    Column("content", Text, nullable=True),
+    Column("status", String(20), nullable=False),
+    Column("sort_order", Integer, nullable=False),
+    Column(
+        "user_id",
+        Uuid,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    ),
+    Column(
+        "category_id",
+        Uuid,
+        ForeignKey("categories.id", ondelete="CASCADE"),
+        nullable=False,
+    ),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+    Column("updated_at", DateTime(timezone=True), nullable=False),
+    Column("archived_at", DateTime(timezone=True), nullable=False),
+    Index("ix_posts_archive_sort", "sort_order", "id"),
+    Index("ix_posts_archive_user_sort", "user_id", "sort_order", "id"),
+    Index("ix_posts_archive_category_sort", "category_id", "sort_order", "id"),
+)
+
+
+def create_table(conn, name):
+    """ステップを追加した時点の定義でテーブルを作成（既にあれば何もしない）"""
+    history.tables[name].create(conn, checkfirst=True)
+
+
+Migration = namedtuple("Migration", "version description upgrade concurrent")
+
+MIGRATIONS = []
+
+
+def migration(version, description, concurrent=False):
+    """マイグレーションのステップを登録するデコレーター
+
+    concurrent=True のステップは、PostgreSQLではトランザクション外
+    （AUTOCOMMIT）で実行され、インデックスを CONCURRENTLY で作成する。
+    """
+
+    def decorator(func):
+        if any(m.version == version for m in MIGRATIONS):
+            raise ValueError(f"マイグレーションのバージョンが重複しています: {version}")
+        MIGRATIONS.append(Migration(version, description, func, concurrent))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return func
+
+    return decorator
+
+
+def get_index(model, name):
+    """モデルに定義されたインデックスを名前で取得"""
+    for index in model.__table__.indexes:
+        if index.name == name:
+            return index
+    raise KeyError(name)
+
+
+def create_index(conn, index):
+    """インデックスがなければ作成（PostgreSQLでは可能な限り CONCURRENTLY）"""
+    columns = ", ".join(column.name for column in index.columns)
+    create_index_sql(conn, index.name, index.table.name, f"({columns})")
+
+
+def create_index_sql(conn, name, table_name, definition):
+    """インデックスを SQL の定義で作成（create_index と同じく CONCURRENTLY）
+
+    definition は ON <テーブル> に続く部分（例: "USING gin (...)"）。
+    """
+    concurrently = ""
+    if conn.dialect.name == "postgresql":
+        # 失敗した CONCURRENTLY で残った無効なインデックスは作り直す
+        invalid = conn.execute(
+            text(
+                """
+                SELECT 1 FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE c.relname = :name AND NOT i.indisvalid
+                """
+            ),
+            {"name": name},
+        ).first()
+        if invalid:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+        if conn.get_execution_options().get("isolation_level") == "AUTOCOMMIT":
+            concurrently = "CONCURRENTLY "
+
+    conn.execute(
+        text(
+            f"CREATE INDEX {concurrently}IF NOT EXISTS {name} "
+            f"ON {table_name} {definition}"
+        )
+    )
+
+
+def drop_index(conn, name):
+    """インデックスがあれば削除（create_index と同じく CONCURRENTLY）"""
+    concurrently = ""
+    if (
+        conn.dialect.name == "postgresql"
+        and conn.get_execution_options().get("isolation_level") == "AUTOCOMMIT"
+    ):
+        concurrently = "CONCURRENTLY "
+    conn.execute(text(f"DROP INDEX {concurrently}IF EXISTS {name}"))
+
+
+def add_column(conn, model, name):
+    """カラムがなければ追加"""
+    table = model.__table__
+    columns = inspect(conn).get_columns(table.name)
+    if name in {column["name"] for column in columns}:
+        return
+    column = table.c[name]
+    column_type = column.type.compile(dialect=conn.dialect)
+    conn.execute(
+        text(f"ALTER TABLE {table.name} ADD COLUMN {name} {column_type}")
+    )
+
+
+# ----------------------------------------------------------
+# マイグレーションのステップ
+# ----------------------------------------------------------
+@migration(1, "初期テーブルの作成")
+def create_tables(conn):
+    for name in ("users", "categories", "posts"):
+        create_table(conn, name)
+
+
+@migration(2, "posts(status, sort_order, id) インデックス", concurrent=True)
+def add_posts_status_index(conn):
+    # 24 で削除する（モデルにはない）
+    create_index_sql(
+        conn, "ix_posts_status_sort", "posts", "(status, sort_order, id)"
+    )
+
+
+@migration(
+    3, "posts(user_id, status, sort_order, id) インデックス", concurrent=True
+)
+def add_posts_user_index(conn):
+    create_index(conn, get_index(Post, "ix_posts_user_status_sort"))
+
+
+@migration(
+    4,
+    "posts(category_id, status, sort_order, id) インデックス",
+    concurrent=True,
+)
+def add_posts_category_index(conn):
+    create_index(conn, get_index(Post, "ix_posts_category_status_sort"))
+
+
+@migration(
+    5, "categories(user_id, sort_order, id) インデックス", concurrent=True
+)
+def add_categories_user_index(conn):
+    create_index(conn, get_index(Category, "ix_categories_user_sort"))
+
+
+@migration(6, "sort_order を RANK_GAP 間隔に振り直す")
+def respace_sort_order(conn):
+    session = Session(bind=conn)
+
+    def respace(model, scope_column):
+        rows = session.execute(
+            select(model.id, scope_column).order_by(
+                scope_column, model.sort_order, model.id
+            )
+        ).all()
+        updates = []
+        position = 0
+        previous_scope = object()
+        for row in rows:
+            if row[1] != previous_scope:
+                previous_scope, position = row[1], 0
+            updates.append({"id": row.id, "sort_order": position * RANK_GAP})
+            position += 1
+        for start in range(0, len(updates), 1000):
+            bulk_update_order(
+                session, model, updates[start : start + 1000], ["sort_order"]
+            )
+
+    respace(Post, Post.status)
+    respace(Category, Category.user_id)
+
+
+@migration(7, "categories.deleted_at（削除中のカテゴリー）")
+def add_categories_deleted_at(conn):
+    add_column(conn, Category, "deleted_at")
+
+
+@migration(8, "categories.updated_at と tombstones テーブル（差分の取得）")
+def add_change_tracking(conn):
+    add_column(conn, Category, "updated_at")
+    conn.execute(
+        update(Category)
+        .where(Category.updated_at.is_(None))
+        .values(updated_at=Category.created_at)
+    )
+    create_table(conn, "tombstones")
+
+
+@migration(9, "posts(updated_at, id) インデックス", concurrent=True)
+def add_posts_updated_index(conn):
+    # 24 で削除する（モデルにはない）
+    create_index_sql(conn, "ix_posts_updated", "posts", "(updated_at, id)")
+
+
+@migration(10, "categories(updated_at, id) インデックス", concurrent=True)
+def add_categories_updated_index(conn):
+    # 24 で削除する（モデルにはない）
+    create_index_sql(
+        conn, "ix_categories_updated", "categories", "(updated_at, id)"
+    )
+
+
+@migration(11, "tombstones(deleted_at, id) インデックス", concurrent=True)
+def add_tombstones_deleted_index(conn):
+    create_index(conn, get_index(Tombstone, "ix_tombstones_deleted"))
+
+
+@migration(12, "pg_trgm 拡張（タスクの検索）")
+def add_pg_trgm(conn):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+
+@migration(13, "posts のタイトル・内容の trigram インデックス", concurrent=True)
+def add_posts_search_index(conn):
+    # SQLite では n-gram のプロセス内インデックスで検索する
+    if conn.dialect.name == "postgresql":
+        create_index_sql(
+            conn,
+            "ix_posts_search_trgm",
+            "posts",
+            f"USING gin (({SEARCH_EXPRESSION}) gin_trgm_ops)",
+        )
+
+
+@migration(14, "posts_archive テーブル（アーカイブ済みのタスクの移動先）")
+def add_posts_archive(conn):
+    # 作成時点では空のテーブルなので、インデックスも同じトランザクションで作成する
+    create_table(conn, "posts_archive")
+
+
+@migration(15, "tombstones.user_id（差分をユーザーごとに返す）")
+def add_tombstones_user_id(conn):
+    # 既存の記録の持ち主は分からないため NULL のまま（保持期間が過ぎれば消える）
+    add_column(conn, Tombstone, "user_id")
+
+
+@migration(
+    16, "tombstones(user_id, deleted_at, id) インデックス", concurrent=True
+)
+def add_tombstones_user_index(conn):
+    create_index(conn, get_index(Tombstone, "ix_tombstones_user_deleted"))
+
+
+@migration(17, "posts(user_id, updated_at, id) インデックス", concurrent=True)
+def add_posts_user_updated_index(conn):
+    create_index(conn, get_index(Post, "ix_posts_user_updated"))
+
+
+@migration(
+    18, "categories(user_id, updated_at, id) インデックス", concurrent=True
+)
+def add_categories_user_updated_index(conn):
+    create_index(conn, get_index(Category, "ix_categories_user_updated"))
+
+
+@migration(19, "posts_archive(sort_order, id) インデックスの削除", concurrent=True)
+def drop_posts_archive_sort_index(conn):
+    # ユーザーで絞り込まずに並び順だけで読むインデックスは、他のユーザーの
+    # 行を読み飛ばす計画に使われるため削除する（ix_posts_archive_user_sort を使う）
+    drop_index(conn, "ix_posts_archive_sort")
+
+
+@migration(20, "btree_gin 拡張と部分文字列の関数（タスクの検索）")
+def add_bigram_function(conn):
+    if conn.dialect.name != "postgresql":
+        return
+    # GIN インデックスに user_id（uuid）を含めるため
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gin"))
+    conn.execute(
+        text(
+            f"""
+            CREATE OR REPLACE FUNCTION {BIGRAM_FUNCTION}(value text)
+            RETURNS text[]
+            LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+            AS $$
+                SELECT coalesce(
+                    array_agg(DISTINCT substr(lower(value), i, 2)), '{{}}'
+                )
+                FROM generate_series(1, length(value) - 1) AS i
+            $$
+            """
+        )
+    )
+
+
+@migration(21, "posts の (user_id, 部分文字列) GIN インデックス", concurrent=True)
+def add_posts_bigram_index(conn):
+    if conn.dialect.name == "postgresql":
+        create_index_sql(
+            conn,
+            "ix_posts_search_bigram",
+            "posts",
+            f"USING gin (user_id, {BIGRAM_FUNCTION}(({SEARCH_EXPRESSION})))",
+        )
+
+
+@migration(22, "posts の検索対象の式の統計")
+def add_posts_search_statistics(conn):
+    # 式のインデックス（ix_posts_search_trgm）を削除すると式の統計も
+    # なくなり、ILIKE で一致する件数を少なく見積もって、よく出る語でも
+    # 一致したすべてのタスクを読んでから並べ替える計画になるため
+    if conn.dialect.name == "postgresql":
+        conn.execute(
+            text(
+                "CREATE STATISTICS IF NOT EXISTS st_posts_search "
+                f"ON (({SEARCH_EXPRESSION})) FROM posts"
+            )
+        )
+        conn.execute(text("ANALYZE posts"))
+
+
+@migration(23, "posts の trigram インデックスの削除", concurrent=True)
+def drop_posts_trigram_index(conn):
+    # ユーザーで絞り込めず、2文字の語に使えないため ix_posts_search_bigram に置き換える
+    if conn.dialect.name == "postgresql":
+        drop_index(conn, "ix_posts_search_trgm")
+
+
+@migration(24, "ユーザーで絞り込まないインデックスの削除", concurrent=True)
+def drop_unscoped_indexes(conn):
+    # クエリはすべてユーザーのスコープの中で行い、ユーザーで始まる
+    # インデックス（ix_posts_user_status_sort・ix_posts_user_updated・
+    # ix_categories_user_updated）を使う。ユーザーで始まらないものは
+    # 他のユーザーの行を読み飛ばす計画にしか使われず、書き込みのたびに
+    # 更新する分だけ遅くなる
+    for name in (
+        "ix_posts_status_sort",
+        "ix_posts_updated",
+        "ix_categories_updated",
+    ):
+        drop_index(conn, name)
+
+
+# ----------------------------------------------------------
+# 実行
+# ----------------------------------------------------------
+def applied_versions(engine):
+    """適用済みのバージョン一覧を取得"""
+    metadata.create_all(engine, checkfirst=True)
+    with engine.connect() as conn:
+        return set(conn.execute(select(schema_version.c.version)).scalars())
+
+
+def run_migrations(engine):
+    """未適用のマイグレーションを順に実行し、適用したバージョンを返す"""
+    is_postgres = engine.dialect.name == "postgresql"
+    applied = []
+
+    with engine.connect() as lock_conn:
+        if is_postgres:
+            lock_conn.execute(
+                text("SELECT pg_advisory_lock(:key)"),
+                {"key": MIGRATION_LOCK_KEY},
+            )
+            lock_conn.commit()
+
+        try:
+            done = applied_versions(engine)
+            for step in MIGRATIONS:
+                if step.version in done:
+                    continue
+
+                logger.info(
+                    "マイグレーション %s: %s", step.version, step.description
+                )
+                if step.concurrent and is_postgres:
+                    with engine.connect().execution_options(
+                        isolation_level="AUTOCOMMIT"
+                    ) as conn:
+                        step.upgrade(conn)
+                    with engine.begin() as conn:
+                        conn.execute(
+                            insert(schema_version).values(
+                                version=step.version,
+                                description=step.description,
+                            )
+                        )
+                else:
+                    with engine.begin() as conn:
+                        step.upgrade(conn)
+                        conn.execute(
+                            insert(schema_version).values(
+                                version=step.version,
+                                description=step.description,
+                            )
+                        )
+                applied.append(step.version)
+        finally:
+            if is_postgres:
+                lock_conn.execute(
+                    text("SELECT pg_advisory_unlock(:key)"),
+                    {"key": MIGRATION_LOCK_KEY},
+                )
+                lock_conn.commit()
+
+    return applied
+
+
+# ----------------------------------------------------------
+# 実行計画の確認
+# ----------------------------------------------------------
+def board_queries(category_id, search):
+    """ボードの表示・APIで実行するクエリ
+
+    (名前, 実行する関数, 使われるべきインデックス) のリスト。関数はビューと
+    同じもの（session, scope を受け取る）を呼び出し、発行されたSQLを
+    そのまま実行計画の確認に使う（クエリを組み立て直すと実際の条件と
+    ずれるため）。インデックスはいずれかが使われていればよい。
+    """
+    from datetime import timedelta
+
+    from .archive import fetch_archive_page
+    from .board import board_version, build_board, fetch_page
+    from .changes import TIMEZONE, fetch_changes
+    from .search import search_tasks
+    from .transfer import export_select
+
+    since = datetime.now(TIMEZONE) - timedelta(hours=1)
+
+    def export(session, scope):
+        for name in ("categories", "posts"):
+            session.execute(export_select(name, scope).limit(1)).all()
+
+    return [
+        (
+            "ボードのバージョン（/admin のETag）",
+            board_version,
+            ["ix_posts_user_updated", "ix_categories_user_updated"],
+        ),
+        (
+            "ボード（/admin）",
+            build_board,
+            [
+                "ix_categories_user_sort",
+                "ix_posts_category_status_sort",
+                "ix_posts_user_status_sort",
+            ],
+        ),
+        (
+            "progress列（/api/board/progress）",
+            lambda session, scope: fetch_page(
+                session, scope, Post.status == "progress"
+            ),
+            ["ix_posts_user_status_sort"],
+        ),
+        (
+            "カテゴリー別TODO列（/api/categories/<id>/tasks）",
+            lambda session, scope: fetch_page(
+                session,
+                scope,
+                Post.status == "todo",
+                Post.category_id == category_id,
+            ),
+            ["ix_posts_category_status_sort", "ix_posts_user_status_sort"],
+        ),
+        (
+            "アーカイブ列（/api/board/archive）",
+            lambda session, scope: fetch_archive_page(session, scope),
+            ["ix_posts_user_status_sort", "ix_posts_archive_user_sort"],
+        ),
+        (
+            "差分（/api/changes）",
+            lambda session, scope: fetch_changes(
+                session, scope, since, timedelta(days=7)
+            ),
+            ["ix_posts_user_updated", "ix_tombstones_user_deleted"],
+        ),
+        (
+            "検索（/api/search）",
+            lambda session, scope: search_tasks(session, scope, search, "会議"),
+            [
+                "ix_posts_search_bigram",
+                "ix_posts_user_updated",
+                "ix_posts_archive_user_sort",
+            ],
+        ),
+        (
+            "エクスポート（/api/export）",
+            export,
+            ["ix_categories_user_sort", "ix_posts_user_status_sort"],
+        ),
+    ]
+
+
+def explain(conn, statement, parameters=None, analyze=False):
+    """SQL（SELECT文または発行されたSQLの文字列とパラメーター）の実行計画
+
+    analyze=True の場合、PostgreSQL では実行して実際の件数・時間・
+    読んだバッファーも出力する（EXPLAIN (ANALYZE, BUFFERS)）。
+    """
+    if not isinstance(statement, str):
+        statement = str(
+            statement.compile(
+                dialect=conn.dialect, compile_kwargs={"literal_binds": True}
+            )
+        )
+    if conn.dialect.name == "postgresql":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+    else:
+        prefix = "EXPLAIN QUERY PLAN "
+    rows = conn.exec_driver_sql(prefix + statement, parameters or ()).all()
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def capture_statements(conn, func):
+    """func(conn) の実行中に発行された SELECT を (SQL, パラメーター) のリストで返す"""
+    from sqlalchemy import event
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(conn, "before_cursor_execute", record)
+    try:
+        func(conn)
+    finally:
+        event.remove(conn, "before_cursor_execute", record)
+    return statements
+
+
+# 実行計画の確認の対象にするテーブル
+PLAN_TABLES = ("posts", "posts_archive", "categories", "tombstones")
+
+# ユーザーのデータに絞り込んでいるとみなすインデックスの条件
+SCOPED_CONDITIONS = ("user_id", "category_id", "(id =")
+
+
+def unscoped_scans(plan):
+    """実行計画のうち、ユーザーのデータに絞り込まずに読んでいるスキャン
+
+    テーブル全体・インデックス全体を読むもの（Seq Scan、条件のない
+    Index Scan、SQLite の SCAN）と、user_id をインデックスではなく
+    Filter で絞り込んでいるもの（他のユーザーの行も読む）を返す。
+    SQLite の計画には Filter が出ないため、後者は PostgreSQL のみ判定できる。
+    """
+    nodes = []
+    for line in plan.splitlines():
+        stripped = line.strip().removeprefix("->").strip()
+        if stripped.startswith(("SCAN ", "SEARCH ")):
+            # SQLite: SEARCH <テーブル> USING INDEX <名前> (<条件>)
+            table = stripped.split()[1]
+            if table in PLAN_TABLES:
+                nodes.append({"line": stripped, "cond": "", "filter": ""})
+                if stripped.startswith("SEARCH "):
+                    nodes[-1]["cond"] = stripped
+        elif " Scan " in f" {stripped} " and " on " in stripped:
+            table = stripped.split(" on ", 1)[1].split()[0]
+            if table in PLAN_TABLES:
+                nodes.append({"line": stripped, "cond": "", "filter": ""})
+            else:
+                nodes.append(None)
+        elif nodes and nodes[-1] is not None:
+            if stripped.startswith(("Index Cond:", "Recheck Cond:")):
+                nodes[-1]["cond"] += stripped
+            elif stripped.startswith("Filter:"):
+                nodes[-1]["filter"] += stripped
+
+    unscoped = []
+    for node in filter(None, nodes):
+        scoped = any(c in node["cond"] for c in SCOPED_CONDITIONS)
+        if (
+            not node["cond"]
+            or "Seq Scan" in node["line"]
+            or ("user_id" in node["filter"] and not scoped)
+        ):
+            unscoped.append(node["line"])
+    return unscoped
+
+
+def explain_board_queries(engine, user_id=None):
+    """ボードのクエリの実行計画を確認し、(名前, 計画, インデックス使用) を返す
+
+    user_id を省略した場合はタスクのあるユーザーを1人選ぶ。1つの名前で
+    複数のSQLを発行する場合は、それぞれの計画を並べて返す。
+    """
+    from .scope import UserScope
+    from .search import BigramSearch, NgramSearch
+
+    results = []
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            # 件数が少ないテーブルでもインデックスを使う計画を確認する
+            conn.execute(text("SET LOCAL enable_seqscan = off"))
+        if user_id is None:
+            user_id = conn.scalar(select(Post.user_id).limit(1))
+        category_id = conn.scalar(
+            select(Category.id).where(Category.user_id == user_id).limit(1)
+        )
+        scope = UserScope(user_id)
+        if engine.dialect.name == "postgresql":
+            search = BigramSearch()
+        else:
+            # プロセス内のインデックスは先に構築しておく（リクエストごとのSQLではない）
+            search = NgramSearch()
+            search.criteria(Session(bind=conn), "会議", scope)
+        for name, func, index_names in board_queries(category_id, search):
+            statements = capture_statements(
+                conn, lambda conn: func(Session(bind=conn), scope)
+            )
+            plans = [explain(conn, *statement) for statement in statements]
+            plan = "\n--\n".join(plans)
+            # すべてのSQLがユーザーのデータに絞り込み、想定したインデックスを使う
+            ok = not unscoped_scans(plan) and any(
+                name in plan for name in index_names
+            )
+            results.append((name, plan, ok))
+        conn.rollback()
+    return results
+
+
+def main():
+    from .config import get_config
+    from .logger import setup_logging
+
+    parser = argparse.ArgumentParser(description="スキーマのマイグレーション")
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="ボードのクエリの実行計画とインデックスの使用を確認する",
+    )
+    args = parser.parse_args()
+
+    config = get_config()
+    setup_logging(config)
+    engine = create_engine(config.database_url)
+
+    if args.explain:
+        ok = True
+        for name, plan, uses_index in explain_board_queries(engine):
+            print(f"== {name}: {'OK' if uses_index else 'NG'}")
+            print(plan)
+            ok = ok and uses_index
+        raise SystemExit(0 if ok else 1)
+
+    applied = run_migrations(engine)
+    print(f"適用したマイグレーション: {applied or 'なし'}")
+
+
+if __name__ == "__main__":
+    main()
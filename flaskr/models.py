@@ -4,6 +4,7 @@ from sqlalchemy import (
     Uuid,
     ForeignKey,
     DateTime,
+    Index,
     Integer,
     String,
 )
@@ -40,10 +41,16 @@ class User(Base):
 
     # 関連テーブルとのリレーション
     categories = relationship(
-        "Category", back_populates="user", cascade="all, delete-orphan"
+        "Category",
+        back_populates="user",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     posts = relationship(
-        "Post", back_populates="user", cascade="all, delete-orphan"
+        "Post",
+        back_populates="user",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
 
@@ -51,6 +58,12 @@ class Category(Base):
     """カテゴリー情報を管理するテーブル"""
 
     __tablename__ = "categories"
+    __table_args__ = (
+        # ユーザーごとのカテゴリー一覧（並び順付き）
+        Index("ix_categories_user_sort", "user_id", "sort_order", "id"),
+        # 差分の取得（/api/changes）
+        Index("ix_categories_user_updated", "user_id", "updated_at", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         Uuid,
@@ -68,11 +81,25 @@ class Category(Base):
         DateTime(timezone=True),
         default=lambda: datetime.now(ZoneInfo("Asia/Tokyo")),
     )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(ZoneInfo("Asia/Tokyo")),
+        onupdate=lambda: datetime.now(ZoneInfo("Asia/Tokyo")),
+    )
+
+    # 削除処理中（タスクをバックグラウンドで削除している）のカテゴリー
+    deleted_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
 
     # 関連テーブルとのリレーション
+    # タスクの削除はデータベースの ON DELETE CASCADE に任せる（読み込まない）
     user = relationship("User", back_populates="categories")
     posts = relationship(
-        "Post", back_populates="category", cascade="all, delete-orphan"
+        "Post",
+        back_populates="category",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
 
@@ -80,6 +107,22 @@ class Post(Base):
     """タスク（投稿）情報を管理するテーブル"""
 
     __tablename__ = "posts"
+    __table_args__ = (
+        # ボードの列（ステータス別・カテゴリー別）を並び順どおりに取得する
+        # （読み込みは常にユーザーごとなので user_id・category_id から始める）
+        Index(
+            "ix_posts_user_status_sort", "user_id", "status", "sort_order", "id"
+        ),
+        Index(
+            "ix_posts_category_status_sort",
+            "category_id",
+            "status",
+            "sort_order",
+            "id",
+        ),
+        # 差分の取得（/api/changes）
+        Index("ix_posts_user_updated", "user_id", "updated_at", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         Uuid,
@@ -113,3 +156,63 @@ class Post(Base):
     # 関連テーブルとのリレーション
     user = relationship("User", back_populates="posts")
     category = relationship("Category", back_populates="posts")
+
+
+class ArchivedPost(Base):
+    """アーカイブ済みのタスクを移したテーブル（flaskr/archive.py）
+
+    列は posts と同じで、移した日時（archived_at）だけを追加で持つ。
+    """
+
+    __tablename__ = "posts_archive"
+    __table_args__ = (
+        # アーカイブの列（/api/board/archive）を並び順どおりに取得する
+        # （読み込みは常にユーザーごとなので user_id から始まるものだけを持つ）
+        Index("ix_posts_archive_user_sort", "user_id", "sort_order", "id"),
+        Index(
+            "ix_posts_archive_category_sort", "category_id", "sort_order", "id"
+        ),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(Uuid, primary_key=True)
+    title: Mapped[str] = mapped_column(String(200), nullable=False)
+    content: Mapped[str] = mapped_column(Text, nullable=True)
+    status: Mapped[str] = mapped_column(String(20), default="archive")
+    sort_order: Mapped[int] = mapped_column(Integer, default=0)
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        Uuid,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    category_id: Mapped[uuid.UUID] = mapped_column(
+        Uuid,
+        ForeignKey("categories.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(ZoneInfo("Asia/Tokyo")),
+    )
+
+
+class Tombstone(Base):
+    """削除したタスク・カテゴリーの記録（差分の取得用）"""
+
+    __tablename__ = "tombstones"
+    __table_args__ = (
+        Index("ix_tombstones_deleted", "deleted_at", "id"),
+        Index("ix_tombstones_user_deleted", "user_id", "deleted_at", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # "task" または "category"
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)
+    object_id: Mapped[uuid.UUID] = mapped_column(Uuid, nullable=False)
+    # 削除したタスク・カテゴリーの持ち主（差分はユーザーごとに返す）
+    user_id: Mapped[uuid.UUID] = mapped_column(Uuid, nullable=True)
+    deleted_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(ZoneInfo("Asia/Tokyo")),
+    )
@@ -0,0 +1,641 @@
+# ==========================================================
+# ボードの操作（作成・編集・移動・並び替え・削除）の実行用
+# ==========================================================
+# 各操作は「パラメータの検証（parse）」と「適用（apply）」に分かれる。
+# /api/batch では全操作を先に検証してから1つのトランザクションで
+# 順に適用し、1件でも失敗した場合は全体をロールバックする。
+# 単機能のルート（/add_task など）も1件だけの操作として同じ処理を使う。
+#
+#   results = run_operations(db, [
+#       {"op": "set_status", "id": "...", "status": "progress"},
+#       {"op": "move", "id": "...", "before_id": "...", "after_id": None},
+#   ], user_id_getter)
+#
+# ASGI モード（flaskr/asgi.py）では run_operations_async で同じ操作を
+# 非同期のエンジン上で実行する（AsyncSession.run_sync で同じ処理を呼び出す）。
+#
+# 操作はすべて実行するユーザーのスコープ（flaskr/scope.py）の中で行い、
+# 他のユーザーのタスク・カテゴリーは存在しないものとして扱う（404）。
+import inspect
+import uuid
+from collections import namedtuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from .archive import ARCHIVE_STATUS, restore_tasks
+from .logger import get_logger
+from .models import ArchivedPost, Category, Post
+from .ordering import bulk_update_order, parse_order_rows
+from .pagination import STATUSES
+from .ranking import (
+    RANK_GAP,
+    edge_rank,
+    first_rank,
+    in_range,
+    move_between,
+)
+from .scope import UserScope, forget_user
+from .tombstones import record_deletions
+from .users import user_exists
+
+logger = get_logger(__name__)
+
+# 1回の /api/batch で受け付ける操作数の上限
+MAX_OPERATIONS = 500
+
+
+class OperationError(Exception):
+    """操作の検証・適用のエラー（status はHTTPステータス）"""
+
+    def __init__(self, message, status=400, index=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.index = index
+
+
+Operation = namedtuple("Operation", "name parse apply")
+
+OPERATIONS = {}
+
+
+def operation(name, parse):
+    """操作を登録するデコレーター（apply 関数に付ける）
+
+    parse(data) は検証済みのパラメータを返し、apply(ctx, params) は
+    (HTTPステータス, 結果の辞書) を返す。
+    """
+
+    def decorator(func):
+        if name in OPERATIONS:
+            raise ValueError(f"操作の名前が重複しています: {name}")
+        OPERATIONS[name] = Operation(name, parse, func)
+        return func
+
+    return decorator
+
+
+# ----------------------------------------------------------
+# パラメータの検証
+# ----------------------------------------------------------
+def _uuid(value, message):
+    try:
+        return uuid.UUID(str(value))
+    except (TypeError, ValueError):
+        raise OperationError(message) from None
+
+
+def _optional_uuid(value, message):
+    return _uuid(value, message) if value else None
+
+
+def parse_task_id(data):
+    return {"id": _uuid(data.get("id"), "無効なタスクID")}
+
+
+def _text(data, field, model, label):
+    """前後の空白を除いた文字列（列の長さを超える場合はエラー）"""
+    value = data.get(field) or ""
+    if not isinstance(value, str):
+        raise OperationError(f"{label}は文字列で指定してください")
+    value = value.strip()
+    length = model.__table__.c[field].type.length
+    if length is not None and len(value) > length:
+        raise OperationError(f"{label}は{length}文字以内で入力してください")
+    return value
+
+
+def parse_task_fields(data):
+    """作成・編集で共通のタスクの内容（タイトル・内容・カテゴリー）"""
+    title = _text(data, "title", Post, "タイトル")
+    if not title or not data.get("category_id"):
+        raise OperationError("タイトルとカテゴリIDは必須です")
+    return {
+        "title": title,
+        "content": _text(data, "content", Post, "内容"),
+        "category_id": _uuid(data.get("category_id"), "無効なカテゴリID"),
+    }
+
+
+def parse_create(data):
+    return {
+        # 同じバッチ内の後続の操作から参照できるようにIDを指定できる
+        "id": _optional_uuid(data.get("id"), "無効なタスクID")
+        or uuid.uuid4(),
+        **parse_task_fields(data),
+    }
+
+
+def parse_edit(data):
+    return {**parse_task_id(data), **parse_task_fields(data)}
+
+
+def parse_set_status(data):
+    params = parse_task_id(data)
+    status = data.get("status")
+    if status not in STATUSES:
+        raise OperationError(f"無効なステータス: {status}")
+    params["status"] = status
+    return params
+
+
+def parse_move(data, id_message="無効なタスクID"):
+    return {
+        "id": _uuid(data.get("id"), id_message),
+        "before_id": _optional_uuid(data.get("before_id"), id_message),
+        "after_id": _optional_uuid(data.get("after_id"), id_message),
+    }
+
+
+def parse_reorder(data):
+    tasks = data.get("tasks")
+    if not isinstance(tasks, list):
+        raise OperationError("Tasks must be a list")
+    # 全タスクにカテゴリーがある場合のみカテゴリーも更新する
+    if tasks and all(
+        isinstance(task, dict) and "category_id" in task for task in tasks
+    ):
+        fields, uuid_fields = ["category_id", "sort_order"], ["category_id"]
+    else:
+        fields, uuid_fields = ["sort_order"], []
+    try:
+        rows = parse_order_rows(tasks, fields, uuid_fields=uuid_fields)
+    except ValueError as e:
+        raise OperationError(str(e)) from None
+    return {"rows": rows, "fields": fields}
+
+
+def parse_create_category(data):
+    name = _text(data, "name", Category, "カテゴリー名")
+    if not name:
+        raise OperationError("カテゴリー名は必須です")
+    return {
+        "id": _optional_uuid(data.get("id"), "無効なカテゴリID")
+        or uuid.uuid4(),
+        "name": name,
+    }
+
+
+def parse_move_category(data):
+    return parse_move(data, "無効なカテゴリID")
+
+
+def parse_reorder_categories(data):
+    category_ids = data.get("category_ids")
+    if not isinstance(category_ids, list):
+        raise OperationError("カテゴリIDが提供されていません")
+    # 同じIDが複数回含まれる場合は最後の位置を採用する（parse_order_rows と
+    # 同じ。重複したまま UPDATE ... FROM VALUES に渡すとどの値になるか不定）
+    rows = {}
+    for index, category_id in enumerate(category_ids):
+        row_id = _uuid(category_id, f"無効なUUID: {category_id}")
+        rows[row_id] = {"id": row_id, "sort_order": index * RANK_GAP}
+    return {"rows": list(rows.values())}
+
+
+def parse_operations(items):
+    """操作の一覧を検証して (Operation, パラメータ) の一覧を返す"""
+    if not isinstance(items, list) or not items:
+        raise OperationError("operations は空でないリストで指定してください")
+    if len(items) > MAX_OPERATIONS:
+        raise OperationError(
+            f"1回に実行できる操作は{MAX_OPERATIONS}件までです"
+        )
+
+    parsed = []
+    for index, data in enumerate(items):
+        try:
+            if not isinstance(data, dict):
+                raise OperationError("操作はオブジェクトで指定してください")
+            op = OPERATIONS.get(data.get("op"))
+            if op is None:
+                raise OperationError(f"不明な操作: {data.get('op')}")
+            parsed.append((op, op.parse(data)))
+        except OperationError as e:
+            e.index = index
+            raise
+    return parsed
+
+
+# ----------------------------------------------------------
+# 適用
+# ----------------------------------------------------------
+class OperationContext:
+    """1回の実行（トランザクション）の中で共有する状態"""
+
+    def __init__(self, session, user_id=None):
+        self.session = session
+        self.user_id = user_id
+        self.scope = UserScope(user_id)
+        self._loaded = []
+        self._created = {}
+        self._missing = set()
+        self._deleted = set()
+        # 他のユーザーのもの（操作できないが、同じIDでの作成もできない）
+        self._foreign = set()
+        # posts にはないが posts_archive にあるタスク（同じIDでの作成はできない）
+        self._archived = set()
+        # ステータスごとの末尾の sort_order（追加のたびに問い合わせない）
+        self._last_ranks = {}
+
+    def prefetch(self, model, ids):
+        """参照するタスク・カテゴリーを1回のクエリで読み込む"""
+        ids = set(ids)
+        if not ids:
+            return
+        # セッションの identity map は弱参照なので、読み込んだインスタンスを
+        # 保持しておく（get() で再度問い合わせないように）
+        loaded = self.session.scalars(select(model).where(model.id.in_(ids)))
+        self._loaded.extend(loaded)
+        found = {obj.id for obj in self._loaded if isinstance(obj, model)}
+        self._missing |= {(model, i) for i in ids - found}
+        self._foreign |= {
+            (model, obj.id)
+            for obj in self._loaded
+            if isinstance(obj, model) and not self.scope.owns(obj)
+        }
+        if model is Post and ids - found:
+            self._archived |= set(
+                self.session.scalars(
+                    select(ArchivedPost.id).where(
+                        ArchivedPost.id.in_(ids - found)
+                    )
+                )
+            )
+
+    def get(self, model, object_id, message):
+        """スコープのユーザーのタスク・カテゴリーを取得
+        （ない場合・他のユーザーのものの場合は 404 の OperationError）"""
+        key = (model, object_id)
+        if key in self._missing or key in self._deleted or key in self._foreign:
+            raise OperationError(message, 404)
+        # 同じ実行内で作成したもの（まだ INSERT されていない）
+        obj = self._created.get((model, object_id))
+        if obj is not None:
+            return obj
+        obj = self.session.get(model, object_id)
+        if obj is None or not self.scope.owns(obj):
+            raise OperationError(message, 404)
+        return obj
+
+    def restore(self, ids):
+        """prefetch で見つからなかったタスクが posts_archive にあれば
+        posts に戻す（以降は他のタスクと同じように操作できる）"""
+        missing = [i for i in ids if (Post, i) in self._missing]
+        for post_id in restore_tasks(self.session, self.scope, missing):
+            self._missing.discard((Post, post_id))
+            self._archived.discard(post_id)
+
+    def check_new(self, model, object_id):
+        """作成するIDが既に使われていれば（posts_archive のタスクを含む）
+        409 の OperationError"""
+        key = (model, object_id)
+        archived = model is Post and object_id in self._archived
+        if archived or key not in self._missing or key in self._deleted:
+            raise OperationError("同じIDが既に存在します", 409)
+
+    def add(self, obj):
+        """作成したインスタンスをセッションに追加"""
+        key = (type(obj), obj.id)
+        self.session.add(obj)
+        self._created[key] = obj
+        self._missing.discard(key)
+
+    def expire(self, model, fields, ids):
+        """SQLで直接更新した行の読み込み済みの値を破棄する"""
+        for object_id in ids:
+            obj = self.session.identity_map.get(
+                self.session.identity_key(model, object_id)
+            )
+            if obj is not None:
+                self.session.expire(obj, fields)
+
+    def delete(self, obj):
+        """インスタンスを削除（同じ実行内で作成したものは追加を取り消す）"""
+        key = (type(obj), obj.id)
+        if self._created.pop(key, None) is not None and obj in self.session.new:
+            self.session.expunge(obj)
+        else:
+            self.session.delete(obj)
+        self._deleted.add(key)
+
+    def flush(self):
+        """SQLを直接実行する操作の前に、ORMの変更を書き込む"""
+        session = self.session
+        if session.new or session.dirty or session.deleted:
+            session.flush()
+
+    def next_rank(self, status):
+        """ステータスの末尾に追加する sort_order"""
+        rank = self._last_ranks.get(status)
+        if rank is not None and in_range(rank + RANK_GAP):
+            rank += RANK_GAP
+        else:
+            self.flush()
+            columns = [(Post, (self.scope.where(Post), Post.status == status))]
+            if status == ARCHIVE_STATUS:
+                # posts_archive に移したタスクより後ろに置く
+                columns.append(
+                    (ArchivedPost, (self.scope.where(ArchivedPost),))
+                )
+            rank = edge_rank(self.session, columns)
+        self._last_ranks[status] = rank
+        return rank
+
+    def ranks_changed(self):
+        """並び替えで末尾の値が変わった可能性がある場合に呼び出す"""
+        self._last_ranks.clear()
+
+
+def _task_result(post, **extra):
+    return {
+        "id": str(post.id),
+        "title": post.title,
+        "content": post.content,
+        "status": post.status,
+        "category_id": str(post.category_id),
+        "sort_order": post.sort_order,
+        **extra,
+    }
+
+
+def _get_category(ctx, category_id, message):
+    category = ctx.get(Category, category_id, message)
+    if category.deleted_at is not None:
+        raise OperationError(message, 404)
+    return category
+
+
+@operation("create", parse_create)
+def apply_create(ctx, params):
+    _get_category(ctx, params["category_id"], "指定されたカテゴリが見つかりません")
+    ctx.check_new(Post, params["id"])
+    # 新しいタスクはTODOの末尾に追加
+    post = Post(
+        id=params["id"],
+        title=params["title"],
+        content=params["content"],
+        category_id=params["category_id"],
+        user_id=ctx.user_id,
+        status="todo",
+        sort_order=ctx.next_rank("todo"),
+    )
+    ctx.add(post)
+    return 201, _task_result(post, message="タスクを追加しました")
+
+
+@operation("edit", parse_edit)
+def apply_edit(ctx, params):
+    post = ctx.get(Post, params["id"], "タスクが見つかりません")
+    _get_category(ctx, params["category_id"], "カテゴリーが見つかりません")
+    post.title = params["title"]
+    post.content = params["content"]
+    post.category_id = params["category_id"]
+    return 200, _task_result(post, message="タスクが正常に更新されました")
+
+
+@operation("set_status", parse_set_status)
+def apply_set_status(ctx, params):
+    post = ctx.get(Post, params["id"], "タスクが見つかりません")
+    new_status = params["status"]
+    if post.status != new_status:
+        # 移動先のステータスの末尾に置く
+        post.sort_order = ctx.next_rank(new_status)
+    post.status = new_status
+    return 200, _task_result(
+        post, message=f"タスクのステータスを{new_status}に更新しました"
+    )
+
+
+@operation("move", parse_move)
+def apply_move(ctx, params):
+    post = ctx.get(Post, params["id"], "タスクが見つかりません")
+    if post.status == ARCHIVE_STATUS:
+        # 前後のタスクを posts_archive に移していれば posts に戻す
+        restore_tasks(
+            ctx.session, ctx.scope, [params["before_id"], params["after_id"]]
+        )
+    ctx.flush()
+    try:
+        rebalanced = move_between(
+            ctx.session,
+            Post,
+            post,
+            params["before_id"],
+            params["after_id"],
+            ctx.scope.where(Post),
+            Post.status == post.status,
+        )
+    except LookupError as e:
+        raise OperationError(str(e), 409) from None
+    ctx.ranks_changed()
+    return 200, _task_result(post, rebalanced_count=rebalanced)
+
+
+@operation("reorder", parse_reorder)
+def apply_reorder(ctx, params):
+    rows = params["rows"]
+    if "category_id" in params["fields"]:
+        # 移動先のカテゴリーもスコープのユーザーのものに限る
+        for category_id in {row["category_id"] for row in rows}:
+            _get_category(ctx, category_id, "カテゴリーが見つかりません")
+    ctx.flush()
+    # 1つのSQL文で全タスクの並び順（とカテゴリー）を更新
+    # （他のユーザーのタスクは一致した件数に含めず、更新もしない）
+    matched, changed = bulk_update_order(
+        ctx.session, Post, rows, params["fields"], ctx.scope
+    )
+    ids = [row["id"] for row in rows]
+    if matched < len(set(ids)):
+        # posts_archive に移したタスクは posts に戻してから更新する
+        restored = set(restore_tasks(ctx.session, ctx.scope, ids))
+        if restored:
+            more_matched, more_changed = bulk_update_order(
+                ctx.session,
+                Post,
+                [row for row in rows if row["id"] in restored],
+                params["fields"],
+                ctx.scope,
+            )
+            matched += more_matched
+            changed += more_changed
+    ctx.expire(Post, params["fields"], ids)
+    ctx.ranks_changed()
+    return 200, {"updated_count": changed, "matched_count": matched}
+
+
+@operation("delete", parse_task_id)
+def apply_delete(ctx, params):
+    post = ctx.get(Post, params["id"], "タスクが見つかりません")
+    ctx.delete(post)
+    record_deletions(ctx.session, Post, [post.id], ctx.user_id)
+    return 200, {"id": str(post.id), "deleted": True}
+
+
+@operation("create_category", parse_create_category)
+def apply_create_category(ctx, params):
+    ctx.check_new(Category, params["id"])
+    # 新しいカテゴリを先頭に作成
+    ctx.flush()
+    category = Category(
+        id=params["id"],
+        name=params["name"],
+        user_id=ctx.user_id,
+        sort_order=first_rank(
+            ctx.session, Category, ctx.scope.where(Category)
+        ),
+    )
+    ctx.add(category)
+    return 201, {
+        "id": str(category.id),
+        "name": category.name,
+        "sort_order": category.sort_order,
+    }
+
+
+@operation("move_category", parse_move_category)
+def apply_move_category(ctx, params):
+    category = _get_category(ctx, params["id"], "カテゴリーが見つかりません")
+    ctx.flush()
+    try:
+        rebalanced = move_between(
+            ctx.session,
+            Category,
+            category,
+            params["before_id"],
+            params["after_id"],
+            ctx.scope.where(Category),
+        )
+    except LookupError as e:
+        raise OperationError(str(e), 409) from None
+    return 200, {
+        "id": str(category.id),
+        "sort_order": category.sort_order,
+        "rebalanced_count": rebalanced,
+    }
+
+
+@operation("reorder_categories", parse_reorder_categories)
+def apply_reorder_categories(ctx, params):
+    ctx.flush()
+    # 1つのSQL文で全カテゴリの並び順を更新
+    matched, changed = bulk_update_order(
+        ctx.session,
+        Category,
+        params["rows"],
+        ["sort_order"],
+        ctx.scope,
+    )
+    ctx.expire(Category, ["sort_order"], [row["id"] for row in params["rows"]])
+    return 200, {"matched_count": matched, "changed_count": changed}
+
+
+# ----------------------------------------------------------
+# 実行
+# ----------------------------------------------------------
+def _referenced_ids(parsed):
+    """操作が参照するタスク・カテゴリーのID"""
+    post_ids, category_ids = set(), set()
+    for op, params in parsed:
+        if op.name in ("create", "edit", "set_status", "move", "delete"):
+            post_ids.add(params["id"])
+        if op.name in ("create_category", "move_category"):
+            category_ids.add(params["id"])
+        if op.name in ("create", "edit"):
+            category_ids.add(params["category_id"])
+        if op.name == "reorder" and "category_id" in params["fields"]:
+            category_ids.update(row["category_id"] for row in params["rows"])
+    return post_ids, category_ids
+
+
+def apply_operations(session, parsed, user_id=None):
+    """検証済みの操作をセッションに順に適用する（コミットは呼び出し元で行う）
+
+    AsyncSession.run_sync からも呼び出すため、同期のセッションだけを使う。
+    """
+    ctx = OperationContext(session, user_id)
+    post_ids, category_ids = _referenced_ids(parsed)
+    ctx.prefetch(Post, post_ids)
+    ctx.prefetch(Category, category_ids)
+    # posts_archive に移したタスクを操作する場合は posts に戻しておく
+    ctx.restore(
+        params["id"]
+        for op, params in parsed
+        if op.name in ("edit", "set_status", "move", "delete")
+    )
+
+    results = []
+    for index, (op, params) in enumerate(parsed):
+        try:
+            results.append(op.apply(ctx, params))
+        except OperationError as e:
+            e.index = index
+            raise
+    return results
+
+
+def run_operations(db, items, user_id_getter=None):
+    """操作を検証してから1つのトランザクションで適用する
+
+    戻り値は操作ごとの (HTTPステータス, 結果の辞書) の一覧。
+    失敗した場合は全体をロールバックして OperationError を送出する
+    （index は失敗した操作の位置）。
+    """
+    parsed = parse_operations(items)
+
+    for attempt in range(2):
+        # ユーザーの作成は別のトランザクションで行うため先に解決しておく
+        # （すべての操作をユーザーのスコープで行うため常に必要）
+        user_id = user_id_getter() if user_id_getter else None
+
+        with db.session() as session:
+            try:
+                results = apply_operations(session, parsed, user_id)
+                session.commit()
+                return results
+            except OperationError:
+                session.rollback()
+                raise
+            except IntegrityError:
+                session.rollback()
+                if not _stale_user(session, user_id, attempt):
+                    raise
+
+
+def _stale_user(session, user_id, attempt):
+    """書き込みの失敗が、キャッシュしたユーザーが他のプロセスで削除された
+    ためか（そうであればキャッシュを破棄し、1回だけやり直す）"""
+    if attempt or user_id is None or user_exists(session, user_id):
+        return False
+    logger.warning("default user was deleted", extra={"user_id": str(user_id)})
+    forget_user(user_id)
+    return True
+
+
+async def run_operations_async(db, items, user_id_getter=None):
+    """run_operations の非同期版（db は AsyncDatabase）
+
+    user_id_getter はコルーチン関数でもよい。
+    """
+    parsed = parse_operations(items)
+
+    for attempt in range(2):
+        user_id = user_id_getter() if user_id_getter else None
+        if inspect.isawaitable(user_id):
+            user_id = await user_id
+
+        async with db.session() as session:
+            try:
+                results = await session.run_sync(
+                    apply_operations, parsed, user_id
+                )
+                await session.commit()
+                return results
+            except OperationError:
+                await session.rollback()
+                raise
+            except IntegrityError:
+                await session.rollback()
+                if not await session.run_sync(_stale_user, user_id, attempt):
+                    raise
@@ -0,0 +1,136 @@
+# ==========================================================
+# 並び順の一括更新用
+# ==========================================================
+import uuid
+
+from sqlalchemy import (
+    Uuid,
+    bindparam,
+    case,
+    column,
+    func,
+    or_,
+    select,
+    update,
+    values,
+)
+
+
+def bulk_update_order(session, model, rows, fields, scope=None):
+    """並び順などの値を1つのSQL文でまとめて更新する
+
+    rows は {"id": UUID, <field>: 値, ...} の辞書のリスト。
+    scope（flaskr/scope.py）を指定した場合、他のユーザーの行は
+    一致した行数に含めず、更新もしない。
+    戻り値は (一致した行数, 実際に値が変わった行数) のタプル。
+    コミットは呼び出し側で行う。
+    """
+    if not rows:
+        return 0, 0
+
+    table = model.__table__
+    ids = [row["id"] for row in rows]
+
+    # 一致した行数（存在するIDの数）と、そのうちスコープのユーザーの行数
+    # （user_id を WHERE に含めると、ID が多い場合にユーザーのインデックス
+    # 全体を走査する実行計画になるため、主キーで絞り込んでから数える）
+    owned = (
+        func.count(case((scope.where(model), 1)))
+        if scope is not None
+        else func.count()
+    )
+    matched, owned_count = session.execute(
+        select(func.count(), owned)
+        .select_from(table)
+        .where(table.c.id.in_(ids))
+    ).one()
+    if owned_count < matched:
+        # 他のユーザーの行を除いて更新する
+        found = {
+            row.id
+            for row in session.execute(
+                select(table.c.id, table.c.user_id).where(table.c.id.in_(ids))
+            )
+            if scope.owns(row)
+        }
+        rows = [row for row in rows if row["id"] in found]
+        matched = len(found)
+        if not rows:
+            return 0, 0
+
+    if session.get_bind().dialect.name == "postgresql":
+        # UPDATE ... FROM (VALUES ...) で1文にまとめる
+        new_values = values(
+            column("id", Uuid),
+            *[column(field, table.c[field].type) for field in fields],
+            name="new_values",
+        ).data([tuple(row[key] for key in ["id", *fields]) for row in rows])
+
+        stmt = (
+            update(table)
+            .where(table.c.id == new_values.c.id)
+            .where(
+                or_(
+                    *[
+                        table.c[field].is_distinct_from(new_values.c[field])
+                        for field in fields
+                    ]
+                )
+            )
+            .values({field: new_values.c[field] for field in fields})
+        )
+        result = session.execute(stmt)
+    else:
+        # UPDATE FROM VALUES 非対応のDBでは executemany で1回の呼び出しにまとめる
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("_id"))
+            .where(
+                or_(
+                    *[
+                        table.c[field] != bindparam(f"_{field}")
+                        for field in fields
+                    ]
+                )
+            )
+            .values({field: bindparam(f"_{field}") for field in fields})
+        )
+        params = [
+            {f"_{key}": row[key] for key in ["id", *fields]} for row in rows
+        ]
+        result = session.execute(stmt, params)
+
+    return matched, max(result.rowcount, 0)
+
+
+def parse_order_rows(items, fields, uuid_fields=()):
+    """リクエストの並び順データを検証して bulk_update_order 用の行に変換
+
+    同じIDが複数回含まれる場合は最後の値を採用する。
+    不正なデータの場合は ValueError を送出する。
+    """
+    rows = {}
+    for item in items:
+        if not isinstance(item, dict) or not all(
+            key in item for key in ["id", *fields]
+        ):
+            raise ValueError("Missing required fields in task data")
+
+        try:
+            row = {"id": uuid.UUID(str(item["id"]))}
+        except ValueError:
+            raise ValueError(f"Invalid task ID: {item['id']}")
+
+        for field in fields:
+            if field in uuid_fields:
+                try:
+                    row[field] = uuid.UUID(str(item[field]))
+                except ValueError:
+                    raise ValueError(f"Invalid {field}: {item[field]}")
+            else:
+                try:
+                    row[field] = int(item[field])
+                except (TypeError, ValueError):
+                    raise ValueError(f"Invalid {field}: {item[field]}")
+        rows[row["id"]] = row
+    return list(rows.values())
@@ -0,0 +1,59 @@
+# ==========================================================
+# キーセットページネーション用
+# ==========================================================
+# タスクは (status, sort_order, id) の順に並ぶため、
+# 「前ページ最後のタスクの (sort_order, id) より後ろ」を条件にして
+# OFFSET を使わずに次のページを取得する。
+import uuid
+
+from sqlalchemy import select, tuple_
+
+from .models import Post
+
+# 1ページあたりのタスク数
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# ボードのステータス
+STATUSES = ["todo", "progress", "archive"]
+
+
+def encode_cursor(post):
+    """タスクから次ページ取得用のカーソル文字列を作成"""
+    return f"{post.sort_order}:{post.id}"
+
+
+def decode_cursor(cursor):
+    """カーソル文字列を (sort_order, id) に変換（不正な場合は ValueError）"""
+    sort_order, _, post_id = cursor.partition(":")
+    return int(sort_order), uuid.UUID(post_id)
+
+
+def parse_page_args(args):
+    """リクエストの cursor / limit を検証して (after, limit) を返す"""
+    cursor = args.get("cursor")
+    after = decode_cursor(cursor) if cursor else None
+    limit = min(int(args.get("limit", PAGE_SIZE)), MAX_PAGE_SIZE)
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return after, limit
+
+
+def page_query(*criteria, after=None, limit=PAGE_SIZE, model=Post):
+    """条件に一致するタスクIDを1ページ分（+1件）取得するSELECT文
+
+    model はアーカイブのテーブル（ArchivedPost）を読む場合に指定する。
+    """
+    stmt = select(model.id).where(*criteria)
+    if after is not None:
+        stmt = stmt.where(tuple_(model.sort_order, model.id) > tuple_(*after))
+    # 次ページの有無を判定するため1件多く取得する
+    return stmt.order_by(model.sort_order, model.id).limit(limit + 1)
+
+
+def split_page(posts, limit):
+    """取得結果を (ページ内のタスク, 次ページのカーソル) に分割"""
+    if len(posts) > limit:
+        posts = posts[:limit]
+        return posts, encode_cursor(posts[-1])
+    return posts, None
@@ -0,0 +1,137 @@
+# ==========================================================
+# カテゴリーの削除用
+# ==========================================================
+# タスクの削除はデータベースの ON DELETE CASCADE に任せ、カテゴリーの
+# DELETE 1文で完了させる。タスクが多いカテゴリーは1文で削除すると
+# 長時間ロックを保持するため、deleted_at を設定してボードから隠し、
+# タスクを一定件数ずつ別のトランザクションで削除してからカテゴリーを削除する。
+# アーカイブのテーブル（posts_archive）に移したタスクも同じように扱う。
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, func, select, update
+
+from .logger import get_logger
+from .models import ArchivedPost, Category, Post
+from .tombstones import record_deletions
+
+logger = get_logger(__name__)
+
+
+def hidden_category_ids(session, scope):
+    """スコープのユーザーの削除処理中のカテゴリーのID一覧"""
+    return list(
+        session.scalars(
+            select(Category.id).where(
+                scope.where(Category), Category.deleted_at.is_not(None)
+            )
+        )
+    )
+
+
+def visible_criteria(session, scope):
+    """スコープのユーザーのタスクのうち、削除処理中のカテゴリーのものを
+    除外する条件"""
+    hidden = hidden_category_ids(session, scope)
+    return [Post.category_id.not_in(hidden)] if hidden else []
+
+
+def delete_category(session, scope, category_id, threshold):
+    """カテゴリーを削除、またはバックグラウンドでの削除の対象にする
+
+    戻り値は (カテゴリー名, タスク数, バックグラウンドで削除するか)。
+    カテゴリーがない（他のユーザーのものを含む）場合は LookupError。
+    呼び出し側でコミットする。
+    """
+    # 行をロックしてから数える（タスクの追加はこのロックを待つため件数がずれない）
+    name = session.scalar(
+        select(Category.name)
+        .where(
+            Category.id == category_id,
+            scope.where(Category),
+            Category.deleted_at.is_(None),
+        )
+        .with_for_update()
+    )
+    if name is None:
+        raise LookupError("カテゴリーが見つかりません")
+
+    # posts と posts_archive の件数を1回の問い合わせで合計する
+    hot, archived = [
+        select(func.count())
+        .where(model.category_id == category_id)
+        .scalar_subquery()
+        for model in (Post, ArchivedPost)
+    ]
+    task_count = session.scalar(select(hot + archived))
+
+    if task_count > threshold:
+        session.execute(
+            update(Category)
+            .where(Category.id == category_id)
+            .values(deleted_at=datetime.now(ZoneInfo("Asia/Tokyo")))
+        )
+        return name, task_count, True
+
+    # タスクは ON DELETE CASCADE で同じ文の中で削除される
+    session.execute(delete(Category).where(Category.id == category_id))
+    record_deletions(session, Category, [category_id], scope.user_id)
+    return name, task_count, False
+
+
+def purge_category(engine, category_id, batch_size=1000):
+    """削除処理中のカテゴリーのタスクを batch_size 件ずつ削除してから
+    カテゴリーを削除する（中断しても再実行すれば続きから削除する）"""
+    deleted = 0
+    for model in (Post, ArchivedPost):
+        while True:
+            with engine.begin() as conn:
+                batch = (
+                    select(model.id)
+                    .where(model.category_id == category_id)
+                    .limit(batch_size)
+                    .scalar_subquery()
+                )
+                count = conn.execute(
+                    delete(model).where(model.id.in_(batch))
+                ).rowcount
+            deleted += count
+            if count < batch_size:
+                break
+
+    with engine.begin() as conn:
+        user_id = conn.scalar(
+            select(Category.user_id).where(
+                Category.id == category_id, Category.deleted_at.is_not(None)
+            )
+        )
+        deleted_category = user_id is not None and conn.execute(
+            delete(Category).where(Category.id == category_id)
+        ).rowcount
+        # 同時に実行した別の削除処理が先に削除した場合は記録しない
+        if deleted_category:
+            record_deletions(conn, Category, [category_id], user_id)
+    logger.info(
+        "category purged",
+        extra={"category_id": str(category_id), "deleted_tasks": deleted},
+    )
+    return deleted
+
+
+def resume_purges(engine, batch_size=1000, started_before=None):
+    """中断した削除処理を最後まで実行する
+
+    started_before（timedelta）を指定した場合は、それより前に削除を
+    始めたカテゴリーだけを対象にする（実行中の削除処理と重ならないように）。
+    """
+    criteria = [Category.deleted_at.is_not(None)]
+    if started_before is not None:
+        criteria.append(
+            Category.deleted_at
+            < datetime.now(ZoneInfo("Asia/Tokyo")) - started_before
+        )
+    with engine.connect() as conn:
+        category_ids = list(conn.scalars(select(Category.id).where(*criteria)))
+    for category_id in category_ids:
+        purge_category(engine, category_id, batch_size)
+    return category_ids
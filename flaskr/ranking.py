@@ -0,0 +1,205 @@
+# ==========================================================
+# 間隔付きの並び順（sort_order）管理用
+# ==========================================================
+# sort_order を RANK_GAP 間隔の整数で持ち、1件の移動では
+# 移動した行の sort_order だけを書き換える。
+# 前後の値の間に空きがなくなった場合のみ、移動先の周辺を
+# 局所的に振り直す（リバランス）。
+# sort_order は INTEGER（32ビット）の列なので、先頭・末尾への追加を
+# 繰り返して範囲を超えそうな場合は、並び順を保ったまま範囲全体を
+# 0 を中心に振り直す（respace）。
+from sqlalchemy import func, select, tuple_
+
+from .ordering import bulk_update_order
+
+# 隣り合う項目の sort_order の間隔
+RANK_GAP = 1024
+
+# リバランス時に最初に読み込む周辺項目の件数
+REBALANCE_WINDOW = 16
+
+# sort_order（INTEGER）の範囲
+RANK_MIN = -(2**31)
+RANK_MAX = 2**31 - 1
+
+
+def in_range(rank):
+    """sort_order の列に保存できる値か"""
+    return RANK_MIN <= rank <= RANK_MAX
+
+
+def rank_between(lower, upper):
+    """lower と upper の間に入る sort_order を返す（空きがなければ None）"""
+    if lower is None and upper is None:
+        return 0
+    if lower is None:
+        return upper - RANK_GAP
+    if upper is None:
+        return lower + RANK_GAP
+    if upper - lower < 2:
+        return None
+    return (lower + upper) // 2
+
+
+def respace(session, columns):
+    """並び順を保ったまま sort_order を 0 を中心に等間隔に振り直す
+
+    columns は並び順を共有する (モデル, criteria) のリスト（posts と
+    posts_archive のアーカイブ列のように複数のテーブルにまたがる場合）。
+    間隔は RANK_GAP（件数が多く範囲に収まらない場合は狭める）。
+    戻り値は振り直した項目の件数。コミットは呼び出し側で行う。
+    """
+    items = []
+    for model, criteria in columns:
+        items.extend(
+            (row.sort_order, str(row.id), row.id, model)
+            for row in session.execute(
+                select(model.id, model.sort_order).where(*criteria)
+            )
+        )
+    items.sort(key=lambda item: item[:2])
+
+    gap = min(RANK_GAP, (RANK_MAX - RANK_MIN) // (len(items) + 1))
+    start = -gap * (len(items) // 2)
+    for model, _ in columns:
+        rows = [
+            {"id": item_id, "sort_order": start + gap * index}
+            for index, (_, _, item_id, item_model) in enumerate(items)
+            if item_model is model
+        ]
+        bulk_update_order(session, model, rows, ["sort_order"])
+        # セッションに読み込み済みの項目は振り直した値を読み直す
+        for obj in list(session.identity_map.values()):
+            if isinstance(obj, model):
+                session.expire(obj, ["sort_order"])
+    return len(items)
+
+
+def edge_rank(session, columns, last=True):
+    """columns の末尾（last=False なら先頭）に追加する sort_order を返す
+
+    範囲を超える場合は columns 全体を振り直してから求める。
+    """
+    aggregate, pick, step = (
+        (func.max, max, RANK_GAP) if last else (func.min, min, -RANK_GAP)
+    )
+    values = [
+        session.execute(select(aggregate(model.sort_order)).where(*criteria))
+        .scalar()
+        for model, criteria in columns
+    ]
+    values = [value for value in values if value is not None]
+    if not values:
+        return 0
+    if not in_range(pick(values) + step):
+        respace(session, columns)
+        return edge_rank(session, columns, last)
+    return pick(values) + step
+
+
+def last_rank(session, model, *criteria):
+    """末尾に追加する項目の sort_order を返す"""
+    return edge_rank(session, [(model, criteria)])
+
+
+def first_rank(session, model, *criteria):
+    """先頭に追加する項目の sort_order を返す"""
+    return edge_rank(session, [(model, criteria)], last=False)
+
+
+def _rebalance_after(session, model, item_id, before, criteria):
+    """before の直後に空きを作り、(移動する項目の sort_order, 件数) を返す
+
+    before の後ろの項目を REBALANCE_WINDOW 件ずつ広げながら読み込み、
+    十分な空きが見つかった範囲だけを等間隔に振り直す。
+    """
+    window = REBALANCE_WINDOW
+    while True:
+        following = session.execute(
+            select(model.id, model.sort_order)
+            .where(
+                *criteria,
+                model.id != item_id,
+                tuple_(model.sort_order, model.id)
+                > tuple_(before.sort_order, before.id),
+            )
+            .order_by(model.sort_order, model.id)
+            .limit(window)
+        ).all()
+
+        lower = before.sort_order
+        if len(following) < window:
+            # 末尾まで到達した場合は上限なしで振り直す
+            # （範囲を超える場合は None を返し、呼び出し側で全体を振り直す）
+            if not in_range(lower + RANK_GAP * (len(following) + 1)):
+                return None, 0
+            new_rank = lower + RANK_GAP
+            rows = [
+                {"id": row.id, "sort_order": lower + RANK_GAP * (index + 2)}
+                for index, row in enumerate(following)
+            ]
+            break
+
+        # 最後の項目は動かさず、その手前までを等間隔に振り直す
+        upper = following[-1].sort_order
+        spacing = (upper - lower) // (len(following) + 1)
+        if spacing >= 2:
+            new_rank = lower + spacing
+            rows = [
+                {"id": row.id, "sort_order": lower + spacing * (index + 2)}
+                for index, row in enumerate(following[:-1])
+            ]
+            break
+
+        window *= 2
+
+    bulk_update_order(session, model, rows, ["sort_order"])
+    return new_rank, len(rows)
+
+
+def move_between(session, model, item, before_id, after_id, *criteria):
+    """item を before_id と after_id の間に移動する
+
+    before_id は移動先の直前、after_id は直後の項目のID（端の場合は None）。
+    criteria は並び順を共有する範囲（同じステータス・同じユーザーなど）。
+    戻り値はリバランスで振り直した他の項目の件数。
+    コミットは呼び出し側で行う。
+    """
+    neighbor_ids = [i for i in (before_id, after_id) if i is not None]
+    if not neighbor_ids:
+        # 他に項目がない場合は末尾に置く
+        item.sort_order = last_rank(
+            session, model, *criteria, model.id != item.id
+        )
+        return 0
+
+    rebalanced = 0
+    while True:
+        neighbors = {
+            row.id: row
+            for row in session.execute(
+                select(model.id, model.sort_order).where(
+                    *criteria, model.id.in_(neighbor_ids)
+                )
+            )
+        }
+        if any(i not in neighbors for i in neighbor_ids):
+            raise LookupError("移動先の前後の項目が見つかりません")
+
+        before = neighbors.get(before_id)
+        after = neighbors.get(after_id)
+        new_rank = rank_between(
+            before.sort_order if before else None,
+            after.sort_order if after else None,
+        )
+        if new_rank is None:
+            new_rank, rebalanced = _rebalance_after(
+                session, model, item.id, before, criteria
+            )
+        if new_rank is not None and in_range(new_rank):
+            break
+        # 先頭・末尾が INTEGER の範囲を超える場合は全体を振り直す
+        rebalanced = respace(session, [(model, criteria)])
+
+    item.sort_order = new_rank
+    return rebalanced
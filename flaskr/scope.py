@@ -0,0 +1,54 @@
+# ==========================================================
+# ユーザーごとのデータの絞り込み用
+# ==========================================================
+# ボードの読み込み・書き込みのクエリは UserScope の条件で現在のユーザーの
+# タスク・カテゴリーだけに絞り込む（user_id から始まるインデックスを使う）。
+# ボードの表示の負荷は、テーブル全体ではなくそのユーザーのデータの量に比例する。
+# 他のユーザーのタスク・カテゴリーのIDを指定した操作は、存在しない場合と
+# 同じように扱う（404）。
+#
+# 現在のユーザーはリクエストごとに1回だけ解決して flask.g に保持する。
+#
+#   scope = current_scope()
+#   session.execute(select(Post.id).where(scope.where(Post), ...))
+from flask import g, has_app_context
+
+from .db import get_db
+from .users import forget_user_id, get_user_resolver
+
+
+class UserScope:
+    """1人のユーザーのタスク・カテゴリーに絞り込む条件"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+
+    def where(self, model):
+        """model（Post・ArchivedPost・Category・Tombstone）をこのユーザーの
+        行に絞り込む条件"""
+        return model.user_id == self.user_id
+
+    def owns(self, obj):
+        """読み込んだインスタンスがこのユーザーのものか"""
+        return obj.user_id == self.user_id
+
+    def __repr__(self):
+        return f"UserScope({self.user_id})"
+
+
+def current_scope():
+    """現在のリクエストのユーザーのスコープ（認証実装までは既定ユーザー）"""
+    if "flaskr_scope" not in g:
+        user_id = get_user_resolver().default_user_id(get_db().engine)
+        g.flaskr_scope = UserScope(user_id)
+    return g.flaskr_scope
+
+
+def forget_user(user_id):
+    """user_id の解決結果（プロセス内のキャッシュと現在のリクエストの
+    スコープ）を破棄し、次に解決するときにユーザーを作成し直す"""
+    forget_user_id(user_id)
+    if has_app_context():
+        scope = g.get("flaskr_scope")
+        if scope is not None and scope.user_id == user_id:
+            g.pop("flaskr_scope")
@@ -0,0 +1,402 @@
+# ==========================================================
+# タスクの検索用（/api/search）
+# ==========================================================
+# タイトルと内容の部分一致で検索し、タイトルに一致したもの（順位 0）を
+# 先に、同じ順位の中では更新の新しい順に並べる。ページは
+# (順位, updated_at, id) のキーセットで区切る。
+# 順位は式で計算して並べ替えず、順位ごとに条件を分けたSELECT文で
+# (updated_at, id) の降順に1ページ分だけを読む（一致した全件に順位を
+# 付けてから並べ替えると、よく出る語ほど遅くなるため）。
+# posts_archive に移したタスクも同じ条件で検索し、UNION ALL でまとめる
+# （ステータスの指定が archive 以外なら posts だけを読む）。
+# バックエンドは以下から選択できる。
+#   - bigram: PostgreSQL の GIN インデックス（ユーザーIDと2文字ずつの部分文字列、
+#             ix_posts_search_bigram）で候補を絞り込んでから ILIKE で確認する
+#             （2文字の日本語の語もインデックスを使う。1文字の語と posts_archive は
+#             ユーザーのインデックスで読んでから ILIKE で絞り込む）
+#   - ngram:  プロセス内の n-gram 転置インデックスで候補を絞り込む
+#             （SQLite・テスト向け。updated_at と削除の記録で差分だけを反映する。
+#             インデックスはユーザーごとに分け、検索するユーザーの分だけを引く）
+#   - auto:   データベースが PostgreSQL なら bigram、それ以外は ngram
+#   （以前の trigram は bigram と同じ扱い）
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import (
+    Integer,
+    false,
+    func,
+    literal,
+    literal_column,
+    not_,
+    select,
+    tuple_,
+    union_all,
+)
+
+from .archive import ARCHIVE_STATUS
+from .board import BoardRow, row_to_dict
+from .changes import CURSOR_OVERLAP, TIMEZONE
+from .models import ArchivedPost, Category, Post, Tombstone, User
+from .pagination import PAGE_SIZE
+from .purge import hidden_category_ids
+
+# 検索語の最大文字数
+MAX_QUERY_LENGTH = 100
+
+# GIN インデックスの対象（search_text() と同じ式にする）
+SEARCH_EXPRESSION = "title || ' ' || coalesce(content, '')"
+
+# 文字列を小文字にした2文字ずつの部分文字列の配列にする関数（PostgreSQL、
+# マイグレーションで作成する。インデックスの式に使うため IMMUTABLE）
+BIGRAM_FUNCTION = "flaskr_bigrams"
+
+
+def search_text(model=Post):
+    """検索対象の文字列（インデックスの式と一致させるため定数で連結する）"""
+    return model.title + literal_column("' '") + func.coalesce(
+        model.content, literal_column("''")
+    )
+
+
+def escape_like(value):
+    """LIKE のワイルドカードをエスケープ"""
+    return (
+        value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    )
+
+
+def encode_cursor(row):
+    """検索結果の行から次ページ取得用のカーソル文字列を作成"""
+    return f"{row.rank}:{row.updated_at.isoformat()}:{row.id}"
+
+
+def decode_cursor(cursor):
+    """カーソル文字列を (順位, updated_at, id) に変換（不正な場合は ValueError）"""
+    rank, _, rest = cursor.partition(":")
+    updated_at, _, post_id = rest.rpartition(":")
+    return int(rank), datetime.fromisoformat(updated_at), uuid.UUID(post_id)
+
+
+def like_criteria(query, model=Post):
+    """検索対象の文字列に検索語を含む条件（ILIKE）"""
+    return [
+        search_text(model).ilike(f"%{escape_like(query)}%", escape="\\")
+    ]
+
+
+def bigrams(value):
+    """BIGRAM_FUNCTION の呼び出し（SQLの式）"""
+    return getattr(func, BIGRAM_FUNCTION)(value)
+
+
+class BigramSearch:
+    """2文字ずつの部分文字列の GIN インデックスを使う検索（PostgreSQL）
+
+    検索語のすべての部分文字列を含むタスクを ix_posts_search_bigram
+    （user_id, 部分文字列の配列）で絞り込み、ILIKE で部分一致を確認する。
+    pg_trgm は3文字未満の語にインデックスを使えず、2文字の日本語の語が
+    全件の走査になるため、2文字ずつに分ける。
+
+    よく出る語は、インデックスで一致するすべてのタスクを読んでから
+    並べ替えるより、(user_id, updated_at, id) のインデックスを新しい順に
+    読んで ILIKE で絞り込むほうが速い。PostgreSQL は配列の @> の件数を
+    部分文字列ごとの割合の積で見積もり、よく出る語でも少なく見積もるため、
+    ユーザーの新しいタスクの一部で一致する割合を調べて使い分ける。
+    """
+
+    # 新しいタスクのこの件数のうち MAX_SELECTIVITY を超える割合が一致する
+    # 場合は、部分文字列のインデックスを使わずに LIKE で走査する
+    SAMPLE_SIZE = 1000
+    MAX_SELECTIVITY = 0.05
+
+    def is_common(self, session, query, scope):
+        """ユーザーの新しいタスクのうち検索語を含むものの割合が多いか"""
+        recent = (
+            select(Post.title, Post.content)
+            .where(scope.where(Post))
+            .order_by(Post.updated_at.desc(), Post.id.desc())
+            .limit(self.SAMPLE_SIZE)
+            .subquery()
+        )
+        sampled, matched = session.execute(
+            select(
+                func.count(),
+                func.count().filter(*like_criteria(query, recent.c)),
+            ).select_from(recent)
+        ).one()
+        return matched > sampled * self.MAX_SELECTIVITY
+
+    def criteria(self, session, query, scope, model=Post):
+        criteria = like_criteria(query, model)
+        # posts_archive にはインデックスを作らない（移した後は更新されず、
+        # ユーザーのインデックスで読む件数はアーカイブした分に限られる）
+        if model is not Post or len(query) < 2:
+            return criteria
+        if self.is_common(session, query, scope):
+            return criteria
+        return [
+            bigrams(search_text(model)).op("@>")(bigrams(query)),
+            *criteria,
+        ]
+
+
+class NgramSearch:
+    """プロセス内の n-gram 転置インデックスを使う検索
+
+    n 文字ずつの部分文字列からタスクIDを引き、すべてを含むタスクだけを
+    候補にしてから部分一致を確認する。検索のたびに前回以降に更新・削除
+    されたタスクだけをインデックスに反映する。転置インデックスはユーザー
+    ごとに持ち、検索の負荷が他のユーザーのタスクの数によらないようにする。
+    """
+
+    # 一致するタスクがこの割合を超える場合は候補のIDで絞り込まず、
+    # LIKE で走査する（IN の一覧が大きくなるほど遅くなるため）
+    MAX_SELECTIVITY = 0.05
+
+    def __init__(self, n=2):
+        self.n = n
+        # ユーザーID → n-gram → タスクID
+        self._postings = defaultdict(lambda: defaultdict(set))
+        # ユーザーID → タスクID
+        self._users = defaultdict(set)
+        self._documents = {}
+        self._categories = defaultdict(set)
+        self._watermark = None
+        self._lock = threading.Lock()
+
+    def _grams(self, value):
+        return {value[i : i + self.n] for i in range(len(value) - self.n + 1)}
+
+    def _remove(self, post_id):
+        document = self._documents.pop(post_id, None)
+        if document is None:
+            return
+        value, category_id, user_id = document
+        postings = self._postings[user_id]
+        for gram in self._grams(value):
+            postings[gram].discard(post_id)
+        self._users[user_id].discard(post_id)
+        self._categories[category_id].discard(post_id)
+
+    def _add(self, post_id, category_id, user_id, title, content):
+        self._remove(post_id)
+        value = f"{title} {content or ''}".lower()
+        self._documents[post_id] = (value, category_id, user_id)
+        postings = self._postings[user_id]
+        for gram in self._grams(value):
+            postings[gram].add(post_id)
+        self._users[user_id].add(post_id)
+        self._categories[category_id].add(post_id)
+
+    def refresh(self, session):
+        """前回以降に更新・削除されたタスクをインデックスに反映
+
+        posts_archive に移したタスクは移す前と同じIDで登録済みのため、
+        最初の構築のときだけ読み込む（移した後は更新されない）。
+        """
+        with self._lock:
+            now = datetime.now(TIMEZONE)
+            stmt = select(
+                Post.id, Post.category_id, Post.user_id, Post.title, Post.content
+            )
+            if self._watermark is None:
+                archived = select(
+                    ArchivedPost.id,
+                    ArchivedPost.category_id,
+                    ArchivedPost.user_id,
+                    ArchivedPost.title,
+                    ArchivedPost.content,
+                )
+                for row in session.execute(archived):
+                    self._add(*row)
+            else:
+                after = self._watermark - CURSOR_OVERLAP
+                stmt = stmt.where(Post.updated_at > after)
+                tombstones = session.execute(
+                    select(Tombstone.kind, Tombstone.object_id).where(
+                        Tombstone.deleted_at > after
+                    )
+                )
+                for kind, object_id in tombstones:
+                    if kind == "category":
+                        posts = self._categories.pop(object_id, set())
+                        for post_id in list(posts):
+                            self._remove(post_id)
+                    else:
+                        self._remove(object_id)
+            for row in session.execute(stmt):
+                self._add(*row)
+            self._watermark = now
+
+    def matching_ids(self, query, user_id):
+        """ユーザーのタスクのうち検索語を含むもののID一覧"""
+        query = query.lower()
+        with self._lock:
+            if len(query) < self.n:
+                candidates = self._users.get(user_id, set())
+            else:
+                user_postings = self._postings.get(user_id, {})
+                postings = sorted(
+                    (user_postings.get(g, set()) for g in self._grams(query)),
+                    key=len,
+                )
+                candidates = set.intersection(*postings)
+            return [
+                post_id
+                for post_id in candidates
+                if query in self._documents[post_id][0]
+            ]
+
+    def criteria(self, session, query, scope, model=Post):
+        self.refresh(session)
+        ids = self.matching_ids(query, scope.user_id)
+        if not ids:
+            return [false()]
+        documents = len(self._users.get(scope.user_id, ()))
+        if len(ids) > documents * self.MAX_SELECTIVITY:
+            return like_criteria(query, model)
+        return [model.id.in_(ids)]
+
+
+def search_select(
+    model,
+    criteria,
+    scope,
+    title_match,
+    rank,
+    status,
+    category_id,
+    hidden,
+    after,
+    limit,
+):
+    """model（Post・ArchivedPost）の検索のうち順位 rank のものを
+    更新の新しい順に1ページ分（+1件）取得するSELECT文"""
+    stmt = select(
+        model.id,
+        model.title,
+        model.content,
+        model.status,
+        model.category_id,
+        model.sort_order,
+        model.user_id,
+        literal(rank, Integer).label("rank"),
+        model.updated_at,
+    ).where(
+        *criteria,
+        scope.where(model),
+        title_match if rank == 0 else not_(title_match),
+    )
+    if status is not None:
+        stmt = stmt.where(model.status == status)
+    if category_id is not None:
+        stmt = stmt.where(model.category_id == category_id)
+    if hidden:
+        stmt = stmt.where(model.category_id.not_in(hidden))
+    if after is not None and after[0] == rank:
+        stmt = stmt.where(
+            tuple_(model.updated_at, model.id) < tuple_(*after[1:])
+        )
+    # (user_id, updated_at, id) のインデックスを逆順に読めるように並べる
+    stmt = stmt.order_by(model.updated_at.desc(), model.id.desc())
+    # SQLite は UNION ALL の中の LIMIT をサブクエリにしないと扱えない
+    return select(stmt.limit(limit + 1).subquery())
+
+
+def search_tasks(
+    session,
+    scope,
+    backend,
+    query,
+    status=None,
+    category_id=None,
+    after=None,
+    limit=PAGE_SIZE,
+):
+    """スコープのユーザーのタスク（posts_archive に移したものを含む）のうち
+    検索語に一致するもの（辞書）1ページ分と次ページのカーソルを取得"""
+    pattern = f"%{escape_like(query)}%"
+    hidden = hidden_category_ids(session, scope)
+    models = [Post]
+    if status in (None, ARCHIVE_STATUS):
+        models.append(ArchivedPost)
+    # カーソルが順位 1 のタスクなら、順位 0（タイトルに一致）は読み終えている
+    ranks = [0, 1] if after is None or after[0] == 0 else [1]
+
+    selects = []
+    for model in models:
+        criteria = backend.criteria(session, query, scope, model)
+        title_match = model.title.ilike(pattern, escape="\\")
+        selects += [
+            search_select(
+                model,
+                criteria,
+                scope,
+                title_match,
+                rank,
+                status,
+                category_id,
+                hidden,
+                after,
+                limit,
+            )
+            for rank in ranks
+        ]
+    found = union_all(*selects).subquery()
+    # 次ページの有無を判定するため1件多く取得する
+    rows = session.execute(
+        select(
+            found.c.id,
+            found.c.title,
+            found.c.content,
+            found.c.status,
+            found.c.category_id,
+            found.c.sort_order,
+            found.c.user_id,
+            Category.name,
+            User.name,
+            found.c.rank,
+            found.c.updated_at,
+        )
+        .join(Category, Category.id == found.c.category_id)
+        .join(User, User.id == found.c.user_id)
+        # 結合するカテゴリーもユーザーのものだけを読む
+        .where(scope.where(Category))
+        .order_by(found.c.rank, found.c.updated_at.desc(), found.c.id.desc())
+        .limit(limit + 1)
+    ).all()
+
+    cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        cursor = encode_cursor(rows[-1])
+    size = len(BoardRow._fields)
+    tasks = [row_to_dict(BoardRow._make(row[:size])) for row in rows]
+    return tasks, cursor
+
+
+def create_search(config):
+    """設定に応じた検索のバックエンドを作成"""
+    backend_name = getattr(config, "SEARCH_BACKEND", "auto")
+    if backend_name == "auto":
+        is_postgres = config.database_url.startswith("postgresql")
+        backend_name = "bigram" if is_postgres else "ngram"
+    if backend_name in ("bigram", "trigram"):
+        return BigramSearch()
+    return NgramSearch()
+
+
+def init_search(app, config):
+    """アプリケーションに検索のバックエンドを登録"""
+    backend = create_search(config)
+    app.extensions["flaskr_search"] = backend
+    return backend
+
+
+def get_search():
+    """現在のアプリケーションの検索のバックエンド"""
+    return current_app.extensions["flaskr_search"]
@@ -0,0 +1,75 @@
+# ==========================================================
+# JSONのエンコード用
+# ==========================================================
+# orjson がインストールされていればそれを使い、UUID・datetime を
+# str() せずにそのままエンコードする。インストールされていない場合は
+# 標準の json で同じ形式（空白なし・非ASCIIはそのまま）に変換する。
+#
+#   app.json = FastJSONProvider(app)   # jsonify・tojson もこの関数を使う
+import json
+import uuid
+from datetime import date
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson は任意の依存
+    orjson = None
+
+
+def _default(value):
+    """orjson・json が直接扱えない値の変換"""
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+    raise TypeError(
+        f"Object of type {type(value).__name__} is not JSON serializable"
+    )
+
+
+def dumps(obj):
+    """オブジェクトをJSON文字列に変換"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default).decode()
+    return json.dumps(
+        obj, default=_default, ensure_ascii=False, separators=(",", ":")
+    )
+
+
+def loads(s):
+    """JSON文字列（bytes も可）をオブジェクトに変換"""
+    if orjson is not None:
+        return orjson.loads(s)
+    return json.loads(s)
+
+
+def htmlsafe_dumps(obj):
+    """<script type="application/json"> に埋め込めるJSON文字列に変換"""
+    # Flask の tojson と同じ文字をエスケープする
+    return (
+        dumps(obj)
+        .replace("<", "\\u003c")
+        .replace(">", "\\u003e")
+        .replace("&", "\\u0026")
+        .replace("'", "\\u0027")
+    )
+
+
+class FastJSONProvider(JSONProvider):
+    """dumps・loads を使う Flask の JSONProvider"""
+
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
@@ -0,0 +1,43 @@
+# ==========================================================
+# 削除の記録用（差分の取得で削除を返すため）
+# ==========================================================
+# 行を削除すると updated_at では検知できないため、削除したIDを
+# tombstones テーブルに記録する。保持期間を過ぎた記録は削除する。
+#
+# カテゴリーの削除時はカテゴリーの記録だけを残す（タスクは ON DELETE CASCADE
+# で削除されるため、クライアントはカテゴリーと一緒にタスクを取り除く）。
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, insert
+
+from .models import Category, Post, Tombstone
+
+# 記録の種類
+KINDS = {Post: "task", Category: "category"}
+
+
+def record_deletions(conn, model, ids, user_id):
+    """user_id のユーザーが削除したタスク・カテゴリーを記録
+    （コミットは呼び出し側で行う）"""
+    ids = list(ids)
+    if not ids:
+        return
+    conn.execute(
+        insert(Tombstone),
+        [
+            {"kind": KINDS[model], "object_id": object_id, "user_id": user_id}
+            for object_id in ids
+        ],
+    )
+
+
+def prune_tombstones(engine, retention):
+    """保持期間（timedelta）を過ぎた記録を削除し、削除した件数を返す"""
+    with engine.begin() as conn:
+        return conn.execute(
+            delete(Tombstone).where(
+                Tombstone.deleted_at
+                < datetime.now(ZoneInfo("Asia/Tokyo")) - retention
+            )
+        ).rowcount
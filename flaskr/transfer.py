@@ -0,0 +1,432 @@
+# ==========================================================
+# タスク・カテゴリーの一括エクスポート・インポート用
+# ==========================================================
+# ボードの移行・バックアップ用。ORM のオブジェクトを作らずに行のまま扱う。
+#   - エクスポート: サーバーサイドカーソル（yield_per）で batch_size 行ずつ
+#     取得して NDJSON / CSV の文字列を返すため、件数によらずメモリは一定。
+#     PostgreSQL では REPEATABLE READ の1つのスナップショットから読み込む。
+#   - インポート: batch_size 行ずつ PostgreSQL（psycopg2）では COPY、
+#     それ以外は executemany（insertmanyvalues）でまとめて INSERT する。
+#     全体を1つのトランザクションで行い、失敗した場合は何も取り込まない。
+#
+# NDJSON は1行に1件で、"table" に categories / posts を持つ（カテゴリーを
+# 先に出力するため、そのまま取り込める）。CSV は1テーブルずつ扱う。
+# 出力するのはエクスポートしたユーザーの行だけで、取り込んだ行はインポートした
+# ユーザーのものにする（他のユーザーのカテゴリーを参照するタスクは取り込まない）。
+# updated_at は取り込んだ時刻にする（差分の取得・検索のインデックスに
+# 反映させるため）。
+#
+#   $ flask --app flaskr.main transfer export -o board.ndjson
+#   $ flask --app flaskr.main transfer export --format csv --table posts
+#   $ flask --app flaskr.main transfer import board.ndjson --batch-size 10000
+import csv
+import io
+import uuid
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import String, func, select, union_all
+
+from .changes import TIMEZONE
+from .logger import get_logger
+from .models import ArchivedPost, Category, Post
+from .pagination import STATUSES
+from .scope import UserScope
+from .serializer import dumps, loads
+
+logger = get_logger(__name__)
+
+FORMATS = ["ndjson", "csv"]
+
+MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# テーブルごとのモデルと入出力する列（ユーザー・削除処理の列は含めない）
+TABLES = {
+    "categories": (
+        Category,
+        ["id", "name", "sort_order", "created_at", "updated_at"],
+    ),
+    "posts": (
+        Post,
+        [
+            "id",
+            "title",
+            "content",
+            "status",
+            "sort_order",
+            "category_id",
+            "created_at",
+            "updated_at",
+        ],
+    ),
+}
+
+
+class TransferError(ValueError):
+    """取り込むデータの形式のエラー（line は入力の行番号）"""
+
+    def __init__(self, message, line=None):
+        super().__init__(message if line is None else f"{line}行目: {message}")
+        self.message = message
+        self.line = line
+
+
+class TransferConflict(TransferError):
+    """取り込むIDが既に使われている（posts_archive のタスクを含む）"""
+
+
+# ------------------------------------------------------
+# エクスポート
+# ------------------------------------------------------
+def export_select(name, scope):
+    """スコープのユーザーのテーブルの出力用の SELECT
+    （削除処理中のカテゴリーとそのタスクは除く）
+
+    タスクは posts_archive に移したものも含める。
+    """
+    model, fields = TABLES[name]
+    if model is Category:
+        stmt = select(*[Category.__table__.c[field] for field in fields])
+        return stmt.where(
+            scope.where(Category), Category.deleted_at.is_(None)
+        ).order_by(Category.sort_order, Category.id)
+    hidden = select(Category.id).where(
+        scope.where(Category), Category.deleted_at.is_not(None)
+    )
+    stmt = union_all(
+        *[
+            select(*[model.__table__.c[field] for field in fields]).where(
+                scope.where(model), model.category_id.not_in(hidden)
+            )
+            for model in (Post, ArchivedPost)
+        ]
+    )
+    return stmt.order_by(stmt.selected_columns.id)
+
+
+def iter_batches(engine, scope, tables, batch_size):
+    """(テーブル名, 行のリスト) を batch_size 行ずつ返す"""
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            # カテゴリーとタスクを同じ時点のデータから読み込む
+            conn = conn.execution_options(isolation_level="REPEATABLE READ")
+        for name in tables:
+            result = conn.execution_options(yield_per=batch_size).execute(
+                export_select(name, scope)
+            )
+            for partition in result.partitions():
+                yield name, partition
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_stream(engine, scope, tables, fmt="ndjson", batch_size=5000):
+    """スコープのユーザーのテーブルの行を NDJSON / CSV の文字列として
+    batch_size 行ずつ返す"""
+    if fmt == "csv" and len(tables) != 1:
+        raise TransferError("CSV は1テーブルずつ出力してください")
+
+    if fmt == "csv":
+        [name] = tables
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(TABLES[name][1])
+        for _, rows in iter_batches(engine, scope, tables, batch_size):
+            writer.writerows([_csv_value(v) for v in row] for row in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        # 0件の場合もヘッダーは出力する
+        if buffer.tell():
+            yield buffer.getvalue()
+        return
+
+    for name, rows in iter_batches(engine, scope, tables, batch_size):
+        yield "".join(
+            dumps({"table": name, **row._asdict()}) + "\n" for row in rows
+        )
+
+
+# ------------------------------------------------------
+# インポート
+# ------------------------------------------------------
+def read_ndjson(lines, table=None):
+    """NDJSON の各行を (行番号, テーブル名, 値の辞書) として返す"""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = loads(line)
+        except ValueError:
+            raise TransferError("JSONとして読み込めません", number) from None
+        if not isinstance(record, dict):
+            raise TransferError("オブジェクトではありません", number)
+        yield number, record.pop("table", table), record
+
+
+def read_csv(lines, table):
+    """CSV（1行目は列名）の各行を (行番号, テーブル名, 値の辞書) として返す"""
+    reader = csv.DictReader(lines)
+    for record in reader:
+        yield reader.line_num, table, record
+
+
+def read_records(lines, fmt="ndjson", table=None):
+    if fmt == "csv":
+        if table not in TABLES:
+            raise TransferError("CSV はテーブル（categories / posts）の指定が必要です")
+        return read_csv(lines, table)
+    if table is not None and table not in TABLES:
+        raise TransferError(f"無効なテーブル: {table}")
+    return read_ndjson(lines, table)
+
+
+def _uuid(value, field, line):
+    if not value:
+        raise TransferError(f"{field} は必須です", line)
+    try:
+        return value if isinstance(value, uuid.UUID) else uuid.UUID(value)
+    except (AttributeError, TypeError, ValueError):
+        raise TransferError(f"無効な{field}: {value}", line) from None
+
+
+def _text(record, field, model, line, required=True):
+    value = record.get(field)
+    if not value:
+        if required:
+            raise TransferError(f"{field} は必須です", line)
+        # 空の内容はアプリケーションと同じく空文字列で保存する
+        return ""
+    if not isinstance(value, str):
+        raise TransferError(f"{field} は文字列にしてください", line)
+    length = model.__table__.c[field].type.length
+    if length is not None and len(value) > length:
+        raise TransferError(f"{field} は{length}文字以内にしてください", line)
+    return value
+
+
+def _int(value, field, line):
+    if value in (None, ""):
+        return 0
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise TransferError(f"無効な{field}: {value}", line) from None
+
+
+def _datetime(value, field, line, default):
+    if not value:
+        return default
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise TransferError(f"無効な{field}: {value}", line) from None
+
+
+def to_row(name, record, line, user_id, now):
+    """取り込む値を検証して INSERT する行（列名 → 値）に変換"""
+    model, _ = TABLES[name]
+    row = {
+        "id": _uuid(record.get("id") or str(uuid.uuid4()), "id", line),
+        "sort_order": _int(record.get("sort_order"), "sort_order", line),
+        "user_id": user_id,
+        "created_at": _datetime(
+            record.get("created_at"), "created_at", line, now
+        ),
+        "updated_at": now,
+    }
+    if model is Category:
+        row["name"] = _text(record, "name", model, line)
+        return row
+
+    status = record.get("status") or "todo"
+    if status not in STATUSES:
+        raise TransferError(f"無効なステータス: {status}", line)
+    row.update(
+        title=_text(record, "title", model, line),
+        content=_text(record, "content", model, line, required=False),
+        status=status,
+        category_id=_uuid(record.get("category_id"), "category_id", line),
+    )
+    return row
+
+
+def copy_rows(conn, table, rows):
+    """PostgreSQL の COPY ... FROM STDIN で行を取り込む（psycopg2）"""
+    columns = list(rows[0])
+    # CSV 形式の COPY では引用符のない空の値が NULL になるため、
+    # 文字列の列は空文字列として読み込ませる
+    texts = [c for c in columns if isinstance(table.c[c].type, String)]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows([_csv_value(row[c]) for c in columns] for row in rows)
+    buffer.seek(0)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN"
+            f" WITH (FORMAT csv, FORCE_NOT_NULL ({', '.join(texts)}))",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def insert_rows(conn, table, rows):
+    """executemany（insertmanyvalues）で行をまとめて INSERT する"""
+    conn.execute(table.insert(), rows)
+
+
+def check_categories(conn, rows, user_id):
+    """タスクの行が他のユーザーのカテゴリーを参照していれば TransferError"""
+    category_ids = {row["category_id"] for row in rows}
+    foreign = conn.scalar(
+        select(func.count())
+        .select_from(Category)
+        .where(Category.id.in_(category_ids), Category.user_id != user_id)
+    )
+    if foreign:
+        raise TransferError("他のユーザーのカテゴリーを参照している行があります")
+
+
+def check_archived(conn, rows):
+    """タスクの行のIDが posts_archive で使われていれば TransferConflict
+    （posts の主キーでは重複を検出できないため）"""
+    archived = conn.scalar(
+        select(func.count())
+        .select_from(ArchivedPost)
+        .where(ArchivedPost.id.in_([row["id"] for row in rows]))
+    )
+    if archived:
+        raise TransferConflict("アーカイブ済みのタスクと同じIDの行があります")
+
+
+def import_records(engine, records, user_id, batch_size=5000, method="auto"):
+    """read_records() の行を batch_size 行ずつ取り込んでテーブルごとの件数を返す
+
+    method は copy（PostgreSQL のみ）/ insert / auto（psycopg2 なら copy）。
+    形式のエラー・他のユーザーのカテゴリーの参照は TransferError、
+    posts_archive のタスクとのIDの重複は TransferConflict、posts でのIDの重複・
+    存在しないカテゴリーの参照は IntegrityError を送出し、すべてロールバックする。
+    """
+    counts = dict.fromkeys(TABLES, 0)
+    now = datetime.now(TIMEZONE)
+    with engine.begin() as conn:
+        if method == "auto":
+            method = "copy" if conn.dialect.driver == "psycopg2" else "insert"
+        write = copy_rows if method == "copy" else insert_rows
+
+        pending, pending_name = [], None
+
+        def flush():
+            if pending:
+                model = TABLES[pending_name][0]
+                if model is Post:
+                    check_categories(conn, pending, user_id)
+                    check_archived(conn, pending)
+                write(conn, model.__table__, pending)
+                counts[pending_name] += len(pending)
+                pending.clear()
+
+        for line, name, record in records:
+            if name not in TABLES:
+                raise TransferError(f"無効なテーブル: {name}", line)
+            # カテゴリーを先に書き込んでからそのタスクを書き込む
+            if name != pending_name or len(pending) >= batch_size:
+                flush()
+                pending_name = name
+            pending.append(to_row(name, record, line, user_id, now))
+        flush()
+    return counts
+
+
+# ------------------------------------------------------
+# flask コマンド（flask --app flaskr.main transfer ...）
+# ------------------------------------------------------
+transfer_cli = AppGroup("transfer", help="タスク・カテゴリーのエクスポート・インポート")
+
+
+def _publish_board():
+    """取り込んだ後にボードのバージョンを上げ、変更を通知する
+
+    バージョンは別プロセスのサーバーと redis で共有する場合だけ反映される。
+    """
+    engine = current_app.extensions["flaskr_db"].engine
+    user_id = current_app.extensions["flaskr_users"].default_user_id(engine)
+    current_app.extensions["flaskr_board_cache"].bump(user_id)
+    try:
+        current_app.extensions["flaskr_events"].publish(
+            {"type": "board", "user": str(user_id)}
+        )
+    except Exception:
+        logger.exception("publish board event failed")
+
+
+@transfer_cli.command("export")
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default="ndjson")
+@click.option(
+    "--table",
+    type=click.Choice(list(TABLES)),
+    help="出力するテーブル（省略時はすべて。CSV では必須）",
+)
+@click.option("-o", "--output", type=click.File("w"), default="-")
+@click.option("--batch-size", type=int, help="1回に取得する行数")
+def export_command(fmt, table, output, batch_size):
+    """タスク・カテゴリーを NDJSON / CSV で出力"""
+    config = current_app.config["APP_CONFIG"]
+    engine = current_app.extensions["flaskr_db"].engine
+    if fmt == "csv" and table is None:
+        raise click.UsageError("CSV では --table を指定してください")
+    tables = [table] if table else list(TABLES)
+    scope = UserScope(
+        current_app.extensions["flaskr_users"].default_user_id(engine)
+    )
+    for chunk in export_stream(
+        engine, scope, tables, fmt, batch_size or config.TRANSFER_BATCH_SIZE
+    ):
+        output.write(chunk)
+
+
+@transfer_cli.command("import")
+@click.argument("source", type=click.File("r", encoding="utf-8", lazy=False))
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default=None)
+@click.option("--table", type=click.Choice(list(TABLES)))
+@click.option("--batch-size", type=int, help="1回に書き込む行数")
+@click.option(
+    "--method", type=click.Choice(["auto", "copy", "insert"]), default=None
+)
+def import_command(source, fmt, table, batch_size, method):
+    """NDJSON / CSV のタスク・カテゴリーを取り込む（- は標準入力）"""
+    config = current_app.config["APP_CONFIG"]
+    engine = current_app.extensions["flaskr_db"].engine
+    if fmt is None:
+        fmt = "csv" if source.name.endswith(".csv") else "ndjson"
+    user_id = current_app.extensions["flaskr_users"].default_user_id(engine)
+    try:
+        counts = import_records(
+            engine,
+            read_records(source, fmt, table),
+            user_id,
+            batch_size=batch_size or config.TRANSFER_BATCH_SIZE,
+            method=method or config.TRANSFER_METHOD,
+        )
+    except TransferError as e:
+        raise click.ClickException(str(e)) from None
+    _publish_board()
+    click.echo(
+        ", ".join(f"{name}: {count}件" for name, count in counts.items()),
+        err=True,
+    )
+
+
+def init_transfer(app, config):
+    """アプリケーションに flask transfer コマンドを登録"""
+    app.cli.add_command(transfer_cli)
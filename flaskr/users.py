@@ -0,0 +1,139 @@
+# ==========================================================
+# 既定ユーザーの解決用
+# ==========================================================
+# 書き込みのたびにユーザーを SELECT しないように、メールアドレスから
+# 引いたユーザーIDをプロセス内にキャッシュする。
+# ユーザーの作成は INSERT ... ON CONFLICT (email) DO NOTHING RETURNING で
+# 行うため、最初のリクエストが同時に来ても1件しか作成されない。
+# ユーザーの削除・メールアドレスの変更を検知したらキャッシュを破棄する。
+# 他のプロセス（別のワーカー・直接のSQL）での削除は検知できないため、
+# 書き込みが外部キーの違反で失敗した場合に破棄する（forget_user_id、
+# flaskr/operations.py）。
+import threading
+import weakref
+
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .models import User
+
+# キャッシュを破棄する対象（アプリケーションごとの UserResolver）
+_resolvers = weakref.WeakSet()
+
+
+def _insert(dialect_name):
+    if dialect_name == "postgresql":
+        return postgresql.insert(User)
+    if dialect_name == "sqlite":
+        return sqlite.insert(User)
+    return None
+
+
+def ensure_user(conn, name, email, password):
+    """ユーザーを作成（既にあれば何もしない）してIDを返す"""
+    stmt = _insert(conn.dialect.name)
+    if stmt is not None:
+        user_id = conn.execute(
+            stmt.values(name=name, email=email, password=password)
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User.id)
+        ).scalar()
+        if user_id is not None:
+            return user_id
+    else:
+        # ON CONFLICT がないデータベースでは存在確認してから作成する
+        user_id = conn.scalar(select(User.id).where(User.email == email))
+        if user_id is None:
+            user_id = conn.execute(
+                User.__table__.insert()
+                .values(name=name, email=email, password=password)
+                .returning(User.id)
+            ).scalar()
+        return user_id
+
+    # 他のリクエストが先に作成していた
+    return conn.scalar(select(User.id).where(User.email == email))
+
+
+class UserResolver:
+    """メールアドレスからユーザーIDを解決し、プロセス内にキャッシュする"""
+
+    def __init__(self, config):
+        self.config = config
+        self._ids = {}
+        self._lock = threading.Lock()
+        _resolvers.add(self)
+
+    def default_user_id(self, engine):
+        """既定ユーザーのID（なければ作成）"""
+        email = self.config.DEFAULT_USER_EMAIL
+        user_id = self._ids.get(email)
+        if user_id is not None:
+            return user_id
+
+        with self._lock:
+            user_id = self._ids.get(email)
+            if user_id is None:
+                # 呼び出し元のトランザクションがロールバックされても
+                # ユーザーは残るように、別のトランザクションで作成する
+                with engine.begin() as conn:
+                    user_id = ensure_user(
+                        conn,
+                        self.config.DEFAULT_USER_NAME,
+                        email,
+                        self.config.DEFAULT_USER_PASSWORD,
+                    )
+                self._ids[email] = user_id
+        return user_id
+
+    def forget(self, user_id):
+        """user_id に解決したキャッシュを破棄"""
+        with self._lock:
+            for email in [e for e, i in self._ids.items() if i == user_id]:
+                del self._ids[email]
+
+    def invalidate(self, email=None):
+        """キャッシュを破棄（email を省略した場合はすべて）"""
+        with self._lock:
+            if email is None:
+                self._ids.clear()
+            else:
+                self._ids.pop(email, None)
+
+
+def init_users(app, config):
+    """アプリケーションにユーザーの解決を登録"""
+    resolver = UserResolver(config)
+    app.extensions["flaskr_users"] = resolver
+    return resolver
+
+
+def get_user_resolver():
+    """現在のアプリケーションの UserResolver"""
+    return current_app.extensions["flaskr_users"]
+
+
+def forget_user_id(user_id):
+    """user_id に解決したキャッシュをすべての UserResolver から破棄
+    （他のプロセスでユーザーが削除されていた場合）"""
+    for resolver in list(_resolvers):
+        resolver.forget(user_id)
+
+
+def user_exists(conn, user_id):
+    """ユーザーが存在するか（conn は Connection・Session）"""
+    return conn.scalar(select(User.id).where(User.id == user_id)) is not None
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted(mapper, connection, target):
+    for resolver in list(_resolvers):
+        resolver.invalidate(target.email)
+
+
+@event.listens_for(User.email, "set")
+def _invalidate_renamed(target, value, oldvalue, initiator):
+    if isinstance(oldvalue, str) and oldvalue != value:
+        for resolver in list(_resolvers):
+            resolver.invalidate(oldvalue)
@@ -0,0 +1,14 @@
+# ==========================================================
+# ルート（Blueprint）
+# ==========================================================
+# 各Blueprintは current_app の拡張（flaskr_db, flaskr_board_cache）と
+# APP_CONFIG だけを使うため、必要なものだけを個別に登録できる。
+from . import admin, api, categories, tasks, transfer
+
+BLUEPRINTS = [admin.bp, api.bp, categories.bp, tasks.bp, transfer.bp]
+
+
+def register_blueprints(app, blueprints=None):
+    """Blueprintをアプリケーションに登録"""
+    for blueprint in blueprints or BLUEPRINTS:
+        app.register_blueprint(blueprint)
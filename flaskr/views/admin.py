@@ -0,0 +1,88 @@
+# ==========================================================
+# 管理画面
+# ==========================================================
+from flask import Blueprint, jsonify, make_response, render_template, request
+
+from ..board import board_version, build_board
+from ..changes import current_cursor
+from ..db import get_db, get_pool_stats
+from ..logger import get_logger
+from ..scope import current_scope
+from ..serializer import htmlsafe_dumps
+from .helpers import get_board_cache
+
+logger = get_logger(__name__)
+
+bp = Blueprint("admin", __name__)
+
+
+@bp.route("/admin")
+def admin():
+    """管理画面のメインページ"""
+    cache = get_board_cache()
+    scope = current_scope()
+
+    # 書き込みのたびに上がるカウンター。ワーカー間で共有できない構成では
+    # データベースの内容から求める（圧縮の有無で内容が変わるため弱いETagで
+    # 比較する）
+    version = cache.version(scope.user_id)
+    if version is None:
+        with get_db().session() as session:
+            version = board_version(session, scope)
+    etag = cache.etag(scope.user_id, version)
+    if request.if_none_match.contains_weak(etag):
+        response = make_response("", 304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    board = cache.get(scope.user_id, version)
+    if board is None:
+        with get_db().session() as session:
+            # 差分の取得（/api/changes）はボードを構築する前の時刻から始める
+            cursor = current_cursor()
+            data = build_board(session, scope)
+
+            columns = data["columns"]
+            logger.debug(
+                "board built",
+                extra={
+                    "categories": len(data["categories"]),
+                    "tasks": len(data["tasks"]),
+                    "todo": sum(len(ids) for ids in columns["category"].values()),
+                    "progress": len(columns["status"]["progress"]),
+                },
+            )
+
+            # ボードのデータは1回だけエンコードし、文字列のままキャッシュする
+            board = {
+                "categories": data["categories"],
+                "first_category_id": data["first_category_id"],
+                "board_data": htmlsafe_dumps(
+                    {
+                        "tasks": data["tasks"],
+                        "columns": columns,
+                        "cursors": data["cursors"],
+                        "lazy": data["lazy"],
+                        "changes_cursor": cursor,
+                    }
+                ),
+            }
+            cache.set(scope.user_id, version, board)
+
+    response = make_response(render_template("admin.html", **board))
+    response.set_etag(etag, weak=True)
+    # 毎回ETagで再検証させる
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@bp.route("/register", methods=["GET", "POST"])
+def register():
+    """ユーザー登録画面（将来実装予定）"""
+    return render_template("register.html")
+
+
+@bp.route("/admin/pool_stats")
+def pool_stats():
+    """コネクションプールの状態（プールサイズの調整用）"""
+    return jsonify(get_pool_stats(get_db().engine))
@@ -0,0 +1,244 @@
+# ==========================================================
+# ボードのページ単位の取得・検索・まとめて更新するAPI
+# ==========================================================
+import uuid
+
+from flask import Blueprint, Response, jsonify, request
+
+from ..archive import ARCHIVE_STATUS, fetch_archive_page
+from ..board import fetch_page
+from ..changes import current_cursor, fetch_changes, parse_cursor
+from ..db import get_db
+from ..events import get_events, stream
+from ..logger import get_logger
+from ..models import Category, Post
+from ..operations import OperationError, run_operations
+from ..pagination import MAX_PAGE_SIZE, PAGE_SIZE, STATUSES, parse_page_args
+from ..scope import current_scope
+from ..search import MAX_QUERY_LENGTH, decode_cursor, get_search, search_tasks
+from .helpers import current_user_id, get_app_config, invalidates_board
+
+logger = get_logger(__name__)
+
+bp = Blueprint("api", __name__)
+
+
+@bp.route("/api/board/<status>")
+def board_tasks(status):
+    """ステータス別のタスクをページ単位で取得"""
+    if status not in STATUSES:
+        return jsonify({"error": f"無効なステータス: {status}"}), 400
+
+    try:
+        after, limit = parse_page_args(request.args)
+    except ValueError:
+        return jsonify({"error": "無効なページ指定です"}), 400
+
+    scope = current_scope()
+    with get_db().session() as session:
+        if status == ARCHIVE_STATUS:
+            # posts_archive に移したタスクも含めて読み込む
+            tasks, next_cursor = fetch_archive_page(
+                session, scope, after=after, limit=limit
+            )
+        else:
+            tasks, next_cursor = fetch_page(
+                session,
+                scope,
+                Post.status == status,
+                after=after,
+                limit=limit,
+            )
+        return jsonify(
+            {
+                "tasks": tasks,
+                "next_cursor": next_cursor,
+            }
+        )
+
+
+@bp.route("/api/categories/<category_id>/tasks")
+def category_tasks(category_id):
+    """カテゴリー別のタスクをページ単位で取得（既定はTODOのみ）"""
+    status = request.args.get("status", "todo")
+    if status not in STATUSES:
+        return jsonify({"error": f"無効なステータス: {status}"}), 400
+
+    try:
+        category_uuid = uuid.UUID(category_id)
+    except ValueError:
+        return jsonify({"error": "無効なカテゴリーID"}), 400
+
+    try:
+        after, limit = parse_page_args(request.args)
+    except ValueError:
+        return jsonify({"error": "無効なページ指定です"}), 400
+
+    scope = current_scope()
+    with get_db().session() as session:
+        if status == ARCHIVE_STATUS:
+            tasks, next_cursor = fetch_archive_page(
+                session, scope, category_uuid, after=after, limit=limit
+            )
+        else:
+            tasks, next_cursor = fetch_page(
+                session,
+                scope,
+                Post.status == status,
+                Post.category_id == category_uuid,
+                after=after,
+                limit=limit,
+            )
+        # 空のページのときだけ、他のユーザーのカテゴリーでないかを確認する
+        # （存在しない場合と同じく 404。タスクがあれば自分のカテゴリー）
+        if not tasks and after is None:
+            category = session.get(Category, category_uuid)
+            if category is None or not scope.owns(category):
+                return jsonify({"error": "カテゴリーが見つかりません"}), 404
+        return jsonify(
+            {
+                "tasks": tasks,
+                "next_cursor": next_cursor,
+            }
+        )
+
+
+@bp.route("/api/search")
+def search():
+    """タイトル・内容の部分一致でタスクを検索
+
+    q（必須）のほか status・category_id で絞り込める。
+    タイトルに一致したものを先に、更新の新しい順に返す。
+    """
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "検索語を指定してください"}), 400
+    if len(query) > MAX_QUERY_LENGTH:
+        return (
+            jsonify({"error": f"検索語は{MAX_QUERY_LENGTH}文字以内にしてください"}),
+            400,
+        )
+
+    status = request.args.get("status") or None
+    if status is not None and status not in STATUSES:
+        return jsonify({"error": f"無効なステータス: {status}"}), 400
+
+    category_id = request.args.get("category_id") or None
+    if category_id is not None:
+        try:
+            category_id = uuid.UUID(category_id)
+        except ValueError:
+            return jsonify({"error": "無効なカテゴリーID"}), 400
+
+    try:
+        cursor = request.args.get("cursor")
+        after = decode_cursor(cursor) if cursor else None
+        limit = min(int(request.args.get("limit", PAGE_SIZE)), MAX_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError("limit must be positive")
+    except ValueError:
+        return jsonify({"error": "無効なページ指定です"}), 400
+
+    scope = current_scope()
+    with get_db().session() as session:
+        tasks, next_cursor = search_tasks(
+            session,
+            scope,
+            get_search(),
+            query,
+            status=status,
+            category_id=category_id,
+            after=after,
+            limit=limit,
+        )
+    return jsonify({"tasks": tasks, "next_cursor": next_cursor})
+
+
+@bp.route("/api/changes")
+def changes():
+    """カーソル（since）以降に作成・更新・削除されたタスクとカテゴリーを取得
+
+    reset が true の場合、クライアントはボード全体を読み込み直す。
+    次回は返した cursor を since に指定する。
+    """
+    # 取得を始める前の時刻を次のカーソルにする
+    cursor = current_cursor()
+    since = request.args.get("since")
+    if not since:
+        return jsonify({"cursor": cursor, "reset": True})
+
+    try:
+        since = parse_cursor(since)
+    except ValueError:
+        return jsonify({"error": "無効なカーソルです"}), 400
+
+    scope = current_scope()
+    with get_db().session() as session:
+        delta = fetch_changes(
+            session, scope, since, get_app_config().tombstone_retention
+        )
+    if delta is None:
+        return jsonify({"cursor": cursor, "reset": True})
+    return jsonify({"cursor": cursor, "reset": False, **delta})
+
+
+@bp.route("/api/events")
+def events():
+    """ボードの変更を Server-Sent Events で通知
+
+    イベント（board / resync）を受け取ったら /api/changes で差分を取得する。
+    """
+    broadcaster = get_events()
+    subscription = broadcaster.subscribe(current_scope().user_id)
+    if subscription is None:
+        # 接続数の上限（クライアントは手動更新にフォールバックする）
+        return jsonify({"error": "接続数の上限に達しています"}), 503
+
+    config = get_app_config()
+    response = Response(
+        stream(
+            subscription,
+            broadcaster,
+            heartbeat=config.EVENTS_HEARTBEAT,
+            max_age=config.EVENTS_MAX_AGE,
+        ),
+        mimetype="text/event-stream",
+    )
+    response.headers["Cache-Control"] = "no-cache"
+    # nginx などのプロキシでバッファリングさせない
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@bp.route("/api/batch", methods=["POST"])
+@invalidates_board
+def batch():
+    """複数の操作を1つのトランザクションでまとめて適用
+
+    リクエスト: {"operations": [{"op": "move", "id": ..., ...}, ...]}
+    すべての操作を検証してから適用し、操作ごとの結果（code はHTTPステータス）を
+    返す。1件でも失敗した場合はすべてロールバックして失敗した操作の位置
+    （index）を返す。
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or "operations" not in data:
+        return jsonify({"error": "operations が指定されていません"}), 400
+
+    operations = data["operations"]
+    try:
+        results = run_operations(get_db(), operations, current_user_id)
+    except OperationError as e:
+        return jsonify({"error": e.message, "index": e.index}), e.status
+    except Exception as e:
+        logger.exception("batch failed")
+        return jsonify({"error": f"サーバーエラー: {str(e)}"}), 500
+
+    return jsonify(
+        {
+            "success": True,
+            "results": [
+                {"op": item["op"], "code": code, "result": result}
+                for item, (code, result) in zip(operations, results)
+            ],
+        }
+    )
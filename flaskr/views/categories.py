@@ -0,0 +1,159 @@
+# ==========================================================
+# カテゴリーの追加・並び替え・削除
+# ==========================================================
+import uuid
+
+from flask import Blueprint, flash, jsonify, redirect, request, url_for
+
+from .. import purge
+from ..db import get_db
+from ..jobs import get_jobs
+from ..logger import get_logger
+from ..operations import OperationError
+from ..scope import current_scope
+from .helpers import (
+    get_app_config,
+    invalidates_board,
+    operation_response,
+    run_operation,
+    wants_json,
+)
+
+logger = get_logger(__name__)
+
+bp = Blueprint("categories", __name__)
+
+
+@bp.route("/update_category_order", methods=["POST"])
+@invalidates_board
+def update_category_order():
+    """カテゴリの並び順を更新"""
+    data = request.get_json(silent=True)
+
+    if not data or "category_ids" not in data:
+        return jsonify({"error": "カテゴリIDが提供されていません"}), 400
+
+    response, status = operation_response(
+        "reorder_categories", {"category_ids": data["category_ids"]}
+    )
+    if status == 200:
+        result = response.get_json()
+        return jsonify(
+            {
+                "message": "カテゴリの並び順を更新しました",
+                "matched_count": result["matched_count"],
+                "changed_count": result["changed_count"],
+            }
+        )
+    return response, status
+
+
+@bp.route("/move_category/<category_id>", methods=["POST"])
+@invalidates_board
+def move_category(category_id):
+    """カテゴリを前後のカテゴリの間に移動（移動したカテゴリのみ更新）"""
+    data = request.get_json(silent=True) or {}
+    return operation_response(
+        "move_category",
+        {
+            "id": category_id,
+            "before_id": data.get("before_id"),
+            "after_id": data.get("after_id"),
+        },
+    )
+
+
+@bp.route("/admin/add_category", methods=["POST"])
+@invalidates_board
+def add_category():
+    """新しいカテゴリを追加
+
+    JSONを受け付けるリクエスト（category-creator.js）には作成したカテゴリーを、
+    それ以外には管理画面へのリダイレクトを返す。
+    """
+    category_name = request.form.get("category_name", "").strip()
+
+    if wants_json():
+        return operation_response("create_category", {"name": category_name})
+
+    try:
+        run_operation("create_category", {"name": category_name})
+    except OperationError as e:
+        # 管理画面に戻ってエラーを表示する
+        flash(e.message, "error")
+
+    return redirect(url_for("admin.admin"))
+
+
+@bp.route("/admin/delete_category/<category_id>", methods=["POST", "DELETE"])
+@invalidates_board
+def delete_category(category_id):
+    """カテゴリーとそのタスクを削除
+
+    タスクが多い場合はカテゴリーを非表示にして 202 を返し、
+    タスクはバックグラウンドで分割して削除する。
+    """
+    try:
+        category_uuid = uuid.UUID(category_id)
+    except ValueError:
+        return jsonify({"error": "無効なカテゴリーID"}), 400
+
+    config = get_app_config()
+    db = get_db()
+    try:
+        with db.session() as session:
+            try:
+                category_name, task_count, deferred = purge.delete_category(
+                    session,
+                    current_scope(),
+                    category_uuid,
+                    config.CATEGORY_PURGE_THRESHOLD,
+                )
+            except LookupError as e:
+                return jsonify({"error": str(e)}), 404
+            session.commit()
+
+        response = {
+            "success": True,
+            "id": str(category_uuid),
+            "name": category_name,
+            "deleted_tasks": task_count,
+        }
+        if not deferred:
+            logger.info(
+                "category deleted",
+                extra={
+                    "category_id": str(category_uuid),
+                    "deleted_tasks": task_count,
+                },
+            )
+            response["message"] = (
+                f"カテゴリー '{category_name}' と関連タスク {task_count}件を削除しました"
+            )
+            return jsonify(response)
+
+        job_id = get_jobs().submit(
+            "purge_category",
+            purge.purge_category,
+            db.engine,
+            category_uuid,
+            config.CATEGORY_PURGE_BATCH,
+        )
+        response["job_id"] = job_id
+        response["message"] = (
+            f"カテゴリー '{category_name}' の関連タスク {task_count}件を削除しています"
+        )
+        return jsonify(response), 202
+
+    except Exception as e:
+        logger.exception("delete category failed")
+        return jsonify({"error": f"サーバーエラー: {str(e)}"}), 500
+
+
+@bp.route("/admin/jobs/<job_id>")
+def job_status(job_id):
+    """バックグラウンド処理の状態"""
+    status = get_jobs().status(job_id)
+    if status is None:
+        return jsonify({"error": "ジョブが見つかりません"}), 404
+    return jsonify(status)
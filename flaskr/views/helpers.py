@@ -0,0 +1,79 @@
+# ==========================================================
+# ビューで共通して使う関数
+# ==========================================================
+from functools import wraps
+
+from flask import current_app, jsonify, make_response, request
+
+from ..db import get_db
+from ..events import get_events
+from ..logger import get_logger
+from ..operations import OperationError, run_operations
+from ..scope import current_scope
+
+logger = get_logger(__name__)
+
+
+def get_app_config():
+    """現在のアプリケーションの設定（Config）"""
+    return current_app.config["APP_CONFIG"]
+
+
+def get_board_cache():
+    """現在のアプリケーションのボードのキャッシュ"""
+    return current_app.extensions["flaskr_board_cache"]
+
+
+def invalidates_board(view):
+    """成功した書き込み（コミット済み）の後にボードのバージョンを上げ、
+    接続中のクライアントに変更を通知するデコレーター"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        if response.status_code < 400:
+            get_board_cache().bump(current_user_id())
+            try:
+                get_events().publish(
+                    {"type": "board", "user": str(current_user_id())}
+                )
+            except Exception:
+                # 通知に失敗しても書き込み自体は成功している
+                logger.exception("publish board event failed")
+        return response
+
+    return wrapper
+
+
+def wants_json():
+    """リクエストがHTMLよりJSONのレスポンスを求めているか"""
+    best = request.accept_mimetypes.best_match(["application/json", "text/html"])
+    return best == "application/json"
+
+
+def current_user_id():
+    """現在のユーザーのID（リクエストごとに1回だけ解決する）"""
+    return current_scope().user_id
+
+
+def run_operation(op, params):
+    """1件の操作を実行して (HTTPステータス, 結果) を返す
+
+    失敗した場合は OperationError を送出する。
+    """
+    [(status, result)] = run_operations(
+        get_db(), [{**params, "op": op}], current_user_id
+    )
+    return status, result
+
+
+def operation_response(op, params):
+    """1件の操作を実行してJSONのレスポンスを返す（単機能のルート用）"""
+    try:
+        status, result = run_operation(op, params)
+    except OperationError as e:
+        return jsonify({"error": e.message}), e.status
+    except Exception as e:
+        logger.exception("operation failed", extra={"op": op})
+        return jsonify({"error": f"サーバーエラー: {str(e)}"}), 500
+    return jsonify({"success": True, **result}), status
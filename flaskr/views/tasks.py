@@ -0,0 +1,123 @@
+# ==========================================================
+# タスクの追加・編集・並び替え・ステータス変更・削除
+# ==========================================================
+# 処理は flaskr/operations.py の操作として実装し、
+# ここではリクエストを操作のパラメータに変換するだけにする。
+from flask import Blueprint, jsonify, request
+
+from .helpers import invalidates_board, operation_response
+
+bp = Blueprint("tasks", __name__)
+
+
+@bp.route("/update_task_order", methods=["POST"])
+@invalidates_board
+def update_task_order():
+    """タスクのカテゴリと並び順をまとめて更新"""
+    data = request.get_json(silent=True)
+    if not data or "tasks" not in data:
+        return jsonify({"error": "Invalid data format"}), 400
+
+    tasks = data["tasks"]
+    if not isinstance(tasks, list):
+        return jsonify({"error": "Tasks must be a list"}), 400
+    if not all(isinstance(task, dict) and "category_id" in task for task in tasks):
+        return jsonify({"error": "Missing required fields in task data"}), 400
+
+    return operation_response("reorder", {"tasks": tasks})
+
+
+@bp.route("/add_task", methods=["POST"])
+@invalidates_board
+def add_task():
+    """新しいタスクを追加"""
+    if not request.is_json:
+        return jsonify({"error": "JSON形式のリクエストが必要です"}), 400
+
+    data = request.get_json()
+    return operation_response(
+        "create",
+        {
+            "title": data.get("title"),
+            "content": data.get("content"),
+            "category_id": data.get("category_id"),
+        },
+    )
+
+
+@bp.route("/admin/edit_task/<task_id>", methods=["POST"])
+@invalidates_board
+def edit_task(task_id):
+    """タスクを編集"""
+    # リクエストデータの取得
+    data = request.get_json() if request.is_json else request.form
+    return operation_response(
+        "edit",
+        {
+            "id": task_id,
+            "title": data.get("title"),
+            "content": data.get("content"),
+            "category_id": data.get("category_id"),
+        },
+    )
+
+
+@bp.route("/admin/delete_task/<task_id>", methods=["POST"])
+@invalidates_board
+def delete_task(task_id):
+    """タスクを削除"""
+    response, status = operation_response("delete", {"id": task_id})
+    if status != 200:
+        return response, status
+    return "", 204
+
+
+@bp.route("/update_task_status/<task_id>", methods=["POST"])
+@invalidates_board
+def update_task_status(task_id):
+    """タスクのステータスを更新"""
+    if not request.is_json:
+        return jsonify({"error": "JSON形式のリクエストが必要です"}), 400
+
+    data = request.get_json()
+    return operation_response(
+        "set_status", {"id": task_id, "status": data.get("status")}
+    )
+
+
+@bp.route("/update_task_order_by_status", methods=["POST"])
+@invalidates_board
+def update_task_order_by_status():
+    """同一ステータス内でのタスク順序を更新"""
+    data = request.get_json(silent=True)
+    if not data or "tasks" not in data:
+        return jsonify({"error": "Invalid data format"}), 400
+
+    tasks = data["tasks"]
+    if not isinstance(tasks, list):
+        return jsonify({"error": "Tasks must be a list"}), 400
+
+    # statusは必須項目として確認のみ行い、並び順だけを更新する
+    if not all(isinstance(task, dict) and "status" in task for task in tasks):
+        return jsonify({"error": "Missing required fields in task data"}), 400
+
+    rows = [
+        {key: task[key] for key in ("id", "sort_order") if key in task}
+        for task in tasks
+    ]
+    return operation_response("reorder", {"tasks": rows})
+
+
+@bp.route("/move_task/<task_id>", methods=["POST"])
+@invalidates_board
+def move_task(task_id):
+    """タスクを同じステータス内の前後のタスクの間に移動（移動したタスクのみ更新）"""
+    data = request.get_json(silent=True) or {}
+    return operation_response(
+        "move",
+        {
+            "id": task_id,
+            "before_id": data.get("before_id"),
+            "after_id": data.get("after_id"),
+        },
+    )
@@ -0,0 +1,100 @@
+# ==========================================================
+# タスク・カテゴリーのエクスポート・インポート
+# ==========================================================
+import io
+
+from flask import Blueprint, Response, jsonify, request
+from sqlalchemy.exc import IntegrityError
+
+from ..db import get_db
+from ..logger import get_logger
+from ..scope import current_scope
+from ..transfer import (
+    FORMATS,
+    MIMETYPES,
+    TABLES,
+    TransferConflict,
+    TransferError,
+    export_stream,
+    import_records,
+    read_records,
+)
+from .helpers import current_user_id, get_app_config, invalidates_board
+
+logger = get_logger(__name__)
+
+bp = Blueprint("transfer", __name__)
+
+
+@bp.route("/api/export")
+def export():
+    """タスク・カテゴリーを NDJSON / CSV でストリーミング出力
+
+    format（ndjson / csv）と table（categories / posts、CSV では必須）を指定する。
+    """
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in FORMATS:
+        return jsonify({"error": f"無効な形式: {fmt}"}), 400
+    table = request.args.get("table")
+    if table is not None and table not in TABLES:
+        return jsonify({"error": f"無効なテーブル: {table}"}), 400
+    tables = [table] if table else list(TABLES)
+    if fmt == "csv" and len(tables) != 1:
+        return jsonify({"error": "CSV はテーブルの指定が必要です"}), 400
+
+    chunks = export_stream(
+        get_db().engine,
+        current_scope(),
+        tables,
+        fmt,
+        get_app_config().TRANSFER_BATCH_SIZE,
+    )
+    response = Response(chunks, mimetype=MIMETYPES[fmt])
+    filename = f"{table or 'board'}.{fmt}"
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@bp.route("/api/import", methods=["POST"])
+@invalidates_board
+def import_():
+    """NDJSON / CSV のタスク・カテゴリーを取り込む
+
+    本文を行ごとに読みながら書き込むため、大きなファイルでもメモリは一定。
+    format を省略した場合は Content-Type が text/csv なら CSV。
+    """
+    fmt = request.args.get("format") or (
+        "csv" if request.mimetype == "text/csv" else "ndjson"
+    )
+    if fmt not in FORMATS:
+        return jsonify({"error": f"無効な形式: {fmt}"}), 400
+
+    config = get_app_config()
+    lines = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+    try:
+        counts = import_records(
+            get_db().engine,
+            read_records(lines, fmt, request.args.get("table")),
+            current_user_id(),
+            batch_size=config.TRANSFER_BATCH_SIZE,
+            method=config.TRANSFER_METHOD,
+        )
+    except TransferConflict as e:
+        return jsonify({"error": e.message, "line": e.line}), 409
+    except TransferError as e:
+        return jsonify({"error": e.message, "line": e.line}), 400
+    except UnicodeDecodeError:
+        return jsonify({"error": "UTF-8 で送信してください"}), 400
+    except IntegrityError as e:
+        logger.warning("import failed: %s", e.orig)
+        return (
+            jsonify(
+                {
+                    "error": "既に存在するID、または存在しないカテゴリーを"
+                    "参照している行があります"
+                }
+            ),
+            409,
+        )
+    return jsonify({"success": True, "imported": counts})
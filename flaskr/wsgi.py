@@ -0,0 +1,27 @@
+# ==========================================================
+# 本番環境用のWSGIエントリーポイント
+# ==========================================================
+# gunicorn などの pre-fork 型サーバーから読み込む。
+#
+#   $ gunicorn -c gunicorn.conf.py flaskr.wsgi:app
+#
+# preload でマスタープロセスがアプリを読み込んでからワーカーを fork するため、
+# マスターが作ったDB接続やログ出力スレッドはワーカーに引き継がれない（または
+# 共有すると壊れる）。fork 直後に post_fork() を呼んで作り直す。
+from . import create_app
+from .logger import start_listener
+
+app = create_app()
+
+application = app
+
+
+def post_fork():
+    """fork 直後のワーカーで呼び出す"""
+    # マスターから引き継いだ接続は閉じずに破棄する（close=False）。
+    # 閉じるとソケットを共有しているマスター側の接続まで壊れる。
+    # マスターでは通常接続しないが、接続済みの場合に備える
+    app.extensions["flaskr_db"].dispose(close=False)
+    # ログ出力スレッドは fork で引き継がれないので作り直す
+    start_listener()
+
@@ -0,0 +1,87 @@
+# ==========================================================
+# gunicorn の設定
+# ==========================================================
+#   $ gunicorn -c gunicorn.conf.py flaskr.wsgi:app
+#   $ WEB_MODE=asgi gunicorn -c gunicorn.conf.py flaskr.asgi:app
+#
+# ワーカー数・スレッド数などは Config（WEB_*）から取得する。
+# （"config" は gunicorn の設定名と重なるため app_config とする）
+# ワーカー数はコマンドラインの -w ではなく WEB_WORKERS で指定する
+# （アプリもボードのキャッシュの切り替えに同じ値を使うため）。
+import os
+
+# 未指定ならCPU数 × 2 + 1。アプリの Config.WEB_WORKERS も同じ値になるように、
+# flaskr.config を読み込む前に環境変数に設定する（ワーカーにも引き継がれる）
+os.environ.setdefault("WEB_WORKERS", str((os.cpu_count() or 1) * 2 + 1))
+
+from flaskr.config import get_config  # noqa: E402
+
+app_config = get_config()
+
+bind = app_config.WEB_BIND
+workers = app_config.WEB_WORKERS
+threads = app_config.WEB_THREADS
+if app_config.WEB_MODE == "asgi":
+    # JSONの書き込みAPIはイベントループで処理し、それ以外の（Flaskの）
+    # ルートはワーカーごとに WEB_THREADS 個のスレッドで処理する
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    worker_class = "gthread" if app_config.WEB_THREADS > 1 else "sync"
+timeout = app_config.WEB_TIMEOUT
+max_requests = app_config.WEB_MAX_REQUESTS
+max_requests_jitter = app_config.WEB_MAX_REQUESTS // 10
+
+# 開発環境ではコードの変更で再起動する（preload と併用できないため切り替える）
+reload = app_config.DEBUG
+# マスターでアプリを1回だけ読み込み、ワーカーはメモリを共有して起動する
+preload_app = not reload
+
+# アクセスログは出力しない（リクエストの記録は /metrics と アプリのログで行う）
+errorlog = "-"
+
+
+def on_starting(server):
+    from flaskr.metrics import reset_shared_metrics
+
+    # 前回の起動時のワーカーの値を合計に含めない
+    reset_shared_metrics(app_config.METRICS_DIR)
+
+
+def when_ready(server):
+    if workers > 1 and app_config.BOARD_CACHE_BACKEND in ("memory", "local"):
+        server.log.warning(
+            f"BOARD_CACHE_BACKEND={app_config.BOARD_CACHE_BACKEND} はワーカー間で"
+            "共有されないため、ボードのキャッシュを無効にします（redis を推奨）"
+        )
+    if workers > 1 and app_config.EVENTS_BACKEND == "memory":
+        server.log.warning(
+            "EVENTS_BACKEND=memory は同じワーカー内にしか変更を通知しないため、"
+            "他のワーカーに接続したクライアントには届きません（auto / postgres を推奨）"
+        )
+    if (
+        workers > 1
+        and app_config.METRICS_ENABLED
+        and not app_config.METRICS_DIR
+    ):
+        server.log.warning(
+            "METRICS_DIR が未指定のため、/metrics は応答したワーカーの値だけを"
+            "返します（全ワーカーの合計には METRICS_DIR を指定）"
+        )
+    # ASGI モードの /api/events はスレッドを占有しない
+    if (
+        app_config.WEB_MODE != "asgi"
+        and app_config.EVENTS_MAX_SUBSCRIBERS >= threads
+    ):
+        server.log.warning(
+            "EVENTS_MAX_SUBSCRIBERS が WEB_THREADS 以上のため、"
+            "/api/events の接続だけでワーカーのスレッドが埋まることがあります"
+        )
+
+
+def post_fork(server, worker):
+    if app_config.WEB_MODE == "asgi":
+        from flaskr.asgi import post_fork as reset_after_fork
+    else:
+        from flaskr.wsgi import post_fork as reset_after_fork
+
+    reset_after_fork()
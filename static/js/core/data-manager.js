@@ -3,51 +3,72 @@ class DataManager {
     constructor() {
         this.allPosts = {};
         this.postsByStatus = {};
+        // 各列の次ページ取得用カーソル（null は最終ページ）
+        this.cursors = { category: {}, status: {} };
+        // 最初のページを埋め込まない列（表示されたときに読み込む）
+        this.lazy = new Set();
+        // 差分の取得（/api/changes）用カーソル
+        this.changesCursor = null;
+        this.syncing = null;
+        this.loading = new Set();
         this.init();
     }
 
     init() {
         this.loadInitialData();
         this.setupCategoryAnimations();
+        this.setupInfiniteScroll();
+        this.setupLazyColumns();
     }
 
     loadInitialData() {
         try {
-            // カテゴリー別データ（TODOのみ）
-            const categoryData = document.getElementById("all-posts-data")?.textContent;
-            if (categoryData) {
-                this.allPosts = JSON.parse(categoryData);
-            }
+            const boardData = document.getElementById("board-data")?.textContent;
+            const board = boardData ? JSON.parse(boardData) : {};
+            const tasks = board.tasks || {};
+            const columns = board.columns || { category: {}, status: {} };
 
-            // ステータス別データ（全ステータス）
-            const statusData = document.getElementById("posts-by-status-data")?.textContent;
-            if (statusData) {
-                this.postsByStatus = JSON.parse(statusData);
-                
-                // allPostsにステータス別データもマージ
-                Object.keys(this.postsByStatus).forEach(status => {
-                    this.postsByStatus[status].forEach(task => {
-                        const categoryId = task.category_id;
-                        if (!this.allPosts[categoryId]) {
-                            this.allPosts[categoryId] = [];
-                        }
-                        
-                        // 重複チェック
-                        const exists = this.allPosts[categoryId].some(t => t.id === task.id);
-                        if (!exists) {
-                            this.allPosts[categoryId].push(task);
-                        }
-                    });
+            // タスクはIDごとに1つのオブジェクトを各一覧で共有する
+            this.allPosts = {};
+            this.postsByStatus = { todo: [], progress: [], archive: [] };
+
+            // TODO（カテゴリー別）。ステータス別のTODOはカテゴリー順に連結
+            Object.entries(columns.category).forEach(([categoryId, ids]) => {
+                const categoryTasks = ids.map(id => tasks[id]);
+                if (categoryTasks.length) {
+                    this.allPosts[categoryId] = categoryTasks;
+                }
+                this.postsByStatus.todo.push(...categoryTasks);
+            });
+
+            // TODO以外（ステータス別）。カテゴリー別の一覧にも追加する
+            Object.entries(columns.status).forEach(([status, ids]) => {
+                this.postsByStatus[status] = ids.map(id => {
+                    const task = tasks[id];
+                    if (!this.allPosts[task.category_id]) {
+                        this.allPosts[task.category_id] = [];
+                    }
+                    this.allPosts[task.category_id].push(task);
+                    return task;
                 });
+            });
+
+            // 次ページ取得用カーソル
+            if (board.cursors) {
+                this.cursors = board.cursors;
+            }
+            this.lazy = new Set(board.lazy || []);
+            if (board.changes_cursor) {
+                this.changesCursor = board.changes_cursor;
             }
 
             window.allPosts = this.allPosts; // グローバルに公開
             
             console.log("データロード完了:", {
                 categories: Object.keys(this.allPosts).length,
-                todo: this.postsByStatus.todo?.length || 0,
-                progress: this.postsByStatus.progress?.length || 0,
-                archive: this.postsByStatus.archive?.length || 0
+                todo: this.postsByStatus.todo.length,
+                progress: this.postsByStatus.progress.length,
+                archive: this.postsByStatus.archive.length
             });
             
         } catch (error) {
@@ -65,6 +86,222 @@ class DataManager {
         });
     }
 
+    // リストの末尾付近までスクロールしたら次のページを読み込む
+    setupInfiniteScroll() {
+        document.querySelectorAll(".task-list").forEach(list => {
+            list.addEventListener("scroll", () => {
+                const remaining = list.scrollHeight - list.scrollTop - list.clientHeight;
+                if (remaining > 100) return;
+
+                if (list.id === "todo-tasks") {
+                    const categoryId = list.dataset.currentCategoryId;
+                    if (categoryId) {
+                        this.loadMore("category", categoryId, list);
+                    }
+                } else if (list.dataset.status) {
+                    this.loadMore("status", list.dataset.status, list);
+                }
+            });
+        });
+    }
+
+    // アーカイブなどの列は、画面に表示されたときに最初のページを読み込む
+    setupLazyColumns() {
+        this.lazy.forEach(status => {
+            const list = document.querySelector(`.task-list[data-status="${status}"]`);
+            if (!list) return;
+
+            if (!("IntersectionObserver" in window)) {
+                this.loadMore("status", status, list);
+                return;
+            }
+            const observer = new IntersectionObserver(entries => {
+                if (entries.some(entry => entry.isIntersecting)) {
+                    observer.disconnect();
+                    this.loadMore("status", status, list);
+                }
+            });
+            observer.observe(list);
+        });
+    }
+
+    isLazy(kind, key) {
+        return kind === "status" && this.lazy.has(key);
+    }
+
+    hasMore(kind, key) {
+        return Boolean(this.cursors[kind]?.[key]) || this.isLazy(kind, key);
+    }
+
+    async loadMore(kind, key, listElement) {
+        const cursor = this.cursors[kind]?.[key];
+        const lazy = this.isLazy(kind, key);
+        const loadingKey = `${kind}:${key}`;
+        if ((!cursor && !lazy) || this.loading.has(loadingKey)) return [];
+
+        this.loading.add(loadingKey);
+        try {
+            const url = kind === "category"
+                ? `/api/categories/${key}/tasks`
+                : `/api/board/${key}`;
+            const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+            const response = await fetch(`${url}${query}`);
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+
+            const page = await response.json();
+            this.cursors[kind][key] = page.next_cursor;
+
+            if (lazy) {
+                // 読み込む前に移動・差分で追加されたタスクと並び順どおりにまとめる
+                this.lazy.delete(key);
+                page.tasks.forEach(task => {
+                    const taskId = String(task.id);
+                    if (this.getTasksByStatus(task.status).some(t => String(t.id) === taskId)) return;
+                    this.insertSorted(this.postsByStatus, task.status, task);
+                });
+                if (listElement && window.TaskRenderer) {
+                    window.TaskRenderer.renderTaskList(null, listElement);
+                }
+                console.log(`列の読み込み完了 (${loadingKey}):`, page.tasks.length);
+                return page.tasks;
+            }
+
+            page.tasks.forEach(task => {
+                if (kind === "category") {
+                    this.addTaskToCategory(key, task);
+                }
+                if (!this.postsByStatus[task.status]) {
+                    this.postsByStatus[task.status] = [];
+                }
+                this.postsByStatus[task.status].push(task);
+
+                if (listElement && window.TaskRenderer) {
+                    window.TaskRenderer.addTaskToList(task, listElement);
+                }
+            });
+
+            console.log(`次ページ読み込み完了 (${loadingKey}):`, page.tasks.length);
+            return page.tasks;
+        } catch (error) {
+            console.error("次ページの読み込みに失敗しました:", error);
+            return [];
+        } finally {
+            this.loading.delete(loadingKey);
+        }
+    }
+
+    // 前回以降に変更されたタスク・カテゴリーだけを取得して反映する
+    // （ページ全体を読み込み直さない）
+    async syncChanges() {
+        if (this.syncing) return this.syncing;
+
+        this.syncing = (async () => {
+            try {
+                const since = this.changesCursor ? `?since=${encodeURIComponent(this.changesCursor)}` : "";
+                const response = await fetch(`/api/changes${since}`);
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+
+                const changes = await response.json();
+                if (changes.reset) {
+                    // カーソルが古い・変更が多すぎる場合は全体を読み込み直す
+                    location.reload();
+                    return;
+                }
+
+                this.applyChanges(changes);
+                this.changesCursor = changes.cursor;
+            } catch (error) {
+                console.error("差分の取得に失敗しました:", error);
+                location.reload();
+            } finally {
+                this.syncing = null;
+            }
+        })();
+        return this.syncing;
+    }
+
+    applyChanges(changes) {
+        changes.deleted.categories.forEach(categoryId => {
+            this.removeCategory(categoryId);
+            document.querySelector(`.category-item[data-category-id="${categoryId}"]`)?.remove();
+            if (window.getSelectedCategoryId?.() === categoryId) {
+                window.setSelectedCategoryId(null);
+            }
+        });
+
+        changes.categories.forEach(category => this.upsertCategoryElement(category));
+
+        changes.deleted.tasks.forEach(taskId => this.removeTask(taskId));
+        changes.tasks.forEach(task => {
+            this.removeTask(task.id);
+            this.insertSorted(this.allPosts, task.category_id, task);
+            this.insertSorted(this.postsByStatus, task.status, task);
+        });
+
+        // 表示中のリストを描画し直す
+        if (window.TaskRenderer) {
+            document.querySelectorAll(".task-list").forEach(list => {
+                const categoryId = list.id === "todo-tasks" ? window.getSelectedCategoryId?.() : null;
+                window.TaskRenderer.renderTaskList(categoryId, list);
+            });
+        }
+
+        console.log("差分を反映しました:", {
+            categories: changes.categories.length,
+            tasks: changes.tasks.length,
+            deletedCategories: changes.deleted.categories.length,
+            deletedTasks: changes.deleted.tasks.length
+        });
+    }
+
+    upsertCategoryElement(category) {
+        const categoryList = document.getElementById("category-list");
+        if (!categoryList) return;
+
+        const existing = categoryList.querySelector(`.category-item[data-category-id="${category.id}"]`);
+        if (existing) {
+            existing.querySelector(".category-button").textContent = category.name;
+            return;
+        }
+
+        // 新しいカテゴリーは先頭に作成される
+        const li = document.createElement("li");
+        li.className = "category-item animate";
+        li.setAttribute("data-category-id", category.id);
+        const button = document.createElement("button");
+        button.className = "category-button";
+        button.textContent = category.name;
+        li.appendChild(button);
+        categoryList.prepend(li);
+
+        if (!this.allPosts[category.id]) {
+            this.allPosts[category.id] = [];
+        }
+    }
+
+    // sort_order の順を保って追加する
+    insertSorted(groups, key, task) {
+        if (!groups[key]) {
+            groups[key] = [];
+        }
+        const tasks = groups[key];
+        const index = tasks.findIndex(t => t.sort_order > task.sort_order);
+        tasks.splice(index === -1 ? tasks.length : index, 0, task);
+    }
+
+    removeTask(taskId) {
+        const taskIdStr = String(taskId);
+        [this.allPosts, this.postsByStatus].forEach(groups => {
+            Object.keys(groups).forEach(key => {
+                groups[key] = groups[key].filter(task => String(task.id) !== taskIdStr);
+            });
+        });
+    }
+
     getTasksForCategory(categoryId) {
         return this.allPosts[categoryId] || [];
     }
@@ -0,0 +1,38 @@
+// ボードの変更通知（Server-Sent Events）
+// 他のタブ・ユーザーの変更を受け取ったら、差分（/api/changes）だけを取得して反映する
+document.addEventListener("DOMContentLoaded", () => {
+    if (typeof EventSource === "undefined" || !window.dataManager) {
+        console.warn("変更通知を利用できません");
+        return;
+    }
+
+    // 連続した変更はまとめて1回だけ取得する
+    const SYNC_DELAY = 300;
+    let timer = null;
+
+    function scheduleSync() {
+        if (timer) return;
+        timer = setTimeout(() => {
+            timer = null;
+            // 入力中のモーダルがある間は反映を待つ
+            if (document.querySelector(".modal:not(.hidden)")) {
+                scheduleSync();
+                return;
+            }
+            window.dataManager.syncChanges();
+        }, SYNC_DELAY);
+    }
+
+    const source = new EventSource("/api/events");
+    source.addEventListener("board", scheduleSync);
+    // 通知を取りこぼした可能性がある（キューのあふれ・再接続）
+    source.addEventListener("resync", scheduleSync);
+    source.addEventListener("error", () => {
+        // 接続が切れた場合は EventSource が自動で再接続する
+        // （接続数の上限などで失敗した場合は手動更新になる）
+        console.log("変更通知の接続状態:", source.readyState);
+    });
+
+    window.addEventListener("beforeunload", () => source.close());
+    console.log("変更通知の購読を開始");
+});
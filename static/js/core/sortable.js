@@ -1,4 +1,5 @@
 // 並び替え機能（カテゴリー並び替えのみ）
+// 移動したカテゴリーだけをサーバーに送り、1行の更新で済ませる
 document.addEventListener("DOMContentLoaded", () => {
     console.log("Sortable.js初期化開始");
     
@@ -26,33 +27,33 @@ document.addEventListener("DOMContentLoaded", () => {
             onEnd: function(evt) {
                 console.log("カテゴリードラッグ終了");
                 
-                const newOrder = [];
-                document.querySelectorAll(".category-item").forEach(item => {
-                    const categoryId = item.dataset.categoryId;
-                    if (categoryId) {
-                        newOrder.push(categoryId);
-                    }
-                });
+                // 移動したカテゴリーと前後のカテゴリーのIDだけを送信
+                const item = evt.item;
+                const categoryId = item.dataset.categoryId;
+                const beforeId = item.previousElementSibling?.dataset.categoryId || null;
+                const afterId = item.nextElementSibling?.dataset.categoryId || null;
 
-                console.log("新しいカテゴリー順序:", newOrder);
-
-                if (newOrder.length > 0) {
-                    fetch("/update_category_order", {
-                        method: "POST",
-                        headers: { "Content-Type": "application/json" },
-                        body: JSON.stringify({ category_ids: newOrder })
-                    })
-                    .then(res => {
-                        if (!res.ok) {
-                            console.error("カテゴリー順序の更新に失敗しました");
-                        } else {
-                            console.log("カテゴリー順序を更新しました");
-                        }
-                    })
-                    .catch(error => {
-                        console.error("カテゴリー順序更新の通信エラー:", error);
-                    });
+                if (!categoryId || evt.oldIndex === evt.newIndex) {
+                    return;
                 }
+
+                console.log("カテゴリー移動:", { categoryId, beforeId, afterId });
+
+                fetch(`/move_category/${categoryId}`, {
+                    method: "POST",
+                    headers: { "Content-Type": "application/json" },
+                    body: JSON.stringify({ before_id: beforeId, after_id: afterId })
+                })
+                .then(res => {
+                    if (!res.ok) {
+                        console.error("カテゴリー順序の更新に失敗しました");
+                    } else {
+                        console.log("カテゴリー順序を更新しました");
+                    }
+                })
+                .catch(error => {
+                    console.error("カテゴリー順序更新の通信エラー:", error);
+                });
             }
         });
         
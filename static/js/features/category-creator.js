@@ -3,7 +3,7 @@ document.addEventListener("DOMContentLoaded", function () {
     const categoryModal = document.getElementById("category-modal");
     const createCategoryBtn = document.getElementById("create-category-btn");
     const closeCategoryBtn = document.getElementById("close-category-modal");
-    const categoryForm = document.getElementById("category-form"); // フォームがある場合
+    const categoryForm = document.getElementById("category-form");
 
     // モーダル制御
     if (createCategoryBtn && categoryModal) {
@@ -34,13 +34,13 @@ document.addEventListener("DOMContentLoaded", function () {
         }
     });
 
-    // フォーム送信処理（もしカテゴリーフォームがある場合）
+    // フォーム送信処理（ページを読み込み直さずに追加する）
     if (categoryForm) {
         categoryForm.addEventListener("submit", async (e) => {
             e.preventDefault();
             
             const formData = new FormData(categoryForm);
-            const categoryName = formData.get('name');
+            const categoryName = formData.get('category_name')?.trim();
             
             if (!categoryName) {
                 alert("カテゴリー名を入力してください");
@@ -48,14 +48,16 @@ document.addEventListener("DOMContentLoaded", function () {
             }
 
             try {
-                const response = await fetch("/admin/add_category", {
+                const response = await fetch(categoryForm.action, {
                     method: "POST",
+                    headers: { "Accept": "application/json" },
                     body: formData
                 });
 
                 // カテゴリー追加成功後の処理
                 if (response.ok) {
                     categoryModal.classList.add("hidden");
+                    categoryForm.reset();
                     
                     // 削除モードをリセット
                     if (window.deleteModeManager) {
@@ -63,7 +65,8 @@ document.addEventListener("DOMContentLoaded", function () {
                         window.deleteModeManager.setMode('task', false);
                     }
                     
-                    location.reload();
+                    // 追加したカテゴリーだけを取得して反映
+                    await window.dataManager.syncChanges();
                 } else {
                     alert("カテゴリーの追加に失敗しました");
                 }
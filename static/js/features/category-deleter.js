@@ -96,8 +96,7 @@ document.addEventListener('DOMContentLoaded', () => {
     function deleteCategory(categoryId) {
         console.log("カテゴリー削除実行:", categoryId);
         
-        // URLパスを修正（/adminを削除）
-        fetch(`/delete_category/${categoryId}`, {
+        fetch(`/admin/delete_category/${categoryId}`, {
             method: "DELETE",
             headers: {
                 "Content-Type": "application/json",
@@ -114,7 +113,8 @@ document.addEventListener('DOMContentLoaded', () => {
                 }
                 
                 window.deleteModeManager.setMode('category', false);
-                location.reload();
+                // 削除したカテゴリー以外の変更も差分で反映
+                return window.dataManager.syncChanges();
             } else {
                 console.error("カテゴリー削除失敗:", response.status, response.statusText);
                 return response.text().then(text => {
@@ -1,33 +1,36 @@
 // カテゴリー切り替え機能
 document.addEventListener('DOMContentLoaded', () => {
-    const categoryButtons = document.querySelectorAll('.category-button');
+    const categoryList = document.getElementById('category-list');
     const taskList = document.querySelector('#todo-tasks');
+    // 差分の反映でカテゴリーが追加・削除されるため、毎回取得する
+    const getCategoryButtons = () => document.querySelectorAll('.category-button');
     
     let selectedCategoryId = null;
 
-    categoryButtons.forEach(button => {
-        button.addEventListener('click', (event) => {
-            event.stopPropagation();
+    // 追加されたカテゴリーにも効くようにリストで受け取る（イベント委譲）
+    categoryList?.addEventListener('click', (event) => {
+        const button = event.target.closest('.category-button');
+        if (!button) return;
+        event.stopPropagation();
 
-            // アクティブ状態の更新
-            categoryButtons.forEach(btn => btn.classList.remove('active'));
-            button.classList.add('active');
+        // アクティブ状態の更新
+        getCategoryButtons().forEach(btn => btn.classList.remove('active'));
+        button.classList.add('active');
 
-            // カテゴリーIDを取得
-            selectedCategoryId = button.closest('.category-item').dataset.categoryId;
-            
-            // タスクリストにカテゴリーIDを設定
-            if (taskList) {
-                taskList.dataset.currentCategoryId = selectedCategoryId;
-            }
-            
-            console.log("カテゴリー切り替え:", selectedCategoryId);
-            
-            // TODOタスクリストを更新（カテゴリー別にフィルタ）
-            if (window.TaskRenderer && taskList) {
-                window.TaskRenderer.renderTaskList(selectedCategoryId, taskList);
-            }
-        });
+        // カテゴリーIDを取得
+        selectedCategoryId = button.closest('.category-item').dataset.categoryId;
+        
+        // タスクリストにカテゴリーIDを設定
+        if (taskList) {
+            taskList.dataset.currentCategoryId = selectedCategoryId;
+        }
+        
+        console.log("カテゴリー切り替え:", selectedCategoryId);
+        
+        // TODOタスクリストを更新（カテゴリー別にフィルタ）
+        if (window.TaskRenderer && taskList) {
+            window.TaskRenderer.renderTaskList(selectedCategoryId, taskList);
+        }
     });
 
     // 初期化処理：カテゴリー未選択状態
@@ -35,7 +38,7 @@ document.addEventListener('DOMContentLoaded', () => {
         console.log("初期状態: カテゴリー未選択");
         
         // 全てのカテゴリーボタンからactiveクラスを削除
-        categoryButtons.forEach(btn => btn.classList.remove('active'));
+        getCategoryButtons().forEach(btn => btn.classList.remove('active'));
         
         // selectedCategoryIdをnullに設定
         selectedCategoryId = null;
@@ -62,7 +65,7 @@ document.addEventListener('DOMContentLoaded', () => {
         }
         
         // ボタンのアクティブ状態も更新
-        categoryButtons.forEach(btn => {
+        getCategoryButtons().forEach(btn => {
             const categoryId = btn.closest('.category-item').dataset.categoryId;
             btn.classList.toggle('active', categoryId === id);
         });
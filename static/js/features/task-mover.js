@@ -93,6 +93,9 @@ document.addEventListener('DOMContentLoaded', () => {
                 // 同じリスト内での並び替えの場合
                 if (sourceList === targetList) {
                     console.log("同じリスト内での並び替え");
+                    if (evt.oldIndex !== evt.newIndex) {
+                        moveTask(taskElement);
+                    }
                     return;
                 }
 
@@ -187,5 +190,34 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // 移動したタスクと前後のタスクのIDだけを送信して並び順を更新
+    async function moveTask(taskElement) {
+        const taskId = taskElement.getAttribute('data-id');
+        const beforeId = taskElement.previousElementSibling?.getAttribute('data-id') || null;
+        const afterId = taskElement.nextElementSibling?.getAttribute('data-id') || null;
+
+        console.log("moveTask実行:", { taskId, beforeId, afterId });
+
+        try {
+            const response = await fetch(`/move_task/${taskId}`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ before_id: beforeId, after_id: afterId })
+            });
+
+            if (!response.ok) {
+                const errorText = await response.text();
+                throw new Error(`HTTP ${response.status}: ${errorText}`);
+            }
+
+            const result = await response.json();
+            console.log("並び順更新成功:", result);
+        } catch (error) {
+            console.error("タスク並び順更新エラー:", error);
+        }
+    }
+
     console.log("タスク移動機能初期化完了");
 });
\ No newline at end of file
@@ -0,0 +1,83 @@
+# ==========================================================
+# posts_archive に移したタスク
+# ==========================================================
+# 移したタスクと同じIDでは作成・取り込みができないこと（posts の主キー
+# では重複を検出できない）、移したタスクを操作すると posts に戻ることを
+# 確認する。
+import json
+import uuid
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from flaskr.archive import archive_tasks
+from flaskr.models import ArchivedPost, Post
+
+
+@pytest.fixture
+def archived(client, engine):
+    """posts_archive に移したタスクのIDとそのカテゴリーのID"""
+    category_id = str(uuid.uuid4())
+    task_id = str(uuid.uuid4())
+    operations = [
+        {"op": "create_category", "id": category_id, "name": "仕事"},
+        {
+            "op": "create",
+            "id": task_id,
+            "title": "移したタスク",
+            "category_id": category_id,
+        },
+        {"op": "set_status", "id": task_id, "status": "archive"},
+    ]
+    response = client.post("/api/batch", json={"operations": operations})
+    assert response.status_code == 200, response.get_json()
+    assert archive_tasks(engine, timedelta(0)) == 1
+    return {"id": task_id, "category_id": category_id}
+
+
+def counts(engine, task_id):
+    with engine.connect() as conn:
+        return tuple(
+            conn.scalar(
+                select(func.count())
+                .select_from(model)
+                .where(model.id == uuid.UUID(task_id))
+            )
+            for model in (Post, ArchivedPost)
+        )
+
+
+def test_create_with_archived_id_conflicts(client, engine, archived):
+    operation = {
+        "op": "create",
+        "id": archived["id"],
+        "title": "同じID",
+        "category_id": archived["category_id"],
+    }
+    response = client.post("/api/batch", json={"operations": [operation]})
+    assert response.status_code == 409, response.get_json()
+    assert counts(engine, archived["id"]) == (0, 1)
+
+
+def test_import_with_archived_id_conflicts(client, engine, archived):
+    record = {
+        "table": "posts",
+        "id": archived["id"],
+        "title": "同じID",
+        "category_id": archived["category_id"],
+    }
+    response = client.post(
+        "/api/import",
+        data=json.dumps(record) + "\n",
+        content_type="application/x-ndjson",
+    )
+    assert response.status_code == 409, response.get_json()
+    assert counts(engine, archived["id"]) == (0, 1)
+
+
+def test_operating_on_archived_task_restores_it(client, engine, archived):
+    operation = {"op": "set_status", "id": archived["id"], "status": "todo"}
+    response = client.post("/api/batch", json={"operations": [operation]})
+    assert response.status_code == 200, response.get_json()
+    assert counts(engine, archived["id"]) == (1, 0)
@@ -0,0 +1,159 @@
+# ==========================================================
+# ASGI モード（flaskr.asgi:app）のスモークテスト
+# ==========================================================
+# 非同期のルートと Flask のルート（a2wsgi 経由）の両方に、ASGI の
+# ミドルウェアでリクエストID・セキュリティヘッダー・圧縮・計測が
+# 1回ずつ適用されることを確認する。
+import threading
+import time
+import uuid
+
+import pytest
+
+# ASGI モードの依存関係（requirements-asgi.txt）がなければスキップ
+pytest.importorskip("a2wsgi")
+pytest.importorskip("aiosqlite")
+
+from starlette.testclient import TestClient  # noqa: E402
+
+from flaskr import SECURITY_HEADERS  # noqa: E402
+from flaskr.async_api import create_asgi_app  # noqa: E402
+from flaskr.migrations import run_migrations  # noqa: E402
+
+from .conftest import make_config  # noqa: E402
+
+
+@pytest.fixture
+def client(database_url):
+    app = create_asgi_app(
+        make_config(database_url, EVENTS_BACKEND="memory", EVENTS_MAX_AGE=0.2)
+    )
+    db = app.state.flask_app.extensions["flaskr_db"]
+    run_migrations(db.engine)
+    with TestClient(app) as client:
+        yield client
+    db.dispose()
+
+
+def create_tasks(client, count):
+    category_id = str(uuid.uuid4())
+    operations = [
+        {"op": "create_category", "id": category_id, "name": "仕事"}
+    ] + [
+        {
+            "op": "create",
+            "id": str(uuid.uuid4()),
+            "title": f"タスク{i}",
+            "content": "内容" * 20,
+            "category_id": category_id,
+        }
+        for i in range(count)
+    ]
+    return client.post(
+        "/api/batch",
+        json={"operations": operations},
+        headers={"Accept-Encoding": "identity"},
+    )
+
+
+def test_async_and_flask_routes_share_data(client):
+    response = create_tasks(client, 3)
+    assert response.status_code == 200
+    assert response.json()["success"] is True
+    response = client.get("/api/board/todo")
+    assert response.status_code == 200
+    assert len(response.json()["tasks"]) == 3
+
+
+@pytest.mark.parametrize("path", ["/api/batch", "/api/board/todo"])
+def test_security_headers_and_request_id(client, path):
+    if path == "/api/batch":
+        response = client.post(path, json={"operations": []})
+    else:
+        response = client.get(path)
+    for name, value in SECURITY_HEADERS.items():
+        assert response.headers.get_list(name) == [value]
+    request_id = response.headers["X-Request-ID"]
+    assert len(request_id) == 32
+
+    response = client.get(path, headers={"X-Request-ID": "abc"})
+    assert response.headers.get_list("X-Request-ID") == ["abc"]
+
+
+def test_responses_are_compressed_once(client):
+    response = create_tasks(client, 30)
+    assert "Content-Encoding" not in response.headers
+
+    for path in ["/api/board/todo", "/admin"]:
+        response = client.get(path, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers.get_list("Content-Encoding") == ["gzip"]
+        assert "Accept-Encoding" in response.headers["Vary"]
+    # 非同期のルートのレスポンスも圧縮する
+    response = client.post(
+        "/api/batch",
+        json={
+            "operations": [
+                {
+                    "op": "create",
+                    "id": str(uuid.uuid4()),
+                    "title": "長いタスク",
+                    "content": "内容" * 500,
+                    "category_id": client.get("/api/board/todo").json()[
+                        "tasks"
+                    ][0]["category_id"],
+                }
+            ]
+        },
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.json()["success"] is True
+
+
+def test_events_are_served_natively_without_compression(client):
+    with client.stream(
+        "GET", "/api/events", headers={"Accept-Encoding": "gzip"}
+    ) as response:
+        assert response.status_code == 200
+        assert "Content-Encoding" not in response.headers
+        assert response.headers["X-Request-ID"]
+        body = "".join(response.iter_text())
+    assert body.startswith("retry: 3000")
+
+
+def test_metrics_include_async_routes(client):
+    client.post("/api/batch", json={"operations": []})
+    client.get("/api/board/todo")
+    body = client.get("/metrics").text
+    assert (
+        'flaskr_http_requests_total{route="/api/batch",method="POST",'
+        'status="400"} 1'
+    ) in body
+    assert 'route="/api/board/<status>"' in body
+
+
+def test_write_does_not_wait_for_board_event(client):
+    broadcaster = client.app.state.flask_app.extensions["flaskr_events"]
+    release, published = threading.Event(), []
+
+    def publish(event):
+        # NOTIFY の応答が遅い場合の代わり
+        release.wait(5)
+        published.append(event)
+
+    broadcaster.publish = publish
+    etag = client.get("/admin").headers["ETag"]
+    try:
+        assert create_tasks(client, 1).status_code == 200
+        assert published == []
+        # ボードのバージョンは通知を待たずに上がっている
+        response = client.get("/admin", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+    finally:
+        release.set()
+    deadline = time.monotonic() + 5
+    while not published and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [event["type"] for event in published] == ["board"]
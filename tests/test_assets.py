@@ -0,0 +1,103 @@
+# ==========================================================
+# 静的ファイルのビルド
+# ==========================================================
+# 外部のライブラリを記録済みの sha256 と照合すること（記録がない・一致
+# しない場合はビルドを中止する）と、JSの圧縮がテンプレートリテラルを
+# 変えないことを確認する。取得元は file:// のURLに置き換える。
+import hashlib
+import os
+
+import pytest
+
+from flaskr import assets
+
+VENDOR_JS = b"/*! vendor */window.vendor=1;\n"
+VENDOR_CSS = b"*{margin:0}\n"
+
+
+@pytest.fixture
+def static_dir(tmp_path, monkeypatch):
+    """取得元のファイルと BUNDLES の元のファイルを置いた static/"""
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    vendor = {}
+    for name, data in [
+        ("vendor/lib/lib.min.js", VENDOR_JS),
+        ("vendor/reset/reset.min.css", VENDOR_CSS),
+    ]:
+        source = source_dir / os.path.basename(name)
+        source.write_bytes(data)
+        vendor[name] = source.as_uri()
+    monkeypatch.setattr(assets, "VENDOR", vendor)
+    monkeypatch.setattr(
+        assets,
+        "BUNDLES",
+        {
+            "js/app.js": ["vendor/lib/lib.min.js", "js/app.js"],
+            "css/app.css": ["vendor/reset/reset.min.css", "css/app.css"],
+        },
+    )
+
+    static = tmp_path / "static"
+    (static / "js").mkdir(parents=True)
+    (static / "css").mkdir()
+    (static / "js" / "app.js").write_text(
+        "// コメント\nconst html = `<p>\n  ${ name }  </p>`;\n",
+        encoding="utf-8",
+    )
+    (static / "css" / "app.css").write_text(
+        "/* コメント */\nbody {\n  color: red;\n}\n", encoding="utf-8"
+    )
+    return str(static)
+
+
+def test_pin_records_sums_and_build_verifies(static_dir):
+    fetched = assets.fetch_vendor(static_dir, force=True, pin=True)
+    assert sorted(fetched) == sorted(assets.VENDOR)
+    sums = assets.load_sums(static_dir)
+    assert (
+        sums["vendor/lib/lib.min.js"] == hashlib.sha256(VENDOR_JS).hexdigest()
+    )
+
+    manifest = assets.build(static_dir)
+    with open(os.path.join(static_dir, manifest["js/app.js"])) as f:
+        bundled = f.read()
+    assert "window.vendor=1" in bundled
+    assert "コメント" not in bundled
+    # テンプレートリテラルの空白はそのまま
+    if assets.rjsmin is not None:
+        assert "`<p>\n  ${ name }  </p>`" in bundled
+
+
+def test_fetch_refuses_unpinned_files(static_dir):
+    with pytest.raises(assets.VendorError, match="記録されていません"):
+        assets.fetch_vendor(static_dir)
+    assert not os.path.exists(
+        os.path.join(static_dir, "vendor/lib/lib.min.js")
+    )
+
+
+def test_fetch_refuses_changed_files(static_dir, tmp_path):
+    assets.fetch_vendor(static_dir, force=True, pin=True)
+    (tmp_path / "source" / "lib.min.js").write_bytes(b"window.evil=1;\n")
+    with pytest.raises(assets.VendorError, match="一致しません"):
+        assets.fetch_vendor(static_dir, force=True)
+
+
+def test_build_refuses_modified_vendor_files(static_dir):
+    assets.fetch_vendor(static_dir, force=True, pin=True)
+    with open(os.path.join(static_dir, "vendor/lib/lib.min.js"), "ab") as f:
+        f.write(b"window.evil=1;\n")
+    with pytest.raises(assets.VendorError, match="一致しません"):
+        assets.build(static_dir, fetch=False)
+
+
+def test_minify_js_keeps_source_when_template_literals_change(monkeypatch):
+    class BrokenMinifier:
+        @staticmethod
+        def jsmin(source):
+            return source.replace("  ", "")
+
+    monkeypatch.setattr(assets, "rjsmin", BrokenMinifier)
+    source = "const html = `<p>  x</p>`;\n"
+    assert assets.minify_js(source) == source
@@ -0,0 +1,128 @@
+# ==========================================================
+# 操作のまとめての適用（/api/batch）
+# ==========================================================
+# 途中の操作が失敗した場合に全体がロールバックされ、失敗した操作の
+# 位置（index）を返すこと、成功した場合は操作ごとの結果コードを返す
+# ことを確認する。作成・編集のタイトルの検証も同じ処理を使う。
+import uuid
+
+import pytest
+from sqlalchemy import func, select
+
+from flaskr.models import Category, Post
+
+from .conftest import reset_postgres
+
+
+@pytest.fixture(
+    params=["sqlite", pytest.param("postgresql", marks=pytest.mark.postgres)]
+)
+def database_url(request, tmp_path):
+    if request.param == "postgresql":
+        return reset_postgres()
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+def post_batch(client, *operations):
+    return client.post("/api/batch", json={"operations": list(operations)})
+
+
+def count(engine, model):
+    with engine.connect() as conn:
+        return conn.scalar(select(func.count()).select_from(model))
+
+
+def create_category(category_id):
+    return {"op": "create_category", "id": category_id, "name": "仕事"}
+
+
+def create(task_id, category_id, title="タスク"):
+    return {
+        "op": "create",
+        "id": task_id,
+        "title": title,
+        "category_id": category_id,
+    }
+
+
+def test_results_have_per_operation_codes(client):
+    category_id, task_id = str(uuid.uuid4()), str(uuid.uuid4())
+    response = post_batch(
+        client,
+        create_category(category_id),
+        create(task_id, category_id),
+        {"op": "set_status", "id": task_id, "status": "progress"},
+        {"op": "reorder", "tasks": [{"id": task_id, "sort_order": 1}]},
+    )
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [(r["op"], r["code"]) for r in results] == [
+        ("create_category", 201),
+        ("create", 201),
+        ("set_status", 200),
+        ("reorder", 200),
+    ]
+    assert results[3]["result"] == {"updated_count": 1, "matched_count": 1}
+
+
+@pytest.mark.parametrize("failing", [1, 2])
+def test_failing_operation_rolls_back_whole_batch(client, engine, failing):
+    category_id = str(uuid.uuid4())
+    operations = [
+        create_category(category_id),
+        create(str(uuid.uuid4()), category_id),
+        create(str(uuid.uuid4()), category_id),
+    ]
+    # 適用の時点で失敗する操作（存在しないカテゴリー）
+    operations[failing] = create(str(uuid.uuid4()), str(uuid.uuid4()))
+
+    response = post_batch(client, *operations)
+    assert response.status_code == 404
+    assert response.get_json()["index"] == failing
+    assert count(engine, Category) == 0
+    assert count(engine, Post) == 0
+
+
+def test_invalid_operation_is_rejected_before_applying(client, engine):
+    category_id = str(uuid.uuid4())
+    response = post_batch(
+        client,
+        create_category(category_id),
+        {"op": "set_status", "id": str(uuid.uuid4()), "status": "done"},
+    )
+    assert response.status_code == 400
+    assert response.get_json()["index"] == 1
+    assert count(engine, Category) == 0
+
+
+@pytest.mark.parametrize("op", ["create", "edit"])
+def test_title_is_stripped_and_limited(client, engine, op):
+    category_id, task_id = str(uuid.uuid4()), str(uuid.uuid4())
+    response = post_batch(
+        client, create_category(category_id), create(task_id, category_id)
+    )
+    assert response.status_code == 200
+    if op == "create":
+        task_id = str(uuid.uuid4())
+    operation = {**create(task_id, category_id), "op": op}
+
+    response = post_batch(client, {**operation, "title": "x" * 201})
+    assert response.status_code == 400
+    assert "200文字以内" in response.get_json()["error"]
+
+    response = post_batch(client, {**operation, "title": "  " + "x" * 200})
+    assert response.status_code == 200
+    with engine.connect() as conn:
+        title = conn.scalar(
+            select(Post.title).where(Post.id == uuid.UUID(task_id))
+        )
+    assert title == "x" * 200
+
+
+def test_add_category_form_shows_error(client, engine):
+    response = client.post(
+        "/admin/add_category", data={"category_name": "x" * 101}
+    )
+    assert response.status_code == 302
+    assert count(engine, Category) == 0
+    assert "100文字以内" in client.get("/admin").get_data(as_text=True)
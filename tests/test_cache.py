@@ -0,0 +1,212 @@
+# ==========================================================
+# 管理画面のボードのキャッシュ
+# ==========================================================
+# gunicorn の複数ワーカーの代わりに、同じデータベースを使う2つのアプリで
+# 片方の書き込みがもう片方の /admin に反映されることを確認する。
+import os
+import subprocess
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+from sqlalchemy import delete, event, update
+
+from flaskr.cache import (
+    ExternalStoreBackend,
+    LocalStore,
+    NullBackend,
+    create_board_cache,
+)
+from flaskr.models import Post
+
+from .conftest import make_config
+
+CATEGORY_ID = str(uuid.uuid4())
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def add_task(client, title):
+    operations = [{"op": "create", "title": title, "category_id": CATEGORY_ID}]
+    if title == "最初のタスク":
+        operations.insert(
+            0, {"op": "create_category", "id": CATEGORY_ID, "name": "仕事"}
+        )
+    response = client.post("/api/batch", json={"operations": operations})
+    assert response.status_code < 400, response.get_json()
+
+
+def load_admin(client, etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    return client.get("/admin", headers=headers)
+
+
+@pytest.mark.parametrize("backend", ["memory", "local"])
+def test_process_local_backend_is_disabled_with_workers(make_app, backend):
+    app = make_app(BOARD_CACHE_BACKEND=backend, WEB_WORKERS=2)
+    cache = app.extensions["flaskr_board_cache"]
+    assert isinstance(cache.backend, NullBackend)
+
+
+def test_single_worker_keeps_memory_backend(make_app):
+    app = make_app(BOARD_CACHE_BACKEND="memory", WEB_WORKERS=1)
+    cache = app.extensions["flaskr_board_cache"]
+    assert not isinstance(cache.backend, NullBackend)
+
+
+def workers_seen(code):
+    """WEB_WORKERS を指定しない環境で code を実行し、出力を返す
+
+    Config の値は読み込み時に決まるため、別のプロセスで確認する。
+    """
+    env = {k: v for k, v in os.environ.items() if k != "WEB_WORKERS"}
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.split()
+
+
+def test_web_workers_defaults_to_one_process():
+    # flask run などでは memory のキャッシュを無効にしない
+    assert workers_seen(
+        "from flaskr.config import get_config;"
+        "print(get_config().WEB_WORKERS)"
+    ) == ["1"]
+
+
+def test_gunicorn_conf_passes_worker_count_to_app():
+    expected = str((os.cpu_count() or 1) * 2 + 1)
+    assert workers_seen(
+        "import runpy;"
+        "conf = runpy.run_path('gunicorn.conf.py');"
+        "from flaskr.config import get_config;"
+        "print(conf['workers'], get_config().WEB_WORKERS)"
+    ) == [expected, expected]
+
+
+@pytest.mark.parametrize("backend", ["memory", "local"])
+def test_other_worker_write_is_visible(make_app, backend):
+    first = make_app(BOARD_CACHE_BACKEND=backend, WEB_WORKERS=2).test_client()
+    second = make_app(BOARD_CACHE_BACKEND=backend, WEB_WORKERS=2).test_client()
+
+    add_task(first, "最初のタスク")
+    response = load_admin(first)
+    assert "最初のタスク" in response.get_data(as_text=True)
+    etag = response.headers["ETag"]
+    # 変更がなければどちらのワーカーでも304
+    assert load_admin(first, etag).status_code == 304
+    assert load_admin(second, etag).status_code == 304
+
+    # もう片方のワーカーで書き込む
+    add_task(second, "別のワーカーのタスク")
+
+    response = load_admin(first, etag)
+    assert response.status_code == 200
+    assert "別のワーカーのタスク" in response.get_data(as_text=True)
+
+
+def test_shared_store_is_shared_between_workers(make_app):
+    # redis の代わりに同じ LocalStore を2つのアプリで使う
+    store = LocalStore()
+    clients = []
+    for _ in range(2):
+        app = make_app(BOARD_CACHE_BACKEND="redis", WEB_WORKERS=2)
+        app.extensions["flaskr_board_cache"].backend = ExternalStoreBackend(store)
+        clients.append(app.test_client())
+    first, second = clients
+
+    add_task(first, "最初のタスク")
+    etag = load_admin(first).headers["ETag"]
+    assert load_admin(first, etag).status_code == 304
+
+    add_task(second, "別のワーカーのタスク")
+
+    response = load_admin(first, etag)
+    assert response.status_code == 200
+    assert "別のワーカーのタスク" in response.get_data(as_text=True)
+
+
+def test_etag_changes_with_database_writes_without_shared_counter(make_app):
+    # カウンターを共有できない構成ではデータベースの内容から求めるため、
+    # リクエストを経由しない書き込み（別プロセスの処理など）でも変わる
+    app = make_app(BOARD_CACHE_BACKEND="memory", WEB_WORKERS=2)
+    client = app.test_client()
+    engine = app.extensions["flaskr_db"].engine
+    assert app.extensions["flaskr_board_cache"].version("user") is None
+
+    add_task(client, "最初のタスク")
+    etag = load_admin(client).headers["ETag"]
+    with engine.begin() as conn:
+        conn.execute(update(Post).values(title="更新したタスク"))
+    response = load_admin(client, etag)
+    assert response.status_code == 200
+    assert "更新したタスク" in response.get_data(as_text=True)
+
+    # 削除は件数で検知する
+    etag = response.headers["ETag"]
+    with engine.begin() as conn:
+        conn.execute(delete(Post))
+    assert load_admin(client, etag).status_code == 200
+
+
+def count_queries(engine):
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    return statements
+
+
+@pytest.mark.parametrize("backend", ["memory", "none"])
+def test_unchanged_board_is_revalidated_without_queries(app, client, backend):
+    app.extensions["flaskr_board_cache"] = create_board_cache(
+        make_config("sqlite://", BOARD_CACHE_BACKEND=backend)
+    )
+    add_task(client, "最初のタスク")
+    etag = load_admin(client).headers["ETag"]
+
+    statements = count_queries(app.extensions["flaskr_db"].engine)
+    assert load_admin(client, etag).status_code == 304
+    assert statements == []
+
+
+def test_writes_bump_board_version(app, client):
+    cache = app.extensions["flaskr_board_cache"]
+    add_task(client, "最初のタスク")
+    etag = load_admin(client).headers["ETag"]
+    before = cache.version(current_user(app))
+
+    add_task(client, "次のタスク")
+    assert cache.version(current_user(app)) == before + 1
+    response = load_admin(client, etag)
+    assert response.status_code == 200
+    assert "次のタスク" in response.get_data(as_text=True)
+
+    # 失敗した書き込みでは上げない
+    response = client.post(
+        "/api/batch", json={"operations": [{"op": "delete", "id": "x"}]}
+    )
+    assert response.status_code >= 400
+    assert cache.version(current_user(app)) == before + 1
+
+
+def current_user(app):
+    engine = app.extensions["flaskr_db"].engine
+    return app.extensions["flaskr_users"].default_user_id(engine)
+
+
+def test_external_store_counter_starts_once():
+    store = LocalStore()
+    first, second = ExternalStoreBackend(store), ExternalStoreBackend(store)
+    start = first.version("user")
+    assert second.version("user") == start
+    assert second.incr("user") == start + 1
+    assert first.version("user") == start + 1
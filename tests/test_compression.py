@@ -0,0 +1,130 @@
+# ==========================================================
+# レスポンスの圧縮（flaskr/compression.py）
+# ==========================================================
+# Accept-Encoding の q値に応じて brotli / gzip を選ぶこと、圧縮の対象に
+# なるレスポンスには Vary: Accept-Encoding を付けること、圧縮済み・
+# ストリーミング・小さいレスポンスなどは変更しないことを確認する。
+import gzip
+import json
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask, Response, jsonify
+
+from flaskr import compression
+from flaskr.compression import init_compression
+
+BODY = {"tasks": [{"title": f"タスク{i}"} for i in range(200)]}
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    init_compression(
+        app,
+        SimpleNamespace(
+            COMPRESS_MIN_SIZE=1024,
+            COMPRESS_GZIP_LEVEL=6,
+            COMPRESS_BROTLI_QUALITY=4,
+        ),
+    )
+
+    @app.route("/json")
+    def large_json():
+        response = jsonify(BODY)
+        response.set_etag("v1")
+        return response
+
+    @app.route("/small")
+    def small():
+        return jsonify({"ok": True})
+
+    @app.route("/encoded")
+    def encoded():
+        data = gzip.compress(json.dumps(BODY).encode())
+        return Response(
+            data,
+            mimetype="application/json",
+            headers={"Content-Encoding": "gzip"},
+        )
+
+    @app.route("/stream")
+    def stream():
+        return Response(
+            (json.dumps(item) for item in BODY["tasks"]),
+            mimetype="application/json",
+        )
+
+    @app.route("/image")
+    def image():
+        return Response(b"\0" * 4096, mimetype="image/png")
+
+    @app.route("/no-transform")
+    def no_transform():
+        response = jsonify(BODY)
+        response.cache_control.no_transform = True
+        return response
+
+    return app.test_client()
+
+
+def decoded(response):
+    encoding = response.headers.get("Content-Encoding")
+    data = response.get_data()
+    if encoding == "br":
+        data = compression.brotli.decompress(data)
+    elif encoding == "gzip":
+        data = gzip.decompress(data)
+    return json.loads(data)
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        ("gzip", "gzip"),
+        ("gzip, br", "br"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("br;q=0, gzip;q=0.1", "gzip"),
+        ("*", "br"),
+        ("deflate", None),
+        ("gzip;q=0", None),
+        ("", None),
+    ],
+)
+def test_encoding_follows_q_values(client, accept, expected):
+    if expected == "br" or "br" in accept:
+        pytest.importorskip("brotli")
+    response = client.get("/json", headers={"Accept-Encoding": accept})
+    assert response.headers.get("Content-Encoding") == expected
+    assert "Accept-Encoding" in response.vary
+    assert decoded(response) == BODY
+
+
+def test_gzip_only_without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    app = Flask(__name__)
+    compressor = compression.Compressor()
+    assert list(compressor.levels) == ["gzip"]
+    with app.test_request_context(headers={"Accept-Encoding": "br, gzip"}):
+        response = compressor.after_request(jsonify(BODY))
+    assert response.headers["Content-Encoding"] == "gzip"
+
+
+def test_strong_etag_becomes_weak(client):
+    response = client.get("/json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["ETag"] == 'W/"v1"'
+    response = client.get("/json", headers={"Accept-Encoding": "identity"})
+    assert response.headers["ETag"] == '"v1"'
+
+
+@pytest.mark.parametrize(
+    "path", ["/small", "/encoded", "/stream", "/image", "/no-transform"]
+)
+def test_responses_left_unchanged(client, path):
+    identity = client.get(path, headers={"Accept-Encoding": "identity"})
+    response = client.get(path, headers={"Accept-Encoding": "gzip, br"})
+    assert response.get_data() == identity.get_data()
+    assert response.headers.get("Content-Encoding") == identity.headers.get(
+        "Content-Encoding"
+    )
+    assert "Accept-Encoding" not in response.vary
@@ -0,0 +1,131 @@
+# ==========================================================
+# コネクションプールの設定と統計
+# ==========================================================
+# DB_POOL_CLASS="null" では接続を保持せず、キューのプールの設定
+# （DB_POOL_SIZE など）を渡さないこと、/admin/pool_stats がプールの
+# 種類に応じた項目を返し、チェックアウトの待ち・タイムアウトを数える
+# ことを確認する。
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.pool import NullPool, StaticPool
+
+from flaskr.db import (
+    Database,
+    InstrumentedNullPool,
+    InstrumentedQueuePool,
+    async_engine_options,
+    engine_options,
+    get_pool_stats,
+)
+
+from .conftest import make_config
+
+# config フィクスチャのキューのプールの設定
+QUEUE_VALUES = {
+    "pool_size": 1,
+    "max_overflow": 0,
+    "pool_timeout": 0.05,
+    "pool_recycle": 60,
+}
+QUEUE_SETTINGS = set(QUEUE_VALUES)
+CHECKOUT_KEYS = {
+    "checkouts",
+    "checkout_timeouts",
+    "wait_total_ms",
+    "wait_avg_ms",
+    "wait_max_ms",
+}
+QUEUE_KEYS = {
+    "size",
+    "checked_out",
+    "checked_in",
+    "overflow",
+    "max_overflow",
+    "timeout",
+}
+
+
+@pytest.fixture
+def config(database_url):
+    return make_config(
+        database_url,
+        DB_POOL_SIZE=1,
+        DB_MAX_OVERFLOW=0,
+        DB_POOL_TIMEOUT=0.05,
+        DB_POOL_RECYCLE=60,
+    )
+
+
+def test_null_pool_ignores_queue_settings(config):
+    config.DB_POOL_CLASS = "null"
+    options = engine_options(config)
+    assert options["poolclass"] is InstrumentedNullPool
+    assert not QUEUE_SETTINGS & set(options)
+
+    options = async_engine_options(config, config.async_database_url)
+    assert options["poolclass"] is NullPool
+    assert not QUEUE_SETTINGS & set(options)
+
+
+def test_queue_pool_uses_settings(config):
+    options = engine_options(config)
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert {key: options[key] for key in QUEUE_SETTINGS} == QUEUE_VALUES
+    # 非同期のエンジンは既定のプールのクラスに同じ設定を渡す
+    options = async_engine_options(config, config.async_database_url)
+    assert "poolclass" not in options
+    assert {key: options[key] for key in QUEUE_SETTINGS} == QUEUE_VALUES
+
+
+@pytest.mark.parametrize("url", ["sqlite://", "sqlite:///:memory:"])
+def test_memory_sqlite_shares_one_connection(config, url):
+    assert engine_options(config, url)["poolclass"] is StaticPool
+
+
+def test_null_pool_stats_have_checkout_counts_only(config):
+    config.DB_POOL_CLASS = "null"
+    engine = Database(config).engine
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    stats = get_pool_stats(engine)
+    assert set(stats) == {"pool_class", *CHECKOUT_KEYS}
+    assert stats["pool_class"] == "InstrumentedNullPool"
+    assert stats["checkouts"] == 3
+    engine.dispose()
+
+
+def test_queue_pool_stats_count_timeouts(config):
+    database = Database(config)
+    engine = database.engine
+    with engine.connect():
+        stats = get_pool_stats(engine)
+        assert set(stats) == {"pool_class", *QUEUE_KEYS, *CHECKOUT_KEYS}
+        assert stats["size"] == 1
+        assert stats["checked_out"] == 1
+        # プールの上限に達している間の取得はタイムアウトする
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    stats = get_pool_stats(engine)
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 1
+    assert stats["checkout_timeouts"] == 1
+    assert stats["wait_max_ms"] >= 50
+
+    # 作り直したプールにも統計を引き継ぐ
+    database.dispose()
+    assert get_pool_stats(engine)["checkout_timeouts"] == 1
+    engine.dispose()
+
+
+def test_pool_stats_route(make_app):
+    client = make_app(DB_POOL_CLASS="null").test_client()
+    body = client.get("/admin/pool_stats").get_json()
+    assert body["pool_class"] == "InstrumentedNullPool"
+    assert CHECKOUT_KEYS <= set(body)
+
+    client = make_app().test_client()
+    body = client.get("/admin/pool_stats").get_json()
+    assert body["pool_class"] == "InstrumentedQueuePool"
+    assert QUEUE_KEYS | CHECKOUT_KEYS <= set(body)
@@ -0,0 +1,145 @@
+# ==========================================================
+# ボードの変更通知（/api/events）
+# ==========================================================
+# ASGI モードの SSE がイベントループ上で待ち（接続数が WEB_THREADS に
+# 縛られない）、他のスレッドから配信したイベントを受け取ること、
+# PostgreSQL の NOTIFY が1つの接続を使い回すことを確認する。
+import asyncio
+import threading
+import time
+
+import pytest
+
+from flaskr.events import Broadcaster, PostgresBroadcaster, astream
+from flaskr.migrations import run_migrations
+
+from .conftest import make_config
+
+
+async def collect(subscription, broadcaster, heartbeat, max_age):
+    return [
+        chunk
+        async for chunk in astream(
+            subscription, broadcaster, heartbeat=heartbeat, max_age=max_age
+        )
+    ]
+
+
+def test_astream_receives_events_from_other_threads():
+    broadcaster = Broadcaster(max_subscribers=1)
+    subscription = broadcaster.subscribe("u1")
+
+    async def main():
+        task = asyncio.create_task(
+            collect(subscription, broadcaster, heartbeat=10, max_age=0.5)
+        )
+        await asyncio.sleep(0.05)
+        # LISTEN のスレッドからの配信と同じく別のスレッドから送る
+        threading.Thread(
+            target=broadcaster.publish, args=({"type": "board", "user": "u1"},)
+        ).start()
+        return await task
+
+    started = time.monotonic()
+    chunks = asyncio.run(main())
+    assert chunks[0] == "retry: 3000\n\n"
+    assert any(chunk.startswith("event: board") for chunk in chunks)
+    # heartbeat まで待たずに届き、max_age で閉じる
+    assert time.monotonic() - started < 2
+    assert broadcaster.stats()["subscribers"] == 0
+
+
+def test_astream_sends_heartbeat():
+    broadcaster = Broadcaster()
+    subscription = broadcaster.subscribe()
+    chunks = asyncio.run(
+        collect(subscription, broadcaster, heartbeat=0.05, max_age=0.3)
+    )
+    assert ": ping\n\n" in chunks
+
+
+@pytest.fixture
+def asgi_app(database_url):
+    # ASGI モードの依存関係（requirements-asgi.txt）がなければスキップ
+    pytest.importorskip("a2wsgi")
+    pytest.importorskip("aiosqlite")
+    from flaskr.async_api import create_asgi_app
+
+    app = create_asgi_app(
+        make_config(
+            database_url,
+            WEB_THREADS=2,
+            EVENTS_BACKEND="memory",
+            EVENTS_MAX_SUBSCRIBERS=100,
+            EVENTS_HEARTBEAT=0.1,
+            EVENTS_MAX_AGE=0.5,
+        )
+    )
+    db = app.state.flask_app.extensions["flaskr_db"]
+    run_migrations(db.engine)
+    yield app
+    db.dispose()
+
+
+def test_asgi_events_do_not_hold_threads(asgi_app):
+    httpx = pytest.importorskip("httpx")
+
+    async def main():
+        transport = httpx.ASGITransport(app=asgi_app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            started = time.monotonic()
+            responses = await asyncio.gather(
+                *(client.get("/api/events") for _ in range(50))
+            )
+            return responses, time.monotonic() - started
+
+    responses, elapsed = asyncio.run(main())
+    assert all(r.status_code == 200 for r in responses)
+    assert responses[0].headers["content-type"].startswith("text/event-stream")
+    assert responses[0].text.startswith("retry: 3000")
+    # スレッド（WEB_THREADS=2）で処理すると 50 / 2 * 0.5 秒かかる
+    assert elapsed < 5
+
+
+def test_asgi_events_limit_subscribers(asgi_app):
+    httpx = pytest.importorskip("httpx")
+    broadcaster = asgi_app.state.flask_app.extensions["flaskr_events"]
+    broadcaster.max_subscribers = 0
+
+    async def main():
+        transport = httpx.ASGITransport(app=asgi_app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            return await client.get("/api/events")
+
+    assert asyncio.run(main()).status_code == 503
+
+
+@pytest.mark.postgres
+def test_postgres_publish_reuses_connection(pg_url):
+    from flaskr.db import Database
+
+    db = Database(make_config(pg_url))
+    broadcaster = PostgresBroadcaster(db, "flaskr_test", poll_interval=0.1)
+    subscription = broadcaster.subscribe()
+    try:
+        # LISTEN の開始（RESYNC の配信）を待つ
+        assert subscription.get(timeout=5) == {"type": "resync"}
+        broadcaster.publish({"type": "board"})
+        connection = broadcaster._publisher
+        broadcaster.publish({"type": "board"})
+        assert broadcaster._publisher is connection
+        assert subscription.get(timeout=5) == {"type": "board"}
+        assert subscription.get(timeout=5) == {"type": "board"}
+
+        # 接続が切れていれば作り直して発行する
+        connection.close()
+        broadcaster.publish({"type": "board"})
+        assert broadcaster._publisher is not connection
+        assert subscription.get(timeout=5) == {"type": "board"}
+    finally:
+        broadcaster.unsubscribe(subscription)
+        db.dispose()
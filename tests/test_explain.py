@@ -0,0 +1,124 @@
+# ==========================================================
+# ボード・APIのクエリの実行計画
+# ==========================================================
+# ビューと同じ関数が発行したSQLを EXPLAIN し、すべてのスキャンが
+# user_id（またはユーザーのカテゴリー）から始まるインデックスで
+# 絞り込まれていることを確認する（flaskr.migrations.explain_board_queries）。
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert, text
+
+from benchmarks.seed import seed
+from flaskr.archive import archive_tasks
+from flaskr.migrations import (
+    explain_board_queries,
+    run_migrations,
+    unscoped_scans,
+)
+from flaskr.models import Tombstone
+
+from .conftest import reset_postgres
+
+QUERY_NAMES = [
+    "ボードのバージョン（/admin のETag）",
+    "ボード（/admin）",
+    "progress列（/api/board/progress）",
+    "カテゴリー別TODO列（/api/categories/<id>/tasks）",
+    "アーカイブ列（/api/board/archive）",
+    "差分（/api/changes）",
+    "検索（/api/search）",
+    "エクスポート（/api/export）",
+]
+
+
+def add_tombstones(engine, user_ids, count):
+    now = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Tombstone),
+            [
+                {
+                    "kind": "post",
+                    "object_id": uuid.uuid4(),
+                    "user_id": user_id,
+                    "deleted_at": now - timedelta(minutes=i),
+                }
+                for user_id in user_ids
+                for i in range(count)
+            ],
+        )
+
+
+@pytest.fixture(scope="module")
+def plans():
+    """1人のユーザーと、その10倍のタスクを持つ他のユーザーのデータでの実行計画"""
+    engine = create_engine(reset_postgres())
+    run_migrations(engine)
+    [user_id], _ = seed(engine, 2000)
+    others, _ = seed(engine, 20000, users=10, seed_value=1)
+    # アーカイブの列・差分が posts_archive・tombstones も読むようにする
+    archive_tasks(engine, timedelta(days=7))
+    add_tombstones(engine, [user_id, *others], 200)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    results = {
+        name: (plan, ok)
+        for name, plan, ok in explain_board_queries(engine, user_id)
+    }
+    engine.dispose()
+    return results
+
+
+@pytest.mark.postgres
+@pytest.mark.parametrize("name", QUERY_NAMES)
+def test_query_uses_user_index(plans, name):
+    plan, ok = plans[name]
+    assert not unscoped_scans(plan), plan
+    assert ok, plan
+
+
+@pytest.mark.postgres
+def test_all_app_queries_are_checked(plans):
+    assert list(plans) == QUERY_NAMES
+
+
+def test_unscoped_scans_detects_filtered_user():
+    plan = """Limit
+  ->  Index Scan using ix_posts_archive_sort on posts_archive
+        Filter: ((user_id = 'e3e7'::uuid) AND ((status)::text = 'archive'::text))"""
+    assert unscoped_scans(plan) == [
+        "Index Scan using ix_posts_archive_sort on posts_archive"
+    ]
+
+
+def test_unscoped_scans_detects_full_scans():
+    plan = """Hash Join
+  ->  Seq Scan on categories
+  ->  Index Only Scan using ix_posts_updated on posts
+  ->  Index Scan using users_pkey on users"""
+    assert unscoped_scans(plan) == [
+        "Seq Scan on categories",
+        "Index Only Scan using ix_posts_updated on posts",
+    ]
+    assert unscoped_scans(
+        "SCAN posts USING COVERING INDEX ix_posts_status_sort"
+    )
+
+
+def test_unscoped_scans_accepts_user_index():
+    plan = """Nested Loop
+  ->  Index Only Scan using ix_posts_user_status_sort on posts posts_1
+        Index Cond: ((user_id = 'e3e7'::uuid) AND (status = 'progress'::text))
+  ->  Index Scan using ix_posts_category_status_sort on posts
+        Index Cond: ((category_id = 'f728'::uuid) AND (status = 'todo'::text))
+        Filter: (user_id = 'e3e7'::uuid)
+  ->  Bitmap Heap Scan on categories
+        Recheck Cond: (user_id = 'e3e7'::uuid)
+        ->  Bitmap Index Scan on ix_categories_user_sort
+              Index Cond: (user_id = 'e3e7'::uuid)"""
+    assert unscoped_scans(plan) == []
+    assert not unscoped_scans(
+        "SEARCH posts USING INDEX ix_posts_user_status_sort (user_id=? AND status=?)"
+    )
@@ -0,0 +1,86 @@
+# ==========================================================
+# ログ出力（DEBUGログのサンプリング・JSON形式）
+# ==========================================================
+# DEBUG以下のログだけが割合・1秒あたりの件数で間引かれ、INFO以上は
+# 常に通ること、件数はメッセージごと・1秒ごとに数えることを確認する。
+import json
+import logging
+
+import pytest
+
+from flaskr import logger as flaskr_logger
+from flaskr.logger import DebugSampler, JsonFormatter, parse_levels
+
+
+def record(level=logging.DEBUG, msg="sql %s", name="flaskr.test", **extra):
+    item = logging.LogRecord(name, level, __file__, 1, msg, ("x",), None)
+    item.__dict__.update(extra)
+    return item
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.monotonic() の値（秒）を変更できるようにする"""
+    now = [100.0]
+    monkeypatch.setattr(flaskr_logger.time, "monotonic", lambda: now[0])
+    return now
+
+
+def passed(sampler, records):
+    return sum(sampler.filter(item) for item in records)
+
+
+@pytest.mark.parametrize("level", [logging.INFO, logging.WARNING])
+def test_info_and_above_are_never_sampled(clock, level):
+    sampler = DebugSampler(rate=0.0, per_second=1)
+    assert passed(sampler, [record(level) for _ in range(5)]) == 5
+
+
+def test_rate_drops_debug_records(monkeypatch):
+    values = iter([0.05, 0.5, 0.09, 0.95])
+    monkeypatch.setattr(flaskr_logger.random, "random", lambda: next(values))
+    sampler = DebugSampler(rate=0.1)
+    assert [sampler.filter(record()) for _ in range(4)] == [
+        True,
+        False,
+        True,
+        False,
+    ]
+
+
+def test_rate_limit_per_message_and_second(clock):
+    sampler = DebugSampler(per_second=2)
+    assert passed(sampler, [record() for _ in range(5)]) == 2
+    # 別のメッセージ・別のロガーは別に数える
+    assert passed(sampler, [record(msg="other") for _ in range(5)]) == 2
+    assert (
+        passed(sampler, [record(name="flaskr.other") for _ in range(5)]) == 2
+    )
+
+    clock[0] += 0.5
+    assert passed(sampler, [record()]) == 0
+    clock[0] += 0.5
+    assert passed(sampler, [record() for _ in range(5)]) == 2
+
+
+def test_no_rate_limit_by_default(clock):
+    sampler = DebugSampler()
+    assert passed(sampler, [record() for _ in range(100)]) == 100
+
+
+def test_json_formatter_includes_extra_and_request_id():
+    line = JsonFormatter().format(
+        record(logging.INFO, request_id="abc", user_id="u1")
+    )
+    entry = json.loads(line)
+    assert entry["level"] == "INFO"
+    assert entry["message"] == "sql x"
+    assert entry["request_id"] == "abc"
+    assert entry["user_id"] == "u1"
+
+
+def test_parse_levels():
+    assert parse_levels(" flaskr.main=debug, sqlalchemy.engine=INFO,x") == {
+        "flaskr.main": "DEBUG",
+        "sqlalchemy.engine": "INFO",
+    }
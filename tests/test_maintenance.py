@@ -0,0 +1,121 @@
+# ==========================================================
+# 定期的な後片付け（削除の記録の整理・中断したカテゴリーの削除の再開）
+# ==========================================================
+# 保持期間を過ぎた削除の記録だけが消えること、それより古いカーソルの
+# /api/changes はボード全体を読み込み直させること、中断したカテゴリーの
+# 削除がスレッド・コマンドから再開されることを確認する。
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, insert, select, update
+
+from flaskr.changes import TIMEZONE
+from flaskr.models import Category, Post, Tombstone
+from flaskr.tombstones import prune_tombstones
+
+from .conftest import reset_postgres
+
+
+@pytest.fixture(
+    params=["sqlite", pytest.param("postgresql", marks=pytest.mark.postgres)]
+)
+def database_url(request, tmp_path):
+    if request.param == "postgresql":
+        return reset_postgres()
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+def create_category(client, tasks=2):
+    category_id = str(uuid.uuid4())
+    operations = [
+        {"op": "create_category", "id": category_id, "name": "仕事"}
+    ] + [
+        {"op": "create", "title": f"タスク{i}", "category_id": category_id}
+        for i in range(tasks)
+    ]
+    response = client.post("/api/batch", json={"operations": operations})
+    assert response.status_code == 200, response.get_json()
+    return uuid.UUID(category_id)
+
+
+def start_purge(engine, category_id, ago):
+    """削除処理を ago 前に始めて中断した状態にする"""
+    with engine.begin() as conn:
+        conn.execute(
+            update(Category)
+            .where(Category.id == category_id)
+            .values(deleted_at=datetime.now(TIMEZONE) - ago)
+        )
+
+
+def count(engine, model, *criteria):
+    with engine.connect() as conn:
+        return conn.scalar(
+            select(func.count()).select_from(model).where(*criteria)
+        )
+
+
+def test_prune_keeps_records_within_retention(app, engine):
+    now = datetime.now(TIMEZONE)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Tombstone),
+            [
+                {
+                    "kind": "task",
+                    "object_id": uuid.uuid4(),
+                    "deleted_at": now - timedelta(days=days),
+                }
+                for days in (0, 6, 8, 30)
+            ],
+        )
+    assert prune_tombstones(engine, timedelta(days=7)) == 2
+    assert count(engine, Tombstone) == 2
+    assert prune_tombstones(engine, timedelta(days=7)) == 0
+
+
+def test_changes_cursor_past_retention_resets(client):
+    category_id = create_category(client, tasks=1)
+    retention = timedelta(days=7)
+    old = (
+        datetime.now(TIMEZONE) - retention - timedelta(hours=1)
+    ).isoformat()
+    response = client.get("/api/changes", query_string={"since": old})
+    assert response.get_json()["reset"] is True
+
+    recent = (
+        datetime.now(TIMEZONE) - retention + timedelta(hours=1)
+    ).isoformat()
+    response = client.get("/api/changes", query_string={"since": recent})
+    body = response.get_json()
+    assert body["reset"] is False
+    assert str(category_id) in {c["id"] for c in body["categories"]}
+
+
+def test_command_resumes_interrupted_purges(app, client, engine):
+    category_id = create_category(client)
+    start_purge(engine, category_id, timedelta(seconds=1))
+
+    result = app.test_cli_runner().invoke(args=["maintenance", "run"])
+    assert result.exit_code == 0, result.output
+    assert count(engine, Category, Category.id == category_id) == 0
+    assert count(engine, Post, Post.category_id == category_id) == 0
+    # 削除の記録はカテゴリーの1件だけ
+    assert count(engine, Tombstone, Tombstone.object_id == category_id) == 1
+
+
+def test_runner_skips_purges_that_may_still_be_running(make_app):
+    app = make_app(MAINTENANCE_INTERVAL=600)
+    client = app.test_client()
+    engine = app.extensions["flaskr_db"].engine
+    running = create_category(client)
+    start_purge(engine, running, timedelta(seconds=1))
+    interrupted = create_category(client)
+    start_purge(engine, interrupted, timedelta(hours=1))
+
+    runner = app.extensions["flaskr_maintenance"]
+    purged, _ = runner.run_once()
+    assert purged == [interrupted]
+    assert count(engine, Category, Category.id == running) == 1
+    runner.stop()
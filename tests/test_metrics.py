@@ -0,0 +1,124 @@
+# ==========================================================
+# /metrics の全ワーカーの合計（METRICS_DIR）
+# ==========================================================
+# 同じ METRICS_DIR を使う複数のアプリ（ワーカーの代わり）のどれに
+# /metrics を問い合わせても全ワーカーの合計になること、終了した
+# ワーカーのカウンターは残りゲージは除かれることを確認する。
+import json
+
+import pytest
+
+from flaskr.metrics import reset_shared_metrics
+
+REQUESTS = (
+    'flaskr_http_requests_total{route="/api/board/<status>",'
+    'method="GET",status="200"}'
+)
+
+
+def sample(body, name):
+    for line in body.splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+@pytest.fixture
+def metrics_dir(tmp_path):
+    return str(tmp_path / "metrics")
+
+
+def test_metrics_are_summed_across_workers(make_app, metrics_dir):
+    workers = [
+        make_app(METRICS_DIR=metrics_dir, METRICS_FLUSH_INTERVAL=0)
+        for _ in range(2)
+    ]
+    first, second = (app.test_client() for app in workers)
+    first.get("/api/board/todo")
+    first.get("/api/board/todo")
+    second.get("/api/board/todo")
+
+    for client in (first, second):
+        body = client.get("/metrics").text
+        assert sample(body, REQUESTS) == 3
+        # ヒストグラムも合計する
+        assert (
+            sample(
+                body,
+                "flaskr_http_request_duration_seconds_count"
+                '{route="/api/board/<status>",method="GET"}',
+            )
+            == 3
+        )
+
+
+def test_without_metrics_dir_each_worker_reports_its_own(make_app):
+    first, second = (make_app().test_client() for _ in range(2))
+    first.get("/api/board/todo")
+    second.get("/api/board/todo")
+    assert sample(first.get("/metrics").text, REQUESTS) == 1
+
+
+def test_exited_workers_keep_counters_but_not_gauges(make_app, metrics_dir):
+    client = make_app(
+        METRICS_DIR=metrics_dir, METRICS_FLUSH_INTERVAL=0
+    ).test_client()
+    client.get("/api/board/todo")
+    # 終了したワーカー（存在しないプロセスID）の値
+    exited = {
+        "metrics": {
+            "flaskr_http_requests_total": [
+                [["/api/board/<status>", "GET", "200"], 5]
+            ]
+        },
+        "collected": [
+            ["flaskr_db_pool_checked_out", "gauge", "checked_out", 7],
+            ["flaskr_db_pool_checkouts_total", "counter", "checkouts", 11],
+        ],
+    }
+    with open(f"{metrics_dir}/999999999-1.json", "w") as f:
+        json.dump(exited, f)
+
+    body = client.get("/metrics").text
+    assert sample(body, REQUESTS) == 6
+    assert sample(body, "flaskr_db_pool_checked_out") == 0
+    assert sample(body, "flaskr_db_pool_checkouts_total") > 11
+
+    # 次の起動時（gunicorn の on_starting）には前回の値を消す
+    reset_shared_metrics(metrics_dir)
+    client = make_app(
+        METRICS_DIR=metrics_dir, METRICS_FLUSH_INTERVAL=0
+    ).test_client()
+    client.get("/api/board/todo")
+    assert sample(client.get("/metrics").text, REQUESTS) == 1
+
+
+@pytest.mark.parametrize("propagate", [True, False])
+def test_unhandled_exceptions_are_recorded(make_app, propagate):
+    app = make_app()
+    app.config["PROPAGATE_EXCEPTIONS"] = propagate
+
+    @app.route("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    client = app.test_client()
+    if propagate:
+        # after_request が呼ばれない場合も teardown_request で記録する
+        with pytest.raises(RuntimeError):
+            client.get("/boom")
+    else:
+        assert client.get("/boom").status_code == 500
+
+    metrics = app.extensions["flaskr_metrics"]
+    # 開始時刻はリクエストの終わりに消す
+    assert metrics._local.start is None
+    body = client.get("/metrics").text
+    assert (
+        sample(
+            body,
+            "flaskr_http_requests_total"
+            '{route="/boom",method="GET",status="500"}',
+        )
+        == 1
+    )
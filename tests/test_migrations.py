@@ -0,0 +1,56 @@
+# ==========================================================
+# マイグレーション
+# ==========================================================
+# 空のデータベースに順に適用した結果が、モデル（flaskr/models.py）の
+# 定義と同じ列・インデックスになることを確認する。テーブルはステップを
+# 追加した時点の定義で作成するため、モデルから削除したインデックスは
+# 後のステップで削除されている必要がある。
+import pytest
+from sqlalchemy import create_engine, inspect
+
+from flaskr.migrations import run_migrations
+from flaskr.models import Base
+
+from .conftest import reset_postgres
+
+# PostgreSQL だけで作成する（SQLite では n-gram のプロセス内インデックスを使う）
+POSTGRES_ONLY_INDEXES = {"posts": {"ix_posts_search_bigram"}}
+
+
+@pytest.fixture(
+    params=["sqlite", pytest.param("postgresql", marks=pytest.mark.postgres)]
+)
+def migrated(request, tmp_path):
+    if request.param == "postgresql":
+        url = reset_postgres()
+    else:
+        url = f"sqlite:///{tmp_path / 'test.db'}"
+    engine = create_engine(url)
+    run_migrations(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_migrated_schema_matches_models(migrated):
+    inspector = inspect(migrated)
+    extra = {}
+    if migrated.dialect.name == "postgresql":
+        extra = POSTGRES_ONLY_INDEXES
+    for table in Base.metadata.sorted_tables:
+        columns = inspector.get_columns(table.name)
+        assert {column["name"] for column in columns} == set(
+            table.columns.keys()
+        ), table.name
+
+        # 一意制約のインデックス（PostgreSQL）は除く
+        indexes = {
+            index["name"]
+            for index in inspector.get_indexes(table.name)
+            if "duplicates_constraint" not in index
+        }
+        expected = {index.name for index in table.indexes}
+        assert indexes == expected | extra.get(table.name, set()), table.name
+
+
+def test_migrations_are_idempotent(migrated):
+    assert run_migrations(migrated) == []
@@ -0,0 +1,122 @@
+# ==========================================================
+# 並び順の一括更新（reorder・reorder_categories）
+# ==========================================================
+# 同じIDが複数回含まれる場合は最後の値が採用されること、存在しない
+# IDは一致した件数に含めず、行も作成しないことを確認する
+# （PostgreSQL は UPDATE ... FROM VALUES、SQLite は executemany）。
+import uuid
+
+import pytest
+from sqlalchemy import func, select
+
+from flaskr.models import Category, Post
+
+from .conftest import reset_postgres
+
+
+@pytest.fixture(
+    params=["sqlite", pytest.param("postgresql", marks=pytest.mark.postgres)]
+)
+def database_url(request, tmp_path):
+    if request.param == "postgresql":
+        return reset_postgres()
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+def batch(client, *operations):
+    response = client.post("/api/batch", json={"operations": operations})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()["results"]
+
+
+def create_tasks(client, count):
+    category_id = str(uuid.uuid4())
+    ids = [str(uuid.uuid4()) for _ in range(count)]
+    batch(
+        client,
+        {"op": "create_category", "id": category_id, "name": "仕事"},
+        *[
+            {
+                "op": "create",
+                "id": task_id,
+                "title": f"タスク{i}",
+                "category_id": category_id,
+            }
+            for i, task_id in enumerate(ids)
+        ],
+    )
+    return category_id, ids
+
+
+def ranks(engine, model):
+    with engine.connect() as conn:
+        return {
+            str(row.id): row.sort_order
+            for row in conn.execute(select(model.id, model.sort_order))
+        }
+
+
+def count(engine, model):
+    with engine.connect() as conn:
+        return conn.scalar(select(func.count()).select_from(model))
+
+
+def test_reorder_uses_last_value_of_duplicate_ids(client, engine):
+    _, [first, second] = create_tasks(client, 2)
+    [result] = batch(
+        client,
+        {
+            "op": "reorder",
+            "tasks": [
+                {"id": first, "sort_order": 5},
+                {"id": second, "sort_order": 6},
+                {"id": first, "sort_order": 7},
+            ],
+        },
+    )
+    assert result["result"] == {"updated_count": 2, "matched_count": 2}
+    assert ranks(engine, Post) == {first: 7, second: 6}
+
+
+def test_reorder_ignores_unknown_ids(client, engine):
+    _, [task_id] = create_tasks(client, 1)
+    [result] = batch(
+        client,
+        {
+            "op": "reorder",
+            "tasks": [
+                {"id": str(uuid.uuid4()), "sort_order": 3},
+                {"id": task_id, "sort_order": 4},
+            ],
+        },
+    )
+    assert result["result"] == {"updated_count": 1, "matched_count": 1}
+    assert ranks(engine, Post) == {task_id: 4}
+    assert count(engine, Post) == 1
+
+
+def test_reorder_unchanged_values_are_not_counted(client, engine):
+    _, [task_id] = create_tasks(client, 1)
+    rank = ranks(engine, Post)[task_id]
+    [result] = batch(
+        client,
+        {"op": "reorder", "tasks": [{"id": task_id, "sort_order": rank}]},
+    )
+    assert result["result"] == {"updated_count": 0, "matched_count": 1}
+
+
+def test_reorder_categories_with_duplicate_and_unknown_ids(client, engine):
+    first, _ = create_tasks(client, 0)
+    second, _ = create_tasks(client, 0)
+    [result] = batch(
+        client,
+        {
+            "op": "reorder_categories",
+            "category_ids": [first, second, str(uuid.uuid4()), first],
+        },
+    )
+    assert result["result"]["matched_count"] == 2
+    # 重複したIDは最後の位置
+    order = ranks(engine, Category)
+    assert order[second] < order[first]
+    assert count(engine, Category) == 2
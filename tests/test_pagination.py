@@ -0,0 +1,99 @@
+# ==========================================================
+# キーセットページネーション（/api/board/<status>）
+# ==========================================================
+# sort_order が同じタスクが続いても、(sort_order, id) のカーソルで
+# すべてのタスクを1回ずつ、同じ順で返すことを確認する（posts と
+# posts_archive にまたがるアーカイブの列も含む）。
+import uuid
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import update
+
+from flaskr.archive import archive_tasks
+from flaskr.models import ArchivedPost, Post
+
+from .conftest import reset_postgres
+
+
+@pytest.fixture(
+    params=["sqlite", pytest.param("postgresql", marks=pytest.mark.postgres)]
+)
+def database_url(request, tmp_path):
+    if request.param == "postgresql":
+        return reset_postgres()
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+def create_tasks(client, count, status=None):
+    category_id = str(uuid.uuid4())
+    ids = [str(uuid.uuid4()) for _ in range(count)]
+    operations = [
+        {"op": "create_category", "id": category_id, "name": "仕事"}
+    ] + [
+        {
+            "op": "create",
+            "id": task_id,
+            "title": f"タスク{i}",
+            "category_id": category_id,
+        }
+        for i, task_id in enumerate(ids)
+    ]
+    if status:
+        operations += [
+            {"op": "set_status", "id": task_id, "status": status}
+            for task_id in ids
+        ]
+    response = client.post("/api/batch", json={"operations": operations})
+    assert response.status_code == 200, response.get_json()
+    return ids
+
+
+def set_same_rank(engine, *models):
+    with engine.begin() as conn:
+        for model in models:
+            conn.execute(update(model).values(sort_order=0))
+
+
+def read_pages(client, status, limit):
+    ids, cursors = [], []
+    params = {"limit": limit}
+    while True:
+        response = client.get(f"/api/board/{status}", query_string=params)
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        assert len(body["tasks"]) <= limit
+        ids += [task["id"] for task in body["tasks"]]
+        if body["next_cursor"] is None:
+            return ids, cursors
+        cursors.append(body["next_cursor"])
+        params["cursor"] = body["next_cursor"]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3])
+def test_pages_cover_tasks_with_equal_sort_order(client, engine, limit):
+    ids = create_tasks(client, 7)
+    set_same_rank(engine, Post)
+
+    pages, cursors = read_pages(client, "todo", limit)
+    # 同じ sort_order の中は id の順
+    assert pages == sorted(ids, key=uuid.UUID)
+    assert len(cursors) == len(set(cursors)) == (len(ids) - 1) // limit
+
+
+def test_archive_pages_merge_tables_with_equal_sort_order(client, engine):
+    moved = create_tasks(client, 3, status="archive")
+    assert archive_tasks(engine, timedelta(0)) == 3
+    remaining = create_tasks(client, 3, status="archive")
+    set_same_rank(engine, Post, ArchivedPost)
+
+    pages, _ = read_pages(client, "archive", 2)
+    assert pages == sorted(moved + remaining, key=uuid.UUID)
+
+
+@pytest.mark.parametrize(
+    "params", [{"cursor": "x"}, {"cursor": "1:x"}, {"limit": "0"}]
+)
+def test_invalid_page_arguments(client, params):
+    response = client.get("/api/board/todo", query_string=params)
+    assert response.status_code == 400
@@ -0,0 +1,148 @@
+# ==========================================================
+# sort_order の範囲（INTEGER）
+# ==========================================================
+# 先頭・末尾への追加や末尾への移動で sort_order が 32ビットの範囲を
+# 超える場合に、並び順を保ったまま全体を振り直すことを確認する
+# （PostgreSQL では範囲外の値を書き込むとエラーになる）。
+import uuid
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from flaskr.archive import archive_tasks
+from flaskr.models import ArchivedPost, Category, Post
+from flaskr.ranking import RANK_MAX, RANK_MIN, in_range
+
+from .conftest import reset_postgres
+
+
+@pytest.fixture(
+    params=["sqlite", pytest.param("postgresql", marks=pytest.mark.postgres)]
+)
+def database_url(request, tmp_path):
+    if request.param == "postgresql":
+        return reset_postgres()
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+def batch(client, *operations):
+    response = client.post("/api/batch", json={"operations": operations})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()["results"]
+
+
+def create_tasks(client, count, status=None):
+    category_id = str(uuid.uuid4())
+    ids = [str(uuid.uuid4()) for _ in range(count)]
+    operations = [
+        {"op": "create_category", "id": category_id, "name": "仕事"}
+    ] + [
+        {
+            "op": "create",
+            "id": task_id,
+            "title": f"タスク{i}",
+            "category_id": category_id,
+        }
+        for i, task_id in enumerate(ids)
+    ]
+    if status:
+        operations += [
+            {"op": "set_status", "id": task_id, "status": status}
+            for task_id in ids
+        ]
+    batch(client, *operations)
+    return category_id, ids
+
+
+def set_ranks(engine, model, ids, start):
+    """ids の sort_order を start から1ずつの値にする（範囲の端に寄せる）"""
+    with engine.begin() as conn:
+        for index, item_id in enumerate(ids):
+            conn.execute(
+                update(model)
+                .where(model.id == uuid.UUID(item_id))
+                .values(sort_order=start + index)
+            )
+
+
+def ordered(engine, model, **filters):
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(model.id, model.sort_order)
+            .filter_by(**filters)
+            .order_by(model.sort_order, model.id)
+        ).all()
+    assert all(in_range(row.sort_order) for row in rows)
+    return [str(row.id) for row in rows]
+
+
+def test_append_respaces_near_upper_limit(client, engine):
+    category_id, ids = create_tasks(client, 3)
+    set_ranks(engine, Post, ids, RANK_MAX - 2)
+
+    new_id = str(uuid.uuid4())
+    batch(
+        client,
+        *[
+            {
+                "op": "create",
+                "id": task_id,
+                "title": "追加",
+                "category_id": category_id,
+            }
+            for task_id in (new_id, str(uuid.uuid4()))
+        ],
+    )
+    assert ordered(engine, Post, status="todo")[:4] == ids + [new_id]
+
+
+def test_prepend_category_respaces_near_lower_limit(client, engine):
+    create_tasks(client, 1)
+    with engine.connect() as conn:
+        existing = str(conn.execute(select(Category.id)).scalar_one())
+    set_ranks(engine, Category, [existing], RANK_MIN)
+
+    new_id = str(uuid.uuid4())
+    batch(client, {"op": "create_category", "id": new_id, "name": "新規"})
+    assert ordered(engine, Category) == [new_id, existing]
+
+
+@pytest.mark.parametrize("edge", ["first", "last"])
+def test_move_to_edge_respaces(client, engine, edge):
+    _, ids = create_tasks(client, 4)
+    if edge == "last":
+        set_ranks(engine, Post, ids, RANK_MAX - 3)
+        move = {"before_id": ids[-1], "after_id": None}
+        expected = ids[1:] + ids[:1]
+        moved = ids[0]
+    else:
+        set_ranks(engine, Post, ids, RANK_MIN)
+        move = {"before_id": None, "after_id": ids[0]}
+        expected = ids[-1:] + ids[:-1]
+        moved = ids[-1]
+
+    results = batch(client, {"op": "move", "id": moved, **move})
+    assert results[0]["result"]["rebalanced_count"] == 4
+    assert ordered(engine, Post, status="todo") == expected
+
+
+def test_archive_column_respaces_both_tables(client, engine):
+    _, moved = create_tasks(client, 2, status="archive")
+    assert archive_tasks(engine, timedelta(0)) == 2
+    set_ranks(engine, ArchivedPost, moved, RANK_MAX - 1)
+
+    # posts_archive に移したタスクより後ろに置く
+    _, [added] = create_tasks(client, 1, status="archive")
+    with engine.connect() as conn:
+        archived = conn.execute(
+            select(ArchivedPost.id, ArchivedPost.sort_order).order_by(
+                ArchivedPost.sort_order
+            )
+        ).all()
+        rank = conn.execute(
+            select(Post.sort_order).where(Post.id == uuid.UUID(added))
+        ).scalar_one()
+    assert [str(row.id) for row in archived] == moved
+    assert all(in_range(row.sort_order) for row in archived)
+    assert archived[-1].sort_order < rank <= RANK_MAX
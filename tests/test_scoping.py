@@ -0,0 +1,361 @@
+# ==========================================================
+# ユーザーごとのデータの絞り込み
+# ==========================================================
+# 他のユーザーのタスク・カテゴリーが読み込み（ボード・ページ・検索・差分・
+# エクスポート）に混ざらないこと、他のユーザーのIDを指定した操作が 404 に
+# なること、他のユーザーのデータが増えてもレイテンシが変わらないことを確認する。
+import json
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, delete, insert, select, text
+
+from benchmarks.bench_scoping import measure
+from benchmarks.seed import seed
+from flaskr.events import Broadcaster
+from flaskr.migrations import run_migrations
+from flaskr.models import Category, Post, User
+from flaskr.scope import UserScope
+from flaskr.search import BigramSearch, NgramSearch
+from flaskr.tombstones import record_deletions
+
+OTHER_USER_ID = uuid.uuid4()
+OTHER_CATEGORY_ID = uuid.uuid4()
+OTHER_TASK_ID = uuid.uuid4()
+OTHER_TITLE = "他のユーザーの会議"
+
+
+@pytest.fixture
+def board(client, engine):
+    """自分のカテゴリー・タスクと、他のユーザーのカテゴリー・タスク"""
+    cursor = client.get("/api/changes").get_json()["cursor"]
+    category_id = str(uuid.uuid4())
+    task_ids = [str(uuid.uuid4()) for _ in range(3)]
+    operations = [
+        {"op": "create_category", "id": category_id, "name": "仕事"}
+    ] + [
+        {
+            "op": "create",
+            "id": task_id,
+            "title": f"会議{i}",
+            "category_id": category_id,
+        }
+        for i, task_id in enumerate(task_ids)
+    ]
+    response = client.post("/api/batch", json={"operations": operations})
+    assert response.status_code == 200, response.get_json()
+
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User).values(
+                id=OTHER_USER_ID,
+                name="他のユーザー",
+                email="other@example.com",
+                password="x",
+            )
+        )
+        conn.execute(
+            insert(Category).values(
+                id=OTHER_CATEGORY_ID,
+                name="他のユーザーのカテゴリー",
+                user_id=OTHER_USER_ID,
+                sort_order=-1024,
+            )
+        )
+        conn.execute(
+            insert(Post),
+            [
+                (
+                    {
+                        "id": OTHER_TASK_ID,
+                        "title": OTHER_TITLE,
+                        "content": "",
+                        "status": status,
+                        "sort_order": -1024,
+                        "user_id": OTHER_USER_ID,
+                        "category_id": OTHER_CATEGORY_ID,
+                    }
+                    if status == "todo"
+                    else {
+                        "id": uuid.uuid4(),
+                        "title": f"{OTHER_TITLE}（{status}）",
+                        "content": "",
+                        "status": status,
+                        "sort_order": -1024,
+                        "user_id": OTHER_USER_ID,
+                        "category_id": OTHER_CATEGORY_ID,
+                    }
+                )
+                for status in ("todo", "progress", "archive")
+            ],
+        )
+    return {
+        "category_id": category_id,
+        "task_ids": task_ids,
+        "cursor": cursor,
+    }
+
+
+def other_task(engine):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(
+                Post.title, Post.status, Post.sort_order, Post.category_id
+            ).where(Post.id == OTHER_TASK_ID)
+        ).one()
+
+
+def titles(tasks):
+    return [task["title"] for task in tasks]
+
+
+# ----------------------------------------------------------
+# 読み込み
+# ----------------------------------------------------------
+@pytest.mark.parametrize("status", ["todo", "progress", "archive"])
+def test_board_columns_hide_other_users(client, board, status):
+    response = client.get(f"/api/board/{status}")
+    assert response.status_code == 200
+    assert not any(
+        OTHER_TITLE in title for title in titles(response.get_json()["tasks"])
+    )
+
+
+def test_admin_hides_other_users(client, board):
+    html = client.get("/admin").get_data(as_text=True)
+    assert "会議0" in html
+    assert OTHER_TITLE not in html
+    assert "他のユーザーのカテゴリー" not in html
+
+
+def test_search_hides_other_users(client, board):
+    response = client.get("/api/search", query_string={"q": "会議"})
+    assert sorted(titles(response.get_json()["tasks"])) == [
+        "会議0",
+        "会議1",
+        "会議2",
+    ]
+
+
+def test_changes_hide_other_users(client, board, engine):
+    response = client.get(
+        "/api/changes", query_string={"since": board["cursor"]}
+    )
+    changes = response.get_json()
+    assert sorted(titles(changes["tasks"])) == ["会議0", "会議1", "会議2"]
+    assert [c["id"] for c in changes["categories"]] == [board["category_id"]]
+
+    # 他のユーザーの削除の記録も返さない
+    with engine.begin() as conn:
+        conn.execute(delete(Post).where(Post.id == OTHER_TASK_ID))
+        record_deletions(conn, Post, [OTHER_TASK_ID], OTHER_USER_ID)
+    assert client.post(
+        f"/admin/delete_task/{board['task_ids'][0]}"
+    ).status_code in (200, 204)
+    response = client.get(
+        "/api/changes", query_string={"since": board["cursor"]}
+    )
+    assert response.get_json()["deleted"]["tasks"] == [board["task_ids"][0]]
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_export_hides_other_users(client, board, fmt):
+    tables = ["categories", "posts"] if fmt == "csv" else [None]
+    for table in tables:
+        query = {"format": fmt, **({"table": table} if table else {})}
+        body = client.get("/api/export", query_string=query).get_data(
+            as_text=True
+        )
+        assert "他のユーザー" not in body
+        assert str(OTHER_TASK_ID) not in body
+
+
+def test_category_page_of_other_user_is_not_found(client, board):
+    response = client.get(f"/api/categories/{OTHER_CATEGORY_ID}/tasks")
+    assert response.status_code == 404
+
+    response = client.get(f"/api/categories/{board['category_id']}/tasks")
+    assert response.status_code == 200
+    assert len(response.get_json()["tasks"]) == 3
+
+
+# ----------------------------------------------------------
+# 書き込み
+# ----------------------------------------------------------
+@pytest.mark.parametrize(
+    "path, body",
+    [
+        (f"/update_task_status/{OTHER_TASK_ID}", {"status": "progress"}),
+        (f"/admin/edit_task/{OTHER_TASK_ID}", {"title": "変更"}),
+        (f"/move_task/{OTHER_TASK_ID}", {}),
+        (f"/admin/delete_task/{OTHER_TASK_ID}", {}),
+        (f"/move_category/{OTHER_CATEGORY_ID}", {}),
+        (f"/admin/delete_category/{OTHER_CATEGORY_ID}", {}),
+    ],
+)
+def test_writes_to_other_users_ids_are_not_found(
+    client, board, engine, path, body
+):
+    if "edit_task" in path:
+        body["category_id"] = board["category_id"]
+    before = other_task(engine)
+    response = client.post(path, json=body)
+    assert response.status_code == 404, response.get_json()
+    assert other_task(engine) == before
+
+
+@pytest.mark.parametrize(
+    "operation",
+    [
+        {"op": "set_status", "id": str(OTHER_TASK_ID), "status": "progress"},
+        {"op": "edit", "id": str(OTHER_TASK_ID), "title": "変更"},
+        {"op": "move", "id": str(OTHER_TASK_ID)},
+        {"op": "delete", "id": str(OTHER_TASK_ID)},
+        {"op": "move_category", "id": str(OTHER_CATEGORY_ID)},
+    ],
+)
+def test_batch_operations_on_other_users_ids_are_not_found(
+    client, board, engine, operation
+):
+    if operation["op"] == "edit":
+        operation = {**operation, "category_id": board["category_id"]}
+    before = other_task(engine)
+    response = client.post("/api/batch", json={"operations": [operation]})
+    assert response.status_code == 404, response.get_json()
+    assert other_task(engine) == before
+
+
+def test_create_with_other_users_id_conflicts(client, board):
+    operation = {
+        "op": "create",
+        "id": str(OTHER_TASK_ID),
+        "title": "同じID",
+        "category_id": board["category_id"],
+    }
+    response = client.post("/api/batch", json={"operations": [operation]})
+    assert response.status_code == 409
+
+
+def test_tasks_cannot_move_into_other_users_category(client, board, engine):
+    task_id = board["task_ids"][0]
+    response = client.post(
+        "/add_task",
+        json={
+            "title": "他人のカテゴリー",
+            "category_id": str(OTHER_CATEGORY_ID),
+        },
+    )
+    assert response.status_code == 404
+    response = client.post(
+        "/update_task_order",
+        json={
+            "tasks": [
+                {
+                    "id": task_id,
+                    "category_id": str(OTHER_CATEGORY_ID),
+                    "sort_order": 1,
+                }
+            ]
+        },
+    )
+    assert response.status_code == 404
+    with engine.connect() as conn:
+        assert conn.scalar(
+            select(Post.category_id).where(Post.id == uuid.UUID(task_id))
+        ) == uuid.UUID(board["category_id"])
+
+
+def test_reorder_skips_other_users_tasks(client, board, engine):
+    before = other_task(engine)
+    response = client.post(
+        "/update_task_order_by_status",
+        json={
+            "tasks": [
+                {"id": str(OTHER_TASK_ID), "sort_order": 99, "status": "todo"},
+                {
+                    "id": board["task_ids"][1],
+                    "sort_order": 98,
+                    "status": "todo",
+                },
+            ]
+        },
+    )
+    assert response.get_json()["matched_count"] == 1
+    assert other_task(engine) == before
+
+
+def test_import_rejects_other_users_category(client, board, engine):
+    record = {
+        "table": "posts",
+        "title": "取り込み",
+        "category_id": str(OTHER_CATEGORY_ID),
+    }
+    response = client.post(
+        "/api/import",
+        data=json.dumps(record) + "\n",
+        content_type="application/x-ndjson",
+    )
+    assert response.status_code == 400
+    with engine.connect() as conn:
+        assert (
+            conn.scalar(select(Post.id).where(Post.title == "取り込み"))
+            is None
+        )
+
+
+def test_events_are_delivered_per_user():
+    broadcaster = Broadcaster(max_subscribers=3)
+    mine = broadcaster.subscribe("me")
+    other = broadcaster.subscribe("other")
+    broadcaster.publish({"type": "board", "user": "me"})
+    assert mine.get(0) == {"type": "board", "user": "me"}
+    assert other.get(0) is None
+
+
+# ----------------------------------------------------------
+# レイテンシ
+# ----------------------------------------------------------
+# 他のユーザーのデータを 100 倍にしても、ボード・ページ・差分・検索の
+# 時間が（計測のぶれを見込んで）2倍 + 数ミリ秒に収まることを確認する
+USER_POSTS = 500
+OTHER_FACTOR = 100
+MEASURES = ["board", "page", "changes", "search"]
+
+
+def assert_flat_latency(engine, backend):
+    run_migrations(engine)
+    [user_id], _ = seed(engine, USER_POSTS)
+    scope = UserScope(user_id)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    before = measure(engine, scope, backend, repeat=7)
+
+    seed(
+        engine,
+        USER_POSTS * OTHER_FACTOR,
+        users=OTHER_FACTOR,
+        seed_value=1,
+    )
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    after = measure(engine, scope, backend, repeat=7)
+
+    for name, base, grown in zip(MEASURES, before, after):
+        assert grown <= base * 2 + 3, f"{name}: {base:.1f}ms -> {grown:.1f}ms"
+
+
+def test_latency_is_flat_as_other_users_grow(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'scoping.db'}")
+    try:
+        assert_flat_latency(engine, NgramSearch())
+    finally:
+        engine.dispose()
+
+
+@pytest.mark.postgres
+def test_latency_is_flat_as_other_users_grow_postgres(pg_url):
+    engine = create_engine(pg_url)
+    try:
+        assert_flat_latency(engine, BigramSearch())
+    finally:
+        engine.dispose()
@@ -0,0 +1,166 @@
+# ==========================================================
+# タスクの検索（/api/search）
+# ==========================================================
+# posts_archive に移したタスクも検索の対象になること、ステータス・
+# カテゴリーの絞り込みとページ送りが両方のテーブルにまたがって動くことを
+# 確認する（SQLite は ngram、PostgreSQL は bigram のバックエンド）。
+import uuid
+from datetime import timedelta
+
+import pytest
+
+from flaskr.archive import archive_tasks
+
+from .conftest import reset_postgres
+
+
+@pytest.fixture(
+    params=["sqlite", pytest.param("postgresql", marks=pytest.mark.postgres)]
+)
+def database_url(request, tmp_path):
+    if request.param == "postgresql":
+        return reset_postgres()
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+@pytest.fixture
+def tasks(client, engine):
+    """アーカイブ済み（posts_archive に移したもの）と進行中のタスク"""
+    category_id = str(uuid.uuid4())
+    ids = {name: str(uuid.uuid4()) for name in ("移した", "残した", "進行中")}
+    operations = [
+        {"op": "create_category", "id": category_id, "name": "仕事"}
+    ] + [
+        {
+            "op": "create",
+            "id": task_id,
+            "title": f"{name}会議",
+            "category_id": category_id,
+        }
+        for name, task_id in ids.items()
+    ]
+    operations += [
+        {"op": "set_status", "id": ids["移した"], "status": "archive"},
+        {"op": "set_status", "id": ids["進行中"], "status": "progress"},
+    ]
+    response = client.post("/api/batch", json={"operations": operations})
+    assert response.status_code == 200, response.get_json()
+
+    # 検索のインデックスを構築してから移す
+    assert search(client, q="会議")
+    assert archive_tasks(engine, timedelta(0)) == 1
+    # 移した後にアーカイブしたタスクは posts に残る
+    response = client.post(
+        "/api/batch",
+        json={
+            "operations": [
+                {"op": "set_status", "id": ids["残した"], "status": "archive"}
+            ]
+        },
+    )
+    assert response.status_code == 200, response.get_json()
+    return {"category_id": category_id, **ids}
+
+
+def search(client, **params):
+    response = client.get("/api/search", query_string=params)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def titles(body):
+    return sorted(task["title"] for task in body["tasks"])
+
+
+def test_search_finds_tasks_moved_to_archive(client, tasks):
+    assert titles(search(client, q="移した")) == ["移した会議"]
+    assert titles(search(client, q="会議", status="archive")) == [
+        "残した会議",
+        "移した会議",
+    ]
+    assert titles(search(client, q="会議")) == [
+        "残した会議",
+        "移した会議",
+        "進行中会議",
+    ]
+
+
+def test_search_status_other_than_archive_skips_archive(client, tasks):
+    assert titles(search(client, q="会議", status="progress")) == [
+        "進行中会議"
+    ]
+    assert search(client, q="移した", status="todo")["tasks"] == []
+
+
+def test_search_category_filter_includes_archive(client, tasks):
+    body = search(client, q="移した", category_id=tasks["category_id"])
+    assert titles(body) == ["移した会議"]
+    assert search(client, q="移した", category_id=str(uuid.uuid4()))[
+        "tasks"
+    ] == []
+
+
+def test_search_pages_across_both_tables(client, tasks):
+    found = []
+    params = {"q": "会議", "limit": 1}
+    while True:
+        body = search(client, **params)
+        found += [task["id"] for task in body["tasks"]]
+        if body["next_cursor"] is None:
+            break
+        params["cursor"] = body["next_cursor"]
+    assert sorted(found) == sorted(
+        tasks[name] for name in ("移した", "残した", "進行中")
+    )
+
+
+def test_search_pages_title_matches_first_newest_first(client):
+    category_id = str(uuid.uuid4())
+    category = {"op": "create_category", "id": category_id, "name": "仕事"}
+    # 作成順（後のものほど updated_at が新しい）。タイトルに一致するものと
+    # 内容だけに一致するものを交互に作る
+    for title, content in [
+        ("タイトル1", "請求書を送る"),
+        ("請求書の確認1", ""),
+        ("タイトル2", "請求書の再発行"),
+        ("請求書の確認2", ""),
+        ("タイトル3", "請求書の控え"),
+    ]:
+        create = {
+            "op": "create",
+            "id": str(uuid.uuid4()),
+            "title": title,
+            "content": content,
+            "category_id": category_id,
+        }
+        operations = [category, create] if category else [create]
+        response = client.post("/api/batch", json={"operations": operations})
+        assert response.status_code == 200, response.get_json()
+        category = None
+
+    found = []
+    params = {"q": "請求書", "limit": 2}
+    while True:
+        body = search(client, **params)
+        found += [task["title"] for task in body["tasks"]]
+        if body["next_cursor"] is None:
+            break
+        params["cursor"] = body["next_cursor"]
+    assert found == [
+        "請求書の確認2",
+        "請求書の確認1",
+        "タイトル3",
+        "タイトル2",
+        "タイトル1",
+    ]
+
+
+def test_search_rejects_invalid_filters(client):
+    response = client.get(
+        "/api/search", query_string={"q": "会議", "status": "done"}
+    )
+    assert response.status_code == 400
+    response = client.get(
+        "/api/search", query_string={"q": "会議", "category_id": "x"}
+    )
+    assert response.status_code == 400
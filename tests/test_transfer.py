@@ -0,0 +1,117 @@
+# ==========================================================
+# インポートの COPY（PostgreSQL）
+# ==========================================================
+# COPY ... FROM STDIN（CSV 形式）で取り込んだ値が、引用符・区切り文字・
+# 改行・バックスラッシュ・NULL・ASCII 以外の文字を含んでも INSERT で
+# 取り込んだ値と同じになること、CSV のエクスポートを COPY で取り込み
+# 直しても値が変わらないことを確認する。
+import csv
+import io
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+from flaskr.models import Post
+from flaskr.transfer import import_records, read_records
+
+from .conftest import reset_postgres
+
+pytestmark = pytest.mark.postgres
+
+TITLES = [
+    'He said "hi", ok',
+    "カンマ,と\n改行",
+    "back\\slash \\N",
+    "NULL",
+    "\\.",
+    "  前後の空白  ",
+    "タブ\tと\r\nCRLF",
+    "絵文字 🎉 ß é 中文",
+]
+
+CONTENTS = [
+    None,
+    "",
+    '""',
+    "前\n\\.\n後",
+    "\\N",
+    "最後の列,\n",
+    "𠮷野家",
+    "x" * 5000,
+]
+
+
+@pytest.fixture
+def database_url():
+    return reset_postgres()
+
+
+@pytest.fixture
+def user_id(app, engine):
+    return app.extensions["flaskr_users"].default_user_id(engine)
+
+
+def records(category_id):
+    """(行番号, テーブル名, 値) の一覧（毎回新しいID）"""
+    yield 1, "categories", {"id": str(category_id), "name": '分類 "A", 改行\n'}
+    for line, (title, content) in enumerate(zip(TITLES, CONTENTS), 2):
+        yield line, "posts", {
+            "id": str(uuid.uuid4()),
+            "title": title,
+            "content": content,
+            "sort_order": line,
+            "category_id": str(category_id),
+        }
+
+
+def imported(engine, category_id):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(Post.title, Post.content, Post.status, Post.sort_order)
+            .where(Post.category_id == category_id)
+            .order_by(Post.sort_order)
+        ).all()
+
+
+def test_copy_keeps_values_like_insert(engine, user_id):
+    copied, inserted = uuid.uuid4(), uuid.uuid4()
+    assert import_records(engine, records(copied), user_id, method="copy") == {
+        "categories": 1,
+        "posts": len(TITLES),
+    }
+    import_records(engine, records(inserted), user_id, method="insert")
+
+    rows = imported(engine, copied)
+    assert rows == imported(engine, inserted)
+    assert [row.title for row in rows] == TITLES
+    # 空・NULL の内容はどちらも空文字列で保存する
+    assert [row.content for row in rows] == [
+        content or "" for content in CONTENTS
+    ]
+
+
+def test_csv_export_round_trips_through_copy(client, engine, user_id):
+    category_id = uuid.uuid4()
+    import_records(engine, records(category_id), user_id, method="copy")
+
+    response = client.get("/api/export?format=csv&table=posts")
+    assert response.status_code == 200
+    exported = response.get_data(as_text=True)
+
+    # 同じ値を別のIDで取り込み直す
+    rows = list(csv.DictReader(io.StringIO(exported, newline="")))
+    for row in rows:
+        row["id"] = str(uuid.uuid4())
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    lines = io.StringIO(buffer.getvalue(), newline="")
+
+    before = imported(engine, category_id)
+    counts = import_records(
+        engine, read_records(lines, "csv", "posts"), user_id, method="copy"
+    )
+    assert counts["posts"] == len(TITLES)
+    assert sorted(imported(engine, category_id)) == sorted(before * 2)
@@ -0,0 +1,112 @@
+# ==========================================================
+# 既定ユーザーの解決（キャッシュしたユーザーIDの破棄）
+# ==========================================================
+# 他のプロセス（別のワーカー・直接のSQL）でユーザーが削除され、キャッシュ
+# したユーザーIDが古くなっても、書き込みがユーザーを作成し直して成功する
+# ことを確認する（ORM のイベントを通らない削除）。
+import uuid
+
+import pytest
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+
+from flaskr.models import Category, User
+from flaskr.operations import run_operations
+
+from .conftest import make_config, reset_postgres
+
+
+@pytest.fixture(
+    params=["sqlite", pytest.param("postgresql", marks=pytest.mark.postgres)]
+)
+def database_url(request, tmp_path):
+    if request.param == "postgresql":
+        return reset_postgres()
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+def create_category(category_id):
+    return {
+        "operations": [
+            {"op": "create_category", "id": category_id, "name": "仕事"}
+        ]
+    }
+
+
+def user_ids(engine):
+    with engine.connect() as conn:
+        return conn.scalars(select(User.id)).all()
+
+
+def delete_users(engine):
+    """ORM のイベントを通さずにユーザーを削除する（他のプロセスでの削除）"""
+    with engine.begin() as conn:
+        conn.execute(delete(User))
+
+
+def test_write_recreates_user_deleted_elsewhere(app, client, engine):
+    resolver = app.extensions["flaskr_users"]
+    stale = resolver.default_user_id(engine)
+    delete_users(engine)
+    assert resolver.default_user_id(engine) == stale
+
+    category_id = str(uuid.uuid4())
+    response = client.post("/api/batch", json=create_category(category_id))
+    assert response.status_code == 200, response.get_json()
+
+    [user_id] = user_ids(engine)
+    assert user_id != stale
+    assert resolver.default_user_id(engine) == user_id
+    with engine.connect() as conn:
+        owner = conn.scalar(
+            select(Category.user_id).where(
+                Category.id == uuid.UUID(category_id)
+            )
+        )
+    assert owner == user_id
+    assert "仕事" in client.get("/admin").get_data(as_text=True)
+
+
+def test_write_is_retried_only_once(app, engine):
+    calls = []
+
+    def unknown_user_id():
+        calls.append(uuid.uuid4())
+        return calls[-1]
+
+    # 存在しないユーザーを返し続ける場合は1回だけやり直して失敗する
+    with pytest.raises(IntegrityError):
+        run_operations(
+            app.extensions["flaskr_db"],
+            create_category(str(uuid.uuid4()))["operations"],
+            unknown_user_id,
+        )
+    assert len(calls) == 2
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(Category)) == 0
+
+
+def test_async_write_recreates_user_deleted_elsewhere(tmp_path):
+    pytest.importorskip("a2wsgi")
+    pytest.importorskip("aiosqlite")
+    from starlette.testclient import TestClient
+
+    from flaskr.async_api import create_asgi_app
+    from flaskr.migrations import run_migrations
+
+    app = create_asgi_app(make_config(f"sqlite:///{tmp_path / 'test.db'}"))
+    flask_app = app.state.flask_app
+    engine = flask_app.extensions["flaskr_db"].engine
+    run_migrations(engine)
+    with TestClient(app) as client:
+        stale = flask_app.extensions["flaskr_users"].default_user_id(engine)
+        delete_users(engine)
+
+        category_id = str(uuid.uuid4())
+        response = client.post(
+            "/api/batch", json=create_category(category_id)
+        )
+        assert response.status_code == 200, response.json()
+        [user_id] = user_ids(engine)
+        assert user_id != stale
+    flask_app.extensions["flaskr_db"].dispose()